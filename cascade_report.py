@@ -0,0 +1,150 @@
+"""
+Escolha do limiar da cascata de modelos (ver src/cascade.py).
+
+Pontua um arquivo de validação com o primeiro estágio e com o modelo completo e,
+para cada limiar de confiança, reporta a fração de linhas escaladas, a
+concordância da cascata com o modelo completo, a acurácia (se o arquivo tiver o
+rótulo) e o custo médio estimado por linha. Recomenda o limiar mais barato que
+mantém a concordância mínima pedida.
+
+Com `--distill`, treina o primeiro estágio como uma árvore rasa que imita o
+modelo completo, usando metade do arquivo, e avalia na outra metade.
+
+Uso:
+    python cascade_report.py --validation data/holdout.csv
+    python cascade_report.py --validation data/holdout.csv --distill model/cascade_tree.pkl --max-depth 4
+    python cascade_report.py --validation data/holdout.csv --first-stage model/cascade_tree.pkl --min-agreement 0.995
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from cascade import aligned_proba, load_first_stage, threshold_sweep
+from model_compactor import DEFAULT_MODEL, load_holdout
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLDS = [round(t, 2) for t in np.arange(0.40, 1.0001, 0.05)]
+
+
+def ms_per_row(model: Any, X: pd.DataFrame, repeats: int = 3) -> float:
+    """Custo de `predict_proba` por linha, no lote inteiro (melhor de `repeats`)"""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict_proba(X)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000 / max(1, len(X))
+
+
+def distill_tree(X: pd.DataFrame, targets: np.ndarray, max_depth: int, seed: int = 42) -> Pipeline:
+    """Árvore rasa sobre as colunas numéricas, treinada para imitar o modelo completo"""
+    numeric = list(X.select_dtypes(include="number").columns)
+    tree = Pipeline([
+        ("features", ColumnTransformer([("numeric", "passthrough", numeric)], remainder="drop")),
+        ("tree", DecisionTreeClassifier(max_depth=max_depth, min_samples_leaf=20, random_state=seed))
+    ])
+    return tree.fit(X, targets)
+
+
+def recommend(rows: List[Dict[str, Any]], min_agreement: float) -> Optional[Dict[str, Any]]:
+    """Limiar com menor custo (menos escalonamento) entre os que mantêm a concordância"""
+    eligible = [row for row in rows if row["agreement"] >= min_agreement]
+    return min(eligible, key=lambda row: (row["escalation_rate"], row["threshold"])) if eligible else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Escolha do limiar da cascata de modelos")
+    parser.add_argument("--validation", required=True, help="CSV de validação com as features (e o rótulo)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Modelo completo (joblib)")
+    parser.add_argument("--first-stage", default="rules", help="'rules' ou modelo joblib do primeiro estágio")
+    parser.add_argument("--distill", help="Treina uma árvore rasa como primeiro estágio e salva neste caminho")
+    parser.add_argument("--max-depth", type=int, default=4, help="Profundidade da árvore destilada")
+    parser.add_argument("--label", default="Credit_Score", help="Coluna do rótulo")
+    parser.add_argument("--thresholds", help="Limiares separados por vírgula (padrão: 0.40 a 1.00, passo 0.05)")
+    parser.add_argument("--min-agreement", type=float, default=0.99,
+                        help="Concordância mínima com o modelo completo para recomendar um limiar")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args(argv)
+
+    full_model = joblib.load(args.model)
+    X, y = load_holdout(args.validation, full_model, args.label)
+    classes = [c.item() if isinstance(c, np.generic) else c for c in full_model.classes_]
+
+    if args.distill:
+        order = np.random.default_rng(args.seed).permutation(len(X))
+        train, evaluation = order[:len(X) // 2], order[len(X) // 2:]
+        first_stage = distill_tree(X.iloc[train], full_model.predict(X.iloc[train]), args.max_depth, args.seed)
+        joblib.dump(first_stage, args.distill)
+        logger.info(f"Primeiro estágio destilado salvo em {args.distill} ({len(train)} linhas de treino)")
+        first_name = f"distilled_tree(max_depth={args.max_depth})"
+        X = X.iloc[evaluation]
+        y = y[evaluation] if y is not None else None
+    else:
+        first_stage, info = load_first_stage(args.first_stage)
+        first_name = info["model_name"]
+
+    first_proba = aligned_proba(first_stage, X, classes)
+    if first_proba is None:
+        logger.error("O primeiro estágio prevê classes que o modelo completo não conhece")
+        return 1
+    # Comparações como texto: o rótulo do CSV pode vir com outro tipo que as classes do modelo
+    full_predictions = np.asarray([str(v) for v in full_model.predict(X)], dtype=object)
+    first_predictions = np.asarray([str(classes[j]) for j in first_proba.argmax(axis=1)], dtype=object)
+    labels = np.asarray([str(v) for v in y], dtype=object) if y is not None else None
+
+    thresholds = [float(t) for t in args.thresholds.split(",")] if args.thresholds else DEFAULT_THRESHOLDS
+    first_ms, full_ms = ms_per_row(first_stage, X), ms_per_row(full_model, X)
+    rows = threshold_sweep(first_proba.max(axis=1), first_predictions, full_predictions, thresholds,
+                           labels, first_ms, full_ms)
+    best = recommend(rows, args.min_agreement)
+
+    report = {
+        "validation_rows": len(X),
+        "first_stage": first_name,
+        "full_model": args.model,
+        "ms_per_row": {"first_stage": round(first_ms, 6), "full_model": round(full_ms, 6)},
+        "min_agreement": args.min_agreement,
+        "thresholds": rows,
+        "recommended": best
+    }
+
+    print("=" * 72)
+    print(f"Primeiro estágio: {first_name}  |  {len(X)} linhas de validação")
+    print(f"Custo por linha: primeiro estágio {first_ms:.4f}ms, modelo completo {full_ms:.4f}ms")
+    print(f"{'limiar':>7} {'escaladas':>10} {'concordância':>13} {'acurácia':>9} {'ms/linha':>9}")
+    for row in rows:
+        accuracy = f"{row['accuracy']:.4f}" if "accuracy" in row else "-"
+        print(f"{row['threshold']:>7.2f} {row['escalation_rate']:>10.2%} {row['agreement']:>13.4f} "
+              f"{accuracy:>9} {row['ms_per_row']:>9.4f}")
+    if best:
+        print(f"Recomendado: CASCADE_THRESHOLD={best['threshold']} "
+              f"({best['escalation_rate']:.1%} escaladas, concordância {best['agreement']:.4f})")
+    else:
+        print(f"Nenhum limiar atinge concordância {args.min_agreement}; mantenha a cascata desligada")
+    print("=" * 72)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
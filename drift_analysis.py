@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Análise offline de data drift sobre os arquivos diários gravados por
+`write_real_data` (`{data}_credit_score_prediction_data.csv`).
+
+Os arquivos são divididos em blocos (um arquivo, ou um trecho de arquivo grande,
+por tarefa) processados em paralelo por um pool de processos. Cada tarefa reduz
+seu bloco com operações vetorizadas a contagens parciais (histogramas por
+feature, mix de classes, somas por `model_version`), e as parciais são somadas no
+processo principal. Sobre o resultado são calculados:
+- PSI por feature e por dia, contra uma referência (dataset de treino, um
+  arquivo de drift ou, por padrão, o primeiro dia analisado);
+- mix de classes preditas por dia;
+- volume, mix de classes e médias das features por versão do modelo.
+
+Linhas gravadas com amostragem (coluna `sample_weight`, ver src/capture_policy.py)
+contam com o seu peso em todas as contagens; arquivos antigos, sem a coluna,
+valem peso 1. `--unweighted` conta cada linha capturada uma vez.
+
+Exemplos:
+    python drift_analysis.py drift_data/
+    python drift_analysis.py drift_data/ --reference data/train.csv --workers 8 --output drift.json
+    python drift_analysis.py s3://fiap-ds-mlops/credit-score-real-data/
+    python drift_analysis.py drift_data/ --unweighted
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Adicionar pasta src ao path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from schema import CATEGORICAL_DEFAULTS, NUMERIC_FIELDS, drift_files
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PREDICTION_COLUMN = 'credit_score_prediction'
+# Rótulo do dataset de treino, usado quando a referência não tem predições
+LABEL_COLUMN = 'Credit_Score'
+VERSION_COLUMN = 'model_version'
+WEIGHT_COLUMN = 'sample_weight'
+CATEGORICAL_FIELDS = list(CATEGORICAL_DEFAULTS)
+
+# Limiares usuais do PSI: < 0.1 estável, 0.1–0.2 moderado, >= 0.2 significativo
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.2
+PSI_EPSILON = 1e-4
+
+_DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+# Tarefa: (origem, byte inicial, byte final ou None para ler até o fim)
+Task = Tuple[str, int, Optional[int]]
+
+
+def list_sources(path: str) -> List[str]:
+    """Arquivos diários de um diretório/arquivo local ou de um prefixo s3://bucket/prefixo"""
+    if not path.startswith('s3://'):
+        return drift_files(path)
+
+    import aws_clients
+    bucket, _, prefix = path[len('s3://'):].partition('/')
+    s3 = aws_clients.get_client('s3')
+    sources, token = [], None
+    while True:
+        kwargs = {"Bucket": bucket, "Prefix": prefix}
+        if token:
+            kwargs["ContinuationToken"] = token
+        page = s3.list_objects_v2(**kwargs)
+        sources += [f"s3://{bucket}/{obj['Key']}" for obj in page.get('Contents', [])
+                    if obj['Key'].endswith('.csv')]
+        if not page.get('IsTruncated'):
+            break
+        token = page.get('NextContinuationToken')
+    return sorted(sources)
+
+
+def plan_tasks(sources: List[str], chunk_bytes: int) -> List[Task]:
+    """
+    Divide arquivos locais maiores que `chunk_bytes` em trechos; objetos do S3
+    são lidos inteiros por uma tarefa.
+    """
+    tasks: List[Task] = []
+    for source in sources:
+        if source.startswith('s3://'):
+            tasks.append((source, 0, None))
+            continue
+        size = os.path.getsize(source)
+        starts = range(0, max(size, 1), chunk_bytes) if chunk_bytes > 0 else [0]
+        tasks += [(source, start, start + chunk_bytes if chunk_bytes > 0 else None) for start in starts]
+    return tasks
+
+
+def _read_bytes(task: Task) -> Tuple[bytes, bytes]:
+    """
+    Lê o cabeçalho e o trecho da tarefa. Uma linha pertence ao trecho em que
+    começa, então trechos vizinhos não repetem nem perdem linhas.
+    """
+    source, start, end = task
+    if source.startswith('s3://'):
+        import aws_clients
+        bucket, _, key = source[len('s3://'):].partition('/')
+        data = aws_clients.get_client('s3').get_object(Bucket=bucket, Key=key)['Body'].read()
+        header, _, body = data.partition(b'\n')
+        return header, body
+
+    with open(source, 'rb') as f:
+        header = f.readline()
+        if start <= f.tell():
+            position = f.tell()
+        else:
+            f.seek(start - 1)
+            f.readline()
+            position = f.tell()
+        if end is None:
+            return header, f.read()
+        if position >= end:
+            return header, b''
+        data = f.read(end - position)
+        # Completa a última linha só se o trecho terminou no meio dela; uma linha
+        # que começa exatamente em `end` pertence ao próximo trecho
+        if data and not data.endswith(b'\n'):
+            data += f.readline()
+        return header, data
+
+
+def read_block(task: Task) -> Tuple[pd.DataFrame, int]:
+    """
+    Converte o trecho em DataFrame (valores como texto). Linhas com número de
+    colunas diferente do cabeçalho são descartadas, como em `read_drift_records`.
+
+    Returns:
+        tuple: (DataFrame, linhas ignoradas).
+    """
+    header_bytes, body = _read_bytes(task)
+    header = next(csv.reader([header_bytes.decode('utf-8').strip()]), [])
+    rows = [row for row in csv.reader(io.StringIO(body.decode('utf-8'))) if row]
+    valid = [row for row in rows if len(row) == len(header)]
+    return pd.DataFrame(valid, columns=header), len(rows) - len(valid)
+
+
+def _date_of(source: str) -> str:
+    match = _DATE_PATTERN.search(os.path.basename(source))
+    return match.group(1) if match else 'unknown'
+
+
+def _numeric(frame: pd.DataFrame, field: str) -> np.ndarray:
+    if field not in frame.columns:
+        return np.full(len(frame), np.nan)
+    raw = frame[field]
+    values = pd.to_numeric(raw, errors='coerce')
+    # Valores sujos (ex.: "809.98_" no dataset de treino) são limpos só onde a conversão falhou
+    dirty = values.isna() & (raw != '')
+    if dirty.any():
+        values[dirty] = pd.to_numeric(raw[dirty].str.strip().str.strip('_'), errors='coerce')
+    return values.to_numpy(dtype=np.float64)
+
+
+def _weights(frame: pd.DataFrame) -> np.ndarray:
+    """Peso amostral de cada linha; sem a coluna, vazio ou inválido vale 1"""
+    if WEIGHT_COLUMN not in frame.columns:
+        return np.ones(len(frame))
+    weights = pd.to_numeric(frame[WEIGHT_COLUMN], errors='coerce').to_numpy(dtype=np.float64)
+    return np.where(np.isfinite(weights) & (weights > 0), weights, 1.0)
+
+
+def _histogram(values: np.ndarray, edges: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Contagem (ponderada) por faixa; a última posição conta os valores ausentes"""
+    bins = np.searchsorted(edges, values, side='right')
+    bins[np.isnan(values)] = len(edges) + 1
+    return np.bincount(bins, weights=weights, minlength=len(edges) + 2).astype(np.float64)
+
+
+def _value_counts(series: Optional[pd.Series], weights: np.ndarray) -> Dict[str, float]:
+    if series is None:
+        return {}
+    totals = pd.Series(weights, index=series.index).groupby(series).sum()
+    return {str(k): float(v) for k, v in totals.items() if v}
+
+
+def summarize_frame(frame: pd.DataFrame, edges: Dict[str, np.ndarray], weighted: bool = True) -> Dict[str, Any]:
+    """
+    Reduz um DataFrame às contagens usadas no relatório (somáveis entre blocos).
+    Com `weighted`, cada linha conta com o seu `sample_weight`.
+    """
+    numeric = {field: _numeric(frame, field) for field in edges}
+    weights = _weights(frame) if weighted else np.ones(len(frame))
+    summary: Dict[str, Any] = {
+        "rows": float(len(frame)),
+        "weighted_rows": float(weights.sum()),
+        "classes": _value_counts(frame.get(PREDICTION_COLUMN, frame.get(LABEL_COLUMN)), weights),
+        "histograms": {field: _histogram(values, edges[field], weights) for field, values in numeric.items()},
+        "categories": {field: _value_counts(frame[field], weights)
+                       for field in CATEGORICAL_FIELDS if field in frame.columns}
+    }
+
+    if VERSION_COLUMN in frame.columns and len(frame):
+        versions = frame[VERSION_COLUMN].replace('', 'unknown')
+        by_version: Dict[str, Any] = {}
+        values = pd.DataFrame(numeric, index=frame.index)
+        weight_series = pd.Series(weights, index=frame.index)
+        sums = values.mul(weight_series, axis=0).groupby(versions).sum(min_count=1)
+        counts = values.notna().mul(weight_series, axis=0).groupby(versions).sum()
+        weighted_rows = weight_series.groupby(versions).sum()
+        classes = (pd.crosstab(versions, frame[PREDICTION_COLUMN], values=weight_series, aggfunc='sum').fillna(0.0)
+                   if PREDICTION_COLUMN in frame.columns else None)
+        for version, rows in versions.value_counts().items():
+            by_version[str(version)] = {
+                "rows": float(rows),
+                "weighted_rows": float(weighted_rows.loc[version]),
+                "classes": ({str(k): float(v) for k, v in classes.loc[version].items() if v}
+                            if classes is not None else {}),
+                "sums": {f: float(v) for f, v in sums.loc[version].fillna(0.0).items()},
+                "counts": {f: float(v) for f, v in counts.loc[version].items()}
+            }
+        summary["versions"] = by_version
+    return summary
+
+
+def analyse_task(task: Task, edges: Dict[str, np.ndarray], weighted: bool = True) -> Dict[str, Any]:
+    """Executada nos processos do pool: lê e reduz um bloco"""
+    frame, skipped = read_block(task)
+    return {"skipped": skipped, "dates": {_date_of(task[0]): summarize_frame(frame, edges, weighted)}}
+
+
+def merge_into(target: Dict[str, Any], partial: Dict[str, Any]) -> Dict[str, Any]:
+    """Soma recursivamente um resultado parcial em `target`"""
+    for key, value in partial.items():
+        if isinstance(value, dict):
+            merge_into(target.setdefault(key, {}), value)
+        elif key in target:
+            target[key] = target[key] + value
+        else:
+            target[key] = value.copy() if isinstance(value, np.ndarray) else value
+    return target
+
+
+def run_tasks(tasks: List[Task], edges: Dict[str, np.ndarray], workers: int,
+              weighted: bool = True) -> Dict[str, Any]:
+    """Processa as tarefas (em paralelo com workers > 1) e junta as parciais"""
+    merged: Dict[str, Any] = {"skipped": 0, "dates": {}}
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            merge_into(merged, analyse_task(task, edges, weighted))
+        return merged
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        for partial in pool.map(analyse_task, tasks, [edges] * len(tasks), [weighted] * len(tasks)):
+            merge_into(merged, partial)
+    return merged
+
+
+def reference_edges(frame: pd.DataFrame, bins: int) -> Dict[str, np.ndarray]:
+    """Limites das faixas de cada feature numérica pelos quantis da referência"""
+    edges = {}
+    quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+    for field in NUMERIC_FIELDS:
+        values = _numeric(frame, field)
+        values = values[~np.isnan(values)]
+        edges[field] = np.unique(np.quantile(values, quantiles)) if values.size else np.array([])
+    return edges
+
+
+def load_reference(path: str) -> pd.DataFrame:
+    """Lê a referência: CSV local (treino ou drift), diretório ou prefixo S3"""
+    frames = [read_block((source, 0, None))[0] for source in list_sources(path)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population Stability Index entre duas contagens nas mesmas faixas"""
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return 0.0
+    e = np.maximum(expected / expected.sum(), PSI_EPSILON)
+    a = np.maximum(actual / actual.sum(), PSI_EPSILON)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def _category_psi(expected: Dict[str, float], actual: Dict[str, float]) -> float:
+    keys = sorted(set(expected) | set(actual))
+    return psi(np.array([expected.get(k, 0.0) for k in keys]), np.array([actual.get(k, 0.0) for k in keys]))
+
+
+def _status(value: float) -> str:
+    if value >= PSI_SIGNIFICANT:
+        return "significant"
+    return "moderate" if value >= PSI_MODERATE else "stable"
+
+
+def _shares(counts: Dict[str, float]) -> Dict[str, float]:
+    total = sum(counts.values())
+    return {k: round(v / total, 6) for k, v in sorted(counts.items())} if total else {}
+
+
+def build_report(merged: Dict[str, Any], reference: Dict[str, Any]) -> Dict[str, Any]:
+    """Calcula PSI, mix de classes e quebra por versão a partir das contagens somadas"""
+    dates = dict(sorted(merged["dates"].items()))
+    features: Dict[str, Any] = {}
+    for field in NUMERIC_FIELDS + CATEGORICAL_FIELDS:
+        by_date = {}
+        for date, summary in dates.items():
+            if field in reference["histograms"]:
+                by_date[date] = psi(reference["histograms"][field], summary["histograms"][field])
+            elif field in reference["categories"] and field in summary["categories"]:
+                by_date[date] = _category_psi(reference["categories"][field], summary["categories"][field])
+        if by_date:
+            worst = max(by_date.values())
+            features[field] = {"psi_by_date": {d: round(v, 6) for d, v in by_date.items()},
+                               "max_psi": round(worst, 6), "status": _status(worst)}
+
+    versions: Dict[str, Any] = {}
+    for summary in dates.values():
+        merge_into(versions, summary.get("versions", {}))
+
+    return {
+        "rows": int(sum(s["rows"] for s in dates.values())),
+        "estimated_rows": round(sum(s["weighted_rows"] for s in dates.values()), 2),
+        "skipped_lines": int(merged["skipped"]),
+        "reference_rows": int(reference["rows"]),
+        "feature_drift": dict(sorted(features.items(), key=lambda item: item[1]["max_psi"], reverse=True)),
+        "alerts": [field for field, info in features.items() if info["status"] == "significant"],
+        "class_mix": {
+            date: {"rows": int(summary["rows"]), "estimated_rows": round(summary["weighted_rows"], 2),
+                   "shares": _shares(summary["classes"])}
+            for date, summary in dates.items()
+        },
+        "reference_class_mix": _shares(reference["classes"]),
+        "model_versions": {
+            version: {
+                "rows": int(info["rows"]),
+                "estimated_rows": round(info["weighted_rows"], 2),
+                "class_mix": _shares(info["classes"]),
+                "feature_means": {f: round(info["sums"][f] / info["counts"][f], 4)
+                                  for f in info["sums"] if info["counts"].get(f)}
+            }
+            for version, info in sorted(versions.items())
+        }
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("=" * 60)
+    print(f"Linhas analisadas: {report['rows']} ({report['skipped_lines']} ignoradas) "
+          f"em {report['elapsed_seconds']}s com {report['workers']} processos")
+    if report["weighted"] and report["estimated_rows"] != report["rows"]:
+        print(f"Predições estimadas (pesos amostrais): {report['estimated_rows']}")
+    print(f"Referência: {report['reference']} ({report['reference_rows']} linhas)")
+    print("-" * 60)
+    print(f"{'Feature':<28}{'PSI máx.':>10}  Status")
+    for field, info in list(report["feature_drift"].items())[:10]:
+        print(f"{field:<28}{info['max_psi']:>10.4f}  {info['status']}")
+    print("-" * 60)
+    for date, mix in report["class_mix"].items():
+        print(f"{date}: {mix['rows']:>8} linhas  {mix['shares']}")
+    print("-" * 60)
+    for version, info in report["model_versions"].items():
+        print(f"Versão {version}: {info['rows']} linhas  {info['class_mix']}")
+    if report["alerts"]:
+        print(f"ALERTA: drift significativo em {', '.join(report['alerts'])}")
+    print("=" * 60)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Análise offline de data drift dos arquivos diários")
+    parser.add_argument("path", help="Diretório, arquivo CSV ou prefixo s3://bucket/prefixo")
+    parser.add_argument("--reference", help="Referência (CSV de treino, arquivo ou diretório de drift); "
+                                            "padrão: o primeiro dia analisado")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos no pool")
+    parser.add_argument("--chunk-mb", type=float, default=64, help="Tamanho máximo do trecho por tarefa")
+    parser.add_argument("--bins", type=int, default=10, help="Faixas por feature numérica (quantis da referência)")
+    parser.add_argument("--unweighted", action="store_true",
+                        help="Ignora a coluna sample_weight (cada linha capturada conta uma vez)")
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    sources = list_sources(args.path)
+    if not sources:
+        logger.error(f"Nenhum arquivo de drift encontrado em {args.path}")
+        return 1
+
+    reference_path = args.reference or sources[0]
+    reference_frame = load_reference(reference_path)
+    if reference_frame.empty:
+        logger.error(f"Referência vazia: {reference_path}")
+        return 1
+    edges = reference_edges(reference_frame, args.bins)
+    reference = summarize_frame(reference_frame, edges, not args.unweighted)
+
+    tasks = plan_tasks(sources, int(args.chunk_mb * 1024 * 1024))
+    logger.info(f"{len(sources)} arquivos em {len(tasks)} tarefas, {args.workers} processos")
+    merged = run_tasks(tasks, edges, args.workers, not args.unweighted)
+
+    report = {
+        "path": args.path,
+        "reference": reference_path,
+        "files": len(sources),
+        "tasks": len(tasks),
+        "workers": args.workers,
+        "weighted": not args.unweighted,
+        **build_report(merged, reference)
+    }
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,44 @@
+"""
+Gera o snapshot do feature store (perfil mais recente por Customer_ID) a partir
+de um CSV com a coluna `Customer_ID`, como o dataset de treino do modelo.
+
+Uso:
+    python feature_store_builder.py --csv data/train.csv --output model/feature_store.db
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from feature_store import build_snapshot_from_csv
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera o snapshot SQLite do feature store")
+    parser.add_argument("--csv", required=True, help="CSV com Customer_ID e as features")
+    parser.add_argument("--output", default=os.getenv('FEATURE_STORE_PATH', 'model/feature_store.db'),
+                        help="Caminho do snapshot (padrão: FEATURE_STORE_PATH ou model/feature_store.db)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.csv):
+        logger.error(f"Arquivo não encontrado: {args.csv}")
+        return 1
+
+    profiles = build_snapshot_from_csv(args.csv, args.output)
+    if profiles == 0:
+        logger.error("Nenhum perfil gravado: o CSV tem a coluna Customer_ID?")
+        return 1
+
+    print(f"Snapshot gerado: {args.output} ({profiles} perfis)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
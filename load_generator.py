@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga para o servidor HTTP da API de Credit Score (server.py).
+
+Dispara requisições contra /predict (ou /predict/batch) em malha aberta, a uma
+taxa alvo, ou em malha fechada, com concorrência fixa. Os payloads são sintéticos
+(gerados a partir do esquema de `validate_and_clean_data`) ou reproduzidos dos
+CSVs de data drift gravados por `write_real_data`.
+
+As latências são reportadas de duas formas:
+- serviço: do envio efetivo até a resposta;
+- corrigida: na malha aberta, a partir do instante em que a requisição DEVERIA
+  ter sido enviada pelo agendamento (corrige a omissão coordenada, quando o
+  próprio gerador atrasa os envios porque o servidor está lento). Na malha
+  fechada a correção usa o intervalo esperado por cliente (--expected-interval-ms).
+
+Exemplos:
+    python load_generator.py --rate 50 --duration 30
+    python load_generator.py --concurrency 8 --duration 30
+    python load_generator.py --rate 5 --batch-size 200 --replay drift_data/
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Adicionar pasta src ao path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from schema import payload_from_drift_row, read_drift_records, synthetic_record
+
+
+class PayloadSource:
+    """Fornece corpos de requisição sintéticos ou reproduzidos de arquivos de drift"""
+
+    def __init__(self, replay_path: Optional[str] = None, seed: int = 42, missing_rate: float = 0.0):
+        self.rng = random.Random(seed)
+        self.missing_rate = missing_rate
+        self.records: List[Dict[str, Any]] = []
+        self.skipped = [0]
+        self._position = 0
+        self._lock = threading.Lock()
+
+        if replay_path:
+            self.records = [payload_from_drift_row(row)
+                            for row in read_drift_records(replay_path, self.skipped)]
+            if not self.records:
+                raise ValueError(f"Nenhum registro encontrado em {replay_path}")
+
+    def next_records(self, count: int) -> List[Dict[str, Any]]:
+        """Retorna os próximos `count` registros (ciclando os arquivos de replay)"""
+        with self._lock:
+            if not self.records:
+                return [synthetic_record(self.rng, self.missing_rate) for _ in range(count)]
+            batch = []
+            for _ in range(count):
+                batch.append(self.records[self._position % len(self.records)])
+                self._position += 1
+            return batch
+
+    def next_body(self, batch_size: int) -> bytes:
+        records = self.next_records(batch_size)
+        body = {"records": records} if batch_size > 1 else {"data": records[0]}
+        return json.dumps(body).encode('utf-8')
+
+
+class HttpTarget:
+    """Cliente HTTP com uma conexão keep-alive por thread"""
+
+    def __init__(self, url: str, timeout: float):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 80
+        self.base_path = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def post(self, path: str, body: bytes) -> int:
+        """Envia um POST JSON e retorna o status HTTP (exceções sobem ao chamador)"""
+        status, _ = self.request(path, body)
+        return status
+
+    def request(self, path: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        """Envia um POST JSON e retorna (status HTTP, corpo da resposta)"""
+        conn = self._connection()
+        try:
+            conn.request('POST', self.base_path + path, body=body,
+                         headers={'Content-Type': 'application/json', **(headers or {})})
+            response = conn.getresponse()
+            return response.status, response.read()
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+class LatencyRecorder:
+    """Acumula latências e erros de forma thread-safe"""
+
+    def __init__(self):
+        self.service: List[float] = []
+        self.corrected: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.ok = 0
+        self._lock = threading.Lock()
+
+    def record(self, service: float, corrected: List[float], status: Optional[int], error: Optional[str]):
+        with self._lock:
+            self.service.append(service)
+            self.corrected.extend(corrected)
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+            elif status is not None and 200 <= status < 300:
+                self.ok += 1
+            else:
+                key = f"HTTP {status}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil pelo método do posto mais próximo (valores já ordenados)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def expected_interval_corrections(latency: float, expected_interval: Optional[float]) -> List[float]:
+    """
+    Correção de omissão coordenada para malha fechada (estilo HdrHistogram):
+    para cada intervalo esperado "perdido" durante uma resposta lenta, registra
+    a amostra que teria sido observada.
+    """
+    samples = [latency]
+    if not expected_interval or expected_interval <= 0:
+        return samples
+    missing = latency - expected_interval
+    while missing >= expected_interval:
+        samples.append(missing)
+        missing -= expected_interval
+    return samples
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p90_ms": round(percentile(ordered, 90) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "p999_ms": round(percentile(ordered, 99.9) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0
+    }
+
+
+def _send(target: HttpTarget, source: PayloadSource, path: str, batch_size: int):
+    """Envia uma requisição e retorna (latência de serviço, status, erro)"""
+    body = source.next_body(batch_size)
+    started = time.perf_counter()
+    try:
+        status = target.post(path, body)
+        return time.perf_counter() - started, status, None
+    except Exception as e:
+        return time.perf_counter() - started, None, type(e).__name__
+
+
+def run_open_loop(target: HttpTarget, source: PayloadSource, path: str, batch_size: int,
+                  rate: float, duration: float, max_in_flight: int) -> Dict[str, Any]:
+    """
+    Malha aberta: requisições agendadas a `rate` por segundo, independentemente
+    de o servidor ter respondido as anteriores.
+    """
+    recorder = LatencyRecorder()
+    schedule: "queue.Queue[Optional[float]]" = queue.Queue()
+
+    def worker():
+        while True:
+            intended = schedule.get()
+            if intended is None:
+                return
+            service, status, error = _send(target, source, path, batch_size)
+            corrected = time.perf_counter() - intended
+            recorder.record(service, [corrected], status, error)
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(max_in_flight)]
+    for thread in workers:
+        thread.start()
+
+    started = time.perf_counter()
+    sent = 0
+    while True:
+        intended = started + sent / rate
+        if intended - started >= duration:
+            break
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        schedule.put(intended)
+        sent += 1
+
+    for _ in workers:
+        schedule.put(None)
+    for thread in workers:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    return _report("open", recorder, sent, elapsed, batch_size, target_rate=rate)
+
+
+def run_closed_loop(target: HttpTarget, source: PayloadSource, path: str, batch_size: int,
+                    concurrency: int, duration: float,
+                    expected_interval: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Malha fechada: `concurrency` clientes enviam a próxima requisição assim que
+    recebem a resposta anterior.
+    """
+    recorder = LatencyRecorder()
+    deadline = time.perf_counter() + duration
+    counter = [0]
+    counter_lock = threading.Lock()
+
+    def worker():
+        while time.perf_counter() < deadline:
+            service, status, error = _send(target, source, path, batch_size)
+            recorder.record(service, expected_interval_corrections(service, expected_interval),
+                            status, error)
+            with counter_lock:
+                counter[0] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    return _report("closed", recorder, counter[0], elapsed, batch_size, concurrency=concurrency)
+
+
+def _report(mode: str, recorder: LatencyRecorder, sent: int, elapsed: float, batch_size: int,
+            **extra) -> Dict[str, Any]:
+    completed = len(recorder.service)
+    failed = sum(recorder.errors.values())
+    report = {
+        "mode": mode,
+        "elapsed_seconds": round(elapsed, 3),
+        "sent": sent,
+        "completed": completed,
+        "ok": recorder.ok,
+        "errors": recorder.errors,
+        "error_rate": round(failed / completed, 6) if completed else 0.0,
+        "throughput_rps": round(completed / elapsed, 3) if elapsed else 0.0,
+        "records_per_second": round(completed * batch_size / elapsed, 3) if elapsed else 0.0,
+        "batch_size": batch_size,
+        "latency_service": summarize(recorder.service),
+        "latency_corrected": summarize(recorder.corrected)
+    }
+    report.update(extra)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("=" * 60)
+    print(f"Modo: {report['mode']}  |  Duração: {report['elapsed_seconds']}s")
+    print(f"Enviadas: {report['sent']}  Concluídas: {report['completed']}  OK: {report['ok']}")
+    print(f"Throughput: {report['throughput_rps']} req/s ({report['records_per_second']} registros/s)")
+    print(f"Taxa de erro: {report['error_rate']:.4%}  {report['errors'] or ''}")
+    for label, key in (("Serviço", "latency_service"), ("Corrigida", "latency_corrected")):
+        lat = report[key]
+        print(f"{label:>10}: p50={lat['p50_ms']}ms p90={lat['p90_ms']}ms "
+              f"p99={lat['p99_ms']}ms p99.9={lat['p999_ms']}ms max={lat['max_ms']}ms")
+    print("=" * 60)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gerador de carga para server.py")
+    parser.add_argument("--url", default="http://localhost:5000", help="URL base do servidor")
+    parser.add_argument("--rate", type=float, help="Taxa alvo em req/s (malha aberta)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes simultâneos (malha fechada)")
+    parser.add_argument("--max-in-flight", type=int, default=256,
+                        help="Máximo de requisições em voo na malha aberta")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duração em segundos")
+    parser.add_argument("--batch-size", type=int, default=1, help="Registros por requisição (>1 usa /predict/batch)")
+    parser.add_argument("--replay", help="CSV ou diretório com arquivos de data drift para reproduzir")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="Fração de campos omitidos nos sintéticos")
+    parser.add_argument("--expected-interval-ms", type=float,
+                        help="Intervalo esperado por cliente para corrigir a malha fechada")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args(argv)
+
+    source = PayloadSource(args.replay, seed=args.seed, missing_rate=args.missing_rate)
+    if args.replay:
+        print(f"Replay: {len(source.records)} registros ({source.skipped[0]} linhas ignoradas)")
+
+    target = HttpTarget(args.url, args.timeout)
+    path = "/predict/batch" if args.batch_size > 1 else "/predict"
+
+    if args.rate:
+        report = run_open_loop(target, source, path, args.batch_size, args.rate,
+                               args.duration, args.max_in_flight)
+    else:
+        interval = args.expected_interval_ms / 1000 if args.expected_interval_ms else None
+        report = run_closed_loop(target, source, path, args.batch_size, args.concurrency,
+                                 args.duration, interval)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Relatório salvo em {args.output}")
+
+    return 0 if report["completed"] else 1
+
+
+if __name__ == "__main__":
+    exit(main())
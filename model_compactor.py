@@ -0,0 +1,218 @@
+"""
+Gera a variante compacta do modelo de Credit Score (ver src/compact_model.py) e
+um relatório comparando acurácia, probabilidades, tamanho e latência com o
+modelo original em um arquivo de holdout.
+
+Uso:
+    python model_compactor.py --holdout data/holdout.csv
+    python model_compactor.py --holdout data/holdout.csv --target-latency-ms 2 --max-size-mb 20
+    python model_compactor.py --n-estimators 50 --max-depth 12
+"""
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from compact_model import compact_estimator, compact_model
+from explanations import unwrap_model
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "model/model.pkl"
+DEFAULT_OUTPUT = "model/model_compact.pkl"
+LATENCY_ROWS = 200
+
+
+def load_holdout(path: str, model: Any, label: str) -> Tuple[pd.DataFrame, Optional[np.ndarray]]:
+    """Lê o holdout e separa as features (na ordem do modelo) do rótulo, se houver"""
+    df = pd.read_csv(path)
+    y = df.pop(label).to_numpy() if label in df.columns else None
+    estimator = unwrap_model(model)
+    if hasattr(estimator, "feature_names_in_"):
+        df = df[list(estimator.feature_names_in_)]
+    return df, y
+
+
+def measure_latency(model: Any, X: pd.DataFrame) -> Dict[str, float]:
+    """Latência de uma linha (p50 e p95) e do holdout inteiro, em ms"""
+    rows = min(LATENCY_ROWS, len(X))
+    model.predict_proba(X.iloc[:1])
+    timings = []
+    for i in range(rows):
+        started = time.perf_counter()
+        model.predict_proba(X.iloc[i:i + 1])
+        timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    model.predict_proba(X)
+    batch_ms = (time.perf_counter() - started) * 1000
+    return {
+        "single_row_p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "single_row_p95_ms": round(float(np.percentile(timings, 95)), 4),
+        "batch_ms": round(batch_ms, 3),
+        "batch_rows": len(X)
+    }
+
+
+def model_size_mb(model: Any) -> float:
+    return round(len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / (1024 * 1024), 3)
+
+
+def evaluate(original: Any, compact: Any, X: Optional[pd.DataFrame], y: Optional[np.ndarray]) -> Dict[str, Any]:
+    """Compara o modelo compacto com o original"""
+    report: Dict[str, Any] = {
+        "size_mb": {"original": model_size_mb(original), "compact": model_size_mb(compact)}
+    }
+    if X is None or len(X) == 0:
+        return report
+
+    proba_original = np.asarray(original.predict_proba(X))
+    proba_compact = np.asarray(compact.predict_proba(X))
+    classes = np.asarray(unwrap_model(original).classes_)
+    pred_original = classes[np.argmax(proba_original, axis=1)]
+    pred_compact = classes[np.argmax(proba_compact, axis=1)]
+    delta = np.abs(proba_original - proba_compact)
+
+    report.update({
+        "holdout_rows": len(X),
+        "agreement": round(float(np.mean(pred_original == pred_compact)), 6),
+        "probability_delta": {
+            "mean_abs": float(delta.mean()),
+            "p99_abs": float(np.percentile(delta.max(axis=1), 99)),
+            "max_abs": float(delta.max())
+        },
+        "latency": {"original": measure_latency(original, X), "compact": measure_latency(compact, X)}
+    })
+    if y is not None:
+        report["accuracy"] = {
+            "original": round(float(np.mean(pred_original.astype(str) == y.astype(str))), 6),
+            "compact": round(float(np.mean(pred_compact.astype(str) == y.astype(str))), 6)
+        }
+        report["accuracy"]["delta"] = round(report["accuracy"]["compact"] - report["accuracy"]["original"], 6)
+    return report
+
+
+def candidate_configs(n_total: int, depth_total: int, min_estimators: int) -> Iterator[Tuple[int, Optional[int]]]:
+    """
+    Configurações em ordem crescente de redução: primeiro metade dos
+    estimadores por vez até o mínimo, depois profundidade 2 níveis por vez.
+    """
+    n = n_total
+    while True:
+        yield n, None
+        if n <= min_estimators:
+            break
+        n = max(min_estimators, n // 2)
+    depth = depth_total - 2
+    while depth >= 4:
+        yield n, depth
+        depth -= 2
+
+
+def within_budget(compact: Any, X: Optional[pd.DataFrame], target_latency_ms: Optional[float],
+                  max_size_mb: Optional[float]) -> bool:
+    if max_size_mb is not None and model_size_mb(compact) > max_size_mb:
+        return False
+    if target_latency_ms is not None and X is not None:
+        if measure_latency(compact, X.iloc[:LATENCY_ROWS])["single_row_p50_ms"] > target_latency_ms:
+            return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera a variante compacta do modelo de Credit Score")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Modelo original (joblib)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Destino do modelo compacto")
+    parser.add_argument("--holdout", help="CSV de holdout com as features e o rótulo")
+    parser.add_argument("--label", default="Credit_Score", help="Coluna do rótulo no holdout")
+    parser.add_argument("--n-estimators", type=int, help="Número de estimadores mantidos")
+    parser.add_argument("--max-depth", type=int, help="Profundidade máxima das árvores")
+    parser.add_argument("--target-latency-ms", type=float, help="Meta de latência p50 de uma linha")
+    parser.add_argument("--max-size-mb", type=float, help="Tamanho máximo do artefato")
+    parser.add_argument("--min-estimators", type=int, default=10, help="Mínimo de estimadores na busca")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.model):
+        logger.error(f"Modelo não encontrado: {args.model}")
+        return 1
+    original = joblib.load(args.model)
+
+    X, y = (None, None)
+    if args.holdout:
+        X, y = load_holdout(args.holdout, original, args.label)
+    budgets = args.target_latency_ms is not None or args.max_size_mb is not None
+    if args.target_latency_ms is not None and X is None:
+        logger.error("--target-latency-ms requer --holdout para medir a latência")
+        return 1
+
+    try:
+        full = compact_model(original)
+    except TypeError as e:
+        logger.error(f"Modelo não pode ser compactado: {e}")
+        return 1
+
+    if budgets:
+        # Busca a menor redução que atende às metas de latência e tamanho
+        described = compact_estimator(full).describe()
+        compact, budget_met = None, False
+        for n_estimators, max_depth in candidate_configs(described["n_estimators"], described["depth"],
+                                                         args.min_estimators):
+            compact = compact_model(original, n_estimators, max_depth)
+            logger.info(f"Testando {n_estimators} estimadores, profundidade {max_depth or 'completa'}")
+            if within_budget(compact, X, args.target_latency_ms, args.max_size_mb):
+                budget_met = True
+                break
+        if not budget_met:
+            logger.warning("Nenhuma configuração atendeu às metas; usando a mais reduzida")
+    else:
+        compact = compact_model(original, args.n_estimators, args.max_depth)
+        budget_met = None
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "source_model": args.model,
+        "compact": compact_estimator(compact).describe(),
+        "budget": {"target_latency_ms": args.target_latency_ms, "max_size_mb": args.max_size_mb,
+                   "met": budget_met},
+        **evaluate(original, compact, X, y)
+    }
+
+    # Metadados do modelo original, usados pela API ao carregar a variante compacta
+    metadata_path = os.path.join(os.path.dirname(args.model), "model_metadata.json")
+    model_info = {"model_name": "local_model", "version": "unknown"}
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            model_info = json.load(f)
+    report["model_info"] = dict(model_info, variant="compact")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    tmp_path = f"{args.output}.tmp"
+    joblib.dump(compact, tmp_path)
+    shutil.move(tmp_path, args.output)
+    report_path = os.path.splitext(args.output)[0] + "_report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print(f"Modelo compacto salvo em: {args.output}")
+    print(f"Relatório: {report_path}")
+    print(json.dumps({k: report[k] for k in ("compact", "size_mb", "accuracy", "probability_delta", "latency")
+                      if k in report}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,81 +1,119 @@
 """
 Script para baixar o modelo mais recente de classificação de Credit Score do MLflow.
+
+Baixa os arquivos dos artefatos do modelo (model.pkl, MLmodel, ...) direto para
+`model/`, sem desserializar o modelo: vários arquivos por vez, com retomada de
+downloads parciais, verificação de tamanho/sha256 e gravação atômica. Arquivos
+já presentes com o mesmo hash são pulados (ver src/artifact_download.py).
+
+Uso:
+    python model_downloader.py
+    python model_downloader.py --version 4 --workers 8
+    python model_downloader.py --source /mnt/artefatos/model --dest model
 """
 
-from mlflow.tracking import MlflowClient
-import mlflow
+import argparse
 import json
 import os
+import re
+import sys
 from datetime import datetime
 import logging
+from typing import Any, Dict, List, Optional
+
+# Adicionar pasta src ao path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from artifact_download import ArtifactDownloadError, HttpArtifactStore, LocalArtifactStore, download_artifacts
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def download_latest_model():
+MODEL_NAME = "fiap-mlops-score-model"
+MLFLOW_TRACKING_URI = os.getenv('MLFLOW_TRACKING_URI', "https://dagshub.com/domires/fiap-mlops-score-model.mlflow")
+
+
+def auth_headers() -> Dict[str, str]:
+    """Credenciais do servidor de tracking nas variáveis padrão do MLflow"""
+    import base64
+    if os.getenv('MLFLOW_TRACKING_TOKEN'):
+        return {"Authorization": f"Bearer {os.getenv('MLFLOW_TRACKING_TOKEN')}"}
+    if os.getenv('MLFLOW_TRACKING_USERNAME'):
+        credentials = f"{os.getenv('MLFLOW_TRACKING_USERNAME')}:{os.getenv('MLFLOW_TRACKING_PASSWORD', '')}"
+        return {"Authorization": "Basic " + base64.b64encode(credentials.encode()).decode()}
+    return {}
+
+
+def artifact_path(source: str) -> str:
+    """Diretório dos artefatos no run a partir do `source` da versão registrada"""
+    match = re.search(r"/artifacts/(.+)$", source or "") or re.match(r"runs:/[^/]+/(.+)$", source or "")
+    return match.group(1).strip("/") if match else "model"
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    counts: Dict[str, int] = {}
+    for result in report["files"]:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    print("=" * 60)
+    for result in sorted(report["files"], key=lambda r: r["path"]):
+        print(f"{result['status']:>10}  {result['path']}  ({result['bytes']} bytes, {result['seconds']}s)")
+    print(f"Arquivos: {', '.join(f'{n} {status}' for status, n in sorted(counts.items()))}")
+    print(f"Transferido: {report['transferred_bytes'] / 1024 / 1024:.2f} MB de "
+          f"{report['total_bytes'] / 1024 / 1024:.2f} MB em {report['elapsed_seconds']}s "
+          f"({report['mb_per_second']} MB/s)")
+    print("=" * 60)
+
+
+def download_latest_model(dest: str = "model", version: Optional[str] = None, workers: int = 4,
+                          retries: int = 3) -> Optional[Dict[str, Any]]:
     """
-    Baixa a versão mais recente do modelo de credit score do MLflow.
+    Baixa a versão mais recente (ou `version`) do modelo de credit score do MLflow.
+
+    Returns:
+        dict: relatório do download, ou None em caso de falha.
     """
     try:
+        from mlflow.tracking import MlflowClient
+        import mlflow
+
         logger.info("Baixando a versão mais recente do modelo...")
-        
+
         # Configuração do MLflow
-        mlflow.set_tracking_uri("https://dagshub.com/domires/fiap-mlops-score-model.mlflow")
-        
-        model_name = "fiap-mlops-score-model"
+        mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
         client = MlflowClient()
-        
+
         # Busca todas as versões do modelo
-        logger.info(f"Buscando versões do modelo: {model_name}")
-        versions = client.search_model_versions(f"name='{model_name}'")
-        
+        logger.info(f"Buscando versões do modelo: {MODEL_NAME}")
+        versions = client.search_model_versions(f"name='{MODEL_NAME}'")
+
         if not versions:
-            logger.error(f"Nenhuma versão encontrada para o modelo: {model_name}")
-            return False
-        
-        # Encontra a versão mais recente
-        latest_version = max(versions, key=lambda v: int(v.version))
-        logger.info(f"Versão mais recente encontrada: {latest_version.version}")
-        
-        # Cria diretório model se não existir
-        os.makedirs("model", exist_ok=True)
-        
-        # Baixa o modelo completo
-        try:
-            model_uri = f"models:/{model_name}/{latest_version.version}"
-            logger.info(f"Baixando modelo de: {model_uri}")
-            
-            # Baixa usando mlflow.sklearn para manter compatibilidade
-            model = mlflow.sklearn.load_model(model_uri)
-            
-            # Salva o modelo localmente usando joblib para compatibilidade
-            import joblib
-            joblib.dump(model, "model/model.pkl")
-            logger.info("Modelo salvo como model.pkl")
-            
-        except Exception as e:
-            logger.warning(f"Erro ao baixar modelo via MLflow, tentando download de artefatos: {e}")
-            
-            # Fallback: baixa artefatos diretamente
-            try:
-                download_path = client.download_artifacts(
-                    run_id=latest_version.run_id,
-                    path="model",
-                    dst_path="."
-                )
-                logger.info(f"Artefatos baixados em: {download_path}")
-            except Exception as e2:
-                logger.error(f"Falha ao baixar artefatos: {e2}")
-                return False
-        
+            logger.error(f"Nenhuma versão encontrada para o modelo: {MODEL_NAME}")
+            return None
+
+        if version:
+            matching = [v for v in versions if str(v.version) == str(version)]
+            if not matching:
+                logger.error(f"Versão {version} não encontrada para o modelo: {MODEL_NAME}")
+                return None
+            latest_version = matching[0]
+        else:
+            latest_version = max(versions, key=lambda v: int(v.version))
+        logger.info(f"Versão encontrada: {latest_version.version}")
+
+        # Baixa os arquivos dos artefatos (sem carregar e regravar o modelo)
+        store = HttpArtifactStore(MLFLOW_TRACKING_URI, latest_version.run_id,
+                                  artifact_path(latest_version.source), auth_headers())
+        report = download_artifacts(store, dest, workers=workers, retries=retries)
+        if not os.path.exists(os.path.join(dest, "model.pkl")):
+            logger.warning(f"Artefatos baixados sem model.pkl em {dest}")
+
         # Busca informações adicionais do run
         run_info = client.get_run(latest_version.run_id)
         metrics = run_info.data.metrics
-        
+
         # Cria metadata do modelo
         model_metadata = {
-            "model_name": model_name,
+            "model_name": MODEL_NAME,
             "version": latest_version.version,
             "run_id": latest_version.run_id,
             "source": latest_version.source,
@@ -88,23 +126,56 @@ def download_latest_model():
                 "recall": metrics.get("recall", "N/A")
             }
         }
-        
-        # Salva metadata
-        with open("model/model_metadata.json", "w", encoding="utf-8") as f:
+
+        # Salva metadata (atômico, como os artefatos)
+        metadata_path = os.path.join(dest, "model_metadata.json")
+        with open(f"{metadata_path}.tmp", "w", encoding="utf-8") as f:
             json.dump(model_metadata, f, indent=2, ensure_ascii=False)
-        
+        os.replace(f"{metadata_path}.tmp", metadata_path)
+
         logger.info("Metadata do modelo salva com sucesso")
-        logger.info(f"Modelo {model_name} v{latest_version.version} baixado com sucesso!")
-        logger.info(f"Métricas: Accuracy={metrics.get('accuracy', 'N/A'):.4f}")
-        
-        return True
-        
+        logger.info(f"Modelo {MODEL_NAME} v{latest_version.version} baixado com sucesso!")
+        logger.info(f"Métricas: Accuracy={metrics.get('accuracy', 'N/A')}")
+
+        return report
+
     except Exception as e:
         logger.error(f"Erro ao baixar modelo: {e}")
-        return False
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Baixa o modelo de Credit Score do MLflow")
+    parser.add_argument("--dest", default="model", help="Diretório de destino")
+    parser.add_argument("--version", help="Versão registrada (padrão: a mais recente)")
+    parser.add_argument("--source", help="Diretório local no lugar do store de artefatos do MLflow")
+    parser.add_argument("--revision", help="run_id/versão dos artefatos de --source (sem ela e sem "
+                                           "checksums.json, os arquivos são sempre baixados de novo)")
+    parser.add_argument("--workers", type=int, default=4, help="Arquivos baixados em paralelo")
+    parser.add_argument("--retries", type=int, default=3, help="Tentativas por arquivo (cada uma retoma o .part)")
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        try:
+            report = download_artifacts(LocalArtifactStore(args.source, args.revision), args.dest,
+                                        workers=args.workers, retries=args.retries)
+        except ArtifactDownloadError as e:
+            logger.error(f"Erro ao baixar artefatos: {e}")
+            report = None
+    else:
+        report = download_latest_model(args.dest, args.version, args.workers, args.retries)
+    if report is None:
+        return 1
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Relatório salvo em {args.output}")
+    print("Download concluído com sucesso!")
+    return 0
+
 
 if __name__ == "__main__":
-    success = download_latest_model()
-    if not success:
-        exit(1)
-    print("Download concluído com sucesso!")
\ No newline at end of file
+    exit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Trabalhador de jobs de pontuação assíncrona (src/job_queue.py).
+
+Retira jobs da fila em lotes, pontua cada lote com uma única chamada ao
+`handler` (mesma validação, modelo, telemetria e registro de auditoria das
+requisições síncronas) e grava os resultados no destino antes de confirmá-los.
+
+- Registro inválido: o lote é repontuado job a job e só o inválido recebe
+  resultado de erro (definitivo, não volta para a fila).
+- Falha do modelo ou versão indisponível: os jobs voltam para a fila após
+  `--retry-delay` segundos; após o máximo de entregas vão para `dead`.
+- Trabalhador que morre no meio do lote: os jobs reaparecem quando o prazo de
+  visibilidade expira.
+
+O throughput escala com `--processes` (cada processo carrega o modelo e tem seu
+próprio GIL) e, em menor grau, com `--threads` por processo. Cada processo usa um
+subdiretório próprio do spool de telemetria (`TELEMETRY_SPOOL_DIR/worker-N`).
+
+Cada job é um registro ou `{"data": {...}, "model_version": "3"}`.
+
+Exemplos:
+    python queue_worker.py --enqueue campanha.jsonl
+    python queue_worker.py --processes 4 --batch-size 200
+    python queue_worker.py --drain --output worker.json
+    python queue_worker.py --queue https://sqs.us-east-1.amazonaws.com/123/score-jobs --results resultados/
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Adicionar pasta src ao path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from job_queue import open_queue, open_sink
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_URL = os.getenv('JOB_QUEUE_URL', 'jobs/jobs.db')
+JOB_RESULTS_PATH = os.getenv('JOB_RESULTS_PATH', '')
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv('JOB_VISIBILITY_TIMEOUT_SECONDS', '60'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+# Mesmo padrão de TELEMETRY_SPOOL_DIR em src/app.py
+DEFAULT_TELEMETRY_SPOOL_DIR = '/tmp/credit-score-telemetry'
+
+
+def job_record(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return payload["data"] if isinstance(payload.get("data"), dict) else payload
+
+
+class JobWorker:
+    """
+    Consome a fila com `threads` threads, cada uma em seu próprio lote.
+
+    Args:
+        job_queue: fila de `job_queue` (SQLite ou SQS).
+        sink: destino dos resultados.
+        handler (callable): função no formato do `handler` da API.
+        batch_size (int): jobs por recebimento (e por chamada ao handler).
+        retry_delay (float): espera antes de reentregar jobs com falha transitória.
+    """
+
+    def __init__(self, job_queue: Any, sink: Any, handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 batch_size: int = 100, threads: int = 1, retry_delay: float = 5.0,
+                 idle_sleep: float = 0.5):
+        self.queue = job_queue
+        self.sink = sink
+        self.handler = handler
+        self.batch_size = max(1, batch_size)
+        self.threads = max(1, threads)
+        self.retry_delay = retry_delay
+        self.idle_sleep = idle_sleep
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.counters = {"batches": 0, "succeeded": 0, "failed": 0, "retried": 0, "lost_acks": 0,
+                         "errors": 0}
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for key, delta in deltas.items():
+                self.counters[key] += delta
+
+    def _score(self, jobs: List[Dict[str, Any]], version: Optional[str], request_id: str) -> Dict[str, Any]:
+        body: Dict[str, Any] = {"records": [job_record(job["payload"]) for job in jobs]}
+        if version:
+            body["model_version"] = version
+        return self.handler({"body": body, "headers": {"X-Request-ID": request_id}})
+
+    def _results(self, jobs: List[Dict[str, Any]], version: Optional[str]) -> tuple:
+        """Pontua um grupo (mesma versão); retorna (resultados definitivos, jobs a reentregar, erro)"""
+        request_id = f"jobs-{jobs[0]['receipt'][:16]}"
+        try:
+            response = self._score(jobs, version, request_id)
+        except Exception as e:
+            return [], jobs, type(e).__name__
+
+        status = response.get("statusCode", 500)
+        body = json.loads(response["body"]) if status == 200 or status == 400 else None
+        if status == 200:
+            meta = {"model_version": body.get("model_version"), "model_name": body.get("model_name")}
+            return [{"job_id": job["id"], "status": "succeeded", "result": dict(prediction, **meta)}
+                    for job, prediction in zip(jobs, body["predictions"])], [], None
+        if status == 400 and len(jobs) > 1:
+            # Um registro inválido derruba o lote inteiro: isola job a job
+            results, retry, error = [], [], None
+            for job in jobs:
+                single_results, single_retry, single_error = self._results([job], version)
+                results += single_results
+                retry += single_retry
+                error = error or single_error
+            return results, retry, error
+        if status == 400:
+            return [{"job_id": jobs[0]["id"], "status": "failed",
+                     "error": body.get("message") or body.get("error")}], [], None
+        return [], jobs, f"HTTP {status}"
+
+    def process(self, jobs: List[Dict[str, Any]]) -> None:
+        """Pontua, grava e confirma um lote recebido da fila"""
+        groups: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for job in jobs:
+            payload = job["payload"]
+            version = payload.get("model_version") if isinstance(payload, dict) else None
+            groups.setdefault(str(version) if version else None, []).append(job)
+
+        for version, group in groups.items():
+            valid = [job for job in group if isinstance(job["payload"], dict)]
+            results = [{"job_id": job["id"], "status": "failed", "error": "Job deve ser um objeto JSON"}
+                       for job in group if not isinstance(job["payload"], dict)]
+            retry, error = [], None
+            if valid:
+                scored, retry, error = self._results(valid, version)
+                results += scored
+
+            if results:
+                by_id = {job["id"]: job for job in group}
+                self.sink.write(results)
+                acked = self.queue.ack([by_id[r["job_id"]] for r in results])
+                failed = sum(1 for r in results if r["status"] == "failed")
+                self._count(succeeded=len(results) - failed, failed=failed, lost_acks=len(results) - acked)
+            if retry:
+                logger.warning(f"{len(retry)} job(s) voltam para a fila: {error}")
+                self.queue.release(retry, delay=self.retry_delay, error=error)
+                self._count(retried=len(retry))
+        self._count(batches=1)
+
+    def _loop(self, drain: bool, idle_exit: float) -> None:
+        idle_since = None
+        while not self.stop_event.is_set():
+            try:
+                jobs = self.queue.receive(self.batch_size)
+            except Exception as e:
+                logger.error(f"Erro ao receber jobs: {e}")
+                jobs = []
+            if not jobs:
+                idle_since = idle_since or time.monotonic()
+                if drain and time.monotonic() - idle_since >= idle_exit:
+                    return
+                self.stop_event.wait(self.idle_sleep)
+                continue
+            idle_since = None
+            try:
+                self.process(jobs)
+            except Exception as e:
+                # Falha ao gravar/confirmar: devolve o lote e segue consumindo
+                # (jobs já confirmados não são afetados pelo release)
+                logger.error(f"Erro ao processar lote de {len(jobs)} job(s): {e}")
+                try:
+                    self.queue.release(jobs, delay=self.retry_delay, error=type(e).__name__)
+                except Exception as release_error:
+                    logger.error(f"Erro ao devolver jobs à fila: {release_error}")
+                self._count(errors=1)
+
+    def run(self, drain: bool = False, idle_exit: float = 2.0) -> Dict[str, Any]:
+        """
+        Consome a fila até `stop_event` (ou, com `drain`, até ficar vazia por
+        `idle_exit` segundos) e retorna os contadores.
+        """
+        started = time.perf_counter()
+        threads = [threading.Thread(target=self._loop, args=(drain, idle_exit), daemon=True)
+                   for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            logger.info("Encerrando: aguardando os lotes em andamento...")
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            report = dict(self.counters)
+        done = report["succeeded"] + report["failed"]
+        report.update(elapsed_seconds=round(elapsed, 3),
+                      jobs_per_second=round(done / elapsed, 3) if elapsed else 0.0)
+        return report
+
+
+def isolate_telemetry_spool(index: int) -> str:
+    """
+    Aponta o spool de telemetria do processo para `TELEMETRY_SPOOL_DIR/worker-<index>`.
+    O spool assume um processo por diretório; deve ser chamado antes de importar `app`.
+    """
+    base = os.getenv('TELEMETRY_SPOOL_DIR', DEFAULT_TELEMETRY_SPOOL_DIR)
+    path = os.path.join(base, f"worker-{index}")
+    os.environ['TELEMETRY_SPOOL_DIR'] = path
+    return path
+
+
+def _run_process(args: argparse.Namespace, results: Any, index: int = 0) -> None:
+    """Um processo trabalhador: carrega a API e consome a fila"""
+    isolate_telemetry_spool(index)
+    import app
+    if not args.verbose:
+        logging.getLogger('app').setLevel(logging.WARNING)
+    job_queue = open_queue(args.queue, args.visibility_timeout, args.max_attempts)
+    worker = JobWorker(job_queue, open_sink(args.results, job_queue), app.handler,
+                       args.batch_size, args.threads, args.retry_delay)
+    results.put(worker.run(drain=args.drain, idle_exit=args.idle_exit))
+
+
+def _merge(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = {key: sum(r[key] for r in reports)
+              for key in ("batches", "succeeded", "failed", "retried", "lost_acks", "errors")}
+    elapsed = max((r["elapsed_seconds"] for r in reports), default=0.0)
+    merged.update(processes=len(reports), elapsed_seconds=elapsed,
+                  jobs_per_second=round((merged["succeeded"] + merged["failed"]) / elapsed, 3) if elapsed else 0.0)
+    return merged
+
+
+def _read_jobs(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Trabalhador de jobs de pontuação assíncrona")
+    parser.add_argument("--queue", default=JOB_QUEUE_URL, help="Arquivo SQLite ou URL de fila do SQS")
+    parser.add_argument("--results", default=JOB_RESULTS_PATH,
+                        help="Destino: arquivo .db (SQLite) ou diretório de JSON Lines; padrão: o banco da fila")
+    parser.add_argument("--enqueue", help="Enfileira os jobs de um arquivo JSON Lines e sai")
+    parser.add_argument("--processes", type=int, default=1, help="Processos trabalhadores")
+    parser.add_argument("--threads", type=int, default=1, help="Threads por processo")
+    parser.add_argument("--batch-size", type=int, default=100, help="Jobs por lote")
+    parser.add_argument("--visibility-timeout", type=float, default=JOB_VISIBILITY_TIMEOUT_SECONDS,
+                        help="Segundos que um lote recebido fica reservado")
+    parser.add_argument("--max-attempts", type=int, default=JOB_MAX_ATTEMPTS, help="Entregas antes de 'dead' (SQLite)")
+    parser.add_argument("--retry-delay", type=float, default=5.0, help="Espera antes de reentregar falhas transitórias")
+    parser.add_argument("--drain", action="store_true", help="Sai quando a fila ficar vazia")
+    parser.add_argument("--idle-exit", type=float, default=2.0, help="Segundos de fila vazia para sair com --drain")
+    parser.add_argument("--verbose", action="store_true", help="Mantém os logs INFO da API")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os contadores")
+    args = parser.parse_args(argv)
+
+    if args.enqueue:
+        ids = open_queue(args.queue, args.visibility_timeout, args.max_attempts).enqueue(_read_jobs(args.enqueue))
+        print(f"{len(ids)} job(s) enfileirados em {args.queue}")
+        return 0
+
+    results: Any = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_run_process, args=(args, results, index))
+                 for index in range(max(1, args.processes))]
+    for process in processes:
+        process.start()
+    reports = []
+    try:
+        for _ in processes:
+            reports.append(results.get())
+    except KeyboardInterrupt:
+        logger.info("Encerrando os processos trabalhadores...")
+    for process in processes:
+        process.join()
+
+    report = _merge(reports)
+    print(f"Jobs: {report['succeeded']} pontuados, {report['failed']} inválidos, "
+          f"{report['retried']} reentregues, {report['errors']} lote(s) com erro  |  {report['jobs_per_second']} jobs/s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Relatório salvo em {args.output}")
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
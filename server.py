@@ -3,8 +3,14 @@ Servidor HTTP para a API de Credit Score.
 Expõe a API em uma porta local para requisições HTTP.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from datetime import datetime
+from functools import wraps
+import base64
+import hmac
+import math
+import os
 import sys
 import json
 import logging
@@ -19,6 +25,11 @@ sys.path.append('src')
 # Importar a API
 try:
     import app as credit_api
+    import columnar
+    import wire_codec
+    from admission import AdmissionController
+    from job_queue import open_queue, open_sink
+    from profiling import ProfilerBusy
     logger.info("API de Credit Score carregada com sucesso!")
 except Exception as e:
     logger.error(f"Erro ao carregar API: {e}")
@@ -28,6 +39,112 @@ except Exception as e:
 app = Flask(__name__)
 CORS(app)  # Permitir CORS para requisições do frontend
 
+# Endpoints administrativos só existem com ADMIN_TOKEN configurado
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+PROFILE_CPU_MAX_SECONDS = float(os.getenv('PROFILE_CPU_MAX_SECONDS', '60'))
+PROFILE_CPU_MIN_INTERVAL_MS = float(os.getenv('PROFILE_CPU_MIN_INTERVAL_MS', '5'))
+PREDICTIONS_QUERY_MAX_ROWS = int(os.getenv('PREDICTIONS_QUERY_MAX_ROWS', '1000'))
+
+def admin_required(view):
+    """Exige o header X-Admin-Token igual a ADMIN_TOKEN"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Endpoints administrativos desabilitados"}), 404
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token, ADMIN_TOKEN):
+            return jsonify({"error": "Token administrativo inválido"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# Controle de admissão: token bucket por cliente e limite global em andamento.
+# Desligado por padrão: atrás de um proxy, sem ADMISSION_TRUST_FORWARDED, todos os
+# clientes sem X-API-Key dividiriam o bucket do IP do proxy
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'false').lower() == 'true'
+ADMISSION_RATE_PER_CLIENT = float(os.getenv('ADMISSION_RATE_PER_CLIENT', '50'))
+ADMISSION_BURST = float(os.getenv('ADMISSION_BURST', '100'))
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '16'))
+ADMISSION_RECORDS_PER_TOKEN = int(os.getenv('ADMISSION_RECORDS_PER_TOKEN', '50'))
+ADMISSION_BYTES_PER_TOKEN = int(os.getenv('ADMISSION_BYTES_PER_TOKEN', '16384'))
+ADMISSION_TRUST_FORWARDED = os.getenv('ADMISSION_TRUST_FORWARDED', 'false').lower() == 'true'
+
+admission = AdmissionController(ADMISSION_RATE_PER_CLIENT, ADMISSION_BURST, ADMISSION_MAX_IN_FLIGHT)
+if ADMISSION_ENABLED and not ADMISSION_TRUST_FORWARDED:
+    logger.warning("Controle de admissão usa o IP de origem por cliente (ADMISSION_TRUST_FORWARDED=false): "
+                   "atrás de um proxy, todos os clientes sem X-API-Key dividem o mesmo limite")
+
+# Jobs assíncronos (queue_worker.py): /jobs só existe com JOB_QUEUE_URL configurada
+JOB_QUEUE_URL = os.getenv('JOB_QUEUE_URL', '')
+JOB_RESULTS_PATH = os.getenv('JOB_RESULTS_PATH', '')
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv('JOB_VISIBILITY_TIMEOUT_SECONDS', '60'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+JOBS_MAX_PER_REQUEST = int(os.getenv('JOBS_MAX_PER_REQUEST', '10000'))
+
+job_queue = open_queue(JOB_QUEUE_URL, JOB_VISIBILITY_TIMEOUT_SECONDS, JOB_MAX_ATTEMPTS) if JOB_QUEUE_URL else None
+job_results = open_sink(JOB_RESULTS_PATH, job_queue) if job_queue is not None else None
+
+def _client_source():
+    """Origem da requisição (primeiro X-Forwarded-For apenas atrás de proxy confiável)"""
+    if ADMISSION_TRUST_FORWARDED and request.headers.get('X-Forwarded-For'):
+        return request.headers['X-Forwarded-For'].split(',')[0].strip()
+    return request.remote_addr
+
+def request_body():
+    """
+    Corpo da requisição decodificado uma única vez (JSON ou msgpack, o mesmo
+    dicionário para a API). Retorna None se o formato não for aceito ou for inválido.
+    """
+    if 'request_body' not in g:
+        g.request_body = None
+        if wire_codec.media_type(request.content_type):
+            if wire_codec.available():
+                try:
+                    g.request_body = wire_codec.decode(request.get_data())
+                except ValueError as e:
+                    logger.warning(str(e))
+        elif request.is_json:
+            g.request_body = request.get_json(silent=True)
+    return g.request_body
+
+def _unsupported_body():
+    """Resposta para corpo ausente, inválido ou em formato não aceito"""
+    if wire_codec.media_type(request.content_type):
+        if not wire_codec.available():
+            return jsonify({"error": "Corpo msgpack requer o pacote msgpack"}), 415
+        return jsonify({"error": "Corpo msgpack inválido"}), 400
+    return jsonify({"error": "Content-Type deve ser application/json ou application/msgpack"}), 400
+
+def _batch_cost():
+    """Custo de um lote: proporcional aos registros (JSON/msgpack) ou ao tamanho do corpo (colunar)"""
+    if columnar.media_type(request.content_type):
+        return math.ceil((request.content_length or 0) / ADMISSION_BYTES_PER_TOKEN)
+    data = request_body()
+    records = data.get('records') if isinstance(data, dict) else None
+    return math.ceil(len(records) / ADMISSION_RECORDS_PER_TOKEN) if isinstance(records, list) else 1
+
+def admission_controlled(cost=None):
+    """Recusa com 429/503 e Retry-After o que excede os limites de admissão"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not ADMISSION_ENABLED:
+                return view(*args, **kwargs)
+            client = admission.client_key(request.headers.get('X-API-Key'), _client_source())
+            decision = admission.admit(client, cost() if cost else 1)
+            if not decision.admitted:
+                message = ("Limite de requisições do cliente excedido" if decision.status == 429
+                           else "Servidor sobrecarregado")
+                response = jsonify({"error": message, "retry_after": decision.retry_after})
+                response.status_code = decision.status
+                response.headers['Retry-After'] = str(decision.retry_after)
+                return response
+            try:
+                return view(*args, **kwargs)
+            finally:
+                decision.release()
+        return wrapper
+    return decorator
+
 @app.route('/', methods=['GET'])
 def health_check():
     """Endpoint de health check"""
@@ -40,43 +157,133 @@ def health_check():
     })
 
 @app.route('/predict', methods=['POST'])
+@admission_controlled()
 def predict():
     """Endpoint principal para predição de credit score"""
     try:
-        # Obter dados da requisição
-        if request.is_json:
-            data = request.get_json()
-        else:
-            return jsonify({"error": "Content-Type deve ser application/json"}), 400
+        # Obter dados da requisição (JSON ou msgpack)
+        data = request_body()
+        if data is None:
+            return _unsupported_body()
         
         # Validar se tem o campo 'data'
-        if 'data' not in data:
+        if not isinstance(data, dict) or 'data' not in data:
             return jsonify({"error": "Campo 'data' é obrigatório"}), 400
         
-        # Criar evento no formato esperado pela API
-        event = {
-            "body": json.dumps(data),
-            "headers": {"Content-Type": "application/json"}
-        }
+        return forward_to_api(data)
+            
+    except Exception as e:
+        logger.error(f"Erro na predição: {e}")
+        return jsonify({
+            "error": "Erro interno do servidor",
+            "message": str(e)
+        }), 500
+
+@app.route('/predict/batch', methods=['POST'])
+@admission_controlled(cost=_batch_cost)
+def predict_batch():
+    """Endpoint para predição de um lote de registros (JSON, Arrow IPC ou Parquet)"""
+    try:
+        if columnar.media_type(request.content_type):
+            return forward_columnar()
         
-        # Executar predição usando a API existente
-        response = credit_api.handler(event, context=None)
+        data = request_body()
+        if data is None:
+            return _unsupported_body()
         
-        # Retornar resposta
-        if response["statusCode"] == 200:
-            body = json.loads(response["body"])
-            return jsonify(body), 200
-        else:
-            body = json.loads(response["body"])
-            return jsonify(body), response["statusCode"]
+        # Validar se tem o campo 'records'
+        if not isinstance(data, dict) or 'records' not in data:
+            return jsonify({"error": "Campo 'records' é obrigatório"}), 400
+        
+        return forward_to_api(data)
             
     except Exception as e:
-        logger.error(f"Erro na predição: {e}")
+        logger.error(f"Erro na predição em lote: {e}")
         return jsonify({
             "error": "Erro interno do servidor",
             "message": str(e)
         }), 500
 
+@app.route('/jobs', methods=['POST'])
+@admission_controlled(cost=_batch_cost)
+def submit_jobs():
+    """Enfileira registros para pontuação assíncrona (um job por registro)"""
+    if job_queue is None:
+        return jsonify({"error": "Jobs assíncronos desligados", "message": "Configure JOB_QUEUE_URL"}), 404
+    data = request_body()
+    if data is None:
+        return _unsupported_body()
+    records = data.get('records') if isinstance(data, dict) else None
+    if records is None and isinstance(data, dict) and isinstance(data.get('data'), dict):
+        records = [data['data']]
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "Campo 'records' (lista não vazia) ou 'data' é obrigatório"}), 400
+    if len(records) > JOBS_MAX_PER_REQUEST:
+        return jsonify({"error": f"Máximo de {JOBS_MAX_PER_REQUEST} jobs por requisição"}), 400
+    job_ids = data.get('job_ids')
+    if job_ids is not None and (not isinstance(job_ids, list) or len(job_ids) != len(records)
+                                or not all(isinstance(i, str) and i for i in job_ids)):
+        return jsonify({"error": "'job_ids' deve ter um id (texto) por registro"}), 400
+
+    version = data.get('model_version') or request.headers.get('X-Model-Version')
+    payloads = [{"data": record, "model_version": version} if version else {"data": record}
+                for record in records]
+    ids = job_queue.enqueue(payloads, job_ids)
+    return jsonify({"job_ids": ids, "count": len(ids)}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Resultado de um job (ou seu estado, enquanto estiver na fila)"""
+    if job_queue is None:
+        return jsonify({"error": "Jobs assíncronos desligados", "message": "Configure JOB_QUEUE_URL"}), 404
+    found = job_results.get(job_id) or job_queue.status(job_id)
+    if found is None:
+        return jsonify({"error": "Job não encontrado", "job_id": job_id}), 404
+    return jsonify(found)
+
+# Headers repassados ao handler (versão do modelo e prazo da requisição)
+FORWARDED_HEADERS = ('X-Model-Version', 'X-Deadline-Ms', 'X-Request-Start', 'X-Request-ID')
+
+def forward_to_api(data):
+    """Repassa o corpo já decodificado ao handler da API e converte a resposta"""
+    # O dicionário vai direto no evento: nada é reserializado entre servidor e API
+    headers = {"Content-Type": "application/json"}
+    for name in ('Accept',) + FORWARDED_HEADERS:
+        if request.headers.get(name):
+            headers[name] = request.headers[name]
+    
+    event = {
+        "body": data,
+        "headers": headers
+    }
+    
+    # Executar predição usando a API existente
+    return to_flask_response(credit_api.handler(event, context=None))
+
+def forward_columnar():
+    """Repassa um corpo binário (Arrow IPC/Parquet) ao handler, como o API Gateway faz"""
+    headers = {"Content-Type": request.content_type}
+    for name in ('Accept',) + FORWARDED_HEADERS:
+        if request.headers.get(name):
+            headers[name] = request.headers[name]
+    
+    event = {
+        "body": base64.b64encode(request.get_data()).decode('ascii'),
+        "isBase64Encoded": True,
+        "headers": headers
+    }
+    return to_flask_response(credit_api.handler(event, context=None))
+
+def to_flask_response(response):
+    """Converte a resposta no formato do API Gateway, sem decodificar e recodificar o corpo"""
+    headers = response.get("headers", {})
+    body = response["body"]
+    if response.get("isBase64Encoded"):
+        body = base64.b64decode(body)
+    extra = {k: v for k, v in headers.items() if k.startswith('X-')}
+    return Response(body, status=response["statusCode"],
+                    mimetype=headers.get("Content-Type", "application/json"), headers=extra)
+
 @app.route('/predict', methods=['GET'])
 def predict_info():
     """Informações sobre o endpoint de predição"""
@@ -111,6 +318,129 @@ def model_info():
     """Informações sobre o modelo carregado"""
     return jsonify(credit_api.model_info)
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Contadores de execução da API"""
+    stats = credit_api.runtime_stats()
+    stats["admission"] = admission.stats() if ADMISSION_ENABLED else None
+    stats["jobs"] = job_queue.stats() if job_queue is not None else None
+    return jsonify(stats)
+
+@app.route('/models', methods=['GET'])
+def models():
+    """Versões do modelo residentes no pool e estado das fontes"""
+    stats = credit_api.model_pool.stats()
+    stats["sources"] = credit_api.model_resolver.last_report
+    stats["circuit_breaker"] = credit_api.model_breaker.state()
+    return jsonify(stats)
+
+@app.route('/admin/profile/memory/start', methods=['POST'])
+@admin_required
+def profile_memory_start():
+    """Liga o profiling de alocações por etapa do pipeline"""
+    options = request.get_json(silent=True) or {}
+    try:
+        frames = max(1, int(options.get('frames', 1)))
+        detail_requests = max(0, int(options.get('detail_requests', 0)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'frames' e 'detail_requests' devem ser inteiros"}), 400
+    return jsonify(credit_api.profiler.start(frames=frames, detail_requests=detail_requests))
+
+@app.route('/admin/profile/memory', methods=['GET'])
+@admin_required
+def profile_memory_report():
+    """Relatório atual de alocações (por requisição, por etapa e crescimento)"""
+    top = request.args.get('top', default=10, type=int)
+    return jsonify(credit_api.profiler.report(top=top))
+
+@app.route('/admin/profile/memory/stop', methods=['POST'])
+@admin_required
+def profile_memory_stop():
+    """Desliga o profiling de alocações e retorna o relatório final"""
+    return jsonify(credit_api.profiler.stop())
+
+@app.route('/admin/profile/cpu', methods=['POST'])
+@admin_required
+def profile_cpu():
+    """
+    Captura um profile de CPU por amostragem durante uma janela fixa.
+    `format`: json (resumo), collapsed (pilhas para flame graph) ou pstats (arquivo binário).
+    """
+    options = request.get_json(silent=True) or {}
+    try:
+        seconds = float(options.get('seconds', 10))
+        interval_ms = float(options.get('interval_ms', 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'seconds' e 'interval_ms' devem ser números"}), 400
+    mode = options.get('mode', 'cpu')
+    output = options.get('format', request.args.get('format', 'json'))
+    if not 0 < seconds <= PROFILE_CPU_MAX_SECONDS or interval_ms < PROFILE_CPU_MIN_INTERVAL_MS:
+        return jsonify({
+            "error": f"'seconds' deve estar entre 0 e {PROFILE_CPU_MAX_SECONDS:g} "
+                     f"e 'interval_ms' >= {PROFILE_CPU_MIN_INTERVAL_MS:g}"
+        }), 400
+    if mode not in credit_api.CpuSampler.MODES or output not in ('json', 'collapsed', 'pstats'):
+        return jsonify({"error": "'mode' deve ser cpu ou wall e 'format' json, collapsed ou pstats"}), 400
+    try:
+        result = credit_api.cpu_sampler.capture(seconds, interval=interval_ms / 1000, mode=mode)
+    except ProfilerBusy as e:
+        return jsonify({"error": "Captura em andamento", "message": str(e)}), 409
+    
+    filename = f"cpu-{mode}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    if output == 'collapsed':
+        return Response(result["collapsed_stacks"], mimetype='text/plain',
+                        headers={"Content-Disposition": f"attachment; filename={filename}.folded"})
+    if output == 'pstats':
+        return Response(result["pstats_bytes"], mimetype='application/octet-stream',
+                        headers={"Content-Disposition": f"attachment; filename={filename}.pstats"})
+    return jsonify({k: v for k, v in result.items() if k not in ("collapsed_stacks", "pstats_bytes")})
+
+@app.route('/admin/feature-store/reload', methods=['POST'])
+@admin_required
+def feature_store_reload():
+    """Passa a usar o snapshot atual do feature store (ou o abre, se criado depois)"""
+    try:
+        if credit_api.feature_store is None:
+            credit_api.feature_store = credit_api.FeatureStore(credit_api.FEATURE_STORE_PATH)
+        else:
+            credit_api.feature_store.reload()
+    except Exception as e:
+        logger.error(f"Erro ao recarregar feature store: {e}")
+        return jsonify({"error": "Feature store indisponível", "message": str(e)}), 404
+    return jsonify(credit_api.feature_store.stats())
+
+@app.route('/admin/predictions', methods=['GET'])
+@admin_required
+def predictions_lookup():
+    """Consulta o registro local de predições por requisição, cliente e/ou período"""
+    if credit_api.prediction_store is None:
+        return jsonify({"error": "Registro de predições desligado",
+                        "message": "Configure PREDICTION_STORE_PATH"}), 404
+    filters = {
+        "request_id": request.args.get('request_id'),
+        "applicant_key": request.args.get('applicant'),
+        "since": request.args.get('since'),
+        "until": request.args.get('until')
+    }
+    if not any(filters.values()):
+        return jsonify({"error": "Informe 'request_id', 'applicant', 'since' ou 'until'"}), 400
+    limit = min(request.args.get('limit', default=100, type=int), PREDICTIONS_QUERY_MAX_ROWS)
+    try:
+        rows = credit_api.prediction_store.query(limit=limit, **filters)
+    except ValueError:
+        return jsonify({"error": "'since' e 'until' devem ser época em segundos ou ISO 8601"}), 400
+    return jsonify({"predictions": rows, "count": len(rows)})
+
+@app.route('/admin/predictions/compact', methods=['POST'])
+@admin_required
+def predictions_compact():
+    """Remove do registro local as predições além da retenção"""
+    if credit_api.prediction_store is None:
+        return jsonify({"error": "Registro de predições desligado",
+                        "message": "Configure PREDICTION_STORE_PATH"}), 404
+    removed = credit_api.prediction_store.compact()
+    return jsonify(dict(credit_api.prediction_store.stats(), removed=removed))
+
 if __name__ == '__main__':
     print("SUBINDO SERVIDOR HTTP DA API DE CREDIT SCORE")
     print("=" * 60)
@@ -121,8 +451,21 @@ if __name__ == '__main__':
     print("Endpoints disponíveis:")
     print("GET  / - Health check")
     print("POST /predict - Predição de credit score") 
+    print("POST /predict/batch - Predição em lote")
     print("GET  /predict - Informações do endpoint")
     print("GET  /model-info - Informações do modelo")
+    print("GET  /models - Versões residentes no pool")
+    print("GET  /metrics - Contadores de execução")
+    if job_queue is not None:
+        print("POST /jobs - Enfileirar pontuação assíncrona")
+        print("GET  /jobs/<id> - Resultado de um job")
+    if ADMIN_TOKEN:
+        print("POST /admin/profile/memory/start|stop - Profiling de memória")
+        print("GET  /admin/profile/memory - Relatório de alocações")
+        print("POST /admin/profile/cpu - Profile de CPU por amostragem")
+        print("POST /admin/feature-store/reload - Recarregar snapshot do feature store")
+        print("GET  /admin/predictions - Consultar predições registradas")
+        print("POST /admin/predictions/compact - Aplicar a retenção do registro")
     print("=" * 60)
     print("ervidor rodando em: http://localhost:5000")
     print("Para parar: Ctrl+C")
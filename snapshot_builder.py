@@ -0,0 +1,142 @@
+"""
+Gera o snapshot de inicialização da API (ver src/startup_snapshot.py).
+
+Resolve o modelo pelo caminho normal (MLflow -> arquivo local) ou carrega o
+arquivo indicado em `--model`, calcula os recursos pré-calculados (explicador),
+valida o modelo com uma predição e grava tudo em um único arquivo versionado e
+com checksum, junto com a fonte do modelo (sha256 do arquivo ou versão do
+MLflow). Na inicialização, `load_model` restaura esse arquivo em uma única
+leitura quando o checksum, as versões das bibliotecas e a fonte conferem.
+
+Uso:
+    python snapshot_builder.py
+    python snapshot_builder.py --model model/model.pkl --metadata model/model_metadata.json
+    python snapshot_builder.py --output /opt/model/startup_snapshot.pkl --verify
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import joblib
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from schema import CORE_DEFAULTS
+from startup_snapshot import file_source, mlflow_source, read_snapshot, write_snapshot
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = os.getenv('STARTUP_SNAPSHOT_PATH', '') or 'model/startup_snapshot.pkl'
+
+
+def load_from_file(app: Any, model_path: str, metadata_path: Optional[str]) -> tuple:
+    """Modelo joblib + metadados, com os recursos pré-calculados do pool da API"""
+    loaded_model = joblib.load(model_path)
+    info = {"model_name": "local_model", "version": "unknown"}
+    if metadata_path and os.path.exists(metadata_path):
+        with open(metadata_path, 'r') as f:
+            info = json.load(f)
+    info["source"] = "local_file"
+    prepared = app.model_pool.prepare(loaded_model) if app.model_pool.prepare else None
+    return loaded_model, info, prepared
+
+
+def snapshot_source(app: Any, info: Dict[str, Any], model_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Artefato de origem do modelo, conferido por `load_model` antes de restaurar"""
+    if model_path:
+        return file_source(model_path)
+    origin = str(info.get("source", ""))
+    if origin == "local_file":
+        return file_source(app.LOCAL_MODEL_PATH)
+    if origin == "local_compact":
+        return file_source(app.MODEL_COMPACT_PATH)
+    if origin.startswith("mlflow"):
+        return mlflow_source(info)
+    return None
+
+
+def sample_predictions(app: Any, model: Any) -> List[Any]:
+    """Predição de um registro padrão: valida o modelo antes de gravar o snapshot"""
+    model_input = app.prepare_model_input([app.validate_and_clean_data(dict(CORE_DEFAULTS))])
+    return [r["prediction"] for r in app.run_inference(model, model_input, use_cascade=False)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera o snapshot de inicialização da API")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Arquivo do snapshot")
+    parser.add_argument("--model", help="Modelo joblib (padrão: resolução normal da API)")
+    parser.add_argument("--metadata", default="model/model_metadata.json",
+                        help="Metadados do modelo usados com --model")
+    parser.add_argument("--allow-mock", action="store_true",
+                        help="Aceita o modelo de demonstração quando nenhuma fonte carrega")
+    parser.add_argument("--verify", action="store_true", help="Restaura o snapshot gravado e compara as predições")
+    args = parser.parse_args(argv)
+
+    # O builder sempre parte da resolução normal, nunca de um snapshot anterior
+    os.environ['STARTUP_SNAPSHOT_PATH'] = ''
+    if args.model:
+        # Com o arquivo explícito, a importação da API não sonda o MLflow
+        os.environ['MODEL_OFFLINE'] = 'true'
+    import app
+
+    if args.model:
+        started = time.perf_counter()
+        loaded_model, info, prepared = load_from_file(app, args.model, args.metadata)
+        load_seconds = time.perf_counter() - started
+    else:
+        load_seconds = app.startup_report.get("seconds", 0.0)
+        entry = app.model_pool.get_entry()
+        loaded_model, prepared = entry["model"], entry["prepared"]
+        info = {k: v for k, v in entry["info"].items() if k not in ("startup", "thread_budget")}
+        if info.get("type") == "mock" and not args.allow_mock:
+            logger.error("Nenhuma fonte de modelo carregou (modelo de demonstração); "
+                         "use --allow-mock para gravar mesmo assim")
+            return 1
+
+    try:
+        expected = sample_predictions(app, loaded_model)
+        header = write_snapshot(args.output, loaded_model, info, prepared,
+                                snapshot_source(app, info, args.model))
+    except Exception as e:
+        logger.error(f"Não foi possível gerar o snapshot: {e}")
+        return 1
+
+    report: Dict[str, Any] = {
+        "output": args.output,
+        "model_info": info,
+        "size_mb": round(os.path.getsize(args.output) / 1024 / 1024, 3),
+        "sha256": header["sha256"],
+        "source": header["source"],
+        "libraries": header["libraries"],
+        "explainer": prepared is not None,
+        "load_seconds": round(load_seconds, 3)
+    }
+    if args.verify:
+        started = time.perf_counter()
+        restored = read_snapshot(args.output)
+        report["restore_seconds"] = round(time.perf_counter() - started, 3)
+        report["predictions_match"] = sample_predictions(app, restored["model"]) == expected
+
+    print("=" * 60)
+    print(f"Snapshot: {args.output} ({report['size_mb']} MB)")
+    print(f"Modelo: {info.get('model_name')} v{info.get('version')} ({info.get('source')})")
+    print(f"sha256: {header['sha256']}")
+    print(f"Bibliotecas: {', '.join(f'{k} {v}' for k, v in header['libraries'].items())}")
+    print(f"Carregamento normal: {report['load_seconds']}s")
+    if args.verify:
+        print(f"Restauração: {report['restore_seconds']}s  |  predições iguais: {report['predictions_match']}")
+    print("=" * 60)
+
+    with open(os.path.splitext(args.output)[0] + '_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    return 0 if report.get("predictions_match", True) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,169 @@
+"""
+Controle de admissão do servidor HTTP.
+Cada cliente (API key ou origem) tem um token bucket próprio e há um limite
+global de requisições em andamento. O que excede é recusado na hora (429 ou
+503 com Retry-After), protegendo a latência de quem foi admitido.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tempo sugerido ao cliente quando o limite global está cheio
+_OVERLOAD_RETRY_AFTER = 1
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` tokens por segundo, acumulando até `burst`.
+    Não é thread-safe; o AdmissionController serializa o acesso.
+    """
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost: float, now: float) -> float:
+        """
+        Consome `cost` tokens se houver saldo.
+
+        Returns:
+            float: 0 se consumiu, ou os segundos até haver saldo suficiente.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def refund(self, cost: float) -> None:
+        self.tokens = min(self.burst, self.tokens + cost)
+
+
+class Decision:
+    """Resultado da admissão; admitidas devem chamar `release()` ao terminar"""
+
+    def __init__(self, admitted: bool, status: int = 200, retry_after: int = 0, reason: str = "",
+                 release: Optional[Callable[[], None]] = None):
+        self.admitted = admitted
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+        self._release = release
+
+    def release(self) -> None:
+        if self._release is not None:
+            self._release()
+            self._release = None
+
+
+class AdmissionController:
+    """
+    Admissão por cliente (token bucket) e global (requisições em andamento).
+
+    Args:
+        rate (float): tokens por segundo de cada cliente (0 desliga o limite por cliente).
+        burst (float): saldo máximo acumulado por cliente.
+        max_in_flight (int): requisições simultâneas admitidas (0 = sem limite).
+        max_clients (int): buckets mantidos em memória; os menos recentes são descartados.
+        clock (callable): relógio monotônico (substituível nos testes).
+    """
+
+    def __init__(self, rate: float, burst: float, max_in_flight: int, max_clients: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_in_flight = max_in_flight
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._rejections: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+
+    @staticmethod
+    def client_key(api_key: Optional[str], source: Optional[str]) -> str:
+        """Chave do cliente; a API key não é guardada em claro"""
+        if api_key:
+            return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        return f"ip:{source or 'unknown'}"
+
+    def admit(self, client: str, cost: float = 1.0) -> Decision:
+        """
+        Decide se a requisição entra.
+
+        Args:
+            client (str): chave do cliente (ver `client_key`).
+            cost (float): tokens consumidos (lotes custam mais); limitado a `burst`
+                para que um lote grande seja admitido com o bucket cheio.
+
+        Returns:
+            Decision: admitida, ou recusada com status 429 (cliente) / 503 (global).
+        """
+        cost = min(max(cost, 1.0), self.burst)
+        now = self._clock()
+        with self._lock:
+            bucket = None
+            if self.rate > 0:
+                bucket = self._buckets.get(client)
+                if bucket is None:
+                    bucket = TokenBucket(self.rate, self.burst, now)
+                    self._buckets[client] = bucket
+                    if len(self._buckets) > self.max_clients:
+                        evicted, _ = self._buckets.popitem(last=False)
+                        self._rejections.pop(evicted, None)
+                else:
+                    self._buckets.move_to_end(client)
+                wait = bucket.take(cost, now)
+                if wait > 0:
+                    self.rate_limited += 1
+                    self._rejections[client] = self._rejections.get(client, 0) + 1
+                    return Decision(False, 429, max(1, math.ceil(wait)), "rate_limited")
+
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                # Devolve os tokens: a recusa não foi culpa do cliente
+                if bucket is not None:
+                    bucket.refund(cost)
+                self.overloaded += 1
+                return Decision(False, 503, _OVERLOAD_RETRY_AFTER, "overloaded")
+
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.admitted += 1
+        return Decision(True, release=self._release)
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+        with self._lock:
+            total = self.admitted + self.rate_limited + self.overloaded
+            rejected = sorted(self._rejections.items(), key=lambda item: item[1], reverse=True)[:top]
+            return {
+                "admitted": self.admitted,
+                "rate_limited": self.rate_limited,
+                "overloaded": self.overloaded,
+                "shed_ratio": round((self.rate_limited + self.overloaded) / total, 6) if total else 0.0,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "max_in_flight": self.max_in_flight,
+                "rate_per_client": self.rate,
+                "burst": self.burst,
+                "tracked_clients": len(self._buckets),
+                "top_rate_limited_clients": [{"client": c, "rejections": n} for c, n in rejected]
+            }
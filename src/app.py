@@ -4,17 +4,47 @@ Classifica clientes em três categorias: Good, Standard, Poor.
 Sistema robusto com fallback local quando MLflow não estiver disponível.
 """
 
+from contextlib import nullcontext
 from datetime import datetime
+import atexit
+import base64
+import csv
+import hashlib
+import io
 import json
 import os
-import boto3
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Union
+from typing import Dict, Any, List, Union
 import logging
 import pickle
+import sqlite3
+import threading
+import time
+import uuid
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
+import aws_clients
+import columnar
+import wire_codec
+from capture_policy import SAMPLE_WEIGHT_COLUMN, CapturePolicy, parse_class_rates
+from cascade import CascadeScorer, load_first_stage
+from coalescing import SingleFlight, request_key
+from degradation import DeadlinePolicy
+from explanations import build_explainer
+from feature_store import CUSTOMER_ID_FIELD, FeatureStore, enrich_frame, enrich_records
+from inference_backend import InferenceBackendError, ProcessInferenceBackend, available_cpus
+from model_pool import ModelPool, ModelVersionUnavailable
+from prediction_store import PredictionStore
+from profiling import AllocationProfiler, CpuSampler
+from rule_model import RuleCreditScoreModel
+from schema import CATEGORICAL_DEFAULTS, CORE_DEFAULTS, CORE_FIELDS, EXTENDED_FIELDS
+from startup_snapshot import file_source, mlflow_source, try_restore
+from telemetry_spool import TelemetrySpool
+from thread_budget import ThreadBudget, per_worker_budget
+from model_resolver import (
+    CircuitBreaker, ModelSource, ModelSourceResolver, SourceTimeout, run_with_timeout
+)
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -26,66 +56,116 @@ scaler = None
 model_info = {}
 classes = ["Good", "Standard", "Poor"]
 
+# Configuração do pool de versões do modelo
+MODEL_NAME = "fiap-mlops-score-model"
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', 'model/versions')
+MODEL_POOL_MAX_MB = int(os.getenv('MODEL_POOL_MAX_MB', '1024'))
+MODEL_POOL_MAX_MODELS = int(os.getenv('MODEL_POOL_MAX_MODELS', '3'))
+
+# Variante compacta gerada por model_compactor.py (preferida quando habilitada)
+MODEL_PREFER_COMPACT = os.getenv('MODEL_PREFER_COMPACT', 'false').lower() == 'true'
+MODEL_COMPACT_PATH = os.getenv('MODEL_COMPACT_PATH', 'model/model_compact.pkl')
+LOCAL_MODEL_PATH = 'model/model.pkl'
+# Snapshot de inicialização gerado por snapshot_builder.py ('' = desligado)
+STARTUP_SNAPSHOT_PATH = os.getenv('STARTUP_SNAPSHOT_PATH', 'model/startup_snapshot.pkl')
+startup_report = {}
+_mlflow_configured = False
+_mlflow_lock = threading.Lock()
+
+# Configuração do lote e das explicações por predição
+BATCH_MAX_RECORDS = int(os.getenv('BATCH_MAX_RECORDS', '5000'))
+EXPLANATIONS_ENABLED = os.getenv('EXPLANATIONS_ENABLED', 'true').lower() == 'true'
+EXPLANATION_TOP_K = int(os.getenv('EXPLANATION_TOP_K', '5'))
+EXPLANATION_MAX_ROWS = int(os.getenv('EXPLANATION_MAX_ROWS', '1000'))
+
+# Coalescência de requisições idênticas em andamento
+COALESCING_ENABLED = os.getenv('COALESCING_ENABLED', 'true').lower() == 'true'
+singleflight = SingleFlight()
+
+# Feature store opcional: completa registros com Customer_ID a partir do perfil salvo
+FEATURE_STORE_PATH = os.getenv('FEATURE_STORE_PATH', 'model/feature_store.db')
+feature_store = None
+if os.path.isfile(FEATURE_STORE_PATH):
+    try:
+        feature_store = FeatureStore(FEATURE_STORE_PATH)
+        logger.info(f"Feature store carregado: {feature_store.stats()}")
+    except Exception as e:
+        logger.warning(f"Feature store indisponível ({FEATURE_STORE_PATH}): {e}")
+
+# Profiling sob demanda (acionado pelos endpoints administrativos do servidor)
+profiler = AllocationProfiler()
+cpu_sampler = CpuSampler()
+
+# Degradação por prazo: modelo de reserva quando o principal não cabe no tempo restante
+DEGRADATION_ENABLED = os.getenv('DEGRADATION_ENABLED', 'true').lower() == 'true'
+DEGRADATION_FALLBACK = os.getenv('DEGRADATION_FALLBACK', 'rules')
+DEGRADATION_SAFETY_FACTOR = float(os.getenv('DEGRADATION_SAFETY_FACTOR', '1.5'))
+DEGRADATION_MARGIN_MS = float(os.getenv('DEGRADATION_MARGIN_MS', '5'))
+DEGRADATION_ESTIMATE_MAX_AGE_SECONDS = float(os.getenv('DEGRADATION_ESTIMATE_MAX_AGE_SECONDS', '30'))
+REQUEST_SLO_MS = float(os.getenv('REQUEST_SLO_MS', '0'))
+deadline_policy = DeadlinePolicy(DEGRADATION_SAFETY_FACTOR, DEGRADATION_MARGIN_MS,
+                                 DEGRADATION_ESTIMATE_MAX_AGE_SECONDS)
+
+# Backend de inferência: "inline" (thread da requisição) ou "process" (pool de processos)
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'inline')
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0'))
+INFERENCE_TIMEOUT_SECONDS = float(os.getenv('INFERENCE_TIMEOUT_SECONDS', '30'))
+INFERENCE_HEALTH_INTERVAL_SECONDS = float(os.getenv('INFERENCE_HEALTH_INTERVAL_SECONDS', '10'))
+INFERENCE_SNAPSHOT_DIR = os.getenv('INFERENCE_SNAPSHOT_DIR', '/tmp/credit-score-inference')
+inference_backend = None
+inference_fallbacks = 0
+
+# Cascata: primeiro estágio barato e modelo completo só nas linhas incertas
+CASCADE_ENABLED = os.getenv('CASCADE_ENABLED', 'false').lower() == 'true'
+CASCADE_FIRST_STAGE = os.getenv('CASCADE_FIRST_STAGE', 'rules')
+# Sem padrão: depende do primeiro estágio (as regras só têm 0.80/0.65/0.75 por
+# classe) e deve vir do cascade_report.py; obrigatório com CASCADE_ENABLED=true
+CASCADE_THRESHOLD = os.getenv('CASCADE_THRESHOLD', '')
+
+# Orçamento de threads por processo que executa o modelo (0 = núcleos / processos)
+THREAD_BUDGET_ENABLED = os.getenv('THREAD_BUDGET_ENABLED', 'true').lower() == 'true'
+INFERENCE_THREADS_PER_WORKER = int(os.getenv('INFERENCE_THREADS_PER_WORKER', '0'))
+INFERENCE_PARALLEL_MIN_ROWS = int(os.getenv('INFERENCE_PARALLEL_MIN_ROWS', '1000'))
+_model_processes = (INFERENCE_WORKERS or available_cpus()) if INFERENCE_BACKEND == 'process' else 1
+thread_budget = ThreadBudget(
+    per_worker_budget(INFERENCE_THREADS_PER_WORKER, _model_processes, available_cpus()),
+    INFERENCE_PARALLEL_MIN_ROWS
+) if THREAD_BUDGET_ENABLED else None
+
+# Configuração da resolução das fontes do modelo
+KNOWN_RUN_IDS = ["2f5087600685403383420bf1c6720ed5", "bcadaadae75c4ea499bcdad78e9a1d11"]
+MODEL_LOAD_DEADLINE_SECONDS = float(os.getenv('MODEL_LOAD_DEADLINE_SECONDS', '30'))
+MODEL_PROBE_TIMEOUT_SECONDS = float(os.getenv('MODEL_PROBE_TIMEOUT_SECONDS', '10'))
+# Parte do prazo reservada ao arquivo local quando uma fonte remota demora
+MODEL_LOCAL_RESERVE_SECONDS = float(os.getenv('MODEL_LOCAL_RESERVE_SECONDS', '5'))
+MODEL_BREAKER_FAILURES = int(os.getenv('MODEL_BREAKER_FAILURES', '2'))
+MODEL_BREAKER_COOLDOWN_SECONDS = float(os.getenv('MODEL_BREAKER_COOLDOWN_SECONDS', '300'))
+# Sem fontes do MLflow: só arquivos locais (ex.: snapshot_builder.py --model)
+MODEL_OFFLINE = os.getenv('MODEL_OFFLINE', 'false').lower() == 'true'
+
+# Limita cada chamada HTTP do MLflow ao tempo de sondagem (padrão do MLflow: 120s com retries)
+os.environ.setdefault('MLFLOW_HTTP_REQUEST_TIMEOUT', str(int(MODEL_PROBE_TIMEOUT_SECONDS)))
+os.environ.setdefault('MLFLOW_HTTP_REQUEST_MAX_RETRIES', '1')
+
+model_breaker = CircuitBreaker(
+    failure_threshold=MODEL_BREAKER_FAILURES,
+    cooldown=MODEL_BREAKER_COOLDOWN_SECONDS
+)
+model_resolver = ModelSourceResolver(
+    breaker=model_breaker,
+    deadline=MODEL_LOAD_DEADLINE_SECONDS,
+    probe_timeout=MODEL_PROBE_TIMEOUT_SECONDS,
+    local_reserve=MODEL_LOCAL_RESERVE_SECONDS
+)
+
 def create_mock_model():
     """Cria um modelo mock para demonstração quando MLflow não está disponível"""
     global model, scaler, model_info
     
     logger.info("Criando modelo mock para demonstração...")
     
-    # Modelo mock simples para demonstração
-    class MockCreditScoreModel:
-        def __init__(self):
-            self.classes_ = ["Good", "Standard", "Poor"]
-            
-        def predict(self, X):
-            """Predição baseada em regras simples"""
-            predictions = []
-            for _, row in X.iterrows():
-                # Lógica simples baseada em income e utilização de crédito
-                income = row.get('Annual_Income', 0)
-                credit_util = row.get('Credit_Utilization_Ratio', 50)
-                outstanding_debt = row.get('Outstanding_Debt', 0)
-                
-                score = 0
-                if income > 60000:
-                    score += 2
-                elif income > 35000:
-                    score += 1
-                
-                if credit_util < 30:
-                    score += 2
-                elif credit_util < 60:
-                    score += 1
-                
-                if outstanding_debt < 5000:
-                    score += 1
-                
-                # Decidir classificação
-                if score >= 4:
-                    predictions.append("Good")
-                elif score >= 2:
-                    predictions.append("Standard")
-                else:
-                    predictions.append("Poor")
-            
-            return np.array(predictions)
-        
-        def predict_proba(self, X):
-            """Probabilidades mock"""
-            predictions = self.predict(X)
-            probabilities = []
-            
-            for pred in predictions:
-                if pred == "Good":
-                    probabilities.append([0.05, 0.15, 0.80])  # Poor, Standard, Good
-                elif pred == "Standard":
-                    probabilities.append([0.20, 0.65, 0.15])
-                else:  # Poor
-                    probabilities.append([0.75, 0.20, 0.05])
-            
-            return np.array(probabilities)
-    
-    model = MockCreditScoreModel()
+    # Modelo de regras vetorizado (o mesmo usado como reserva na degradação)
+    model = RuleCreditScoreModel()
     model_info = {
         "model_name": "mock_credit_score_model",
         "version": "1.0-demo",
@@ -95,8 +175,281 @@ def create_mock_model():
     
     logger.info("Modelo mock criado com sucesso!")
 
+def configure_mlflow():
+    """Configura o tracking do MLflow/DagsHub uma única vez por processo"""
+    global _mlflow_configured
+    
+    with _mlflow_lock:
+        if _mlflow_configured:
+            return
+        
+        import mlflow
+        import dagshub
+        
+        dagshub.init(repo_owner="domires", repo_name="fiap-mlops-score-model", mlflow=True)
+        mlflow.set_tracking_uri("https://dagshub.com/domires/fiap-mlops-score-model.mlflow")
+        _mlflow_configured = True
+
+def load_model_version(model_name: str, version: str) -> tuple:
+    """
+    Carrega uma versão específica do modelo para o pool: Cache local -> MLflow Registry.
+    
+    Args:
+        model_name (str): nome do modelo registrado.
+        version (str): versão desejada.
+        
+    Returns:
+        tuple: (modelo, metadados do modelo).
+    """
+    version_dir = os.path.join(MODEL_CACHE_DIR, str(version))
+    compact_path = os.path.join(version_dir, 'model_compact.pkl')
+    if MODEL_PREFER_COMPACT and os.path.exists(compact_path):
+        import joblib
+        loaded_model = joblib.load(compact_path)
+        logger.info(f"Versão {version} (compacta) carregada do cache local: {compact_path}")
+        return loaded_model, {
+            "model_name": model_name,
+            "version": str(version),
+            "source": "local_cache",
+            "variant": "compact"
+        }
+    
+    local_path = os.path.join(version_dir, 'model.pkl')
+    if os.path.exists(local_path):
+        import joblib
+        loaded_model = joblib.load(local_path)
+        logger.info(f"Versão {version} carregada do cache local: {local_path}")
+        return loaded_model, {
+            "model_name": model_name,
+            "version": str(version),
+            "source": "local_cache"
+        }
+    
+    # Respeita o circuit breaker e o prazo de carregamento também nas versões sob demanda
+    if not model_breaker.allow("mlflow_registry"):
+        raise ModelVersionUnavailable("MLflow Registry temporariamente indisponível (circuit breaker aberto)")
+    
+    def load():
+        import mlflow.pyfunc
+        configure_mlflow()
+        return mlflow.pyfunc.load_model(f"models:/{model_name}/{version}")
+    
+    try:
+        loaded_model = run_with_timeout(load, MODEL_LOAD_DEADLINE_SECONDS, f"{model_name}:{version}")
+    except SourceTimeout:
+        model_breaker.record_failure("mlflow_registry")
+        raise
+    logger.info(f"Versão {version} carregada do MLflow Registry")
+    return loaded_model, {
+        "model_name": model_name,
+        "version": str(version),
+        "source": "mlflow_registry"
+    }
+
+def _apply_thread_budget(loaded_model: Any, info: Dict[str, Any]) -> tuple:
+    """Ajusta as threads do modelo ao orçamento e registra a configuração nos metadados"""
+    if thread_budget is None:
+        return loaded_model, info
+    return loaded_model, dict(info, thread_budget=thread_budget.configure(loaded_model))
+
+model_pool = ModelPool(
+    loader=lambda name, version: _apply_thread_budget(*load_model_version(name, version)),
+    max_bytes=MODEL_POOL_MAX_MB * 1024 * 1024,
+    max_models=MODEL_POOL_MAX_MODELS,
+    prepare=build_explainer if EXPLANATIONS_ENABLED else None,
+    registry_name=MODEL_NAME
+)
+
+def _current_model_source(recorded: Dict[str, Any]) -> Any:
+    """
+    Fonte que o carregamento normal usaria hoje, no formato da registrada no
+    snapshot: o sha256 do arquivo local (a variante compacta com
+    MODEL_PREFER_COMPACT=true) ou a versão mais recente do MLflow Registry.
+    None se a fonte não estiver disponível (o snapshot é recusado).
+    """
+    if recorded.get("kind") == "file":
+        path = MODEL_COMPACT_PATH if MODEL_PREFER_COMPACT and os.path.exists(MODEL_COMPACT_PATH) \
+            else LOCAL_MODEL_PATH
+        return file_source(path) if os.path.exists(path) else None
+    if recorded.get("kind") != "mlflow" or MODEL_OFFLINE or not model_breaker.allow("mlflow_registry"):
+        return None
+    
+    def latest():
+        from mlflow.tracking import MlflowClient
+        configure_mlflow()
+        versions = MlflowClient().search_model_versions(f"name='{MODEL_NAME}'")
+        if not versions:
+            return None
+        version = max(versions, key=lambda v: int(v.version))
+        return mlflow_source({"model_name": MODEL_NAME, "version": version.version, "run_id": version.run_id})
+    
+    try:
+        return run_with_timeout(latest, MODEL_PROBE_TIMEOUT_SECONDS, "mlflow_registry")
+    except Exception as e:
+        logger.warning(f"Não foi possível conferir a versão do MLflow Registry: {e}")
+        return None
+
 def load_model():
-    """Carrega modelo com estratégia robusta: MLflow -> Local -> Mock"""
+    """
+    Carrega o modelo padrão e o registra no pool de versões: do snapshot de
+    inicialização quando ele confere, senão pela resolução normal das fontes.
+    """
+    global model, model_info, startup_report
+    
+    started = time.perf_counter()
+    snapshot, reason = try_restore(STARTUP_SNAPSHOT_PATH, _current_model_source)
+    if snapshot is not None and os.getenv('FORCE_MLFLOW', 'false').lower() == 'true' \
+            and not str(snapshot["info"].get("source", "")).startswith("mlflow"):
+        snapshot, reason = None, "FORCE_MLFLOW=true e o snapshot não veio do MLflow"
+    
+    prepared = None
+    if snapshot is not None:
+        model = snapshot["model"]
+        model_info = dict(snapshot["info"], startup="snapshot")
+        prepared = snapshot["prepared"] if EXPLANATIONS_ENABLED else None
+        logger.info(f"Modelo restaurado do snapshot {STARTUP_SNAPSHOT_PATH} "
+                    f"(gerado em {snapshot['header']['created_at']})")
+    else:
+        if reason not in ("desligado", "arquivo inexistente"):
+            logger.warning(f"Snapshot de inicialização ignorado ({reason}), carregamento normal")
+        _load_default_model()
+    model, model_info = _apply_thread_budget(model, model_info)
+    
+    model_pool.register(
+        model_info.get("model_name", MODEL_NAME),
+        str(model_info.get("version", "unknown")),
+        model,
+        model_info,
+        default=True,
+        prepared=prepared
+    )
+    startup_report = {
+        "mode": "snapshot" if snapshot is not None else "resolve",
+        "seconds": round(time.perf_counter() - started, 3),
+        "snapshot_path": STARTUP_SNAPSHOT_PATH or None,
+        "snapshot_skipped": reason
+    }
+
+def _mlflow_registry_probe():
+    """Sonda o MLflow Registry e retorna o carregador da versão mais recente"""
+    import mlflow.pyfunc
+    from mlflow.tracking import MlflowClient
+    
+    configure_mlflow()
+    client = MlflowClient()
+    registered_versions = client.search_model_versions(f"name='{MODEL_NAME}'")
+    if not registered_versions:
+        return None
+    
+    latest_version = max(registered_versions, key=lambda v: int(v.version))
+    
+    def load():
+        loaded_model = mlflow.pyfunc.load_model(f"models:/{MODEL_NAME}/{latest_version.version}")
+        logger.info(f"Modelo carregado do MLflow Registry: v{latest_version.version}")
+        return loaded_model, {
+            "model_name": MODEL_NAME,
+            "version": latest_version.version,
+            "run_id": latest_version.run_id,
+            "source": "mlflow_registry"
+        }
+    
+    return load
+
+def _mlflow_run_probe(run_id: str):
+    """Cria a sonda de um run conhecido do MLflow"""
+    def probe():
+        import mlflow.pyfunc
+        from mlflow.tracking import MlflowClient
+        
+        configure_mlflow()
+        MlflowClient().get_run(run_id)
+        
+        def load():
+            loaded_model = mlflow.pyfunc.load_model(f"runs:/{run_id}/model")
+            logger.info(f"✅ Modelo carregado do MLflow run: {run_id}")
+            return loaded_model, {
+                "model_name": MODEL_NAME,
+                "version": "from_run",
+                "run_id": run_id,
+                "source": "mlflow_run"
+            }
+        
+        return load
+    
+    return probe
+
+def _local_file_probe():
+    """Sonda o modelo local em model/model.pkl"""
+    if not os.path.exists(LOCAL_MODEL_PATH):
+        return None
+    
+    def load():
+        import joblib
+        loaded_model = joblib.load(LOCAL_MODEL_PATH)
+        
+        # Carregar metadata se existir
+        if os.path.exists('model/model_metadata.json'):
+            with open('model/model_metadata.json', 'r') as f:
+                info = json.load(f)
+                info["source"] = "local_file"
+        else:
+            info = {"model_name": "local_model", "version": "unknown", "source": "local_file"}
+        
+        logger.info("Modelo local carregado com sucesso!")
+        return loaded_model, info
+    
+    return load
+
+def _local_compact_probe():
+    """Sonda a variante compacta gerada por model_compactor.py"""
+    if not os.path.exists(MODEL_COMPACT_PATH):
+        return None
+    
+    def load():
+        import joblib
+        loaded_model = joblib.load(MODEL_COMPACT_PATH)
+        
+        # Metadados do modelo original ficam no relatório da compactação
+        report_path = os.path.splitext(MODEL_COMPACT_PATH)[0] + '_report.json'
+        info = {"model_name": "local_model", "version": "unknown", "variant": "compact"}
+        if os.path.exists(report_path):
+            with open(report_path, 'r') as f:
+                info = json.load(f).get("model_info", info)
+        info["source"] = "local_compact"
+        
+        logger.info(f"Modelo compacto carregado: {MODEL_COMPACT_PATH}")
+        return loaded_model, info
+    
+    return load
+
+def get_model_sources(force_mlflow: bool = False) -> list:
+    """
+    Lista as fontes do modelo em ordem de prioridade: Registry -> Runs -> Local
+    (com MODEL_PREFER_COMPACT=true, a variante compacta local vem antes de todas;
+    com MODEL_OFFLINE=true, só as fontes locais).
+    
+    Args:
+        force_mlflow (bool): se True, considera apenas fontes do MLflow.
+        
+    Returns:
+        list: fontes candidatas (ModelSource).
+    """
+    sources = []
+    if force_mlflow or not MODEL_OFFLINE:
+        sources.append(ModelSource("mlflow_registry", 0, _mlflow_registry_probe))
+        for i, run_id in enumerate(KNOWN_RUN_IDS):
+            sources.append(ModelSource(f"mlflow_run:{run_id}", 1 + i, _mlflow_run_probe(run_id)))
+    
+    if not force_mlflow:
+        sources.append(ModelSource("local_file", 100, _local_file_probe, local=True))
+        if MODEL_PREFER_COMPACT:
+            # Prioridade acima do Registry: a variante compacta foi escolhida explicitamente
+            sources.append(ModelSource("local_compact", -1, _local_compact_probe, local=True))
+    
+    return sources
+
+def _load_default_model():
+    """Carrega modelo com estratégia robusta: MLflow -> Local -> Mock, com prazo máximo"""
     global model, scaler, model_info
     
     logger.info("Iniciando carregamento do modelo...")
@@ -106,110 +459,234 @@ def load_model():
     if force_mlflow:
         logger.info(" Apenas MLflow será usado (FORCE_MLFLOW=true)")
     
-    # Estratégia 1: Tentar MLflow
-    try:
-        logger.info("Tentando carregar do MLflow...")
-        import mlflow
-        import mlflow.pyfunc
-        import dagshub
-        
-        # Configuração MLflow
-        dagshub.init(repo_owner="domires", repo_name="fiap-mlops-score-model", mlflow=True)
-        mlflow.set_tracking_uri("https://dagshub.com/domires/fiap-mlops-score-model.mlflow")
-        
-        # Tentar carregar modelo registrado
-        try:
-            from mlflow.tracking import MlflowClient
-            client = MlflowClient()
-            model_name = "fiap-mlops-score-model"
-            
-            registered_versions = client.search_model_versions(f"name='{model_name}'")
-            if registered_versions:
-                latest_version = max(registered_versions, key=lambda v: int(v.version))
-                model_uri = f"models:/{model_name}/{latest_version.version}"
-                model = mlflow.pyfunc.load_model(model_uri)
-                model_info = {
-                    "model_name": model_name,
-                    "version": latest_version.version,
-                    "run_id": latest_version.run_id,
-                    "source": "mlflow_registry"
-                }
-                logger.info(f"Modelo carregado do MLflow Registry: v{latest_version.version}")
-                return
-        except Exception as registry_error:
-            logger.warning(f"Falha no Model Registry: {registry_error}")
-        
-        # Tentar runs específicos conhecidos
-        run_ids = ["2f5087600685403383420bf1c6720ed5", "bcadaadae75c4ea499bcdad78e9a1d11"]
-        for run_id in run_ids:
-            try:
-                model_uri = f"runs:/{run_id}/model"
-                model = mlflow.pyfunc.load_model(model_uri)
-                model_info = {
-                    "model_name": "fiap-mlops-score-model",
-                    "version": "from_run",
-                    "run_id": run_id,
-                    "source": "mlflow_run"
-                }
-                logger.info(f"✅ Modelo carregado do MLflow run: {run_id}")
-                return
-            except Exception as run_error:
-                logger.warning(f"Falha no run {run_id}: {run_error}")
-                continue
-        
-    except Exception as mlflow_error:
-        logger.warning(f"MLflow não disponível: {mlflow_error}")
-        
-        # Se modo forçado está ativo, falhar aqui
-        if force_mlflow:
-            logger.error("ERRO: FORCE_MLFLOW=true mas MLflow não está disponível!")
-            logger.error("Verifique: python test_mlflow_connection.py")
-            raise Exception(f"MLflow obrigatório mas não disponível: {mlflow_error}")
-    
-    # Estratégia 2: Modelo local (apenas se não forçar MLflow)
-    if not force_mlflow:
-        try:
-            if os.path.exists('model/model.pkl'):
-                import joblib
-                model = joblib.load('model/model.pkl')
-                
-                # Carregar metadata se existir
-                if os.path.exists('model/model_metadata.json'):
-                    with open('model/model_metadata.json', 'r') as f:
-                        model_info = json.load(f)
-                        model_info["source"] = "local_file"
-                else:
-                    model_info = {"model_name": "local_model", "version": "unknown", "source": "local_file"}
-                
-                logger.info("Modelo local carregado com sucesso!")
-                return
-        except Exception as local_error:
-            logger.warning(f"Falha ao carregar modelo local: {local_error}")
-        
-        # Estratégia 3: Modelo Mock (sempre funciona, apenas se não forçar MLflow)
-        logger.warning("Usando modelo mock para demonstração")
-        create_mock_model()
-    else:
+    # Estratégias 1 e 2: sondagem paralela (MLflow Registry, runs, arquivo local)
+    resolved = model_resolver.resolve(get_model_sources(force_mlflow))
+    if resolved is not None:
+        model, model_info = resolved
+        return
+    
+    if force_mlflow:
         # Se chegou aqui no modo forçado, é porque MLflow falhou
-        logger.error("ERRO: Não foi possível carregar modelo do MLflow no modo forçado")
-        raise Exception("MLflow obrigatório mas modelo não pôde ser carregado")
+        logger.error("ERRO: FORCE_MLFLOW=true mas MLflow não está disponível!")
+        logger.error("Verifique: python test_mlflow_connection.py")
+        raise Exception(f"MLflow obrigatório mas modelo não pôde ser carregado: {model_resolver.last_report}")
+    
+    # Estratégia 3: Modelo Mock (sempre funciona, apenas se não forçar MLflow)
+    logger.warning("Usando modelo mock para demonstração")
+    create_mock_model()
 
 # Carrega o modelo na inicialização
 load_model()
 
-cloudwatch = boto3.client('cloudwatch') if os.getenv('AWS_REGION') else None
+def _load_fallback_model() -> tuple:
+    """
+    Modelo de reserva mantido residente para a degradação por prazo: a variante
+    compacta (DEGRADATION_FALLBACK=compact, se existir) ou o modelo de regras.
+    """
+    if DEGRADATION_FALLBACK == 'compact' and os.path.exists(MODEL_COMPACT_PATH):
+        try:
+            loaded_model, info = _local_compact_probe()()
+            return loaded_model, dict(info, model_name=f"{info.get('model_name')}-compact")
+        except Exception as e:
+            logger.warning(f"Modelo compacto de reserva indisponível, usando regras: {e}")
+    return RuleCreditScoreModel(), {"model_name": "rule_model", "version": "rules-1.0", "type": "rules"}
+
+fallback_model, fallback_info = _load_fallback_model()
+
+if INFERENCE_BACKEND == 'process':
+    try:
+        inference_backend = ProcessInferenceBackend(
+            workers=INFERENCE_WORKERS,
+            snapshot_dir=INFERENCE_SNAPSHOT_DIR,
+            timeout=INFERENCE_TIMEOUT_SECONDS,
+            health_interval=INFERENCE_HEALTH_INTERVAL_SECONDS,
+            max_models=MODEL_POOL_MAX_MODELS,
+            threads_per_worker=thread_budget.threads if thread_budget is not None else 1,
+            parallel_min_rows=INFERENCE_PARALLEL_MIN_ROWS
+        )
+        inference_backend.start()
+        inference_backend.preload(model)
+        atexit.register(inference_backend.stop)
+    except OSError as e:
+        logger.warning(f"Backend de inferência em processos indisponível, inferência local: {e}")
+        inference_backend = None
+
+cascade = None
+if CASCADE_ENABLED and not CASCADE_THRESHOLD:
+    logger.error("CASCADE_ENABLED=true requer CASCADE_THRESHOLD (escolha o limiar com cascade_report.py); "
+                 "cascata desligada")
+elif CASCADE_ENABLED:
+    try:
+        first_stage_model, first_stage_info = load_first_stage(CASCADE_FIRST_STAGE)
+        cascade = CascadeScorer(first_stage_model, float(CASCADE_THRESHOLD), first_stage_info)
+        logger.info(f"Cascata ligada: {first_stage_info['model_name']} com limiar {CASCADE_THRESHOLD}")
+    except Exception as e:
+        logger.warning(f"Primeiro estágio da cascata indisponível, cascata desligada: {e}")
+
+# Clientes AWS criados uma vez na inicialização e reutilizados entre invocações
+cloudwatch = aws_clients.get_client('cloudwatch') if os.getenv('AWS_REGION') else None
+if os.getenv('AWS_REGION'):
+    aws_clients.get_client('s3')
+
+# Destino dos dados de data drift
+DRIFT_BUCKET = 'fiap-ds-mlops'
+DRIFT_PREFIX = 'credit-score-real-data'
+CLOUDWATCH_MAX_METRICS_PER_CALL = 500
+
+def _ship_real_data(records: List[Dict[str, Any]]) -> None:
+    """
+    Envia ao S3 registros de data drift, com um get/put por arquivo diário
+    para o lote inteiro. Linhas são gravadas com o módulo csv (valores com
+    vírgula ficam entre aspas). Levanta exceção em caso de falha.
+    """
+    s3 = aws_clients.get_client('s3')
+    by_file: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_file.setdefault(record["file_name"], []).append(record["row"])
+
+    for file_name, rows in by_file.items():
+        key = f"{DRIFT_PREFIX}/{file_name}"
+        try:
+            existing_object = s3.get_object(Bucket=DRIFT_BUCKET, Key=key)
+            existing_content = existing_object['Body'].read().decode('utf-8').strip()
+        except s3.exceptions.NoSuchKey:
+            existing_content = ''
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        if existing_content:
+            first_line, _, existing_rows = existing_content.partition('\n')
+            header = next(csv.reader([first_line]))
+            # Colunas novas (ex.: sample_weight) entram no fim do cabeçalho; linhas antigas ficam vazias
+            added = [column for column in rows[0] if column not in header]
+            if added:
+                header += added
+                writer.writerow(header)
+                rows_buffer = io.StringIO()
+                csv.writer(rows_buffer, lineterminator='\n').writerows(
+                    row + [''] * len(added) for row in csv.reader(io.StringIO(existing_rows)) if row)
+                buffer.write(rows_buffer.getvalue())
+            else:
+                buffer.write(existing_content + '\n')
+        else:
+            header = list(rows[0].keys())
+            writer.writerow(header)
+        for row in rows:
+            writer.writerow([row.get(column, '') for column in header])
+
+        s3.put_object(Body=buffer.getvalue().rstrip('\n'), Bucket=DRIFT_BUCKET, Key=key)
+        logger.info(f"Dados salvos em S3: {file_name} (+{len(rows)} registros)")
 
-def write_real_data(data: Dict[str, Any], prediction: str) -> None:
+def _ship_metrics(records: List[Dict[str, Any]]) -> None:
+    """
+    Envia ao CloudWatch as métricas de vários registros, agrupadas por namespace
+    em chamadas de até CLOUDWATCH_MAX_METRICS_PER_CALL métricas.
+    Levanta exceção em caso de falha.
+    """
+    by_namespace: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        for item in record["metrics"]:
+            by_namespace.setdefault(item["namespace"], []).append(item["metric"])
+
+    for namespace, metrics in by_namespace.items():
+        for i in range(0, len(metrics), CLOUDWATCH_MAX_METRICS_PER_CALL):
+            cloudwatch.put_metric_data(
+                MetricData=metrics[i:i + CLOUDWATCH_MAX_METRICS_PER_CALL],
+                Namespace=namespace
+            )
+    logger.info(f"Métricas enviadas para CloudWatch: {len(records)} predições")
+
+# Amostragem da captura de data drift (1.0 = todas as predições)
+DRIFT_CAPTURE_RATE = float(os.getenv('DRIFT_CAPTURE_RATE', '1.0'))
+DRIFT_CAPTURE_CLASS_MIN_RATES = os.getenv('DRIFT_CAPTURE_CLASS_MIN_RATES', '')
+DRIFT_CAPTURE_LOW_CONFIDENCE = float(os.getenv('DRIFT_CAPTURE_LOW_CONFIDENCE', '0'))
+DRIFT_CAPTURE_SALT = os.getenv('DRIFT_CAPTURE_SALT', '')
+
+capture_policy = CapturePolicy(
+    rate=DRIFT_CAPTURE_RATE,
+    class_min_rates=parse_class_rates(DRIFT_CAPTURE_CLASS_MIN_RATES),
+    low_confidence=DRIFT_CAPTURE_LOW_CONFIDENCE,
+    salt=DRIFT_CAPTURE_SALT
+)
+
+# Spool local da telemetria: a requisição só grava em disco e uma thread envia
+TELEMETRY_SPOOL_ENABLED = os.getenv('TELEMETRY_SPOOL_ENABLED', 'true').lower() == 'true'
+TELEMETRY_SPOOL_DIR = os.getenv('TELEMETRY_SPOOL_DIR', '/tmp/credit-score-telemetry')
+TELEMETRY_SPOOL_MAX_MB = float(os.getenv('TELEMETRY_SPOOL_MAX_MB', '256'))
+TELEMETRY_SPOOL_SEGMENT_KB = float(os.getenv('TELEMETRY_SPOOL_SEGMENT_KB', '1024'))
+TELEMETRY_FLUSH_INTERVAL_SECONDS = float(os.getenv('TELEMETRY_FLUSH_INTERVAL_SECONDS', '2'))
+
+telemetry_spool = None
+if os.getenv('AWS_REGION') and TELEMETRY_SPOOL_ENABLED:
+    try:
+        telemetry_spool = TelemetrySpool(
+            TELEMETRY_SPOOL_DIR,
+            shippers={"real_data": _ship_real_data, "metrics": _ship_metrics},
+            max_bytes=int(TELEMETRY_SPOOL_MAX_MB * 1024 * 1024),
+            segment_bytes=int(TELEMETRY_SPOOL_SEGMENT_KB * 1024),
+            flush_interval=TELEMETRY_FLUSH_INTERVAL_SECONDS
+        )
+        telemetry_spool.start()
+        atexit.register(telemetry_spool.stop)
+    except OSError as e:
+        logger.warning(f"Spool de telemetria indisponível, envio síncrono: {e}")
+        telemetry_spool = None
+
+# Registro local de auditoria das predições (opcional; desligado sem caminho)
+PREDICTION_STORE_PATH = os.getenv('PREDICTION_STORE_PATH', '')
+PREDICTION_STORE_RETENTION_DAYS = float(os.getenv('PREDICTION_STORE_RETENTION_DAYS', '30'))
+PREDICTION_STORE_BATCH_SIZE = int(os.getenv('PREDICTION_STORE_BATCH_SIZE', '500'))
+PREDICTION_STORE_FLUSH_SECONDS = float(os.getenv('PREDICTION_STORE_FLUSH_SECONDS', '1'))
+PREDICTION_STORE_MAX_PENDING = int(os.getenv('PREDICTION_STORE_MAX_PENDING', '100000'))
+PREDICTION_STORE_FEATURES = os.getenv('PREDICTION_STORE_FEATURES', 'true').lower() == 'true'
+
+prediction_store = None
+if PREDICTION_STORE_PATH:
+    try:
+        prediction_store = PredictionStore(
+            PREDICTION_STORE_PATH,
+            retention_days=PREDICTION_STORE_RETENTION_DAYS,
+            batch_size=PREDICTION_STORE_BATCH_SIZE,
+            flush_interval=PREDICTION_STORE_FLUSH_SECONDS,
+            max_pending=PREDICTION_STORE_MAX_PENDING,
+            store_features=PREDICTION_STORE_FEATURES
+        )
+        prediction_store.start()
+        atexit.register(prediction_store.stop)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Registro de predições indisponível ({PREDICTION_STORE_PATH}): {e}")
+        prediction_store = None
+
+def request_id_for(event: Dict[str, Any]) -> str:
+    """ID da requisição: header X-Request-ID do cliente ou um novo"""
+    return (_header(event, "x-request-id") or "").strip()[:128] or uuid.uuid4().hex
+
+def _emit_telemetry(kind: str, record: Dict[str, Any], shipper) -> None:
+    """Grava no spool; sem spool, envia diretamente (comportamento síncrono)"""
+    if telemetry_spool is not None and telemetry_spool.append(kind, record):
+        return
+    shipper([record])
+
+def write_real_data(data: Dict[str, Any], prediction: str, model_version: str = None,
+                    confidence: float = None, applicant_key: Any = None) -> None:
     """
     Função para escrever os dados consumidos para estudo de data drift.
     
     Args:
         data (dict): dicionário de dados com todas as features de entrada.
         prediction (str): classificação predita (Good, Standard, Poor).
+        model_version (str): versão do modelo que gerou a predição (padrão: modelo carregado).
+        confidence (float): confiança da predição (se disponível), usada pela política de captura.
+        applicant_key: chave do cliente (`Customer_ID`) para o sorteio determinístico.
     """
     if not os.getenv('AWS_REGION'):
         logger.info("AWS não configurado, salvando dados localmente")
         return
+    
+    # Política de captura avaliada antes de copiar a linha ou tocar o spool/S3
+    sample_weight = capture_policy.decide(data, prediction, confidence, applicant_key)
+    if sample_weight is None:
+        return
         
     try:
         now = datetime.now()
@@ -220,27 +697,16 @@ def write_real_data(data: Dict[str, Any], prediction: str) -> None:
         data_copy = data.copy()
         data_copy["credit_score_prediction"] = prediction
         data_copy["timestamp"] = now_formatted
-        data_copy["model_version"] = model_info.get("version", "unknown")
-        
-        s3 = boto3.client('s3')
-        bucket_name = 'fiap-ds-mlops'
-        s3_path = 'credit-score-real-data'
+        data_copy["model_version"] = model_version or model_info.get("version", "unknown")
+        data_copy[SAMPLE_WEIGHT_COLUMN] = round(sample_weight, 6)
         
-        try:
-            existing_object = s3.get_object(Bucket=bucket_name, Key=f"{s3_path}/{file_name}")
-            existing_data = existing_object['Body'].read().decode('utf-8').strip().split('\n')
-            existing_data.append(','.join(map(str, data_copy.values())))
-            update_content = '\n'.join(existing_data)
-        except s3.exceptions.NoSuchKey:
-            update_content = ','.join(data_copy.keys()) + '\n' + ','.join(map(str, data_copy.values()))
-        
-        s3.put_object(Body=update_content, Bucket=bucket_name, Key=f"{s3_path}/{file_name}")
-        logger.info(f"Dados salvos em S3: {file_name}")
+        _emit_telemetry("real_data", {"file_name": file_name, "row": data_copy}, _ship_real_data)
         
     except Exception as e:
         logger.error(f"Erro ao salvar dados no S3: {e}")
 
-def input_metrics(data: Dict[str, Any], prediction: str, confidence: float = None) -> None:
+def input_metrics(data: Dict[str, Any], prediction: str, confidence: float = None,
+                  model_version: str = None) -> None:
     """
     Função para escrever métricas customizadas no CloudWatch.
     
@@ -248,6 +714,7 @@ def input_metrics(data: Dict[str, Any], prediction: str, confidence: float = Non
         data (dict): dicionário de dados com todas as features.
         prediction (str): classificação predita (Good, Standard, Poor).
         confidence (float): confiança da predição (se disponível).
+        model_version (str): versão do modelo que gerou a predição (padrão: modelo carregado).
     """
     if not cloudwatch:
         logger.info("CloudWatch não configurado")
@@ -255,57 +722,50 @@ def input_metrics(data: Dict[str, Any], prediction: str, confidence: float = Non
         
     try:
         # Métrica principal de classificação
-        cloudwatch.put_metric_data(
-            MetricData=[
-                {
-                    'MetricName': 'Credit Score Classification',
-                    'Value': 1,
-                    'Unit': 'Count',
-                    'Dimensions': [
-                        {'Name': "Classification", 'Value': prediction},
-                        {'Name': "ModelVersion", 'Value': str(model_info.get("version", "unknown"))}
-                    ]
-                },
-            ], 
-            Namespace='Credit Score Model'
-        )
+        metrics = [{
+            'namespace': 'Credit Score Model',
+            'metric': {
+                'MetricName': 'Credit Score Classification',
+                'Value': 1,
+                'Unit': 'Count',
+                'Dimensions': [
+                    {'Name': "Classification", 'Value': prediction},
+                    {'Name': "ModelVersion", 'Value': str(model_version or model_info.get("version", "unknown"))}
+                ]
+            }
+        }]
         
         # Métrica de confiança se disponível
         if confidence is not None:
-            cloudwatch.put_metric_data(
-                MetricData=[
-                    {
-                        'MetricName': 'Prediction Confidence',
-                        'Value': confidence,
-                        'Dimensions': [{'Name': "Classification", 'Value': prediction}]
-                    },
-                ], 
-                Namespace='Credit Score Model'
-            )
+            metrics.append({
+                'namespace': 'Credit Score Model',
+                'metric': {
+                    'MetricName': 'Prediction Confidence',
+                    'Value': confidence,
+                    'Dimensions': [{'Name': "Classification", 'Value': prediction}]
+                }
+            })
         
         # Métricas de features importantes
         important_features = ['Annual_Income', 'Credit_Utilization_Ratio', 'Payment_Behaviour']
         for feature in important_features:
             if feature in data and data[feature] is not None:
                 try:
-                    value = float(data[feature])
-                    cloudwatch.put_metric_data(
-                        MetricData=[
-                            {
-                                'MetricName': 'Credit Feature Value',
-                                'Value': value,
-                                'Dimensions': [
-                                    {'Name': 'FeatureName', 'Value': feature},
-                                    {'Name': 'Classification', 'Value': prediction}
-                                ]
-                            },
-                        ], 
-                        Namespace='Credit Score Features'
-                    )
+                    metrics.append({
+                        'namespace': 'Credit Score Features',
+                        'metric': {
+                            'MetricName': 'Credit Feature Value',
+                            'Value': float(data[feature]),
+                            'Dimensions': [
+                                {'Name': 'FeatureName', 'Value': feature},
+                                {'Name': 'Classification', 'Value': prediction}
+                            ]
+                        }
+                    })
                 except (ValueError, TypeError):
                     pass
-                    
-        logger.info(f"Métricas enviadas para CloudWatch: {prediction}")
+        
+        _emit_telemetry("metrics", {"metrics": metrics}, _ship_metrics)
         
     except Exception as e:
         logger.error(f"Erro ao enviar métricas: {e}")
@@ -314,24 +774,10 @@ def validate_and_clean_data(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Valida e limpa os dados de entrada para classificação de credit score.
     """
-    # Campos obrigatórios mínimos para funcionar
-    core_fields = [
-        'Age', 'Annual_Income', 'Monthly_Inhand_Salary', 'Num_Bank_Accounts',
-        'Num_Credit_Card', 'Interest_Rate', 'Num_of_Loan', 'Outstanding_Debt',
-        'Credit_Utilization_Ratio', 'Total_EMI_per_month', 'Amount_invested_monthly',
-        'Monthly_Balance'
-    ]
-    
-    # Campos adicionais para modelos mais complexos
-    extended_fields = [
-        'Delay_from_due_date', 'Num_of_Delayed_Payment', 'Changed_Credit_Limit',
-        'Num_Credit_Inquiries'
-    ]
-    
     cleaned_data = {}
     
     # Processar campos core (obrigatórios)
-    for field in core_fields:
+    for field in CORE_FIELDS:
         if field in data:
             try:
                 value = data[field]
@@ -343,24 +789,10 @@ def validate_and_clean_data(data: Dict[str, Any]) -> Dict[str, Any]:
                 raise ValueError(f"Valor inválido para {field}: {data[field]}")
         else:
             # Valor padrão para campos ausentes
-            default_values = {
-                'Age': 30,
-                'Annual_Income': 50000,
-                'Monthly_Inhand_Salary': 4000,
-                'Num_Bank_Accounts': 2,
-                'Num_Credit_Card': 1,
-                'Interest_Rate': 15,
-                'Num_of_Loan': 1,
-                'Outstanding_Debt': 5000,
-                'Credit_Utilization_Ratio': 30,
-                'Total_EMI_per_month': 500,
-                'Amount_invested_monthly': 200,
-                'Monthly_Balance': 2000
-            }
-            cleaned_data[field] = default_values.get(field, 0.0)
+            cleaned_data[field] = CORE_DEFAULTS.get(field, 0.0)
     
     # Processar campos extended (opcionais)
-    for field in extended_fields:
+    for field in EXTENDED_FIELDS:
         if field in data:
             try:
                 value = data[field]
@@ -371,17 +803,7 @@ def validate_and_clean_data(data: Dict[str, Any]) -> Dict[str, Any]:
             cleaned_data[field] = 0.0
     
     # Campos categóricos
-    categorical_defaults = {
-        'Month': 'January',
-        'Occupation': 'Engineer',
-        'Type_of_Loan': 'Personal Loan',
-        'Credit_Mix': 'Standard',
-        'Credit_History_Age': '5 Years',
-        'Payment_of_Min_Amount': 'Yes',
-        'Payment_Behaviour': 'High_spent_Small_value_payments'
-    }
-    
-    for field, default in categorical_defaults.items():
+    for field, default in CATEGORICAL_DEFAULTS.items():
         cleaned_data[field] = data.get(field, default)
     
     # Validações básicas
@@ -396,26 +818,95 @@ def validate_and_clean_data(data: Dict[str, Any]) -> Dict[str, Any]:
     
     return cleaned_data
 
-def prepare_model_input(data: Dict[str, Any]) -> pd.DataFrame:
+def validate_and_clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Versão colunar de `validate_and_clean_data`: aplica as mesmas regras a um lote
+    inteiro com operações vetorizadas, sem criar um dicionário por linha.
+    
+    Args:
+        df (pd.DataFrame): uma coluna por campo recebido.
+        
+    Returns:
+        pd.DataFrame: campos core, extended e categóricos limpos.
+    """
+    cleaned = {}
+    n_rows = len(df)
+    
+    # Campos core: ausentes recebem o padrão, vazios viram 0.0, inválidos são erro
+    for field in CORE_FIELDS:
+        if field not in df.columns:
+            cleaned[field] = np.full(n_rows, float(CORE_DEFAULTS.get(field, 0.0)))
+            continue
+        column = df[field]
+        if column.dtype == object:
+            column = column.replace("", np.nan)
+        try:
+            cleaned[field] = pd.to_numeric(column, errors='raise').astype(float).fillna(0.0).to_numpy()
+        except (ValueError, TypeError):
+            numeric = pd.to_numeric(column, errors='coerce')
+            bad = column[numeric.isna() & column.notna()].iloc[0]
+            raise ValueError(f"Valor inválido para {field}: {bad}")
+    
+    # Campos extended: inválidos ou ausentes viram 0.0
+    for field in EXTENDED_FIELDS:
+        if field in df.columns:
+            cleaned[field] = pd.to_numeric(df[field], errors='coerce').astype(float).fillna(0.0).to_numpy()
+        else:
+            cleaned[field] = np.zeros(n_rows)
+    
+    # Campos categóricos: nulos ou ausentes recebem o padrão
+    for field, default in CATEGORICAL_DEFAULTS.items():
+        if field in df.columns:
+            cleaned[field] = df[field].astype(object).where(df[field].notna(), default).to_numpy()
+        else:
+            cleaned[field] = np.full(n_rows, default, dtype=object)
+    
+    # Validações básicas
+    cleaned['Age'] = np.clip(cleaned['Age'], 18, 100)
+    cleaned['Annual_Income'] = np.abs(cleaned['Annual_Income'])
+    cleaned['Credit_Utilization_Ratio'] = np.clip(cleaned['Credit_Utilization_Ratio'], 0, 100)
+    
+    return pd.DataFrame(cleaned)
+
+def prepare_model_input(data: Union[Dict[str, Any], List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
     """
     Prepara os dados para entrada no modelo seguindo o formato usado no treinamento.
     Baseado no arquivo testar_endpoint_mlflow.py da pasta modelo.
     
     Args:
-        data (dict): dados validados e limpos.
+        data (dict | list | pd.DataFrame): dados validados e limpos (um registro,
+            um lote ou o lote colunar de `validate_and_clean_frame`).
         
     Returns:
-        pd.DataFrame: DataFrame pronto para predição.
+        pd.DataFrame: DataFrame pronto para predição (uma linha por registro).
     """
-    # Features baseadas no arquivo de teste da pasta modelo
-    core_features = [
-        'Age', 'Annual_Income', 'Monthly_Inhand_Salary', 'Num_Bank_Accounts',
-        'Num_Credit_Card', 'Interest_Rate', 'Num_of_Loan', 'Delay_from_due_date',
-        'Num_of_Delayed_Payment', 'Changed_Credit_Limit', 'Num_Credit_Inquiries',
-        'Outstanding_Debt', 'Credit_Utilization_Ratio', 'Total_EMI_per_month',
-        'Amount_invested_monthly', 'Monthly_Balance'
-    ]
+    if isinstance(data, pd.DataFrame):
+        # Lote colunar já limpo: apenas seleciona as colunas na ordem do modelo
+        return data[MODEL_NUMERIC_FEATURES + list(CATEGORICAL_DEFAULTS)]
+    
+    records = data if isinstance(data, list) else [data]
+    df_input = pd.DataFrame([_model_row(record) for record in records])
     
+    # Garantir tipos corretos para features numéricas
+    for col in MODEL_NUMERIC_FEATURES:
+        if col in df_input.columns:
+            df_input[col] = pd.to_numeric(df_input[col], errors='coerce').fillna(0)
+    
+    logger.info(f"DataFrame preparado: {df_input.shape}, Colunas: {list(df_input.columns)}")
+    
+    return df_input
+
+# Features numéricas baseadas no arquivo de teste da pasta modelo
+MODEL_NUMERIC_FEATURES = [
+    'Age', 'Annual_Income', 'Monthly_Inhand_Salary', 'Num_Bank_Accounts',
+    'Num_Credit_Card', 'Interest_Rate', 'Num_of_Loan', 'Delay_from_due_date',
+    'Num_of_Delayed_Payment', 'Changed_Credit_Limit', 'Num_Credit_Inquiries',
+    'Outstanding_Debt', 'Credit_Utilization_Ratio', 'Total_EMI_per_month',
+    'Amount_invested_monthly', 'Monthly_Balance'
+]
+
+def _model_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Monta uma linha de entrada do modelo a partir de um registro limpo"""
     # Features categóricas opcionais (baseadas no teste do modelo)
     categorical_features = {
         'Month': data.get('Month', 'January'),
@@ -427,11 +918,10 @@ def prepare_model_input(data: Dict[str, Any]) -> pd.DataFrame:
         'Payment_Behaviour': data.get('Payment_Behaviour', 'High_spent_Small_value_payments')
     }
     
-    # Criar DataFrame com uma linha
     model_data = {}
     
     # Adicionar features numéricas
-    for feature in core_features:
+    for feature in MODEL_NUMERIC_FEATURES:
         if feature in data:
             model_data[feature] = data[feature]
         else:
@@ -447,22 +937,420 @@ def prepare_model_input(data: Dict[str, Any]) -> pd.DataFrame:
     # Adicionar features categóricas
     model_data.update(categorical_features)
     
-    # Criar DataFrame
-    df_input = pd.DataFrame([model_data])
+    return model_data
+
+def _header(event: Dict[str, Any], name: str) -> Union[str, None]:
+    """Lê um header do evento sem diferenciar maiúsculas de minúsculas"""
+    headers = event.get("headers") or {}
+    for key, value in headers.items():
+        if key.lower() == name and value:
+            return value
+    return None
+
+def _epoch_ms(value: str) -> Union[float, None]:
+    """Converte `X-Request-Start` (ms ou s desde a época, com ou sem prefixo t=) em ms"""
+    try:
+        number = float(value.strip().removeprefix("t="))
+    except ValueError:
+        return None
+    return number * 1000 if number < 1e11 else number
+
+def request_deadline(event: Dict[str, Any], context: Any, started: float) -> Union[float, None]:
+    """
+    Prazo da requisição no relógio monotônico: o menor entre o header
+    `X-Deadline-Ms`, o SLO configurado (REQUEST_SLO_MS) e o tempo restante do
+    Lambda, descontando a espera na fila indicada por `X-Request-Start`.
+    """
+    budgets = []
+    header = _header(event, "x-deadline-ms")
+    if header is not None:
+        try:
+            budgets.append(float(header))
+        except ValueError:
+            logger.warning(f"X-Deadline-Ms inválido: {header}")
+    if REQUEST_SLO_MS > 0:
+        budgets.append(REQUEST_SLO_MS)
+    if hasattr(context, "get_remaining_time_in_millis"):
+        budgets.append(float(context.get_remaining_time_in_millis()))
     
-    # Garantir tipos corretos para features numéricas
-    for col in core_features:
-        if col in df_input.columns:
-            df_input[col] = pd.to_numeric(df_input[col], errors='coerce').fillna(0)
+    queue_wait_ms = 0.0
+    request_start = _header(event, "x-request-start")
+    start_ms = _epoch_ms(request_start) if request_start else None
+    if start_ms is not None:
+        queue_wait_ms = time.time() * 1000 - start_ms
+    return DeadlinePolicy.deadline(started, budgets, queue_wait_ms)
+
+def _model_key(info: Dict[str, Any], explain: bool = False, cascaded: bool = False) -> str:
+    """Chave da estimativa de latência: com cascata, o custo depende da fração escalada"""
+    suffix = ":explain" if explain else ":cascade" if cascaded else ""
+    return f"{info.get('model_name')}:{info.get('version')}{suffix}"
+
+def _cascade_applies(active_model: Any) -> bool:
+    """Se `predict_arrays` passaria o modelo pela cascata"""
+    return cascade is not None and active_model is not fallback_model and cascade.applies(active_model)
+
+def select_scorer(event: Dict[str, Any], context: Any, started: float, active_model: Any,
+                  active_info: Dict[str, Any], rows: int, explain: bool = False) -> tuple:
+    """
+    Escolhe entre o modelo principal e o de reserva conforme o prazo.
     
-    logger.info(f"DataFrame preparado: {df_input.shape}, Colunas: {list(df_input.columns)}")
+    Returns:
+        tuple: (modelo, metadados, degradação ou None). A degradação traz o
+        motivo, o orçamento restante e a estimativa do modelo principal.
+    """
+    # Sem sentido degradar quando o principal já é o modelo de regras (modo demonstração)
+    already_cheap = isinstance(active_model, RuleCreditScoreModel) and isinstance(fallback_model, RuleCreditScoreModel)
+    if not DEGRADATION_ENABLED or active_model is fallback_model or already_cheap:
+        return active_model, active_info, None
     
-    return df_input
+    deadline = request_deadline(event, context, started)
+    degradation = deadline_policy.decide(_model_key(active_info, explain, _cascade_applies(active_model)),
+                                         rows, deadline)
+    if degradation is None:
+        return active_model, active_info, None
+    
+    degradation["primary_model_version"] = active_info.get("version", "unknown")
+    logger.warning(f"Requisição degradada para {fallback_info['model_name']}: {degradation}")
+    return fallback_model, fallback_info, degradation
+
+def get_requested_model_version(event: Dict[str, Any], body: Dict[str, Any]) -> Union[str, None]:
+    """
+    Obtém a versão do modelo pedida na requisição.
+    
+    O header `X-Model-Version` tem prioridade sobre o campo `model_version` do corpo.
+    Sem nenhum dos dois, retorna None (versão padrão/mais recente).
+    
+    Args:
+        event (dict): evento recebido pelo handler.
+        body (dict): corpo já decodificado da requisição.
+        
+    Returns:
+        str: versão pedida ou None.
+    """
+    version = _header(event, "x-model-version")
+    if version:
+        return str(version)
+    
+    if isinstance(body, dict) and body.get("model_version"):
+        return str(body["model_version"])
+    
+    return None
+
+def predict_arrays(active_model: Any, model_input: pd.DataFrame, use_cascade: bool = True) -> tuple:
+    """
+    Executa o modelo e devolve os resultados em arrays (formato colunar).
+    Com a cascata ligada, o modelo completo recebe apenas as linhas incertas.
+    
+    Returns:
+        tuple: (predições, matriz de probabilidades ou None, classes do modelo).
+    """
+    if use_cascade and _cascade_applies(active_model):
+        return cascade.predict_arrays(active_model, model_input, _model_arrays)
+    return _model_arrays(active_model, model_input)
+
+def _model_arrays(active_model: Any, model_input: pd.DataFrame) -> tuple:
+    """Executa um único modelo (no backend de processos, se configurado)"""
+    global inference_fallbacks
+    
+    # O modelo de reserva fica na thread da requisição: não espera trabalhador livre
+    if inference_backend is not None and active_model is not fallback_model:
+        try:
+            arrays = inference_backend.predict_arrays(active_model, model_input)
+            if arrays is not None:
+                return arrays
+        except InferenceBackendError as e:
+            logger.warning(f"Backend de inferência falhou, executando localmente: {e}")
+            inference_fallbacks += 1
+    
+    # Threads do joblib por tamanho de lote (1 para lotes pequenos), dentro do orçamento
+    with thread_budget.batch(len(model_input)) if thread_budget is not None else nullcontext():
+        predictions = active_model.predict(model_input)
+        
+        # Calcula probabilidades se disponível
+        proba = None
+        if hasattr(active_model, 'predict_proba'):
+            try:
+                proba = np.asarray(active_model.predict_proba(model_input))
+            except Exception as e:
+                logger.warning(f"Erro ao calcular probabilidades: {e}")
+    
+    # Mapeia classes para probabilidades
+    model_classes = active_model.classes_ if hasattr(active_model, 'classes_') else ['Good', 'Poor', 'Standard']
+    model_classes = [_to_native(c) for c in model_classes]
+    
+    return predictions, proba, model_classes
+
+def run_inference(active_model: Any, model_input: pd.DataFrame, use_cascade: bool = True) -> List[Dict[str, Any]]:
+    """
+    Executa o modelo sobre um lote já preparado.
+    
+    Args:
+        active_model: modelo selecionado para a requisição.
+        model_input (pd.DataFrame): entrada do modelo (uma linha por registro).
+        use_cascade (bool): permite a cascata, se configurada.
+        
+    Returns:
+        list: por linha, dicionário com prediction e, se disponíveis, confidence e probabilities.
+    """
+    return _results_from_arrays(*predict_arrays(active_model, model_input, use_cascade))
+
+def _results_from_arrays(predictions: Any, proba: Any, model_classes: List[Any]) -> List[Dict[str, Any]]:
+    """Converte os arrays de `predict_arrays` em um dicionário por linha"""
+    results = []
+    for i in range(len(predictions)):
+        result = {"prediction": _to_native(predictions[i])}
+        if proba is not None:
+            row = proba[i]
+            result["confidence"] = float(row[np.argmax(row)])
+            result["probabilities"] = {model_classes[j]: float(row[j]) for j in range(len(row))}
+        results.append(result)
+    
+    return results
+
+def score_records(active_model: Any, model_input: pd.DataFrame, explainer: Any = None) -> tuple:
+    """
+    Executa a inferência e, se houver explicador, as explicações do lote.
+    
+    Args:
+        active_model: modelo selecionado para a requisição.
+        model_input (pd.DataFrame): entrada do modelo.
+        explainer: explicador pré-calculado do modelo (None = sem explicações).
+        
+    Returns:
+        tuple: (resultados por linha, tempo das explicações em ms ou None).
+    """
+    # As explicações descrevem o modelo completo: sem cascata quando pedidas
+    results = run_inference(active_model, model_input, use_cascade=explainer is None)
+    
+    # Explicações (opcionais, uma única passada vetorizada para o lote)
+    explanation_ms = None
+    if explainer is not None:
+        try:
+            started = time.perf_counter()
+            explanations = explainer.explain(
+                model_input, [r["prediction"] for r in results], top_k=EXPLANATION_TOP_K
+            )
+            explanation_ms = round((time.perf_counter() - started) * 1000, 3)
+            for result, explanation in zip(results, explanations):
+                result["explanation"] = explanation
+            logger.info(f"Explicações calculadas em {explanation_ms}ms")
+        except Exception as e:
+            logger.warning(f"Erro ao calcular explicações: {e}")
+    
+    return results, explanation_ms
+
+def runtime_stats() -> Dict[str, Any]:
+    """Contadores de execução expostos pelo servidor em /metrics"""
+    return {
+        "coalescing": singleflight.stats(),
+        "telemetry_spool": telemetry_spool.stats() if telemetry_spool is not None else None,
+        "feature_store": feature_store.stats() if feature_store is not None else None,
+        "aws_clients": aws_clients.stats(),
+        "prediction_store": prediction_store.stats() if prediction_store is not None else None,
+        "degradation": dict(deadline_policy.stats(), enabled=DEGRADATION_ENABLED,
+                            fallback=fallback_info.get("model_name")),
+        "drift_capture": capture_policy.stats(),
+        "cascade": cascade.stats() if cascade is not None else None,
+        "startup": startup_report,
+        "thread_budget": thread_budget.stats() if thread_budget is not None else None,
+        "inference_backend": dict(
+            inference_backend.stats() if inference_backend is not None else {},
+            backend="process" if inference_backend is not None else "inline",
+            local_fallbacks=inference_fallbacks
+        )
+    }
+
+def _to_native(value: Any) -> Any:
+    """Converte escalares numpy para tipos nativos serializáveis em JSON"""
+    return value.item() if hasattr(value, 'item') else value
+
+def _json_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Monta uma resposta de erro no formato do API Gateway"""
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps(body)
+    }
+
+def _accepts_msgpack(event: Dict[str, Any]) -> bool:
+    return wire_codec.available() and wire_codec.media_type(_header(event, "accept")) is not None
+
+def _encoded_response(event: Dict[str, Any], status_code: int, body: Dict[str, Any],
+                      headers: Dict[str, str] = None) -> Dict[str, Any]:
+    """Resposta no codec pedido pelo Accept: msgpack (binário, em base64) ou JSON"""
+    if _accepts_msgpack(event):
+        return {
+            "statusCode": status_code,
+            "headers": {"Content-Type": wire_codec.MSGPACK, **(headers or {})},
+            "body": base64.b64encode(wire_codec.encode(body)).decode("ascii"),
+            "isBase64Encoded": True
+        }
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": json.dumps(body, separators=(',', ':'))
+    }
+
+def _handle_columnar(event: Dict[str, Any], fmt: str, context: Any = None,
+                     started: float = None) -> Dict[str, Any]:
+    """
+    Predição em lote com corpo Arrow IPC ou Parquet (uma coluna por feature).
+    
+    As colunas são validadas e entregues ao modelo sem criar objetos por linha.
+    Com `Accept` colunar, os resultados voltam no formato pedido (colunas
+    prediction, confidence e probability_<classe>); caso contrário, em JSON.
+    """
+    if not columnar.available():
+        return _json_response(415, {
+            "error": "Formato não suportado",
+            "message": "Entrada colunar requer o pacote pyarrow"
+        })
+    
+    body = event.get("body") or b""
+    if isinstance(body, str):
+        body = base64.b64decode(body) if event.get("isBase64Encoded") else body.encode("utf-8")
+    try:
+        frame = columnar.read_frame(body, fmt)
+    except Exception as e:
+        logger.warning(f"Corpo colunar inválido: {e}")
+        return _json_response(400, {
+            "error": "Dados inválidos",
+            "message": "Não foi possível ler o corpo no formato informado"
+        })
+    
+    if frame.empty:
+        return _json_response(400, {
+            "error": "Dados não fornecidos",
+            "message": "O lote deve ter ao menos uma linha"
+        })
+    if len(frame) > BATCH_MAX_RECORDS:
+        return _json_response(400, {
+            "error": "Lote muito grande",
+            "message": f"Máximo de {BATCH_MAX_RECORDS} registros por requisição"
+        })
+    
+    requested_version = get_requested_model_version(event, None)
+    try:
+        entry = model_pool.get_entry(requested_version)
+        active_model, active_info = entry["model"], entry["info"]
+    except ModelVersionUnavailable as e:
+        logger.warning(f"Versão de modelo indisponível: {e}")
+        return _json_response(404, {
+            "error": "Versão de modelo indisponível",
+            "message": f"Não foi possível carregar a versão {requested_version}"
+        })
+    
+    frame, profiles_found = enrich_frame(feature_store, frame)
+    
+    with profiler.stage("validate_and_clean_data"):
+        try:
+            cleaned = validate_and_clean_frame(frame)
+        except ValueError as e:
+            return _json_response(400, {"error": "Dados inválidos", "message": str(e)})
+    
+    with profiler.stage("prepare_model_input"):
+        model_input = prepare_model_input(cleaned)
+    logger.info(f"Lote colunar ({fmt}) preparado para o modelo: {model_input.shape}")
+    
+    active_model, active_info, degradation = select_scorer(
+        event, context, started or time.monotonic(), active_model, active_info, len(model_input)
+    )
+    model_version = active_info.get("version", "unknown")
+    model_name = active_info.get("model_name", "fiap-mlops-score-model")
+    try:
+        with profiler.stage("inference"):
+            def score():
+                inference_started = time.perf_counter()
+                arrays = predict_arrays(active_model, model_input)
+                if degradation is None:
+                    deadline_policy.observe(_model_key(active_info, cascaded=_cascade_applies(active_model)),
+                                            len(model_input),
+                                            (time.perf_counter() - inference_started) * 1000)
+                return arrays
+            
+            if COALESCING_ENABLED:
+                key = request_key(hashlib.sha256(body).hexdigest(), fmt, model_name, model_version)
+                (predictions, proba, model_classes), _ = singleflight.do(key, score)
+            else:
+                predictions, proba, model_classes = score()
+    except Exception as e:
+        logger.error(f"Erro na predição: {e}")
+        return _json_response(500, {
+            "error": "Erro na predição",
+            "message": "Falha ao executar o modelo"
+        })
+    
+    # Telemetria é por registro; só converte o lote em dicionários se estiver ativa
+    with profiler.stage("telemetry"):
+        if os.getenv('AWS_REGION'):
+            confidences = proba.max(axis=1).tolist() if proba is not None else [None] * len(cleaned)
+            applicant_keys = (frame[CUSTOMER_ID_FIELD].tolist() if CUSTOMER_ID_FIELD in frame.columns
+                              else [None] * len(cleaned))
+            for cleaned_data, prediction, confidence, applicant_key in zip(
+                    cleaned.to_dict('records'), np.asarray(predictions).tolist(), confidences, applicant_keys):
+                try:
+                    input_metrics(cleaned_data, prediction, confidence, model_version=model_version)
+                    write_real_data(cleaned_data, prediction, model_version=model_version,
+                                    confidence=confidence, applicant_key=applicant_key)
+                except Exception as e:
+                    logger.warning(f"Erro ao registrar métricas/dados: {e}")
+        
+        request_id = None
+        if prediction_store is not None:
+            request_id = request_id_for(event)
+            prediction_store.record(
+                request_id, model_name, model_version, np.asarray(predictions), proba, model_classes,
+                features=cleaned,
+                applicant_keys=frame[CUSTOMER_ID_FIELD].to_numpy() if CUSTOMER_ID_FIELD in frame.columns else None,
+                degraded=degradation is not None
+            )
+    
+    cors_headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, Authorization"
+    }
+    output_format = columnar.media_type(_header(event, "accept"))
+    if output_format is None:
+        return _encoded_response(event, 200, {
+            "predictions": _results_from_arrays(predictions, proba, model_classes),
+            "count": len(model_input),
+            "model_version": model_version,
+            "model_name": model_name,
+            "timestamp": datetime.now().isoformat(),
+            **({"profiles_found": profiles_found} if profiles_found is not None else {}),
+            **({"request_id": request_id} if request_id is not None else {}),
+            **({"degraded": True, "degradation": degradation} if degradation is not None else {})
+        }, cors_headers)
+    
+    result_frame = pd.DataFrame({"prediction": np.asarray(predictions)})
+    if proba is not None:
+        result_frame["confidence"] = proba.max(axis=1)
+        for j, model_class in enumerate(model_classes):
+            result_frame[f"probability_{model_class}"] = proba[:, j]
+    
+    return {
+        "statusCode": 200,
+        "headers": {
+            "Content-Type": output_format,
+            "X-Model-Version": str(model_version),
+            "X-Model-Name": model_name,
+            **({"X-Profiles-Found": str(profiles_found)} if profiles_found is not None else {}),
+            **({"X-Degraded": degradation["reason"]} if degradation is not None else {}),
+            **({"X-Request-ID": request_id} if request_id is not None else {}),
+            **cors_headers
+        },
+        "body": base64.b64encode(columnar.write_frame(result_frame, output_format)).decode("ascii"),
+        "isBase64Encoded": True
+    }
 
 def handler(event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
     """
     Função principal da API para classificação de Score de Crédito.
     
+    Aceita um registro em `data` ou um lote em `records`. Com `"explain": true`
+    cada predição traz as features que mais contribuíram para a classe predita.
+    
     Args:
         event (dict): payload de entrada (API Gateway ou Lambda direto).
         context: contexto de execução (opcional).
@@ -470,132 +1358,220 @@ def handler(event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
     Returns:
         dict: resposta com classificação e metadados.
     """
+    started = time.monotonic()
+    with profiler.request():
+        response = _handle(event, context, started)
+    
+    # Erros são montados em JSON; quem pediu msgpack recebe no mesmo codec
+    if response.get("statusCode", 200) >= 400 and not response.get("isBase64Encoded") \
+            and _accepts_msgpack(event):
+        response = _encoded_response(event, response["statusCode"], json.loads(response["body"]),
+                                     {k: v for k, v in response["headers"].items() if k != "Content-Type"})
+    return response
+
+def _handle(event: Dict[str, Any], context: Any = None, started: float = None) -> Dict[str, Any]:
+    """Processa a requisição; cada etapa é medida pelo profiler quando ativo"""
+    started = time.monotonic() if started is None else started
     try:
+        # Lote em formato colunar (Arrow IPC/Parquet) segue um caminho próprio
+        columnar_format = columnar.media_type(_header(event, "content-type"))
+        if columnar_format is not None:
+            return _handle_columnar(event, columnar_format, context, started)
+        
         logger.info(f"Evento recebido: {event}")
         
         # Extração dos dados do evento
         if "body" in event:
             logger.info("Requisição via API Gateway")
             body_str = event.get("body", "{}")
-            if isinstance(body_str, str):
+            if wire_codec.media_type(_header(event, "content-type")) and not isinstance(body_str, dict):
+                # Corpo msgpack: mesmo dicionário do JSON, só a decodificação muda
+                if not wire_codec.available():
+                    return _json_response(415, {
+                        "error": "Formato não suportado",
+                        "message": "Corpo msgpack requer o pacote msgpack"
+                    })
+                raw = base64.b64decode(body_str) if event.get("isBase64Encoded") else body_str
+                try:
+                    body = wire_codec.decode(raw)
+                except ValueError as e:
+                    logger.warning(str(e))
+                    return _json_response(400, {
+                        "error": "Dados inválidos",
+                        "message": "Não foi possível ler o corpo msgpack"
+                    })
+                if not isinstance(body, dict):
+                    return _json_response(400, {
+                        "error": "Dados inválidos",
+                        "message": "O corpo deve ser um mapa"
+                    })
+            elif isinstance(body_str, (str, bytes)):
                 body = json.loads(body_str)
             else:
                 body = body_str
             data = body.get("data", {})
         else:
             logger.info("Invocação direta")
+            body = event
             data = event.get("data", {})
         
-        if not data:
-            return {
-                "statusCode": 400,
-                "headers": {"Content-Type": "application/json"},
-                "body": json.dumps({
+        records = body.get("records") if isinstance(body, dict) else None
+        is_batch = records is not None
+        explain = bool(body.get("explain")) if isinstance(body, dict) else False
+        
+        if is_batch:
+            if not isinstance(records, list) or not records:
+                return _json_response(400, {
                     "error": "Dados não fornecidos",
-                    "message": "Campo 'data' é obrigatório"
+                    "message": "Campo 'records' deve ser uma lista não vazia"
                 })
-            }
+            if len(records) > BATCH_MAX_RECORDS:
+                return _json_response(400, {
+                    "error": "Lote muito grande",
+                    "message": f"Máximo de {BATCH_MAX_RECORDS} registros por requisição"
+                })
+            if explain and len(records) > EXPLANATION_MAX_ROWS:
+                return _json_response(400, {
+                    "error": "Lote muito grande para explicações",
+                    "message": f"Explicações limitadas a {EXPLANATION_MAX_ROWS} registros por requisição"
+                })
+        elif not data:
+            return _json_response(400, {
+                "error": "Dados não fornecidos",
+                "message": "Campo 'data' é obrigatório"
+            })
         
-        # Validação e limpeza dos dados
+        # Seleção da versão do modelo (header X-Model-Version ou campo model_version)
+        requested_version = get_requested_model_version(event, body)
         try:
-            cleaned_data = validate_and_clean_data(data)
-            logger.info(f"Dados validados: {list(cleaned_data.keys())}")
-        except ValueError as e:
-            return {
-                "statusCode": 400,
-                "headers": {"Content-Type": "application/json"},
-                "body": json.dumps({
-                    "error": "Dados inválidos",
-                    "message": str(e)
-                })
-            }
+            entry = model_pool.get_entry(requested_version)
+            active_model, active_info = entry["model"], entry["info"]
+        except ModelVersionUnavailable as e:
+            logger.warning(f"Versão de modelo indisponível: {e}")
+            return _json_response(404, {
+                "error": "Versão de modelo indisponível",
+                "message": f"Não foi possível carregar a versão {requested_version}"
+            })
+        
+        # Validação e limpeza dos dados
+        raw_records = records if is_batch else [data]
+        raw_records, profiles_found = enrich_records(feature_store, raw_records)
+        cleaned_records = []
+        with profiler.stage("validate_and_clean_data"):
+            for index, record in enumerate(raw_records):
+                try:
+                    if not isinstance(record, dict):
+                        raise ValueError("Registro deve ser um objeto JSON")
+                    cleaned_records.append(validate_and_clean_data(record))
+                except ValueError as e:
+                    message = f"Registro {index}: {e}" if is_batch else str(e)
+                    return _json_response(400, {
+                        "error": "Dados inválidos",
+                        "message": message
+                    })
+        logger.info(f"Dados validados: {len(cleaned_records)} registro(s)")
         
         # Preparação dos dados para o modelo
         try:
-            model_input = prepare_model_input(cleaned_data)
+            with profiler.stage("prepare_model_input"):
+                model_input = prepare_model_input(cleaned_records)
             logger.info(f"Input preparado para o modelo: {model_input.shape}")
         except Exception as e:
             logger.error(f"Erro ao preparar input: {e}")
-            return {
-                "statusCode": 500,
-                "headers": {"Content-Type": "application/json"},
-                "body": json.dumps({
-                    "error": "Erro no processamento",
-                    "message": "Falha na preparação dos dados"
-                })
-            }
+            return _json_response(500, {
+                "error": "Erro no processamento",
+                "message": "Falha na preparação dos dados"
+            })
+        
+        # Sem tempo para o modelo principal, o de reserva responde (resposta marcada como degradada)
+        active_model, active_info, degradation = select_scorer(
+            event, context, started, active_model, active_info, len(model_input), explain
+        )
         
-        # Predição
+        # Predição (requisições idênticas em andamento compartilham a mesma execução)
+        model_version = active_info.get("version", "unknown")
+        explainer = entry.get("prepared") if explain and degradation is None else None
         try:
-            prediction = model.predict(model_input)[0]
-            
-            # Calcula probabilidades se disponível
-            confidence = None
-            probabilities = None
-            if hasattr(model, 'predict_proba'):
-                try:
-                    proba = model.predict_proba(model_input)[0]
-                    max_proba_idx = np.argmax(proba)
-                    confidence = float(proba[max_proba_idx])
-                    
-                    # Mapeia classes para probabilidades
-                    classes = model.classes_ if hasattr(model, 'classes_') else ['Good', 'Poor', 'Standard']
-                    probabilities = {classes[i]: float(proba[i]) for i in range(len(proba))}
-                except Exception as e:
-                    logger.warning(f"Erro ao calcular probabilidades: {e}")
-            
-            logger.info(f"Predição: {prediction}, Confiança: {confidence}")
+            def score():
+                inference_started = time.perf_counter()
+                scored = score_records(active_model, model_input, explainer)
+                if degradation is None:
+                    deadline_policy.observe(_model_key(active_info, explain, _cascade_applies(active_model)),
+                                            len(model_input),
+                                            (time.perf_counter() - inference_started) * 1000)
+                return scored
             
+            with profiler.stage("inference"):
+                if COALESCING_ENABLED:
+                    key = request_key(cleaned_records, active_info.get("model_name"), model_version, explain)
+                    (shared_results, explanation_ms), coalesced = singleflight.do(key, score)
+                    if coalesced:
+                        logger.info("Resultado compartilhado com requisição idêntica em andamento")
+                else:
+                    shared_results, explanation_ms = score()
+                
+                # Cópia rasa: o resultado pode ser compartilhado com outras requisições
+                results = [dict(result) for result in shared_results]
+            logger.info(f"Predições: {len(results)}, primeira: {results[0].get('prediction')}")
         except Exception as e:
             logger.error(f"Erro na predição: {e}")
-            return {
-                "statusCode": 500,
-                "headers": {"Content-Type": "application/json"},
-                "body": json.dumps({
-                    "error": "Erro na predição",
-                    "message": "Falha ao executar o modelo"
-                })
-            }
+            return _json_response(500, {
+                "error": "Erro na predição",
+                "message": "Falha ao executar o modelo"
+            })
         
         # Registro de métricas e dados
-        try:
-            input_metrics(cleaned_data, prediction, confidence)
-            write_real_data(cleaned_data, prediction)
-        except Exception as e:
-            logger.warning(f"Erro ao registrar métricas/dados: {e}")
+        with profiler.stage("telemetry"):
+            for cleaned_data, result, raw in zip(cleaned_records, results, raw_records):
+                try:
+                    input_metrics(cleaned_data, result["prediction"], result.get("confidence"),
+                                  model_version=model_version)
+                    write_real_data(cleaned_data, result["prediction"], model_version=model_version,
+                                    confidence=result.get("confidence"),
+                                    applicant_key=raw.get(CUSTOMER_ID_FIELD))
+                except Exception as e:
+                    logger.warning(f"Erro ao registrar métricas/dados: {e}")
+            
+            request_id = None
+            if prediction_store is not None:
+                request_id = request_id_for(event)
+                prediction_store.record(
+                    request_id, active_info.get("model_name"), model_version, results,
+                    features=cleaned_records,
+                    applicant_keys=[r.get(CUSTOMER_ID_FIELD) if isinstance(r, dict) else None
+                                    for r in raw_records],
+                    degraded=degradation is not None
+                )
         
         # Resposta de sucesso
-        response_body = {
-            "prediction": prediction,
-            "model_version": model_info.get("version", "unknown"),
-            "model_name": model_info.get("model_name", "fiap-mlops-score-model"),
+        response_body = results[0] if not is_batch else {"predictions": results, "count": len(results)}
+        response_body.update({
+            "model_version": model_version,
+            "model_name": active_info.get("model_name", "fiap-mlops-score-model"),
             "timestamp": datetime.now().isoformat()
-        }
+        })
+        if profiles_found is not None:
+            response_body["profiles_found"] = profiles_found
+        if request_id is not None:
+            response_body["request_id"] = request_id
+        if degradation is not None:
+            response_body["degraded"] = True
+            response_body["degradation"] = degradation
         
-        if confidence is not None:
-            response_body["confidence"] = confidence
+        if explain:
+            response_body["explanations_available"] = explanation_ms is not None
+            if explanation_ms is not None:
+                response_body["explanation_ms"] = explanation_ms
         
-        if probabilities is not None:
-            response_body["probabilities"] = probabilities
-        
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            },
-            "body": json.dumps(response_body)
-        }
+        return _encoded_response(event, 200, response_body, {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type, Authorization"
+        })
         
     except Exception as e:
         logger.error(f"Erro não tratado: {e}")
-        return {
-            "statusCode": 500,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({
-                "error": "Erro interno do servidor",
-                "message": "Erro inesperado na execução"
-            })
-        }
+        return _json_response(500, {
+            "error": "Erro interno do servidor",
+            "message": "Erro inesperado na execução"
+        })
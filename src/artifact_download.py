@@ -0,0 +1,315 @@
+"""
+Download dos artefatos do modelo: arquivos baixados em paralelo, retomada de
+downloads parciais, verificação de tamanho e sha256 e gravação atômica no
+destino (arquivo `.part` + rename).
+
+A origem é um "artifact store" com `list_files()` e `read(path, start)`:
+- `LocalArtifactStore`: diretório local (cópia do store, testes);
+- `HttpArtifactStore`: API REST do servidor de tracking do MLflow
+  (`/api/2.0/mlflow/artifacts/list` e `/get-artifact`, com cabeçalho Range).
+
+O sha256 esperado vem de um `checksums.json` ({caminho: sha256}) publicado junto
+com os artefatos, quando existir; sem ele, vale o tamanho informado pelo store.
+O manifesto local (`.artifacts.json`) e os arquivos `.part` são associados à
+revisão do store (run_id ou versão): sem hash publicado, um arquivo só é pulado,
+ou um download parcial retomado, se for da mesma revisão. Um arquivo de outra
+versão com o mesmo tamanho nunca é aproveitado.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHECKSUMS_FILE = "checksums.json"
+MANIFEST_FILE = ".artifacts.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactDownloadError(Exception):
+    """Artefato não pôde ser baixado ou não passou na verificação"""
+
+
+def file_sha256(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LocalArtifactStore:
+    """
+    Diretório local no papel do store de artefatos.
+
+    Args:
+        root (str): diretório com os artefatos.
+        revision (str): run_id/versão dos artefatos (None = desconhecida).
+    """
+
+    def __init__(self, root: str, revision: Optional[str] = None):
+        self.root = root
+        self.revision = revision
+
+    def list_files(self) -> List[Dict[str, Any]]:
+        checksums = {}
+        checksums_path = os.path.join(self.root, CHECKSUMS_FILE)
+        if os.path.exists(checksums_path):
+            with open(checksums_path, "r", encoding="utf-8") as f:
+                checksums = json.load(f)
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in sorted(names):
+                full = os.path.join(directory, name)
+                path = os.path.relpath(full, self.root).replace(os.sep, "/")
+                if path in (CHECKSUMS_FILE, MANIFEST_FILE):
+                    continue
+                files.append({"path": path, "size": os.path.getsize(full), "sha256": checksums.get(path)})
+        return files
+
+    def read(self, path: str, start: int = 0, chunk_size: int = CHUNK_SIZE) -> Tuple[int, Iterator[bytes]]:
+        """Retorna (posição inicial efetiva, blocos a partir dela)"""
+        def chunks():
+            with open(os.path.join(self.root, path), "rb") as f:
+                f.seek(start)
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    yield chunk
+        return start, chunks()
+
+
+class HttpArtifactStore:
+    """
+    Artefatos de um run pela API REST do servidor de tracking do MLflow.
+
+    Args:
+        tracking_uri (str): URL do servidor de tracking.
+        run_id (str): run dono dos artefatos.
+        artifact_path (str): diretório dos artefatos no run (ex.: "model").
+        headers (dict): cabeçalhos de autenticação.
+    """
+
+    def __init__(self, tracking_uri: str, run_id: str, artifact_path: str = "model",
+                 headers: Optional[Dict[str, str]] = None, timeout: float = 60.0):
+        self.base_url = tracking_uri.rstrip("/")
+        self.run_id = run_id
+        self.artifact_path = artifact_path.strip("/")
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.revision = run_id
+
+    def _open(self, url: str, headers: Optional[Dict[str, str]] = None) -> Any:
+        request = urllib.request.Request(url, headers=dict(self.headers, **(headers or {})))
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _list(self, path: str) -> List[Dict[str, Any]]:
+        query = urllib.parse.urlencode({"run_id": self.run_id, "path": path})
+        with self._open(f"{self.base_url}/api/2.0/mlflow/artifacts/list?{query}") as response:
+            entries = json.loads(response.read()).get("files", [])
+        files = []
+        for entry in entries:
+            if entry.get("is_dir"):
+                files += self._list(entry["path"])
+            else:
+                files.append({"path": entry["path"], "size": int(entry.get("file_size") or 0)})
+        return files
+
+    def _url(self, path: str) -> str:
+        full = f"{self.artifact_path}/{path}" if self.artifact_path else path
+        return f"{self.base_url}/get-artifact?" + urllib.parse.urlencode({"path": full, "run_uuid": self.run_id})
+
+    def list_files(self) -> List[Dict[str, Any]]:
+        prefix = f"{self.artifact_path}/" if self.artifact_path else ""
+        files = [dict(f, path=f["path"][len(prefix):]) for f in self._list(self.artifact_path)]
+        checksums = {}
+        if any(f["path"] == CHECKSUMS_FILE for f in files):
+            with self._open(self._url(CHECKSUMS_FILE)) as response:
+                checksums = json.loads(response.read())
+        return [dict(f, sha256=checksums.get(f["path"])) for f in files if f["path"] != CHECKSUMS_FILE]
+
+    def read(self, path: str, start: int = 0, chunk_size: int = CHUNK_SIZE) -> Tuple[int, Iterator[bytes]]:
+        """Pede a partir de `start` com Range; servidor sem suporte devolve o arquivo desde o início"""
+        response = self._open(self._url(path), {"Range": f"bytes={start}-"} if start else None)
+        actual_start = start if start and response.status == 206 else 0
+
+        def chunks():
+            with response:
+                for chunk in iter(lambda: response.read(chunk_size), b""):
+                    yield chunk
+        return actual_start, chunks()
+
+
+def _read_manifest(dest: str) -> Dict[str, Dict[str, Any]]:
+    path = os.path.join(dest, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def _write_manifest(dest: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    path = os.path.join(dest, MANIFEST_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def _target_path(dest: str, path: str) -> str:
+    target = os.path.normpath(os.path.join(dest, path))
+    if os.path.commonpath([os.path.abspath(target), os.path.abspath(dest)]) != os.path.abspath(dest):
+        raise ArtifactDownloadError(f"Caminho de artefato fora do destino: {path}")
+    return target
+
+
+def _part_path(target: str, revision: Optional[str]) -> str:
+    """Download parcial associado à revisão: parciais de outra versão não são retomados"""
+    if revision is None:
+        return f"{target}.part"
+    return f"{target}.{hashlib.sha256(str(revision).encode('utf-8')).hexdigest()[:12]}.part"
+
+
+def _remove_stale_parts(target: str, keep: str) -> None:
+    for stale in glob.glob(glob.escape(target) + ".*part"):
+        if stale != keep and os.path.exists(stale):
+            os.remove(stale)
+
+
+def download_file(store: Any, artifact: Dict[str, Any], dest: str, known: Optional[Dict[str, Any]] = None,
+                  retries: int = 3, chunk_size: int = CHUNK_SIZE, backoff: float = 1.0,
+                  revision: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Baixa um artefato para `dest`, retomando o `.part` existente da mesma revisão.
+
+    Args:
+        artifact (dict): {"path", "size", "sha256"} vindo de `store.list_files()`.
+        known (dict): entrada do manifesto local do download anterior.
+        revision (str): run_id/versão dos artefatos; sem ela e sem sha256
+            publicado, o arquivo é sempre baixado de novo.
+
+    Returns:
+        dict: path, status (skipped, downloaded ou resumed), bytes, sha256, seconds.
+    """
+    started = time.perf_counter()
+    path, size = artifact["path"], artifact["size"]
+    expected = artifact.get("sha256")
+    same_revision = revision is not None and known is not None and known.get("revision") == revision
+    previous = known.get("sha256") if same_revision and known.get("size") == size else None
+    target = _target_path(dest, path)
+    part = _part_path(target, revision)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Sem hash publicado nem revisão, um parcial pode ser de outra versão: recomeça
+    if expected is None and revision is None and os.path.exists(part):
+        os.remove(part)
+
+    if os.path.exists(target) and os.path.getsize(target) == size and (expected or previous):
+        digest = file_sha256(target)
+        if digest == (expected or previous):
+            return {"path": path, "status": "skipped", "bytes": 0, "sha256": digest,
+                    "seconds": round(time.perf_counter() - started, 3)}
+
+    resumed, transferred, last_error = False, 0, None
+    for attempt in range(max(1, retries)):
+        try:
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            if offset > size:
+                offset = 0
+            actual, chunks = store.read(path, offset, chunk_size)
+            digest = hashlib.sha256()
+            mode = "r+b" if actual and os.path.exists(part) else "wb"
+            with open(part, mode) as f:
+                if actual:
+                    for chunk in iter(lambda: f.read(chunk_size), b""):
+                        digest.update(chunk)
+                    resumed = True
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    transferred += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            written = os.path.getsize(part)
+            if written != size:
+                raise ArtifactDownloadError(f"{path}: {written} de {size} bytes")
+            sha256 = digest.hexdigest()
+            if expected and sha256 != expected:
+                os.remove(part)
+                raise ArtifactDownloadError(f"{path}: sha256 não confere")
+            os.replace(part, target)
+            _remove_stale_parts(target, part)
+            return {"path": path, "status": "resumed" if resumed else "downloaded", "bytes": transferred,
+                    "sha256": sha256, "seconds": round(time.perf_counter() - started, 3)}
+        except (OSError, urllib.error.URLError, ArtifactDownloadError) as e:
+            last_error = e
+            logger.warning(f"Download de {path} falhou (tentativa {attempt + 1}/{retries}): {e}")
+            if attempt + 1 < retries:
+                time.sleep(backoff * (2 ** attempt))
+    raise ArtifactDownloadError(f"{path}: {last_error}")
+
+
+def download_artifacts(store: Any, dest: str, workers: int = 4, retries: int = 3,
+                       chunk_size: int = CHUNK_SIZE, backoff: float = 1.0,
+                       on_file: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Baixa todos os artefatos do store para `dest`, `workers` arquivos por vez.
+    A revisão (`store.revision`) fica no manifesto e no nome dos `.part`.
+
+    Returns:
+        dict: arquivos, bytes transferidos, tempo e throughput.
+
+    Raises:
+        ArtifactDownloadError: se algum arquivo falhar (os demais ficam gravados).
+    """
+    started = time.perf_counter()
+    os.makedirs(dest, exist_ok=True)
+    artifacts = store.list_files()
+    manifest = _read_manifest(dest)
+    revision = getattr(store, "revision", None)
+
+    def fetch(artifact):
+        try:
+            result = download_file(store, artifact, dest, manifest.get(artifact["path"]),
+                                   retries, chunk_size, backoff, revision)
+        except ArtifactDownloadError as e:
+            result = {"path": artifact["path"], "status": "failed", "error": str(e), "bytes": 0}
+        if on_file:
+            on_file(result)
+        return result
+
+    # Maiores primeiro: o arquivo do modelo não fica para o fim da fila
+    ordered = sorted(artifacts, key=lambda a: -a["size"])
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(fetch, ordered))
+
+    sizes = {a["path"]: a["size"] for a in artifacts}
+    for result in results:
+        if result["status"] != "failed":
+            manifest[result["path"]] = {"size": sizes[result["path"]], "sha256": result["sha256"],
+                                        "revision": revision}
+    _write_manifest(dest, manifest)
+
+    elapsed = time.perf_counter() - started
+    transferred = sum(r["bytes"] for r in results)
+    report = {
+        "files": results,
+        "total_bytes": sum(sizes.values()),
+        "transferred_bytes": transferred,
+        "elapsed_seconds": round(elapsed, 3),
+        "mb_per_second": round(transferred / 1024 / 1024 / elapsed, 3) if elapsed else 0.0
+    }
+    failed = [r for r in results if r["status"] == "failed"]
+    if failed:
+        raise ArtifactDownloadError(f"{len(failed)} artefato(s) falharam: "
+                                    + "; ".join(r["error"] for r in failed))
+    return report
@@ -0,0 +1,91 @@
+"""
+Clientes AWS compartilhados por processo.
+Um cliente por serviço é criado uma única vez (na primeira chamada) com pool de
+conexões, timeouts e retentativas configurados, e reutilizado por todas as
+threads e invocações do Lambda — sem repetir a criação do cliente, a resolução
+de credenciais e o handshake TLS a cada predição.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '10'))
+AWS_CONNECT_TIMEOUT_SECONDS = float(os.getenv('AWS_CONNECT_TIMEOUT_SECONDS', '2'))
+AWS_READ_TIMEOUT_SECONDS = float(os.getenv('AWS_READ_TIMEOUT_SECONDS', '5'))
+AWS_MAX_ATTEMPTS = int(os.getenv('AWS_MAX_ATTEMPTS', '3'))
+AWS_RETRY_MODE = os.getenv('AWS_RETRY_MODE', 'standard')
+
+_session: Optional[boto3.session.Session] = None
+_clients: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def endpoint_url(service: str) -> Optional[str]:
+    """
+    Endpoint alternativo (ex.: um stand-in local): `AWS_ENDPOINT_URL_<SERVIÇO>`
+    tem prioridade sobre `AWS_ENDPOINT_URL`.
+    """
+    return os.getenv(f"AWS_ENDPOINT_URL_{service.upper()}") or os.getenv('AWS_ENDPOINT_URL') or None
+
+
+def client_config() -> Config:
+    """Configuração comum: pool, timeouts, retentativas e keep-alive TCP"""
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=AWS_READ_TIMEOUT_SECONDS,
+        retries={"total_max_attempts": AWS_MAX_ATTEMPTS, "mode": AWS_RETRY_MODE},
+        tcp_keepalive=True
+    )
+
+
+def get_client(service: str) -> Any:
+    """
+    Cliente compartilhado do serviço (ex.: 's3', 'cloudwatch').
+    Clientes do botocore são thread-safe; a sessão não é, por isso a criação
+    acontece sob lock.
+    """
+    client = _clients.get(service)
+    if client is not None:
+        return client
+
+    global _session
+    with _lock:
+        client = _clients.get(service)
+        if client is None:
+            if _session is None:
+                _session = boto3.session.Session()
+            client = _session.client(service, config=client_config(), endpoint_url=endpoint_url(service))
+            _clients[service] = client
+            logger.info(f"Cliente AWS criado: {service} (endpoint: {client.meta.endpoint_url})")
+    return client
+
+
+def reset() -> None:
+    """Descarta os clientes (ex.: após mudar credenciais ou configuração)"""
+    global _session
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _session = None
+
+
+def stats() -> Dict[str, Any]:
+    """Clientes criados e configuração em uso"""
+    with _lock:
+        return {
+            "clients": {name: client.meta.endpoint_url for name, client in _clients.items()},
+            "max_pool_connections": AWS_MAX_POOL_CONNECTIONS,
+            "connect_timeout_seconds": AWS_CONNECT_TIMEOUT_SECONDS,
+            "read_timeout_seconds": AWS_READ_TIMEOUT_SECONDS,
+            "max_attempts": AWS_MAX_ATTEMPTS,
+            "retry_mode": AWS_RETRY_MODE
+        }
@@ -0,0 +1,129 @@
+"""
+Política de captura dos dados de data drift: decide, antes de qualquer I/O, se
+uma predição vai para os arquivos diários de `write_real_data`.
+
+- Taxa global (`rate`) e taxas mínimas por classe predita (`class_min_rates`),
+  para que classes raras (ex.: "Poor") não fiquem sub-amostradas;
+- predições com confiança abaixo de `low_confidence` são sempre capturadas;
+- o sorteio é determinístico por cliente: um hash da chave do solicitante
+  (`Customer_ID` ou, sem ele, do próprio registro) comparado com a taxa. O mesmo
+  cliente fica sempre dentro ou fora da amostra para uma mesma taxa, e taxas
+  maiores incluem os clientes das menores;
+- cada linha capturada leva `sample_weight` = 1 / probabilidade de captura, usado
+  por `drift_analysis.py` para re-ponderar as contagens.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from feature_store import CUSTOMER_ID_FIELD
+
+SAMPLE_WEIGHT_COLUMN = 'sample_weight'
+
+
+def parse_class_rates(text: str) -> Dict[str, float]:
+    """Converte "Poor=1.0,Standard=0.2" em {"Poor": 1.0, "Standard": 0.2}"""
+    rates = {}
+    for item in (text or '').split(','):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Taxa por classe inválida: {item!r} (use Classe=taxa)")
+        rates[name.strip()] = float(value)
+    return rates
+
+
+def _clamp(rate: float) -> float:
+    return min(1.0, max(0.0, float(rate)))
+
+
+def hash_unit(key: str, salt: str = '') -> float:
+    """Posição determinística da chave em [0, 1)"""
+    digest = hashlib.sha256(f"{salt}:{key}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+class CapturePolicy:
+    """
+    Amostragem estratificada e determinística da captura de data drift.
+
+    Args:
+        rate (float): taxa global de captura (0 a 1).
+        class_min_rates (dict): taxa mínima por classe predita.
+        low_confidence (float): confiança abaixo deste valor é sempre capturada (0 desliga).
+        key_field (str): campo com a chave do solicitante.
+        salt (str): troca o conjunto de clientes amostrados sem mudar a taxa.
+    """
+
+    def __init__(self, rate: float = 1.0, class_min_rates: Optional[Dict[str, float]] = None,
+                 low_confidence: float = 0.0, key_field: str = CUSTOMER_ID_FIELD, salt: str = ''):
+        self.rate = _clamp(rate)
+        self.class_min_rates = {str(k): _clamp(v) for k, v in (class_min_rates or {}).items()}
+        self.low_confidence = low_confidence
+        self.key_field = key_field
+        self.salt = salt
+        self._lock = threading.Lock()
+        self.seen = 0
+        self.captured = 0
+        self.reasons: Dict[str, int] = {}
+        self.by_class: Dict[str, Dict[str, int]] = {}
+
+    def probability(self, prediction: str, confidence: Optional[float] = None) -> float:
+        """Probabilidade de captura da predição"""
+        if self._low_confidence(confidence):
+            return 1.0
+        return max(self.rate, self.class_min_rates.get(str(prediction), 0.0))
+
+    def _low_confidence(self, confidence: Optional[float]) -> bool:
+        return confidence is not None and confidence < self.low_confidence
+
+    def applicant_key(self, data: Dict[str, Any], applicant_key: Any = None) -> str:
+        """Chave do sorteio: o ID do cliente ou, sem ele, o registro em forma canônica"""
+        key = applicant_key if applicant_key is not None else data.get(self.key_field)
+        if key is not None and str(key) != '':
+            return str(key)
+        return json.dumps(data, sort_keys=True, default=str)
+
+    def decide(self, data: Dict[str, Any], prediction: str, confidence: Optional[float] = None,
+               applicant_key: Any = None) -> Optional[float]:
+        """
+        Decide a captura de uma predição.
+
+        Returns:
+            float: peso amostral (1 / probabilidade) se capturada; None se descartada.
+        """
+        probability = self.probability(prediction, confidence)
+        if self._low_confidence(confidence):
+            reason, weight = "baixa_confianca", 1.0
+        elif probability >= 1.0:
+            reason, weight = "taxa", 1.0
+        elif probability > 0.0 and hash_unit(self.applicant_key(data, applicant_key), self.salt) < probability:
+            reason, weight = "taxa", 1.0 / probability
+        else:
+            reason, weight = "descartada", None
+
+        with self._lock:
+            self.seen += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+            counts = self.by_class.setdefault(str(prediction), {"seen": 0, "captured": 0})
+            counts["seen"] += 1
+            if weight is not None:
+                self.captured += 1
+                counts["captured"] += 1
+        return weight
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "class_min_rates": dict(self.class_min_rates),
+                "low_confidence": self.low_confidence,
+                "seen": self.seen,
+                "captured": self.captured,
+                "capture_ratio": round(self.captured / self.seen, 4) if self.seen else None,
+                "reasons": dict(self.reasons),
+                "by_class": {k: dict(v) for k, v in self.by_class.items()}
+            }
@@ -0,0 +1,175 @@
+"""
+Cascata de modelos por confiança: um modelo barato (regras vetorizadas ou uma
+árvore rasa destilada do modelo completo) pontua todas as linhas, e apenas as
+linhas com confiança abaixo do limiar são escaladas para o modelo completo, em
+um único sub-lote.
+
+`threshold_sweep` mede, sobre um arquivo de validação, a taxa de escalonamento
+e a concordância com o modelo completo para cada limiar (ver cascade_report.py).
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from rule_model import RuleCreditScoreModel
+
+logger = logging.getLogger(__name__)
+
+
+def load_first_stage(spec: str) -> tuple:
+    """
+    Carrega o primeiro estágio.
+
+    Args:
+        spec (str): "rules" (modelo de regras) ou caminho de um modelo joblib.
+
+    Returns:
+        tuple: (modelo, metadados).
+    """
+    if spec in ("", "rules"):
+        return RuleCreditScoreModel(), {"model_name": "rule_model", "version": "rules-1.0"}
+    import joblib
+    return joblib.load(spec), {"model_name": "cascade_first_stage", "version": spec}
+
+
+def _native_classes(model: Any) -> Optional[List[Any]]:
+    classes = getattr(model, "classes_", None)
+    if classes is None:
+        return None
+    return [c.item() if isinstance(c, np.generic) else c for c in classes]
+
+
+def aligned_proba(model: Any, X: pd.DataFrame, classes: Sequence[Any]) -> Optional[np.ndarray]:
+    """
+    Probabilidades de `model` com as colunas na ordem de `classes`; None se o
+    modelo prevê alguma classe fora de `classes`.
+    """
+    own = _native_classes(model)
+    if own is None or not set(own) <= set(classes):
+        return None
+    proba = np.asarray(model.predict_proba(X), dtype=np.float64)
+    aligned = np.zeros((len(X), len(classes)), dtype=np.float64)
+    index = {c: j for j, c in enumerate(classes)}
+    for i, c in enumerate(own):
+        aligned[:, index[c]] = proba[:, i]
+    return aligned
+
+
+class CascadeScorer:
+    """
+    Primeiro estágio sempre, modelo completo só para as linhas incertas.
+
+    Args:
+        first_stage: modelo barato com `predict_proba` e `classes_`.
+        threshold (float): confiança mínima (maior probabilidade) para a linha
+            ficar com a resposta do primeiro estágio.
+        info (dict): metadados do primeiro estágio.
+    """
+
+    def __init__(self, first_stage: Any, threshold: float, info: Optional[Dict[str, Any]] = None):
+        self.first_stage = first_stage
+        self.threshold = threshold
+        self.info = info or {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rows = 0
+        self.escalated = 0
+        self.bypassed = 0
+
+    def applies(self, full_model: Any) -> bool:
+        """Sem cascata quando o modelo completo já é o barato (ex.: modo demonstração)"""
+        return full_model is not self.first_stage and not isinstance(full_model, RuleCreditScoreModel) \
+            and _native_classes(full_model) is not None
+
+    def predict_arrays(self, full_model: Any, X: pd.DataFrame,
+                       run: Callable[[Any, pd.DataFrame], tuple]) -> tuple:
+        """
+        Mesmo formato de `app.predict_arrays`: (predições, probabilidades, classes).
+
+        Args:
+            full_model: modelo completo da requisição.
+            X (pd.DataFrame): entrada do modelo.
+            run (callable): executa o modelo completo sobre o sub-lote escalado
+                (ex.: pelo backend de inferência em processos).
+        """
+        classes = _native_classes(full_model)
+        try:
+            first_proba = aligned_proba(self.first_stage, X, classes)
+        except Exception as e:
+            logger.warning(f"Primeiro estágio da cascata falhou, usando o modelo completo: {e}")
+            first_proba = None
+        if first_proba is None:
+            with self._lock:
+                self.bypassed += 1
+            return run(full_model, X)
+
+        escalate = first_proba.max(axis=1) < self.threshold
+        escalated = int(escalate.sum())
+        with self._lock:
+            self.calls += 1
+            self.rows += len(X)
+            self.escalated += escalated
+        if escalated == len(X):
+            return run(full_model, X)
+
+        predictions = np.empty(len(X), dtype=object)
+        predictions[:] = [classes[j] for j in first_proba.argmax(axis=1)]
+        proba = first_proba
+        if escalated:
+            rows = np.flatnonzero(escalate)
+            full_predictions, full_proba, full_classes = run(full_model, X.iloc[rows])
+            predictions[rows] = list(full_predictions)
+            if full_proba is not None and list(full_classes) == classes:
+                proba[rows] = full_proba
+            else:
+                proba = None
+        return predictions, proba, classes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "first_stage": self.info.get("model_name"),
+                "threshold": self.threshold,
+                "calls": self.calls,
+                "rows": self.rows,
+                "escalated_rows": self.escalated,
+                "escalation_rate": round(self.escalated / self.rows, 6) if self.rows else None,
+                "bypassed_calls": self.bypassed
+            }
+
+
+def threshold_sweep(first_confidence: np.ndarray, first_predictions: np.ndarray,
+                    full_predictions: np.ndarray, thresholds: Sequence[float],
+                    labels: Optional[np.ndarray] = None, first_ms_per_row: float = 0.0,
+                    full_ms_per_row: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Para cada limiar: fração escalada, concordância da cascata com o modelo
+    completo (e acurácia contra o rótulo, se houver) e custo médio estimado por
+    linha (primeiro estágio sempre + modelo completo nas escaladas).
+    """
+    rows = []
+    full_predictions = np.asarray(full_predictions, dtype=object)
+    full_accuracy = float(np.mean(full_predictions == labels)) if labels is not None else None
+    for threshold in thresholds:
+        escalate = first_confidence < threshold
+        cascade = np.where(escalate, full_predictions, np.asarray(first_predictions, dtype=object))
+        kept = ~escalate
+        row = {
+            "threshold": round(float(threshold), 4),
+            "escalation_rate": round(float(escalate.mean()), 6),
+            "agreement": round(float(np.mean(cascade == full_predictions)), 6),
+            "first_stage_agreement_kept": round(float(np.mean(cascade[kept] == full_predictions[kept])), 6)
+            if kept.any() else None,
+            "ms_per_row": round(first_ms_per_row + full_ms_per_row * float(escalate.mean()), 6)
+        }
+        if full_ms_per_row:
+            row["compute_saving"] = round(1 - row["ms_per_row"] / full_ms_per_row, 6)
+        if labels is not None:
+            row["accuracy"] = round(float(np.mean(cascade == labels)), 6)
+            row["full_model_accuracy"] = round(full_accuracy, 6)
+        rows.append(row)
+    return rows
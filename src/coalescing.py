@@ -0,0 +1,104 @@
+"""
+Coalescência de requisições idênticas em andamento (singleflight).
+Quando chega uma requisição igual a outra que ainda está sendo processada, a nova
+aguarda o resultado da primeira em vez de executar a inferência de novo.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(*parts: Any) -> str:
+    """
+    Gera a chave de coalescência a partir de partes serializáveis em JSON
+    (ex.: registros normalizados por `validate_and_clean_data` e versão do modelo).
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    """Execução em andamento compartilhada entre as requisições iguais"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Garante uma única execução simultânea por chave.
+
+    A primeira requisição (líder) executa a função; as que chegam com a mesma
+    chave enquanto ela roda recebem o mesmo resultado (ou a mesma exceção).
+    Nada é guardado depois que a execução termina — isto não é um cache.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa `func` ou aguarda a execução em andamento com a mesma chave.
+
+        Args:
+            key (str): chave da requisição.
+            func (callable): função sem argumentos que produz o resultado.
+
+        Returns:
+            tuple: (resultado, compartilhado) — compartilhado=True quando o
+            resultado veio de outra requisição.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": round(self.coalesced / total, 6) if total else 0.0,
+                "max_waiters": self.max_waiters,
+                "in_flight": len(self._calls)
+            }
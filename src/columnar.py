@@ -0,0 +1,115 @@
+"""
+Entrada e saída em formato colunar (Arrow IPC e Parquet) para a predição em lote.
+As colunas recebidas viram um DataFrame sem criar objetos Python por linha para as
+features numéricas; os resultados podem voltar no mesmo formato.
+O pyarrow é opcional: sem ele, apenas o JSON é aceito.
+"""
+
+import logging
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+PARQUET = "application/vnd.apache.parquet"
+COLUMNAR_TYPES = (ARROW_STREAM, ARROW_FILE, PARQUET)
+
+# Nomes alternativos usados por clientes comuns
+_ALIASES = {
+    "application/x-parquet": PARQUET,
+    "application/parquet": PARQUET,
+    "application/x-arrow": ARROW_FILE,
+}
+
+
+class ColumnarUnavailable(Exception):
+    """O pyarrow não está instalado"""
+
+
+def media_type(header: Optional[str]) -> Optional[str]:
+    """
+    Retorna o formato colunar indicado por um header Content-Type/Accept, ou None.
+
+    Args:
+        header (str): valor do header (pode ter parâmetros ou vários tipos no Accept).
+    """
+    if not header:
+        return None
+    for part in header.split(","):
+        value = part.split(";", 1)[0].strip().lower()
+        value = _ALIASES.get(value, value)
+        if value in COLUMNAR_TYPES:
+            return value
+    return None
+
+
+def available() -> bool:
+    """Indica se o pyarrow está disponível"""
+    return pa is not None
+
+
+def read_frame(body: bytes, fmt: str) -> pd.DataFrame:
+    """
+    Decodifica um corpo Arrow IPC (stream ou file) ou Parquet.
+
+    Args:
+        body (bytes): conteúdo recebido.
+        fmt (str): um dos COLUMNAR_TYPES.
+
+    Returns:
+        pd.DataFrame: uma coluna por feature recebida.
+    """
+    if pa is None:
+        raise ColumnarUnavailable("pyarrow não instalado")
+
+    buffer = pa.py_buffer(body)
+    if fmt == ARROW_STREAM:
+        table = ipc.open_stream(buffer).read_all()
+    elif fmt == ARROW_FILE:
+        table = ipc.open_file(buffer).read_all()
+    elif fmt == PARQUET:
+        table = pq.read_table(pa.BufferReader(buffer))
+    else:
+        raise ValueError(f"Formato colunar desconhecido: {fmt}")
+
+    return table.to_pandas()
+
+
+def write_frame(df: pd.DataFrame, fmt: str) -> bytes:
+    """
+    Codifica um DataFrame no formato pedido.
+
+    Args:
+        df (pd.DataFrame): resultados (uma coluna por campo).
+        fmt (str): um dos COLUMNAR_TYPES.
+
+    Returns:
+        bytes: conteúdo Arrow IPC ou Parquet.
+    """
+    if pa is None:
+        raise ColumnarUnavailable("pyarrow não instalado")
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if fmt == ARROW_STREAM:
+        with ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == ARROW_FILE:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == PARQUET:
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"Formato colunar desconhecido: {fmt}")
+
+    return sink.getvalue().to_pybytes()
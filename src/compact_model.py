@@ -0,0 +1,218 @@
+"""
+Variante compacta de modelos de árvore do scikit-learn para inferência.
+Guarda as árvores em arrays contíguos (limiares e probabilidades das folhas em
+float32, índices em int32), opcionalmente com menos estimadores ou profundidade
+limitada, e percorre todas as árvores de uma vez com operações vetorizadas —
+sem o custo fixo por chamada do scikit-learn, o que reduz a latência por linha.
+"""
+
+import logging
+from typing import Any, List, Optional
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble._forest import ForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from explanations import unwrap_model
+
+logger = logging.getLogger(__name__)
+
+# Linhas percorridas por vez (limita a memória de nós x árvores)
+_ROW_CHUNK = 512
+
+
+def _float32_floor(values: np.ndarray) -> np.ndarray:
+    """
+    Converte para float32 arredondando para baixo. Como o scikit-learn compara
+    `float32(x) <= limiar_float64`, usar o maior float32 <= limiar mantém
+    exatamente as mesmas decisões.
+    """
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class CompactTreeEnsemble(ClassifierMixin, BaseEstimator):
+    """
+    Classificador de árvores compacto com a interface usada pela API
+    (`predict`, `predict_proba`, `classes_`). É criado a partir de um modelo já
+    treinado com `from_estimator`; o construtor recebe só os parâmetros, como os
+    demais estimadores do scikit-learn (o que mantém `clone()` funcionando).
+
+    Args:
+        n_estimators (int): mantém apenas os primeiros N estimadores (None = todos).
+        max_depth (int): trunca as árvores nesta profundidade; o nó de corte vira
+            folha com a distribuição de classes do próprio nó (None = sem corte).
+    """
+
+    def __init__(self, n_estimators: Optional[int] = None, max_depth: Optional[int] = None):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_estimator(cls, estimator: Any, n_estimators: Optional[int] = None,
+                       max_depth: Optional[int] = None) -> "CompactTreeEnsemble":
+        """
+        Compacta um classificador de árvores treinado.
+
+        Args:
+            estimator: RandomForest/ExtraTrees/DecisionTree de classificação já treinado.
+
+        Raises:
+            TypeError: se o modelo não for um desses classificadores (ex.: gradient
+                boosting, regressores) ou ainda não tiver sido treinado.
+        """
+        if not isinstance(estimator, (ForestClassifier, DecisionTreeClassifier)):
+            raise TypeError(f"Modelo sem suporte à compactação: {type(estimator).__name__} "
+                            f"(apenas RandomForest/ExtraTrees/DecisionTree de classificação)")
+        if not hasattr(estimator, "classes_"):
+            raise TypeError(f"Modelo não treinado: {type(estimator).__name__}")
+
+        if isinstance(estimator, ForestClassifier):
+            trees = [tree.tree_ for tree in estimator.estimators_]
+        else:
+            trees = [estimator.tree_]
+        if n_estimators is not None:
+            trees = trees[:max(1, int(n_estimators))]
+
+        compact = cls(len(trees), max_depth)
+        compact.classes_ = np.asarray(estimator.classes_)
+        compact.n_features_in_ = int(estimator.n_features_in_)
+        if hasattr(estimator, "feature_names_in_"):
+            compact.feature_names_in_ = estimator.feature_names_in_
+        compact.source_estimator = type(estimator).__name__
+        compact._build(trees, max_depth)
+        return compact
+
+    def _build(self, trees: list, max_depth: Optional[int]) -> None:
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset, depth_reached = 0, 0
+
+        for tree in trees:
+            # Nós alcançáveis até a profundidade máxima, em ordem de visita
+            order, depths = [0], [0]
+            i = 0
+            while i < len(order):
+                node, depth = order[i], depths[i]
+                is_split = tree.children_left[node] >= 0 and (max_depth is None or depth < max_depth)
+                if is_split:
+                    order += [tree.children_left[node], tree.children_right[node]]
+                    depths += [depth + 1, depth + 1]
+                i += 1
+            order = np.asarray(order)
+            depth_reached = max(depth_reached, max(depths))
+
+            new_index = np.full(tree.node_count, -1, dtype=np.int64)
+            new_index[order] = np.arange(len(order)) + offset
+            left = new_index[tree.children_left[order].clip(min=0)]
+            right = new_index[tree.children_right[order].clip(min=0)]
+
+            # Folhas (originais ou de corte) apontam para si mesmas
+            leaf = (left < 0) | (tree.children_left[order] < 0)
+            own = np.arange(len(order)) + offset
+            left = np.where(leaf, own, left)
+            right = np.where(leaf, own, right)
+
+            value = tree.value[order, 0, :]
+            proba = value / np.maximum(value.sum(axis=1, keepdims=True), 1e-12)
+
+            lefts.append(left)
+            rights.append(right)
+            features.append(np.where(leaf, 0, tree.feature[order]))
+            thresholds.append(np.where(leaf, 0.0, tree.threshold[order]))
+            values.append(proba)
+            roots.append(offset)
+            offset += len(order)
+
+        self.children_left = np.concatenate(lefts).astype(np.int32)
+        self.children_right = np.concatenate(rights).astype(np.int32)
+        self.feature = np.concatenate(features).astype(np.int32)
+        self.threshold = _float32_floor(np.concatenate(thresholds).astype(np.float64))
+        self.value = np.concatenate(values).astype(np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.is_leaf = self.children_left == np.arange(offset)
+        self.depth = int(depth_reached)
+        self.node_count = offset
+
+    def fit(self, X: Any, y: Any = None) -> "CompactTreeEnsemble":
+        """O modelo compacto é derivado de um já treinado; não é retreinável"""
+        raise NotImplementedError("Treine o modelo original e gere a variante com compact_model()")
+
+    def __sklearn_is_fitted__(self) -> bool:
+        return hasattr(self, "roots")
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        Probabilidades por classe: média das folhas de todas as árvores.
+
+        Args:
+            X: matriz numérica (n linhas x n_features_in_), como a do estimador original.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_features, n_trees = X.shape[1], len(self.roots)
+
+        result = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), _ROW_CHUNK):
+            chunk = X[start:start + _ROW_CHUNK]
+            flat = chunk.ravel()
+            # Um caminho por (linha, árvore); só os que ainda não chegaram a uma folha avançam
+            nodes = np.tile(self.roots, len(chunk))
+            row_offsets = np.repeat(np.arange(len(chunk), dtype=np.int64) * n_features, n_trees)
+            active = np.flatnonzero(~self.is_leaf[nodes])
+            while active.size:
+                current = nodes[active]
+                go_left = flat[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+                following = np.where(go_left, self.children_left[current], self.children_right[current])
+                nodes[active] = following
+                active = active[~self.is_leaf[following]]
+            result[start:start + len(chunk)] = self.value[nodes.reshape(len(chunk), n_trees)].mean(
+                axis=1, dtype=np.float64
+            )
+        return result
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Classe de maior probabilidade por linha"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def describe(self) -> dict:
+        """Resumo do modelo compactado"""
+        return {
+            "source_estimator": self.source_estimator,
+            "n_estimators": self.n_estimators,
+            "max_depth": self.max_depth,
+            "depth": self.depth,
+            "node_count": self.node_count,
+            "array_bytes": int(sum(a.nbytes for a in (
+                self.children_left, self.children_right, self.feature, self.threshold, self.value, self.roots
+            )))
+        }
+
+
+def compact_model(model: Any, n_estimators: Optional[int] = None, max_depth: Optional[int] = None) -> Any:
+    """
+    Gera a variante compacta de um modelo (sklearn ou pyfunc do MLflow).
+    Em um Pipeline, as etapas de pré-processamento são mantidas e apenas o
+    estimador final é substituído.
+
+    Returns:
+        CompactTreeEnsemble, ou Pipeline terminando em um.
+    """
+    estimator = unwrap_model(model)
+    if hasattr(estimator, "steps"):
+        from sklearn.pipeline import Pipeline
+
+        name, final = estimator.steps[-1]
+        compact = CompactTreeEnsemble.from_estimator(final, n_estimators, max_depth)
+        steps: List[tuple] = list(estimator.steps[:-1]) + [(name, compact)]
+        return Pipeline(steps)
+    return CompactTreeEnsemble.from_estimator(estimator, n_estimators, max_depth)
+
+
+def compact_estimator(model: Any) -> Optional[CompactTreeEnsemble]:
+    """Retorna o CompactTreeEnsemble dentro do modelo, se houver"""
+    estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+    return estimator if isinstance(estimator, CompactTreeEnsemble) else None
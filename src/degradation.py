@@ -0,0 +1,156 @@
+"""
+Degradação por prazo: quando o tempo que resta para responder não comporta o
+modelo principal, a requisição é atendida por um modelo de reserva barato.
+Uma resposta aproximada no prazo vale mais que uma resposta exata atrasada.
+
+Como só inferências do modelo principal atualizam a estimativa, uma estimativa
+sem observações há mais de `max_age_seconds` (ex.: um primeiro lote lento no
+aquecimento) deixa passar uma requisição por intervalo para o modelo principal,
+como sonda; a observação da sonda substitui a estimativa antiga.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyEstimator:
+    """
+    Estimativa do tempo de inferência de um modelo: custo fixo por chamada
+    (médias móveis exponenciais das chamadas de uma linha) mais custo por linha
+    (das chamadas em lote).
+    """
+
+    def __init__(self, alpha: float = 0.2, max_age_seconds: float = 30.0):
+        self.alpha = alpha
+        self.max_age_seconds = max_age_seconds
+        self.base_ms: Optional[float] = None
+        self.per_row_ms = 0.0
+        self.observations = 0
+        self.updated_at: Optional[float] = None
+        self.probe_at: Optional[float] = None
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + self.alpha * (value - current)
+
+    def stale(self, now: float) -> bool:
+        """Sem observações há mais de `max_age_seconds`"""
+        return self.updated_at is not None and now - self.updated_at >= self.max_age_seconds
+
+    def observe(self, rows: int, elapsed_ms: float, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        if self.stale(now):
+            # Estimativa envelhecida é substituída, não suavizada
+            self.base_ms, self.per_row_ms = None, 0.0
+        self.updated_at, self.probe_at = now, None
+        if rows <= 1 or self.base_ms is None:
+            self.base_ms = self._ewma(self.base_ms, elapsed_ms / max(rows, 1))
+        else:
+            self.per_row_ms = self._ewma(self.per_row_ms, max(0.0, elapsed_ms - self.base_ms) / (rows - 1))
+        self.observations += 1
+
+    def estimate(self, rows: int) -> Optional[float]:
+        """Tempo esperado em ms, ou None sem observações"""
+        if self.base_ms is None:
+            return None
+        return self.base_ms + self.per_row_ms * max(rows - 1, 0)
+
+
+class DeadlinePolicy:
+    """
+    Decide, antes da inferência, se o modelo principal cabe no prazo.
+
+    Args:
+        safety_factor (float): multiplica a estimativa (a média subestima a cauda).
+        margin_ms (float): reserva para o que vem depois da inferência (telemetria, resposta).
+        max_age_seconds (float): idade da estimativa a partir da qual uma requisição
+            por intervalo vai ao modelo principal como sonda.
+    """
+
+    def __init__(self, safety_factor: float = 1.5, margin_ms: float = 5.0, max_age_seconds: float = 30.0):
+        self.safety_factor = safety_factor
+        self.margin_ms = margin_ms
+        self.max_age_seconds = max_age_seconds
+        self._estimators: Dict[str, LatencyEstimator] = {}
+        self._lock = threading.Lock()
+        self.decisions = 0
+        self.degraded = 0
+        self.probes = 0
+        self.reasons: Dict[str, int] = {}
+
+    @staticmethod
+    def deadline(now: float, budgets_ms: list, queue_wait_ms: float = 0.0) -> Optional[float]:
+        """
+        Instante limite (relógio monotônico) a partir dos orçamentos conhecidos
+        (header, SLO configurado, tempo restante do Lambda); vale o menor.
+        O tempo já gasto na fila é descontado.
+        """
+        budgets = [b for b in budgets_ms if b is not None]
+        if not budgets:
+            return None
+        return now + (min(budgets) - max(queue_wait_ms, 0.0)) / 1000
+
+    def decide(self, model_key: str, rows: int, deadline: Optional[float],
+               now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            dict com o motivo, o orçamento e a estimativa quando o modelo principal
+            não cabe no prazo; None quando cabe (ou não há prazo/estimativa).
+        """
+        if deadline is None:
+            return None
+        now = time.monotonic() if now is None else now
+        remaining_ms = (deadline - now) * 1000 - self.margin_ms
+
+        with self._lock:
+            self.decisions += 1
+            estimator = self._estimators.get(model_key)
+            estimate = estimator.estimate(rows) if estimator is not None else None
+
+            reason = None
+            if remaining_ms <= 0:
+                reason = "deadline_exceeded"
+            elif estimate is not None and estimate * self.safety_factor > remaining_ms:
+                reason = "insufficient_budget"
+                # Estimativa antiga: uma requisição por intervalo vai ao modelo principal
+                if estimator.stale(now) and (estimator.probe_at is None
+                                             or now - estimator.probe_at >= self.max_age_seconds):
+                    estimator.probe_at = now
+                    self.probes += 1
+                    return None
+            if reason is None:
+                return None
+
+            self.degraded += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+        return {
+            "reason": reason,
+            "budget_ms": round(remaining_ms + self.margin_ms, 3),
+            "estimated_ms": round(estimate, 3) if estimate is not None else None
+        }
+
+    def observe(self, model_key: str, rows: int, elapsed_ms: float, now: Optional[float] = None) -> None:
+        """Registra o tempo de uma inferência do modelo principal"""
+        with self._lock:
+            estimator = self._estimators.setdefault(model_key, LatencyEstimator(max_age_seconds=self.max_age_seconds))
+            estimator.observe(rows, elapsed_ms, now)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+        with self._lock:
+            return {
+                "decisions": self.decisions,
+                "degraded": self.degraded,
+                "degraded_ratio": round(self.degraded / self.decisions, 6) if self.decisions else 0.0,
+                "probes": self.probes,
+                "reasons": dict(self.reasons),
+                "estimates": {
+                    key: {"base_ms": round(e.base_ms, 3) if e.base_ms is not None else None,
+                          "per_row_ms": round(e.per_row_ms, 4), "observations": e.observations}
+                    for key, e in self._estimators.items()
+                }
+            }
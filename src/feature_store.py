@@ -0,0 +1,221 @@
+"""
+Feature store embarcado com o perfil mais recente de cada cliente.
+Um snapshot SQLite (chave `Customer_ID`) permite que a requisição envie apenas o
+identificador e os campos que mudaram; os demais vêm do perfil armazenado em vez
+dos valores padrão da população.
+"""
+
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from schema import ALL_FIELDS, NUMERIC_FIELDS
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_ID_FIELD = "Customer_ID"
+
+# Limite de parâmetros por consulta do SQLite (versões antigas: 999)
+_LOOKUP_CHUNK = 500
+
+
+class FeatureStore:
+    """
+    Leitura do snapshot de perfis por `Customer_ID`.
+
+    Cada thread usa sua própria conexão somente leitura; a busca é pela chave
+    primária da tabela. `reload()` faz as conexões serem reabertas, passando a
+    ler um snapshot novo colocado no mesmo caminho.
+    """
+
+    def __init__(self, path: str):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Snapshot do feature store não encontrado: {path}")
+        self.path = path
+        self._local = threading.local()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.metadata = self._read_metadata()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.generation != self._generation:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+            self._local.generation = self._generation
+        return conn
+
+    def _read_metadata(self) -> Dict[str, str]:
+        return dict(self._connection().execute("SELECT key, value FROM metadata").fetchall())
+
+    def reload(self) -> Dict[str, str]:
+        """Passa a ler o snapshot atual do arquivo"""
+        with self._lock:
+            self._generation += 1
+        self.metadata = self._read_metadata()
+        logger.info(f"Feature store recarregado: {self.metadata}")
+        return self.metadata
+
+    def get(self, customer_id: Any) -> Optional[Dict[str, Any]]:
+        """Perfil do cliente, ou None se não estiver no snapshot"""
+        return self.get_many([customer_id]).get(str(customer_id))
+
+    def get_many(self, customer_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca vários perfis de uma vez (usado no lote).
+
+        Returns:
+            dict: Customer_ID (str) -> perfil, apenas para os encontrados.
+        """
+        keys = list(dict.fromkeys(str(c) for c in customer_ids if c not in (None, "")))
+        profiles = {}
+        conn = self._connection()
+        for i in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[i:i + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT customer_id, features FROM profiles WHERE customer_id IN ({placeholders})", chunk
+            ).fetchall()
+            profiles.update((customer_id, json.loads(features)) for customer_id, features in rows)
+
+        with self._lock:
+            self.lookups += len(keys)
+            self.hits += len(profiles)
+        return profiles
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+        with self._lock:
+            return {
+                "path": self.path,
+                "profiles": int(self.metadata.get("profiles", 0)),
+                "built_at": self.metadata.get("built_at"),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_ratio": round(self.hits / self.lookups, 6) if self.lookups else 0.0
+            }
+
+
+def enrich_records(store: Optional[FeatureStore], records: List[Dict[str, Any]]) -> tuple:
+    """
+    Completa registros que trazem `Customer_ID` com o perfil armazenado.
+    Campos enviados na requisição têm prioridade sobre o perfil.
+
+    Returns:
+        tuple: (registros completados, perfis encontrados ou None se nenhum
+        registro trouxe `Customer_ID`).
+    """
+    if store is None:
+        return records, None
+    ids = [r.get(CUSTOMER_ID_FIELD) for r in records if isinstance(r, dict)]
+    if not any(c not in (None, "") for c in ids):
+        return records, None
+
+    profiles = store.get_many(ids)
+    enriched, found = [], 0
+    for record in records:
+        profile = profiles.get(str(record.get(CUSTOMER_ID_FIELD))) if isinstance(record, dict) else None
+        if profile is None:
+            enriched.append(record)
+            continue
+        found += 1
+        enriched.append({**profile, **{k: v for k, v in record.items() if v not in (None, "")}})
+    return enriched, found
+
+
+def enrich_frame(store: Optional[FeatureStore], frame: pd.DataFrame) -> tuple:
+    """
+    Versão colunar de `enrich_records`: valores nulos ou colunas ausentes do
+    lote são preenchidos com o perfil do cliente.
+
+    Returns:
+        tuple: (DataFrame completado, perfis encontrados ou None sem `Customer_ID`).
+    """
+    if store is None or CUSTOMER_ID_FIELD not in frame.columns:
+        return frame, None
+
+    ids = frame[CUSTOMER_ID_FIELD].astype(str)
+    profiles = store.get_many(ids.unique())
+    if not profiles:
+        return frame, 0
+
+    profile_frame = pd.DataFrame.from_dict(profiles, orient="index").reindex(ids.to_numpy())
+    profile_frame.index = frame.index
+    return frame.combine_first(profile_frame), int(ids.isin(profiles.keys()).sum())
+
+
+def _parse_value(field: str, value: str) -> Any:
+    if field in NUMERIC_FIELDS:
+        try:
+            return float(value.strip().strip("_"))
+        except ValueError:
+            return None
+    return value
+
+
+def build_snapshot(rows: Iterable[Dict[str, Any]], path: str, source: str = "") -> int:
+    """
+    Grava um snapshot novo a partir de linhas com `Customer_ID` e as features.
+    A última linha de cada cliente prevalece. O arquivo é escrito ao lado e
+    trocado atomicamente, sem afetar quem está lendo o snapshot anterior.
+
+    Args:
+        rows (iterable): dicionários (ex.: `csv.DictReader` do dataset de treino).
+        path (str): destino do snapshot.
+        source (str): descrição da origem, guardada nos metadados.
+
+    Returns:
+        int: número de perfis gravados.
+    """
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        customer_id = row.get(CUSTOMER_ID_FIELD)
+        if not customer_id:
+            continue
+        profile = profiles.setdefault(str(customer_id), {})
+        for field in ALL_FIELDS:
+            value = row.get(field)
+            if value in (None, ""):
+                continue
+            parsed = _parse_value(field, value) if isinstance(value, str) else value
+            if parsed is not None:
+                profile[field] = parsed
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE profiles (customer_id TEXT PRIMARY KEY, features TEXT NOT NULL) WITHOUT ROWID")
+        conn.execute("CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO profiles VALUES (?, ?)",
+                         ((k, json.dumps(v, separators=(",", ":"))) for k, v in profiles.items()))
+        conn.executemany("INSERT INTO metadata VALUES (?, ?)", [
+            ("profiles", str(len(profiles))),
+            ("built_at", datetime.now().isoformat()),
+            ("source", source)
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    logger.info(f"Snapshot do feature store gravado em {path}: {len(profiles)} perfis")
+    return len(profiles)
+
+
+def build_snapshot_from_csv(csv_path: str, path: str) -> int:
+    """Gera o snapshot a partir de um CSV com a coluna `Customer_ID`"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return build_snapshot(csv.DictReader(f), path, source=os.path.basename(csv_path))
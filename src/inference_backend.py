@@ -0,0 +1,540 @@
+"""
+Backend de inferência em processos: escapa do GIL executando o modelo em um pool
+de processos trabalhadores, cada um com o modelo carregado uma única vez.
+
+O lote já preparado não é serializado como DataFrame: as colunas numéricas vão
+para um bloco float64 e as categóricas para códigos int32 (com as categorias
+distintas na mensagem), ambos escritos em memória compartilhada. O processo
+trabalhador remonta o DataFrame sobre esse bloco, executa o modelo e escreve as
+probabilidades de volta no mesmo segmento. Pelo canal de controle trafegam
+apenas nomes, formatos e as classes do modelo.
+
+Os trabalhadores são iniciados como scripts independentes (este arquivo), sem
+reimportar o servidor nem a API; o modelo chega por um snapshot em disco
+(pickle), gravado uma vez por modelo. Trabalhadores que morrem ou estouram o
+prazo são reiniciados, e uma thread de saúde verifica os ociosos periodicamente.
+"""
+
+import logging
+import os
+import pickle
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import nullcontext
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from thread_budget import ThreadBudget
+
+logger = logging.getLogger(__name__)
+
+# Colunas de probabilidade reservadas por linha no segmento de resposta
+MAX_CLASSES = 32
+ALIGNMENT = 64
+
+
+class InferenceBackendError(Exception):
+    """Falha do backend (processo morto, prazo esgotado ou erro do modelo)"""
+
+
+def _aligned(size: int) -> int:
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def encode_frame(frame: pd.DataFrame) -> Tuple[Dict[str, Any], np.ndarray, np.ndarray]:
+    """
+    Separa o lote em um bloco numérico float64 e códigos int32 das categóricas.
+
+    Returns:
+        tuple: (layout da mensagem, bloco numérico (linhas x colunas), códigos (linhas x colunas)).
+    """
+    numeric, categorical = [], []
+    for column in frame.columns:
+        dtype = frame[column].dtype
+        # Extensões do pandas (Int64, string...) seguem pelo caminho das categóricas
+        if isinstance(dtype, np.dtype) and dtype.kind in "iuf":
+            numeric.append((column, dtype.str))
+        else:
+            categorical.append(column)
+
+    rows = len(frame)
+    values = np.empty((rows, len(numeric)), dtype=np.float64)
+    for i, (column, _) in enumerate(numeric):
+        values[:, i] = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    codes = np.empty((rows, len(categorical)), dtype=np.int32)
+    categories = []
+    for i, column in enumerate(categorical):
+        column_codes, uniques = pd.factorize(frame[column], use_na_sentinel=True)
+        codes[:, i] = column_codes
+        categories.append((column, list(uniques)))
+
+    layout = {
+        "rows": rows,
+        "columns": list(frame.columns),
+        "numeric": numeric,
+        "categorical": categories
+    }
+    return layout, values, codes
+
+
+def decode_frame(layout: Dict[str, Any], values: np.ndarray, codes: np.ndarray) -> pd.DataFrame:
+    """Remonta o DataFrame original a partir de `encode_frame`"""
+    data = {}
+    for i, (column, dtype) in enumerate(layout["numeric"]):
+        data[column] = values[:, i].astype(np.dtype(dtype), copy=True)
+    for i, (column, uniques) in enumerate(layout["categorical"]):
+        lookup = np.array(list(uniques) + [None], dtype=object)
+        data[column] = lookup[codes[:, i]]
+    return pd.DataFrame(data, columns=layout["columns"])
+
+
+def segment_sizes(rows: int, n_numeric: int, n_categorical: int) -> Tuple[int, int, int, int]:
+    """Deslocamentos (códigos, probabilidades, predições) e tamanho total do segmento"""
+    codes_offset = _aligned(rows * n_numeric * 8)
+    proba_offset = codes_offset + _aligned(rows * n_categorical * 4)
+    pred_offset = proba_offset + _aligned(rows * MAX_CLASSES * 8)
+    return codes_offset, proba_offset, pred_offset, pred_offset + _aligned(rows * 4)
+
+
+def _views(buffer: Any, layout: Dict[str, Any]) -> Tuple[np.ndarray, ...]:
+    rows = layout["rows"]
+    n_numeric, n_categorical = len(layout["numeric"]), len(layout["categorical"])
+    codes_offset, proba_offset, pred_offset, _ = segment_sizes(rows, n_numeric, n_categorical)
+    values = np.ndarray((rows, n_numeric), dtype=np.float64, buffer=buffer, offset=0)
+    codes = np.ndarray((rows, n_categorical), dtype=np.int32, buffer=buffer, offset=codes_offset)
+    proba = np.ndarray((rows, MAX_CLASSES), dtype=np.float64, buffer=buffer, offset=proba_offset)
+    predictions = np.ndarray((rows,), dtype=np.int32, buffer=buffer, offset=pred_offset)
+    return values, codes, proba, predictions
+
+
+# ---------------------------------------------------------------------------
+# Processo trabalhador
+# ---------------------------------------------------------------------------
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Anexa ao segmento do processo principal, que é quem o remove"""
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+    return segment
+
+
+def _predict_in_worker(model: Any, segment: shared_memory.SharedMemory,
+                       layout: Dict[str, Any], budget: Optional[ThreadBudget] = None) -> Dict[str, Any]:
+    values, codes, proba_out, pred_out = _views(segment.buf, layout)
+    frame = decode_frame(layout, values, codes)
+
+    with budget.batch(len(frame)) if budget is not None else nullcontext():
+        predictions = np.asarray(model.predict(frame))
+        proba = None
+        if hasattr(model, 'predict_proba'):
+            try:
+                proba = np.asarray(model.predict_proba(frame), dtype=np.float64)
+            except Exception as e:
+                logger.warning(f"Erro ao calcular probabilidades: {e}")
+    classes = [c.item() if isinstance(c, np.generic) else c
+               for c in getattr(model, 'classes_', ['Good', 'Poor', 'Standard'])]
+
+    reply = {"classes": classes, "n_proba": 0, "predictions": None}
+    if proba is not None and proba.ndim == 2 and proba.shape[1] <= MAX_CLASSES:
+        proba_out[:, :proba.shape[1]] = proba
+        reply["n_proba"] = proba.shape[1]
+
+    index = {c: i for i, c in enumerate(classes)}
+    mapped = [index.get(p.item() if isinstance(p, np.generic) else p) for p in predictions]
+    if None in mapped:
+        reply["predictions"] = predictions.tolist()
+    else:
+        pred_out[:] = mapped
+    return reply
+
+
+def _serve(conn: Connection, max_models: int, budget: Optional[ThreadBudget] = None) -> None:
+    """Laço do processo trabalhador: uma mensagem por vez no canal de controle"""
+    if budget is not None:
+        budget.limit_libraries()
+    models: "OrderedDict[str, Any]" = OrderedDict()
+    segment = None
+
+    def model_for(key: str, path: str) -> Any:
+        if key not in models:
+            with open(path, 'rb') as f:
+                models[key] = pickle.load(f)
+            while len(models) > max_models:
+                models.popitem(last=False)
+        models.move_to_end(key)
+        return models[key]
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        kind = message[0]
+        try:
+            if kind == "stop":
+                break
+            elif kind == "ping":
+                conn.send(("pong", os.getpid(), list(models)))
+            elif kind == "load":
+                model_for(message[1], message[2])
+            elif kind == "predict":
+                _, key, path, name, layout = message
+                if segment is None or segment.name != name:
+                    if segment is not None:
+                        segment.close()
+                    segment = _attach(name)
+                conn.send(("ok", _predict_in_worker(model_for(key, path), segment, layout, budget)))
+        except Exception as e:
+            if kind == "predict":
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+            else:
+                logger.warning(f"Trabalhador de inferência: falha em '{kind}': {e}")
+
+    if segment is not None:
+        segment.close()
+
+
+# ---------------------------------------------------------------------------
+# Processo principal
+# ---------------------------------------------------------------------------
+
+class _Worker:
+    """Um processo trabalhador, seu canal de controle e seu segmento de memória"""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.process: Optional[subprocess.Popen] = None
+        self.conn: Optional[Connection] = None
+        self.segment: Optional[shared_memory.SharedMemory] = None
+        self.started_at = 0.0
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def ensure_segment(self, size: int) -> shared_memory.SharedMemory:
+        """Reaproveita o segmento; cresce (em potências de 2) quando o lote não cabe"""
+        if self.segment is None or self.segment.size < size:
+            self.release_segment()
+            capacity = 1 << max(size - 1, 1 << 16).bit_length()
+            self.segment = shared_memory.SharedMemory(create=True, size=capacity)
+        return self.segment
+
+    def release_segment(self) -> None:
+        if self.segment is not None:
+            self.segment.close()
+            try:
+                self.segment.unlink()
+            except FileNotFoundError:
+                pass
+            self.segment = None
+
+
+class ProcessInferenceBackend:
+    """
+    Pool de processos trabalhadores para inferência.
+
+    Args:
+        workers (int): número de processos (0 = um por núcleo disponível).
+        snapshot_dir (str): diretório dos snapshots (pickle) dos modelos.
+        timeout (float): prazo de cada inferência em um trabalhador, em segundos.
+        health_interval (float): intervalo da verificação de saúde dos ociosos (0 = desligada).
+        max_models (int): modelos mantidos em memória por trabalhador (LRU).
+        threads_per_worker (int): orçamento de threads de cada trabalhador (ver thread_budget).
+        parallel_min_rows (int): lotes a partir deste tamanho usam todo o orçamento.
+    """
+
+    def __init__(self, workers: int = 0, snapshot_dir: str = '/tmp/credit-score-inference',
+                 timeout: float = 30.0, health_interval: float = 10.0, max_models: int = 3,
+                 threads_per_worker: int = 1, parallel_min_rows: int = 1000):
+        self.workers = workers if workers > 0 else available_cpus()
+        self.threads_per_worker = threads_per_worker
+        self.parallel_min_rows = parallel_min_rows
+        self.snapshot_dir = snapshot_dir
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.max_models = max_models
+
+        self._slots = [_Worker(i) for i in range(self.workers)]
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._snapshots: "weakref.WeakKeyDictionary[Any, Tuple[str, str]]" = weakref.WeakKeyDictionary()
+        self._unsupported: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+        self.calls = 0
+        self.rows = 0
+        self.failures = 0
+        self.restarts = 0
+        self.health_checks = 0
+
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    # -- ciclo de vida ------------------------------------------------------
+
+    def start(self) -> None:
+        """Inicia os processos e a thread de verificação de saúde"""
+        for worker in self._slots:
+            self._spawn(worker)
+            self._idle.put(worker)
+        if self.health_interval > 0 and self._health_thread is None:
+            self._health_thread = threading.Thread(target=self._health_loop,
+                                                   name="inference-health", daemon=True)
+            self._health_thread.start()
+        logger.info(f"Backend de inferência em processos: {self.workers} trabalhador(es)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Encerra os trabalhadores e remove segmentos e snapshots"""
+        self._stopping.set()
+        for worker in self._slots:
+            if worker.conn is not None:
+                try:
+                    worker.conn.send(("stop",))
+                except OSError:
+                    pass
+        for worker in self._slots:
+            self._terminate(worker, timeout)
+            worker.release_segment()
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+            self._snapshots.clear()
+        for _, path in snapshots:
+            _remove_quietly(path)
+
+    def _spawn(self, worker: _Worker) -> None:
+        parent_sock, child_sock = socket.socketpair()
+        try:
+            worker.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), str(child_sock.fileno()), str(self.max_models),
+                 str(self.threads_per_worker), str(self.parallel_min_rows)],
+                pass_fds=(child_sock.fileno(),), close_fds=True
+            )
+        finally:
+            child_sock.close()
+        worker.conn = Connection(parent_sock.detach())
+        worker.started_at = time.monotonic()
+
+        # Pré-carrega os modelos conhecidos; a primeira inferência espera na fila do canal
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+        for key, path in snapshots:
+            worker.conn.send(("load", key, path))
+
+    def _terminate(self, worker: _Worker, timeout: float = 1.0) -> None:
+        if worker.process is not None:
+            try:
+                worker.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+                worker.process.wait()
+        if worker.conn is not None:
+            worker.conn.close()
+        worker.process, worker.conn = None, None
+
+    def _restart(self, worker: _Worker, reason: str) -> None:
+        logger.warning(f"Trabalhador de inferência {worker.slot} reiniciado: {reason}")
+        if worker.process is not None and worker.process.poll() is None:
+            worker.process.kill()
+        self._terminate(worker)
+        with self._lock:
+            self.restarts += 1
+        if not self._stopping.is_set():
+            self._spawn(worker)
+
+    def _health_loop(self) -> None:
+        while not self._stopping.wait(self.health_interval):
+            self.check_health()
+
+    def check_health(self, timeout: Optional[float] = None) -> int:
+        """
+        Verifica os trabalhadores ociosos (processo vivo e resposta ao ping) e
+        reinicia os que falharem. Os ocupados são verificados pela própria inferência.
+
+        Returns:
+            int: número de trabalhadores reiniciados.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        restarted = 0
+        checked = []
+        while True:
+            try:
+                checked.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in checked:
+            try:
+                healthy = worker.alive()
+                if healthy:
+                    worker.conn.send(("ping",))
+                    healthy = worker.conn.poll(timeout) and worker.conn.recv()[0] == "pong"
+            except (EOFError, OSError):
+                healthy = False
+            if not healthy:
+                self._restart(worker, "falhou na verificação de saúde")
+                restarted += 1
+            self._idle.put(worker)
+        with self._lock:
+            self.health_checks += 1
+        return restarted
+
+    # -- inferência ---------------------------------------------------------
+
+    def _snapshot(self, model: Any) -> Optional[Tuple[str, str]]:
+        """Snapshot do modelo para os trabalhadores (gravado uma vez por modelo)"""
+        with self._lock:
+            try:
+                if model in self._unsupported:
+                    return None
+                found = self._snapshots.get(model)
+            except TypeError:
+                return None
+            if found is not None:
+                return found
+
+            key = uuid.uuid4().hex
+            path = os.path.join(self.snapshot_dir, f"{key}.pkl")
+            try:
+                with open(path + ".tmp", 'wb') as f:
+                    pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + ".tmp", path)
+            except Exception as e:
+                _remove_quietly(path + ".tmp")
+                logger.warning(f"Modelo não serializável para o backend em processos, inferência local: {e}")
+                self._unsupported[model] = str(e)
+                return None
+            self._snapshots[model] = (key, path)
+            weakref.finalize(model, _remove_quietly, path)
+            return key, path
+
+    def preload(self, model: Any) -> bool:
+        """Grava o snapshot e pede aos trabalhadores ociosos que já carreguem o modelo"""
+        snapshot = self._snapshot(model)
+        if snapshot is None:
+            return False
+        workers = []
+        while True:
+            try:
+                workers.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in workers:
+            try:
+                worker.conn.send(("load",) + snapshot)
+            except OSError:
+                pass
+            self._idle.put(worker)
+        return True
+
+    def predict_arrays(self, model: Any, frame: pd.DataFrame) -> Optional[tuple]:
+        """
+        Executa o modelo em um trabalhador.
+
+        Returns:
+            tuple: (predições, probabilidades ou None, classes), no formato de
+            `app.predict_arrays`; None se o modelo não puder ir para os processos.
+
+        Raises:
+            InferenceBackendError: trabalhador morto, prazo esgotado ou erro do modelo.
+        """
+        snapshot = self._snapshot(model)
+        if snapshot is None:
+            return None
+        layout, values, codes = encode_frame(frame)
+        rows = layout["rows"]
+        _, _, _, size = segment_sizes(rows, values.shape[1], codes.shape[1])
+
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise InferenceBackendError("Nenhum trabalhador livre dentro do prazo")
+        try:
+            # /dev/shm cheio (64 MB por padrão no Docker) ou ausente: a API cai para a inferência local
+            try:
+                segment = worker.ensure_segment(size)
+                value_view, code_view, proba_view, pred_view = _views(segment.buf, layout)
+            except OSError as e:
+                worker.release_segment()
+                raise InferenceBackendError(f"Memória compartilhada indisponível ({size} bytes): {e}") from e
+            value_view[:] = values
+            code_view[:] = codes
+
+            try:
+                worker.conn.send(("predict", snapshot[0], snapshot[1], segment.name, layout))
+                if not worker.conn.poll(self.timeout):
+                    self._restart(worker, f"sem resposta em {self.timeout}s")
+                    raise InferenceBackendError("Prazo da inferência esgotado")
+                status, reply = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                self._restart(worker, f"canal encerrado ({e})")
+                raise InferenceBackendError(f"Trabalhador encerrado durante a inferência: {e}")
+            if status != "ok":
+                raise InferenceBackendError(reply)
+
+            classes = reply["classes"]
+            proba = proba_view[:, :reply["n_proba"]].copy() if reply["n_proba"] else None
+            if reply["predictions"] is not None:
+                predictions = np.asarray(reply["predictions"])
+            else:
+                predictions = np.asarray(classes, dtype=object)[pred_view]
+            with self._lock:
+                self.calls += 1
+                self.rows += rows
+            return predictions, proba, classes
+        except InferenceBackendError:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "alive": sum(1 for w in self._slots if w.alive()),
+                "idle": self._idle.qsize(),
+                "calls": self.calls,
+                "rows": self.rows,
+                "failures": self.failures,
+                "restarts": self.restarts,
+                "health_checks": self.health_checks,
+                "models": len(self._snapshots),
+                "shared_memory_bytes": sum(w.segment.size for w in self._slots if w.segment is not None)
+            }
+
+
+def available_cpus() -> int:
+    """Núcleos que este processo pode usar (respeita afinidade/cgroups quando visível)"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    worker_budget = ThreadBudget(int(sys.argv[3]), int(sys.argv[4])) if len(sys.argv) > 4 else None
+    _serve(Connection(int(sys.argv[1])), int(sys.argv[2]), worker_budget)
@@ -0,0 +1,341 @@
+"""
+Fila de jobs de pontuação assíncrona (pré-aprovações, campanhas em lote).
+
+O cliente enfileira registros e volta depois para buscar o resultado; um ou mais
+processos de `queue_worker.py` retiram os jobs em lotes, pontuam pelo mesmo
+pipeline do `handler` e gravam os resultados em um destino.
+
+A entrega segue o modelo de visibilidade do SQS: um job recebido fica invisível
+por `visibility_timeout` segundos e volta para a fila se não for confirmado
+(`ack`) nesse prazo, por exemplo quando o trabalhador morre no meio do lote. Após
+`max_attempts` entregas sem confirmação o job vai para `dead`. A entrega é ao
+menos uma vez: o resultado é gravado antes da confirmação e a gravação é
+idempotente por `job_id`.
+
+Backends: `SqliteJobQueue` (padrão, local, vários processos no mesmo arquivo) e
+`SqsJobQueue`. Destinos: `SqliteResultSink` (consultável por `job_id`) e
+`JsonlResultSink` (arquivos diários).
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Limite da API do SQS para operações em lote
+_SQS_BATCH = 10
+
+_QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    visible_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    receipt TEXT,
+    enqueued_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_visible ON jobs (state, visible_at);
+"""
+
+_RESULTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    completed_at REAL NOT NULL
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SqliteJobQueue:
+    """
+    Fila em um arquivo SQLite (WAL). Vários processos podem consumir o mesmo
+    arquivo: o recebimento reserva os jobs em uma transação IMMEDIATE.
+
+    Args:
+        path (str): arquivo do banco.
+        visibility_timeout (float): segundos que um job recebido fica reservado.
+        max_attempts (int): entregas antes de o job ir para `dead`.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 60.0, max_attempts: int = 5):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(1, max_attempts)
+        self._local = threading.local()
+        self._conn().executescript(_QUEUE_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def enqueue(self, payloads: List[Dict[str, Any]], job_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Enfileira os payloads (um job cada). Ids já existentes são ignorados,
+        o que torna o reenvio de um mesmo lote idempotente.
+
+        Returns:
+            list: id de cada job, na ordem dos payloads.
+        """
+        ids = list(job_ids) if job_ids else [uuid.uuid4().hex for _ in payloads]
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (id, payload, visible_at, enqueued_at) VALUES (?, ?, ?, ?)",
+                [(job_id, json.dumps(payload), now, now) for job_id, payload in zip(ids, payloads)])
+        return ids
+
+    def receive(self, max_jobs: int, visibility_timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Reserva até `max_jobs` jobs visíveis, do mais antigo para o mais novo.
+
+        Returns:
+            list: jobs com `id`, `receipt`, `payload` e `attempts` (incluindo esta entrega).
+        """
+        now = time.time()
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        receipt = uuid.uuid4().hex
+        with self._transaction() as conn:
+            dead = conn.execute("UPDATE jobs SET state = 'dead' WHERE state = 'queued' AND visible_at <= ? "
+                                "AND attempts >= ?", (now, self.max_attempts)).rowcount
+            rows = conn.execute("SELECT id, payload, attempts FROM jobs WHERE state = 'queued' "
+                                "AND visible_at <= ? ORDER BY visible_at LIMIT ?",
+                                (now, max(1, max_jobs))).fetchall()
+            conn.executemany("UPDATE jobs SET attempts = attempts + 1, visible_at = ?, receipt = ? WHERE id = ?",
+                             [(now + timeout, receipt, row[0]) for row in rows])
+        if dead:
+            logger.warning(f"{dead} job(s) excederam {self.max_attempts} entregas e foram para 'dead'")
+        return [{"id": job_id, "receipt": receipt, "payload": json.loads(payload), "attempts": attempts + 1}
+                for job_id, payload, attempts in rows]
+
+    def ack(self, jobs: List[Dict[str, Any]]) -> int:
+        """
+        Confirma jobs processados. Só vale a entrega mais recente: um trabalhador
+        cujo prazo expirou (e o job foi reentregue) não confirma o job alheio.
+
+        Returns:
+            int: jobs confirmados.
+        """
+        with self._transaction() as conn:
+            return sum(conn.execute("DELETE FROM jobs WHERE id = ? AND receipt = ?",
+                                    (job["id"], job["receipt"])).rowcount for job in jobs)
+
+    def release(self, jobs: List[Dict[str, Any]], delay: float = 0.0, error: Optional[str] = None) -> int:
+        """Devolve jobs à fila, visíveis novamente após `delay` segundos"""
+        visible_at = time.time() + delay
+        with self._transaction() as conn:
+            return sum(conn.execute("UPDATE jobs SET visible_at = ?, last_error = ? WHERE id = ? AND receipt = ?",
+                                    (visible_at, error, job["id"], job["receipt"])).rowcount for job in jobs)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado de um job ainda na fila (None se confirmado ou desconhecido)"""
+        row = self._conn().execute("SELECT state, visible_at, attempts, last_error FROM jobs WHERE id = ?",
+                                   (job_id,)).fetchone()
+        if row is None:
+            return None
+        state, visible_at, attempts, last_error = row
+        if state == "queued" and attempts and visible_at > time.time():
+            state = "in_flight"
+        return {"job_id": job_id, "status": state, "attempts": attempts, "last_error": last_error}
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        queued, in_flight, dead = self._conn().execute(
+            "SELECT COALESCE(SUM(state = 'queued' AND visible_at <= ?), 0), "
+            "COALESCE(SUM(state = 'queued' AND visible_at > ?), 0), "
+            "COALESCE(SUM(state = 'dead'), 0) FROM jobs", (now, now)).fetchone()
+        return {"backend": "sqlite", "path": self.path, "queued": queued, "in_flight": in_flight,
+                "dead": dead, "visibility_timeout": self.visibility_timeout,
+                "max_attempts": self.max_attempts}
+
+
+class SqsJobQueue:
+    """
+    Fila no Amazon SQS, com a mesma interface da `SqliteJobQueue`. O limite de
+    entregas fica com a redrive policy (DLQ) configurada na própria fila.
+
+    Args:
+        queue_url (str): URL da fila.
+        visibility_timeout (float): segundos que uma mensagem recebida fica reservada.
+        wait_seconds (int): long polling de cada chamada de recebimento.
+    """
+
+    def __init__(self, queue_url: str, visibility_timeout: float = 60.0, wait_seconds: int = 1):
+        import aws_clients
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        self.wait_seconds = wait_seconds
+        self.sqs = aws_clients.get_client('sqs')
+
+    def enqueue(self, payloads: List[Dict[str, Any]], job_ids: Optional[List[str]] = None) -> List[str]:
+        ids = list(job_ids) if job_ids else [uuid.uuid4().hex for _ in payloads]
+        for start in range(0, len(ids), _SQS_BATCH):
+            entries = [{"Id": str(i), "MessageBody": json.dumps({"id": job_id, "payload": payload})}
+                       for i, (job_id, payload) in enumerate(zip(ids[start:start + _SQS_BATCH],
+                                                                 payloads[start:start + _SQS_BATCH]))]
+            response = self.sqs.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            if response.get("Failed"):
+                raise RuntimeError(f"Falha ao enfileirar {len(response['Failed'])} job(s) no SQS")
+        return ids
+
+    def receive(self, max_jobs: int, visibility_timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        jobs: List[Dict[str, Any]] = []
+        while len(jobs) < max_jobs:
+            response = self.sqs.receive_message(
+                QueueUrl=self.queue_url, MaxNumberOfMessages=min(_SQS_BATCH, max_jobs - len(jobs)),
+                VisibilityTimeout=int(timeout), WaitTimeSeconds=self.wait_seconds if not jobs else 0,
+                AttributeNames=["ApproximateReceiveCount"])
+            messages = response.get("Messages", [])
+            for message in messages:
+                body = json.loads(message["Body"])
+                jobs.append({"id": body["id"], "receipt": message["ReceiptHandle"], "payload": body["payload"],
+                             "attempts": int(message.get("Attributes", {}).get("ApproximateReceiveCount", 1))})
+            if len(messages) < _SQS_BATCH:
+                break
+        return jobs
+
+    def ack(self, jobs: List[Dict[str, Any]]) -> int:
+        acked = 0
+        for start in range(0, len(jobs), _SQS_BATCH):
+            chunk = jobs[start:start + _SQS_BATCH]
+            response = self.sqs.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{"Id": str(i), "ReceiptHandle": job["receipt"]} for i, job in enumerate(chunk)])
+            acked += len(response.get("Successful", []))
+        return acked
+
+    def release(self, jobs: List[Dict[str, Any]], delay: float = 0.0, error: Optional[str] = None) -> int:
+        released = 0
+        for start in range(0, len(jobs), _SQS_BATCH):
+            chunk = jobs[start:start + _SQS_BATCH]
+            response = self.sqs.change_message_visibility_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{"Id": str(i), "ReceiptHandle": job["receipt"], "VisibilityTimeout": int(delay)}
+                         for i, job in enumerate(chunk)])
+            released += len(response.get("Successful", []))
+        return released
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        attributes = self.sqs.get_queue_attributes(
+            QueueUrl=self.queue_url,
+            AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"]
+        ).get("Attributes", {})
+        return {"backend": "sqs", "queue_url": self.queue_url,
+                "queued": int(attributes.get("ApproximateNumberOfMessages", 0)),
+                "in_flight": int(attributes.get("ApproximateNumberOfMessagesNotVisible", 0)),
+                "visibility_timeout": self.visibility_timeout}
+
+
+class SqliteResultSink:
+    """Resultados em SQLite, consultáveis por `job_id` (pode ser o mesmo arquivo da fila)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(_RESULTS_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def write(self, results: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_results (job_id, status, result, error, completed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(r["job_id"], r["status"], json.dumps(r.get("result")) if r.get("result") is not None else None,
+                  r.get("error"), now) for r in results])
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT status, result, error, completed_at FROM job_results WHERE job_id = ?",
+                                   (job_id,)).fetchone()
+        if row is None:
+            return None
+        status, result, error, completed_at = row
+        return {"job_id": job_id, "status": status, "result": json.loads(result) if result else None,
+                "error": error, "completed_at": datetime.fromtimestamp(completed_at).isoformat()}
+
+
+class JsonlResultSink:
+    """Resultados anexados a arquivos diários `{data}_credit_score_jobs.jsonl`"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, results: List[Dict[str, Any]]) -> None:
+        now = datetime.now()
+        path = os.path.join(self.directory, f"{now.strftime('%Y-%m-%d')}_credit_score_jobs.jsonl")
+        lines = "".join(json.dumps(dict(r, completed_at=now.isoformat())) + "\n" for r in results)
+        with self._lock, open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+
+def open_queue(url: str, visibility_timeout: float = 60.0, max_attempts: int = 5):
+    """URL de fila do SQS (https://sqs...) ou caminho de um arquivo SQLite"""
+    if url.startswith("https://"):
+        return SqsJobQueue(url, visibility_timeout)
+    return SqliteJobQueue(url, visibility_timeout, max_attempts)
+
+
+def open_sink(path: str, queue: Any = None):
+    """
+    Arquivo .db/.sqlite vira `SqliteResultSink`; outro caminho, diretório de
+    JSON Lines. Sem caminho, usa o próprio arquivo de uma fila SQLite.
+    """
+    if not path:
+        if isinstance(queue, SqliteJobQueue):
+            return SqliteResultSink(queue.path)
+        raise ValueError("Informe o destino dos resultados (JOB_RESULTS_PATH)")
+    if path.endswith((".db", ".sqlite")):
+        return SqliteResultSink(path)
+    return JsonlResultSink(path)
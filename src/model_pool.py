@@ -0,0 +1,191 @@
+"""
+Pool de modelos com múltiplas versões residentes em memória.
+Mantém as versões usadas mais recentemente dentro de um orçamento de memória (LRU)
+e carrega novas versões sob demanda a partir do MLflow Registry ou do cache local.
+"""
+
+from collections import OrderedDict
+import logging
+import pickle
+import sys
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Estimativa usada quando o modelo não pode ser serializado (ex.: alguns pyfunc)
+DEFAULT_MODEL_SIZE_BYTES = 64 * 1024 * 1024
+
+
+class ModelVersionUnavailable(Exception):
+    """Versão solicitada não pôde ser carregada de nenhuma fonte"""
+
+
+def estimate_model_size(model: Any) -> int:
+    """
+    Estima o tamanho em memória de um modelo pelo tamanho serializado.
+
+    Args:
+        model: objeto do modelo carregado.
+
+    Returns:
+        int: tamanho estimado em bytes.
+    """
+    try:
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        size = sys.getsizeof(model)
+        return max(size, DEFAULT_MODEL_SIZE_BYTES)
+
+
+class ModelPool:
+    """
+    Pool LRU de modelos indexado por (nome, versão).
+
+    O modelo padrão (registrado por `load_model`) fica fixo no pool e nunca é
+    removido; as demais versões são carregadas sob demanda e removidas, da menos
+    usada recentemente para a mais usada, quando o orçamento de memória ou o
+    número máximo de modelos residentes é excedido.
+
+    Versões pedidas sem nome são buscadas em `registry_name` (o modelo registrado
+    no MLflow), e não no nome do modelo padrão, que pode ser um arquivo local,
+    o mock ou um snapshot.
+    """
+
+    def __init__(self, loader: Callable[[str, str], Tuple[Any, Dict[str, Any]]],
+                 max_bytes: int, max_models: int,
+                 prepare: Optional[Callable[[Any], Any]] = None,
+                 registry_name: Optional[str] = None):
+        self.loader = loader
+        self.registry_name = registry_name
+        self.prepare = prepare
+        self.max_bytes = max_bytes
+        self.max_models = max(1, max_models)
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._default_key: Optional[Tuple[str, str]] = None
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+        self.hits = 0
+
+    def register(self, name: str, version: str, model: Any, info: Dict[str, Any],
+                 default: bool = False, prepared: Any = None) -> None:
+        """
+        Registra um modelo já carregado no pool.
+
+        Args:
+            name (str): nome do modelo.
+            version (str): versão do modelo.
+            model: objeto do modelo.
+            info (dict): metadados do modelo (mesmo formato de `model_info`).
+            default (bool): se True, passa a ser a versão usada quando nenhuma é pedida.
+            prepared: recursos já calculados (ex.: restaurados do snapshot de
+                inicialização); se None, são calculados por `prepare`.
+        """
+        key = (str(name), str(version))
+        entry = {
+            "model": model,
+            "info": info,
+            "size": estimate_model_size(model),
+            "prepared": prepared if prepared is not None or not self.prepare else self.prepare(model)
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if default:
+                self._default_key = key
+            self._evict_locked()
+
+    def get(self, version: Optional[str] = None, name: Optional[str] = None) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Retorna o modelo da versão pedida, carregando-o se necessário.
+
+        Args:
+            version (str): versão desejada; None ou "latest" retorna o modelo padrão.
+            name (str): nome do modelo; por padrão `registry_name` (ou, sem ele,
+                o nome do modelo padrão).
+
+        Returns:
+            tuple: (modelo, metadados).
+
+        Raises:
+            ModelVersionUnavailable: se a versão não puder ser carregada.
+        """
+        entry = self.get_entry(version, name)
+        return entry["model"], entry["info"]
+
+    def get_entry(self, version: Optional[str] = None, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Igual a `get`, mas retorna a entrada completa do pool, incluindo os
+        recursos pré-calculados por `prepare` (chave "prepared").
+        """
+        with self._lock:
+            if self._default_key is None:
+                raise ModelVersionUnavailable("Nenhum modelo padrão registrado")
+            if version in (None, "", "latest"):
+                key = self._default_key
+            else:
+                key = (str(name or self.registry_name or self._default_key[0]), str(version))
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Apenas uma thread carrega cada versão; as demais aguardam o resultado
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+
+            logger.info(f"Carregando versão {key[1]} do modelo {key[0]} no pool...")
+            try:
+                model, info = self.loader(key[0], key[1])
+                self.register(key[0], key[1], model, info)
+            except Exception as e:
+                raise ModelVersionUnavailable(f"Versão {key[1]} indisponível: {e}") from e
+            finally:
+                # Sucesso ou falha, o lock de carregamento não fica acumulado
+                with self._lock:
+                    self._loading.pop(key, None)
+
+            with self._lock:
+                self.loads += 1
+                return self._entries.get(key) or {"model": model, "info": info, "prepared": None}
+
+    def _evict_locked(self) -> None:
+        """Remove entradas menos usadas até respeitar o orçamento (lock já adquirido)"""
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models or self._total_bytes_locked() > self.max_bytes
+        ):
+            victim = next((k for k in self._entries if k != self._default_key), None)
+            if victim is None:
+                break
+            self._entries.pop(victim)
+            self.evictions += 1
+            logger.info(f"Modelo {victim[0]} v{victim[1]} removido do pool (LRU)")
+
+    def _total_bytes_locked(self) -> int:
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o estado atual do pool para monitoramento"""
+        with self._lock:
+            return {
+                "default": list(self._default_key) if self._default_key else None,
+                "resident": [
+                    {"model_name": k[0], "version": k[1], "size_bytes": e["size"]}
+                    for k, e in self._entries.items()
+                ],
+                "total_bytes": self._total_bytes_locked(),
+                "max_bytes": self.max_bytes,
+                "max_models": self.max_models,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,224 @@
+"""
+Resolução das fontes do modelo com prazo máximo de inicialização.
+Sonda todas as fontes (MLflow Registry, runs conhecidos, arquivo local) em paralelo,
+escolhe a melhor disponível por prioridade e lembra falhas recentes em um
+circuit breaker para que recarregamentos pulem fontes sabidamente indisponíveis.
+"""
+
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SourceTimeout(Exception):
+    """Fonte não respondeu dentro do prazo"""
+
+
+def run_with_timeout(func: Callable[[], Any], timeout: float, name: str = "operação") -> Any:
+    """
+    Executa `func` em uma thread daemon e aguarda no máximo `timeout` segundos.
+
+    A thread não é interrompida ao estourar o prazo (chamadas de rede não são
+    canceláveis), mas o chamador deixa de esperar por ela e o processo pode
+    encerrar normalmente.
+
+    Raises:
+        SourceTimeout: se o prazo for excedido.
+    """
+    future = start_in_thread(func, f"model-source-{name}")
+    try:
+        return future.result(timeout=max(0.0, timeout))
+    except FutureTimeout as e:
+        raise SourceTimeout(f"{name} excedeu {timeout:.1f}s") from e
+
+
+def start_in_thread(func: Callable[[], Any], thread_name: str) -> Future:
+    """Executa `func` em uma thread daemon e retorna um Future com o resultado"""
+    future: Future = Future()
+
+    def target():
+        try:
+            future.set_result(func())
+        except BaseException as e:  # propaga qualquer erro ao chamador
+            future.set_exception(e)
+
+    threading.Thread(target=target, name=thread_name, daemon=True).start()
+    return future
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por fonte de modelo.
+
+    Após `failure_threshold` falhas consecutivas a fonte fica aberta por
+    `cooldown` segundos e é ignorada; depois disso uma nova tentativa é permitida.
+    """
+
+    def __init__(self, failure_threshold: int = 2, cooldown: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.clock = clock
+        self._failures: Dict[str, int] = {}
+        self._open_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        """Indica se a fonte pode ser tentada agora"""
+        with self._lock:
+            return self.clock() >= self._open_until.get(key, 0.0)
+
+    def record_success(self, key: str) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
+            self._open_until.pop(key, None)
+
+    def record_failure(self, key: str) -> None:
+        with self._lock:
+            failures = self._failures.get(key, 0) + 1
+            self._failures[key] = failures
+            if failures >= self.failure_threshold:
+                self._open_until[key] = self.clock() + self.cooldown
+                logger.warning(f"Circuit breaker aberto para '{key}' por {self.cooldown:.0f}s")
+
+    def state(self) -> Dict[str, Any]:
+        """Estado atual para monitoramento"""
+        now = self.clock()
+        with self._lock:
+            return {
+                key: {
+                    "failures": self._failures.get(key, 0),
+                    "open": now < self._open_until.get(key, 0.0),
+                    "retry_in_seconds": round(max(0.0, self._open_until.get(key, 0.0) - now), 1)
+                }
+                for key in set(self._failures) | set(self._open_until)
+            }
+
+
+class ModelSource:
+    """
+    Fonte candidata do modelo.
+
+    Args:
+        name (str): identificador da fonte (também usado como chave do breaker).
+        priority (int): menor valor = fonte preferida.
+        probe (callable): verificação barata; retorna uma função `load()` que
+            devolve (modelo, metadados), ou None se a fonte não tem modelo.
+            Exceções contam como falha no circuit breaker.
+        local (bool): fonte em disco; tem sempre a reserva do prazo para carregar.
+    """
+
+    def __init__(self, name: str, priority: int,
+                 probe: Callable[[], Optional[Callable[[], Tuple[Any, Dict[str, Any]]]]],
+                 local: bool = False):
+        self.name = name
+        self.priority = priority
+        self.probe = probe
+        self.local = local
+
+
+class ModelSourceResolver:
+    """
+    Resolve o modelo a partir de várias fontes respeitando um prazo total.
+
+    1. Sonda em paralelo todas as fontes cujo breaker está fechado.
+    2. Carrega a fonte disponível de maior prioridade; se o carregamento falhar
+       ou estourar o prazo, tenta a próxima — tudo dentro do prazo restante.
+       Enquanto houver uma fonte local disponível adiante, as fontes remotas
+       deixam `local_reserve` segundos do prazo para ela, e a fonte local tem
+       ao menos essa reserva mesmo com o prazo esgotado.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, deadline: float, probe_timeout: float,
+                 clock: Callable[[], float] = time.monotonic, local_reserve: float = 0.0):
+        self.breaker = breaker
+        self.deadline = deadline
+        self.probe_timeout = probe_timeout
+        self.local_reserve = max(0.0, local_reserve)
+        self.clock = clock
+        self.last_report: List[Dict[str, Any]] = []
+
+    def resolve(self, sources: List[ModelSource]) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        Retorna (modelo, metadados) da melhor fonte disponível, ou None se
+        nenhuma fonte carregou dentro do prazo.
+        """
+        started = self.clock()
+        report = {source.name: {"source": source.name, "priority": source.priority}
+                  for source in sources}
+        self.last_report = list(report.values())
+
+        candidates = []
+        for source in sorted(sources, key=lambda s: s.priority):
+            if self.breaker.allow(source.name):
+                candidates.append(source)
+            else:
+                report[source.name]["status"] = "skipped_circuit_open"
+
+        # Fase 1: sondagem paralela de todas as fontes
+        probes: Dict[str, Future] = {}
+        for source in candidates:
+            probes[source.name] = start_in_thread(source.probe, f"model-probe-{source.name}")
+
+        available = []
+        for source in candidates:
+            remaining = min(self.probe_timeout - (self.clock() - started),
+                            self._remaining(started))
+            try:
+                loader = probes[source.name].result(timeout=max(0.0, remaining))
+            except FutureTimeout:
+                report[source.name]["status"] = "probe_timeout"
+                self.breaker.record_failure(source.name)
+                continue
+            except Exception as e:
+                report[source.name]["status"] = "probe_failed"
+                report[source.name]["error"] = str(e)
+                self.breaker.record_failure(source.name)
+                continue
+
+            if loader is None:
+                report[source.name]["status"] = "unavailable"
+                continue
+            report[source.name]["status"] = "available"
+            available.append((source, loader))
+
+        # Fase 2: carrega a melhor fonte disponível dentro do prazo restante
+        for index, (source, loader) in enumerate(available):
+            remaining = self._remaining(started)
+            if source.local:
+                budget = max(remaining, self.local_reserve)
+            elif any(later.local for later, _ in available[index + 1:]):
+                budget = remaining - self.local_reserve
+            else:
+                budget = remaining
+            if budget <= 0:
+                report[source.name]["status"] = "deadline_exceeded"
+                continue
+            try:
+                loaded_model, info = run_with_timeout(loader, budget, source.name)
+            except SourceTimeout:
+                report[source.name]["status"] = "load_timeout"
+                self.breaker.record_failure(source.name)
+                continue
+            except Exception as e:
+                report[source.name]["status"] = "load_failed"
+                report[source.name]["error"] = str(e)
+                self.breaker.record_failure(source.name)
+                continue
+
+            self.breaker.record_success(source.name)
+            report[source.name]["status"] = "loaded"
+            report[source.name]["elapsed_seconds"] = round(self.clock() - started, 3)
+            logger.info(f"Modelo resolvido pela fonte '{source.name}' "
+                        f"em {self.clock() - started:.2f}s")
+            return loaded_model, info
+
+        logger.warning(f"Nenhuma fonte de modelo carregou em {self.deadline:.1f}s")
+        return None
+
+    def _remaining(self, started: float) -> float:
+        return self.deadline - (self.clock() - started)
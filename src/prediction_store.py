@@ -0,0 +1,373 @@
+"""
+Registro local de auditoria das predições, indexado por requisição, cliente e tempo.
+Responde "o que a API retornou para este cliente na terça passada" em milissegundos,
+sem baixar e varrer os CSVs diários do S3.
+
+A requisição apenas enfileira o lote já pontuado (uma operação em memória); uma
+thread grava os lotes no SQLite em transações agrupadas. Registros mais antigos
+que a retenção são removidos periodicamente.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Linhas removidas por transação na compactação (mantém curtas as janelas de escrita)
+_DELETE_CHUNK = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    request_id TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    applicant_key TEXT,
+    ts REAL NOT NULL,
+    model_name TEXT,
+    model_version TEXT,
+    prediction TEXT,
+    confidence REAL,
+    probabilities TEXT,
+    features TEXT,
+    degraded INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_request ON predictions (request_id);
+CREATE INDEX IF NOT EXISTS idx_predictions_applicant ON predictions (applicant_key, ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);
+"""
+
+_COLUMNS = ("request_id", "row_index", "applicant_key", "ts", "model_name", "model_version",
+            "prediction", "confidence", "probabilities", "features", "degraded")
+
+
+def parse_time(value: Union[str, float, int, None]) -> Optional[float]:
+    """Aceita época em segundos ou data/hora ISO 8601; None fica None"""
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value)).timestamp()
+
+
+def _native(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class PredictionStore:
+    """
+    Armazena as predições em um SQLite local (WAL).
+
+    Args:
+        path (str): arquivo do banco (um processo escritor por arquivo).
+        retention_days (float): idade máxima dos registros (0 = sem compactação).
+        batch_size (int): linhas por transação do escritor.
+        flush_interval (float): espera máxima, em segundos, antes de gravar um lote parcial.
+        max_pending (int): linhas aguardando gravação; acima disso, lotes novos são descartados.
+        compact_interval (float): intervalo entre compactações automáticas, em segundos.
+        store_features (bool): guarda também as features de entrada de cada registro.
+    """
+
+    def __init__(self, path: str, retention_days: float = 30, batch_size: int = 500,
+                 flush_interval: float = 1.0, max_pending: int = 100000,
+                 compact_interval: float = 3600, store_features: bool = True):
+        self.path = path
+        self.retention_days = retention_days
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.compact_interval = compact_interval
+        self.store_features = store_features
+
+        self._pending: deque = deque()
+        self._pending_rows = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self._last_compaction = time.time()
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.compacted = 0
+        self.queries = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._writer = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._writer.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(_SCHEMA)
+
+    # -- escrita ------------------------------------------------------------
+
+    def record(self, request_id: str, model_name: str, model_version: str,
+               predictions: Sequence[Any], proba: Optional[np.ndarray] = None,
+               classes: Optional[Sequence[Any]] = None,
+               features: Union[List[Dict[str, Any]], pd.DataFrame, None] = None,
+               applicant_keys: Optional[Sequence[Any]] = None,
+               degraded: bool = False, ts: Optional[float] = None) -> bool:
+        """
+        Enfileira um lote pontuado; a conversão em linhas e a gravação ficam
+        com a thread escritora.
+
+        Args:
+            predictions: classes preditas (com `proba` e `classes`) ou os
+                dicionários por linha de `run_inference`.
+            features: registros limpos (lista ou DataFrame), um por predição.
+            applicant_keys: chave do cliente de cada linha (`Customer_ID`).
+
+        Returns:
+            bool: False se o lote foi descartado (fila cheia).
+        """
+        rows = len(predictions)
+        batch = (request_id, time.time() if ts is None else ts, model_name, model_version,
+                 predictions, proba, classes, features if self.store_features else None,
+                 applicant_keys, degraded)
+        with self._lock:
+            if self._pending_rows + rows > self.max_pending:
+                self.dropped += rows
+                return False
+            self._pending.append(batch)
+            self._pending_rows += rows
+            self.enqueued += rows
+            should_wake = self._pending_rows >= self.batch_size
+        if should_wake:
+            self._wakeup.set()
+        return True
+
+    @staticmethod
+    def _rows(batch: tuple) -> List[tuple]:
+        """Expande um lote enfileirado em linhas da tabela"""
+        (request_id, ts, model_name, model_version, predictions, proba, classes,
+         features, applicant_keys, degraded) = batch
+        if isinstance(features, pd.DataFrame):
+            features = features.to_dict("records")
+        classes = [str(_native(c)) for c in classes] if classes is not None else None
+
+        rows = []
+        for i, prediction in enumerate(predictions):
+            probabilities, confidence = None, None
+            if isinstance(prediction, dict):
+                confidence = prediction.get("confidence")
+                probabilities = prediction.get("probabilities")
+                prediction = prediction.get("prediction")
+            elif proba is not None and classes is not None:
+                row = proba[i]
+                confidence = float(np.max(row))
+                probabilities = dict(zip(classes, row))
+            if probabilities is not None:
+                probabilities = json.dumps({c: round(float(p), 6) for c, p in probabilities.items()},
+                                           separators=(",", ":"))
+            applicant = _native(applicant_keys[i]) if applicant_keys is not None else None
+            rows.append((
+                request_id, i,
+                str(applicant) if applicant not in (None, "") else None,
+                ts, model_name, str(model_version),
+                str(_native(prediction)), confidence, probabilities,
+                json.dumps({k: _native(v) for k, v in features[i].items()}, separators=(",", ":"),
+                           default=str) if features is not None else None,
+                int(bool(degraded))
+            ))
+        return rows
+
+    def flush(self) -> int:
+        """Grava tudo o que está pendente em transações de até `batch_size` linhas"""
+        written = 0
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    batches, count = [], 0
+                    while self._pending and count < self.batch_size:
+                        batch = self._pending.popleft()
+                        batches.append(batch)
+                        count += len(batch[4])
+                if not batches:
+                    break
+
+                rows = [row for batch in batches for row in self._rows(batch)]
+                try:
+                    with self._writer_transaction():
+                        self._writer.executemany(
+                            f"INSERT INTO predictions ({', '.join(_COLUMNS)}) "
+                            f"VALUES ({', '.join('?' * len(_COLUMNS))})", rows
+                        )
+                    written += len(rows)
+                except sqlite3.Error as e:
+                    logger.warning(f"Registro de predições: falha ao gravar {len(rows)} linha(s): {e}")
+                    with self._lock:
+                        self.write_errors += len(rows)
+                    rows = []
+
+                with self._lock:
+                    self._pending_rows -= count
+                    self.written += len(rows)
+                    if self._pending_rows == 0:
+                        self._idle.notify_all()
+        return written
+
+    @contextmanager
+    def _writer_transaction(self):
+        self._writer.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._writer.execute("ROLLBACK")
+            raise
+        self._writer.execute("COMMIT")
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """
+        Remove registros mais antigos que a retenção e devolve o espaço ao disco.
+
+        Returns:
+            int: linhas removidas.
+        """
+        if self.retention_days <= 0:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.retention_days * 86400
+        removed = 0
+        with self._write_lock:
+            while True:
+                cursor = self._writer.execute(
+                    "DELETE FROM predictions WHERE id IN "
+                    "(SELECT id FROM predictions WHERE ts < ? ORDER BY ts LIMIT ?)",
+                    (cutoff, _DELETE_CHUNK)
+                )
+                removed += cursor.rowcount
+                if cursor.rowcount < _DELETE_CHUNK:
+                    break
+            if removed:
+                self._writer.execute("PRAGMA incremental_vacuum")
+                self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        with self._lock:
+            self.compacted += removed
+            self._last_compaction = time.time()
+        if removed:
+            logger.info(f"Registro de predições: {removed} linha(s) além da retenção removida(s)")
+        return removed
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if self.compact_interval > 0 and time.time() - self._last_compaction >= self.compact_interval:
+                    self.compact()
+            except Exception as e:
+                logger.warning(f"Registro de predições: erro na thread escritora: {e}")
+
+    def start(self) -> None:
+        """Inicia a thread escritora"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prediction-store", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Para a thread escritora gravando o que estiver pendente"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Espera a fila esvaziar (útil em testes e antes de consultas administrativas)"""
+        self._wakeup.set()
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending_rows == 0, timeout)
+
+    # -- consulta -----------------------------------------------------------
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def query(self, request_id: Optional[str] = None, applicant_key: Optional[str] = None,
+              since: Union[str, float, None] = None, until: Union[str, float, None] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Busca predições pelos índices (requisição, cliente + tempo, ou tempo).
+
+        Args:
+            request_id (str): ID da requisição.
+            applicant_key (str): chave do cliente (`Customer_ID`).
+            since / until: intervalo de tempo (época em segundos ou ISO 8601).
+            limit (int): máximo de linhas, das mais recentes para as mais antigas.
+
+        Returns:
+            list: um dicionário por registro pontuado.
+        """
+        clauses, params = [], []
+        if request_id is not None:
+            clauses.append("request_id = ?")
+            params.append(str(request_id))
+        if applicant_key is not None:
+            clauses.append("applicant_key = ?")
+            params.append(str(applicant_key))
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(parse_time(since))
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(parse_time(until))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "ORDER BY row_index" if request_id is not None else "ORDER BY ts DESC, row_index"
+
+        rows = self._reader().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM predictions {where} {order} LIMIT ?",
+            params + [max(1, int(limit))]
+        ).fetchall()
+        with self._lock:
+            self.queries += 1
+
+        results = []
+        for row in rows:
+            result = dict(row)
+            result["timestamp"] = datetime.fromtimestamp(result.pop("ts")).isoformat()
+            result["degraded"] = bool(result["degraded"])
+            for field in ("probabilities", "features"):
+                result[field] = json.loads(result[field]) if result[field] else None
+            results.append(result)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+        with self._lock:
+            return {
+                "path": self.path,
+                "pending": self._pending_rows,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+                "compacted": self.compacted,
+                "queries": self.queries,
+                "retention_days": self.retention_days
+            }
@@ -0,0 +1,422 @@
+"""
+Profiling sob demanda do pipeline de predição.
+`AllocationProfiler` usa o tracemalloc para atribuir bytes alocados a cada etapa
+(validação, preparação do input, inferência e telemetria) e a cada requisição;
+`CpuSampler` captura, por uma janela fixa, amostras das pilhas de todas as threads.
+Ambos ficam desligados até serem acionados pelos endpoints administrativos.
+`StageTimer` mede o tempo de parede das mesmas etapas em ferramentas locais.
+"""
+
+import logging
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Alocações do próprio profiler e da importação de módulos não interessam
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _site(stat: Any) -> str:
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def _top_growth(current: tracemalloc.Snapshot, previous: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    """Locais que mais cresceram entre dois snapshots"""
+    diff = current.compare_to(previous, "lineno")
+    return [
+        {"site": _site(stat), "size_diff": stat.size_diff, "count_diff": stat.count_diff, "size": stat.size}
+        for stat in diff[:limit] if stat.size_diff > 0
+    ]
+
+
+class AllocationProfiler:
+    """
+    Atribuição de alocações por etapa do pipeline usando tracemalloc.
+
+    Em modo normal mede, por etapa e por requisição, os bytes retidos ao final e
+    o pico acima do início (valores aproximados quando há requisições simultâneas,
+    pois o tracemalloc é global ao processo). Em modo detalhado, as próximas
+    `detail_requests` requisições tiram snapshots antes e depois de cada etapa,
+    identificando os locais de alocação de cada uma.
+    """
+
+    def __init__(self, top_sites: int = 10):
+        self.top_sites = top_sites
+        self.active = False
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.started_at = None
+        self.frames = 1
+        self._detail_remaining = 0
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._stage_sites: Dict[str, Dict[str, List[int]]] = {}
+        self._requests = {"count": 0, "net_bytes": 0, "max_net_bytes": 0,
+                          "peak_bytes": 0, "max_peak_bytes": 0}
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def start(self, frames: int = 1, detail_requests: int = 0) -> Dict[str, Any]:
+        """
+        Liga o profiling (reinicia os contadores se já estiver ligado).
+
+        Args:
+            frames (int): profundidade das pilhas guardadas pelo tracemalloc.
+            detail_requests (int): requisições com snapshots por etapa.
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._started_tracing = True
+            self._reset()
+            self.frames = tracemalloc.get_traceback_limit()
+            self._detail_remaining = max(0, int(detail_requests))
+            self.started_at = datetime.now().isoformat()
+            self._baseline = self._snapshot()
+            self.active = True
+        logger.info(f"Profiling de memória iniciado (frames={self.frames}, "
+                    f"detalhado={self._detail_remaining} requisições)")
+        return self.report()
+
+    def stop(self) -> Dict[str, Any]:
+        """Desliga o profiling e retorna o relatório final"""
+        report = self.report()
+        with self._lock:
+            self.active = False
+            self._baseline = None
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        logger.info("Profiling de memória encerrado")
+        return report
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Mede os bytes retidos e o pico de uma requisição inteira"""
+        if not self.active:
+            yield
+            return
+
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        with self._lock:
+            detail = self._detail_remaining > 0
+            if detail:
+                self._detail_remaining -= 1
+        self._local.detail = detail
+        self._local.peak = 0
+        try:
+            yield
+        finally:
+            self._local.detail = False
+            if self.active:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, self._local.peak)
+                net, peak_delta = current - start, max(0, peak - start)
+                with self._lock:
+                    stats = self._requests
+                    stats["count"] += 1
+                    stats["net_bytes"] += net
+                    stats["max_net_bytes"] = max(stats["max_net_bytes"], net)
+                    stats["peak_bytes"] += peak_delta
+                    stats["max_peak_bytes"] = max(stats["max_peak_bytes"], peak_delta)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Atribui ao estágio `name` as alocações feitas dentro do bloco"""
+        if not self.active:
+            yield
+            return
+
+        detail = getattr(self._local, "detail", False)
+        before = self._snapshot() if detail else None
+        start, request_peak = tracemalloc.get_traced_memory()
+        # O pico é zerado por etapa; a requisição guarda o maior pico já visto
+        self._local.peak = max(getattr(self._local, "peak", 0), request_peak)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            if self.active:
+                current, peak = tracemalloc.get_traced_memory()
+                net, peak_delta = current - start, max(0, peak - start)
+                growth = _top_growth(self._snapshot(), before, self.top_sites) if before is not None else []
+                with self._lock:
+                    stats = self._stages.setdefault(name, {"calls": 0, "net_bytes": 0, "max_peak_bytes": 0})
+                    stats["calls"] += 1
+                    stats["net_bytes"] += net
+                    stats["max_peak_bytes"] = max(stats["max_peak_bytes"], peak_delta)
+                    sites = self._stage_sites.setdefault(name, {})
+                    for item in growth:
+                        totals = sites.setdefault(item["site"], [0, 0])
+                        totals[0] += item["size_diff"]
+                        totals[1] += item["count_diff"]
+
+    def report(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Relatório atual: bytes por requisição, por etapa e locais que mais
+        cresceram desde o início do profiling (candidatos a vazamento).
+        """
+        top = top or self.top_sites
+        with self._lock:
+            if not self.active:
+                return {"active": False}
+
+            requests = dict(self._requests)
+            count = requests["count"]
+            stages = {}
+            for name, stats in self._stages.items():
+                stages[name] = dict(stats, mean_net_bytes=stats["net_bytes"] // stats["calls"])
+                sites = sorted(self._stage_sites.get(name, {}).items(), key=lambda kv: -kv[1][0])[:top]
+                if sites:
+                    stages[name]["top_sites"] = [
+                        {"site": site, "size_diff": size, "count_diff": blocks}
+                        for site, (size, blocks) in sites
+                    ]
+            baseline = self._baseline
+            detail_remaining = self._detail_remaining
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "active": True,
+            "started_at": self.started_at,
+            "frames": self.frames,
+            "detail_requests_remaining": detail_remaining,
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "requests": {
+                "count": count,
+                "mean_net_bytes": requests["net_bytes"] // count if count else 0,
+                "max_net_bytes": requests["max_net_bytes"],
+                "mean_peak_bytes": requests["peak_bytes"] // count if count else 0,
+                "max_peak_bytes": requests["max_peak_bytes"]
+            },
+            "stages": stages,
+            "top_growth_since_start": _top_growth(self._snapshot(), baseline, top) if baseline else []
+        }
+
+
+class StageTimer:
+    """
+    Tempo de parede por etapa, com a mesma interface de `request`/`stage` do
+    `AllocationProfiler`. Substitui `app.profiler` em medições locais (ex.:
+    traffic_replay.py); cada thread guarda as etapas da sua última requisição.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Reinicia as etapas da thread e mede a requisição inteira ("total")"""
+        self._local.stages = {}
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.stages["total"] = (time.perf_counter() - started) * 1000
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Soma ao estágio `name` o tempo gasto dentro do bloco"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = getattr(self._local, "stages", None)
+            if stages is not None:
+                stages[name] = stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def last(self) -> Dict[str, float]:
+        """Milissegundos por etapa da última requisição concluída nesta thread"""
+        return dict(getattr(self._local, "stages", {}))
+
+
+# Funções onde threads ociosas ficam paradas (servidor aguardando conexões, filas)
+_IDLE_FILES = ("threading.py", "selectors.py", "socket.py", "socketserver.py", "queue.py")
+
+
+class ProfilerBusy(Exception):
+    """Já existe uma captura de CPU em andamento"""
+
+
+class CpuSampler:
+    """
+    Profiler de CPU por amostragem: lê periodicamente as pilhas de todas as
+    threads (`sys._current_frames`) durante uma janela fixa, sem instrumentar
+    o código. No modo "cpu", threads ociosas (aguardando I/O ou locks) são
+    ignoradas; no modo "wall", entram também (mostra onde o tempo é esperado).
+
+    Uma captura por vez; o intervalo entre amostras tem um mínimo para limitar
+    o custo imposto ao processo.
+
+    Args:
+        min_interval (float): intervalo mínimo entre amostras, em segundos.
+    """
+
+    MODES = ("cpu", "wall")
+
+    def __init__(self, min_interval: float = 0.005):
+        self.min_interval = min_interval
+        self._capturing = threading.Lock()
+        self.last_capture: Optional[Dict[str, Any]] = None
+
+    @property
+    def busy(self) -> bool:
+        return self._capturing.locked()
+
+    def capture(self, seconds: float, interval: float = 0.01, top: int = 20,
+                mode: str = "cpu") -> Dict[str, Any]:
+        """
+        Captura amostras por `seconds` segundos, uma a cada `interval`
+        (nunca abaixo de `min_interval`).
+
+        Returns:
+            dict: funções com mais amostras próprias (self) e acumuladas
+            (inclusive), e as pilhas agregadas (`collapsed_stacks` / `pstats_bytes`).
+
+        Raises:
+            ProfilerBusy: se outra captura estiver em andamento.
+            ValueError: modo desconhecido.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Modo deve ser um de {self.MODES}")
+        if not self._capturing.acquire(blocking=False):
+            raise ProfilerBusy("Captura de CPU já em andamento")
+        try:
+            return self._capture(seconds, max(interval, self.min_interval), top, mode)
+        finally:
+            self._capturing.release()
+
+    def _capture(self, seconds: float, interval: float, top: int, mode: str) -> Dict[str, Any]:
+        own = threading.get_ident()
+        stacks: Counter = Counter()
+        threads = set()
+        samples = 0
+        ticks = 0
+        sampling_seconds = 0.0
+
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            tick = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if mode == "cpu" and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                samples += 1
+                threads.add(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stacks[tuple(reversed(stack))] += 1
+            ticks += 1
+            elapsed = time.perf_counter() - tick
+            sampling_seconds += elapsed
+            time.sleep(max(interval - elapsed, 0.0))
+
+        self_counts: Counter = Counter()
+        inclusive_counts: Counter = Counter()
+        for stack, count in stacks.items():
+            self_counts[stack[-1]] += count
+            for function in set(stack):
+                inclusive_counts[function] += count
+
+        def ranking(counts: Counter) -> List[Dict[str, Any]]:
+            return [
+                {"function": self._label(key), "samples": value, "percent": round(100.0 * value / samples, 2)}
+                for key, value in counts.most_common(top)
+            ]
+
+        wall = time.perf_counter() - started
+        # Tempo representado por amostra: período real entre leituras (pode
+        # exceder o intervalo pedido quando o GIL está disputado)
+        period = wall / ticks if ticks else interval
+        result = {
+            "mode": mode,
+            "seconds": round(wall, 3),
+            "interval_ms": interval * 1000,
+            "effective_interval_ms": round(period * 1000, 3),
+            "ticks": ticks,
+            "samples": samples,
+            "threads_sampled": len(threads),
+            "distinct_stacks": len(stacks),
+            "overhead_percent": round(100.0 * sampling_seconds / wall, 3) if wall else 0.0,
+            "top_self": ranking(self_counts),
+            "top_inclusive": ranking(inclusive_counts),
+            "collapsed_stacks": self.collapsed(stacks),
+            "pstats_bytes": self.pstats(stacks, period)
+        }
+        self.last_capture = {k: v for k, v in result.items() if k not in ("collapsed_stacks", "pstats_bytes")}
+        return result
+
+    @staticmethod
+    def _label(function: tuple) -> str:
+        filename, line, name = function
+        return f"{name} ({filename}:{line})"
+
+    @classmethod
+    def collapsed(cls, stacks: Counter) -> str:
+        """
+        Formato "collapsed stacks" (raiz;...;folha contagem, uma pilha por linha),
+        entrada do flamegraph.pl, speedscope e inferno.
+        """
+        lines = []
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+            frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})"
+                              for filename, line, name in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    @staticmethod
+    def pstats(stacks: Counter, period: float) -> bytes:
+        """
+        Amostras no formato do `pstats` (arquivo lido por `pstats.Stats`,
+        snakeviz, gprof2dot). Tempos estimados: amostras x período; as
+        contagens de chamadas são contagens de amostras.
+        """
+        stats: Dict[tuple, list] = {}
+
+        def entry(function: tuple) -> list:
+            # [chamadas primitivas, chamadas, tempo próprio, tempo acumulado, chamadores]
+            return stats.setdefault(function, [0, 0, 0.0, 0.0, {}])
+
+        for stack, count in stacks.items():
+            seconds = count * period
+            entry(stack[-1])[2] += seconds
+            for function in set(stack):
+                item = entry(function)
+                item[0] += count
+                item[1] += count
+                item[3] += seconds
+            for caller, callee in set(zip(stack, stack[1:])):
+                edges = entry(callee)[4]
+                cc, nc, tt, ct = edges.get(caller, (0, 0, 0.0, 0.0))
+                own = seconds if callee == stack[-1] else 0.0
+                edges[caller] = (cc + count, nc + count, tt + own, ct + seconds)
+
+        return marshal.dumps({function: tuple(values) for function, values in stats.items()})
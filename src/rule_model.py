@@ -0,0 +1,55 @@
+"""
+Modelo de regras para Credit Score, vetorizado.
+Usado como modelo de demonstração quando nenhuma fonte real carrega e como
+modelo de reserva (barato e sempre residente) quando o prazo da requisição não
+comporta o modelo principal.
+"""
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Probabilidades fixas por classe predita, na ordem de `classes_`
+_PROBABILITIES = {
+    "Good": [0.80, 0.15, 0.05],
+    "Standard": [0.15, 0.65, 0.20],
+    "Poor": [0.05, 0.20, 0.75]
+}
+
+
+class RuleCreditScoreModel:
+    """
+    Pontua renda anual, utilização de crédito e dívida em aberto:
+    >= 4 pontos é Good, >= 2 é Standard, abaixo disso Poor.
+    """
+
+    classes_ = np.array(["Good", "Standard", "Poor"])
+
+    def _column(self, X: pd.DataFrame, name: str, default: float) -> np.ndarray:
+        if name not in X.columns:
+            return np.full(len(X), default, dtype=np.float64)
+        return pd.to_numeric(X[name], errors='coerce').fillna(default).to_numpy(dtype=np.float64)
+
+    def _score(self, X: Any) -> np.ndarray:
+        X = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+        income = self._column(X, 'Annual_Income', 0)
+        credit_util = self._column(X, 'Credit_Utilization_Ratio', 50)
+        outstanding_debt = self._column(X, 'Outstanding_Debt', 0)
+
+        score = np.where(income > 60000, 2, np.where(income > 35000, 1, 0))
+        score += np.where(credit_util < 30, 2, np.where(credit_util < 60, 1, 0))
+        score += (outstanding_debt < 5000).astype(int)
+        return score
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Classe por linha, calculada em operações sobre as colunas"""
+        score = self._score(X)
+        return np.select([score >= 4, score >= 2], ["Good", "Standard"], default="Poor")
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """Probabilidades fixas da classe predita (colunas na ordem de `classes_`)"""
+        predictions = self.predict(X)
+        table = np.array([_PROBABILITIES[c] for c in self.classes_])
+        index = np.select([predictions == c for c in self.classes_], range(len(self.classes_)))
+        return table[index]
@@ -0,0 +1,176 @@
+"""
+Esquema dos dados de entrada da API de Credit Score.
+Centraliza os campos, valores padrão e faixas usados pela validação
+(`validate_and_clean_data`), pelas ferramentas de carga e pela leitura dos
+arquivos de data drift gerados por `write_real_data`.
+"""
+
+import csv
+import os
+import random
+from typing import Any, Dict, Iterator, List, Optional
+
+# Campos obrigatórios mínimos para funcionar e seus valores padrão
+CORE_DEFAULTS = {
+    'Age': 30,
+    'Annual_Income': 50000,
+    'Monthly_Inhand_Salary': 4000,
+    'Num_Bank_Accounts': 2,
+    'Num_Credit_Card': 1,
+    'Interest_Rate': 15,
+    'Num_of_Loan': 1,
+    'Outstanding_Debt': 5000,
+    'Credit_Utilization_Ratio': 30,
+    'Total_EMI_per_month': 500,
+    'Amount_invested_monthly': 200,
+    'Monthly_Balance': 2000
+}
+CORE_FIELDS = list(CORE_DEFAULTS)
+
+# Campos adicionais para modelos mais complexos (padrão 0.0)
+EXTENDED_FIELDS = [
+    'Delay_from_due_date', 'Num_of_Delayed_Payment', 'Changed_Credit_Limit',
+    'Num_Credit_Inquiries'
+]
+
+# Campos categóricos e seus valores padrão
+CATEGORICAL_DEFAULTS = {
+    'Month': 'January',
+    'Occupation': 'Engineer',
+    'Type_of_Loan': 'Personal Loan',
+    'Credit_Mix': 'Standard',
+    'Credit_History_Age': '5 Years',
+    'Payment_of_Min_Amount': 'Yes',
+    'Payment_Behaviour': 'High_spent_Small_value_payments'
+}
+
+NUMERIC_FIELDS = CORE_FIELDS + EXTENDED_FIELDS
+ALL_FIELDS = NUMERIC_FIELDS + list(CATEGORICAL_DEFAULTS)
+
+# Colunas adicionadas por `write_real_data` aos arquivos de data drift
+DRIFT_METADATA_COLUMNS = ['credit_score_prediction', 'timestamp', 'model_version', 'sample_weight']
+
+# Faixas plausíveis para geração de carga sintética (mínimo, máximo)
+NUMERIC_RANGES = {
+    'Age': (18, 80),
+    'Annual_Income': (8000, 200000),
+    'Monthly_Inhand_Salary': (500, 16000),
+    'Num_Bank_Accounts': (0, 10),
+    'Num_Credit_Card': (0, 10),
+    'Interest_Rate': (1, 34),
+    'Num_of_Loan': (0, 9),
+    'Outstanding_Debt': (0, 50000),
+    'Credit_Utilization_Ratio': (0, 100),
+    'Total_EMI_per_month': (0, 2000),
+    'Amount_invested_monthly': (0, 2000),
+    'Monthly_Balance': (0, 10000),
+    'Delay_from_due_date': (0, 60),
+    'Num_of_Delayed_Payment': (0, 25),
+    'Changed_Credit_Limit': (-5, 30),
+    'Num_Credit_Inquiries': (0, 15)
+}
+INTEGER_FIELDS = {
+    'Age', 'Num_Bank_Accounts', 'Num_Credit_Card', 'Num_of_Loan',
+    'Delay_from_due_date', 'Num_of_Delayed_Payment', 'Num_Credit_Inquiries'
+}
+
+CATEGORICAL_VALUES = {
+    'Month': ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August'],
+    'Occupation': ['Scientist', 'Teacher', 'Engineer', 'Entrepreneur', 'Developer', 'Lawyer',
+                   'Media_Manager', 'Doctor', 'Journalist', 'Manager', 'Accountant',
+                   'Musician', 'Mechanic', 'Writer', 'Architect'],
+    'Type_of_Loan': ['Personal Loan', 'Auto Loan', 'Credit-Builder Loan', 'Home Equity Loan',
+                     'Mortgage Loan', 'Student Loan', 'Debt Consolidation Loan', 'Payday Loan'],
+    'Credit_Mix': ['Good', 'Standard', 'Bad'],
+    'Credit_History_Age': [f'{years} Years' for years in range(1, 33)],
+    'Payment_of_Min_Amount': ['Yes', 'No', 'NM'],
+    'Payment_Behaviour': ['High_spent_Small_value_payments', 'Low_spent_Large_value_payments',
+                          'Low_spent_Medium_value_payments', 'Low_spent_Small_value_payments',
+                          'High_spent_Medium_value_payments', 'High_spent_Large_value_payments']
+}
+
+
+def synthetic_record(rng: random.Random, missing_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Gera um registro sintético de entrada seguindo o esquema.
+
+    Args:
+        rng (random.Random): gerador de números aleatórios.
+        missing_rate (float): probabilidade de omitir cada campo (exercita os padrões).
+
+    Returns:
+        dict: registro no formato do campo `data` da API.
+    """
+    record = {}
+    for field in NUMERIC_FIELDS:
+        if rng.random() < missing_rate:
+            continue
+        low, high = NUMERIC_RANGES[field]
+        value = rng.uniform(low, high)
+        record[field] = int(value) if field in INTEGER_FIELDS else round(value, 2)
+
+    for field, values in CATEGORICAL_VALUES.items():
+        if rng.random() < missing_rate:
+            continue
+        record[field] = rng.choice(values)
+
+    return record
+
+
+def drift_files(path: str) -> List[str]:
+    """
+    Lista os arquivos diários de data drift (`*_credit_score_prediction_data.csv`).
+
+    Args:
+        path (str): arquivo CSV ou diretório com os arquivos.
+
+    Returns:
+        list: caminhos ordenados por nome (ou seja, por data).
+    """
+    if os.path.isfile(path):
+        return [path]
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.endswith('.csv')
+    )
+
+
+def read_drift_records(path: str, skipped: Optional[List[int]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lê os registros gravados por `write_real_data` como dicionários.
+
+    Linhas cujo número de colunas não bate com o cabeçalho (valores com vírgula
+    gravados sem aspas) são ignoradas e contadas em `skipped`, se fornecido.
+
+    Args:
+        path (str): arquivo CSV ou diretório com os arquivos diários.
+        skipped (list): lista de um elemento usada como contador de linhas ignoradas.
+
+    Yields:
+        dict: linha do arquivo (features + colunas de metadados).
+    """
+    for file_path in drift_files(path):
+        with open(file_path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                continue
+            for row in reader:
+                if len(row) != len(header):
+                    if skipped is not None:
+                        skipped[0] += 1
+                    continue
+                yield dict(zip(header, row))
+
+
+def payload_from_drift_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reconstrói o campo `data` de uma requisição a partir de uma linha de drift.
+
+    Args:
+        row (dict): linha lida por `read_drift_records`.
+
+    Returns:
+        dict: apenas as features conhecidas, sem as colunas de metadados.
+    """
+    return {field: row[field] for field in ALL_FIELDS if field in row and row[field] != ''}
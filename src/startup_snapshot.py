@@ -0,0 +1,180 @@
+"""
+Snapshot de inicialização: um único arquivo com o estado pronto para servir
+(modelo desserializado, metadados e recursos pré-calculados como o explicador).
+
+Formato: uma linha JSON de cabeçalho (formato, sha256 e tamanho do conteúdo,
+versões das bibliotecas, fonte do modelo, metadados do modelo) seguida do
+conteúdo em pickle. A fonte identifica o artefato de origem: o sha256 do arquivo
+do modelo ou nome/versão/run_id do MLflow. A restauração lê o arquivo de uma vez
+e só aceita o snapshot quando o checksum, as versões das bibliotecas e a fonte
+conferem; caso contrário o chamador segue pelo carregamento normal (ver
+snapshot_builder.py).
+"""
+
+from datetime import datetime
+import hashlib
+import json
+import logging
+import os
+import pickle
+import platform
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 2
+SNAPSHOT_MAGIC = "credit-score-startup-snapshot"
+
+
+class SnapshotMismatch(Exception):
+    """Snapshot ausente, corrompido, gerado com outras versões de bibliotecas ou de outra fonte"""
+
+
+def library_versions() -> Dict[str, str]:
+    """Versões que determinam se o pickle do modelo é compatível com o processo"""
+    import numpy
+    import pandas
+    import sklearn
+    return {
+        "python": ".".join(platform.python_version_tuple()[:2]),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__
+    }
+
+
+def file_source(path: str) -> Dict[str, Any]:
+    """Fonte de um modelo carregado de arquivo: o sha256 do conteúdo"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return {"kind": "file", "sha256": digest.hexdigest()}
+
+
+def mlflow_source(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Fonte de um modelo do MLflow: nome, versão e run_id registrados"""
+    return {"kind": "mlflow", "model_name": info.get("model_name"),
+            "version": str(info.get("version")), "run_id": info.get("run_id")}
+
+
+def write_snapshot(path: str, model: Any, info: Dict[str, Any], prepared: Any = None,
+                   source: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Grava o snapshot de forma atômica (arquivo temporário + rename).
+
+    Args:
+        path (str): destino do snapshot.
+        model: modelo pronto para servir.
+        info (dict): metadados do modelo (`model_info`).
+        prepared: recursos pré-calculados do modelo (ex.: explicador).
+        source (dict): artefato de origem (`file_source` ou `mlflow_source`).
+
+    Returns:
+        dict: cabeçalho gravado.
+    """
+    payload = pickle.dumps({"model": model, "info": info, "prepared": prepared},
+                           protocol=pickle.HIGHEST_PROTOCOL)
+    header = {
+        "magic": SNAPSHOT_MAGIC,
+        "format": SNAPSHOT_FORMAT,
+        "created_at": datetime.now().isoformat(),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "payload_bytes": len(payload),
+        "libraries": library_versions(),
+        "source": source,
+        "model_info": info
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(json.dumps(header, default=str).encode("utf-8") + b"\n")
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Lê só o cabeçalho (para inspeção, sem desserializar o modelo)"""
+    with open(path, "rb") as f:
+        return json.loads(f.readline())
+
+
+SourceCheck = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def read_snapshot(path: str, current_source: Optional[SourceCheck] = None) -> Dict[str, Any]:
+    """
+    Restaura o snapshot em uma única leitura.
+
+    Args:
+        path (str): arquivo do snapshot.
+        current_source (callable): recebe a fonte registrada no cabeçalho e
+            retorna a fonte atual no mesmo formato (None se indisponível); o
+            snapshot só é aceito se as duas forem iguais. Sem ele, a fonte não
+            é conferida.
+
+    Returns:
+        dict: {"model", "info", "prepared", "header"}.
+
+    Raises:
+        SnapshotMismatch: se o arquivo não existir, estiver corrompido ou tiver
+            sido gerado com outro formato, outras versões de bibliotecas ou a
+            partir de outro artefato.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise SnapshotMismatch(f"snapshot indisponível: {e}") from e
+
+    newline = data.find(b"\n")
+    try:
+        header = json.loads(data[:newline])
+    except ValueError as e:
+        raise SnapshotMismatch("cabeçalho ilegível") from e
+    if header.get("magic") != SNAPSHOT_MAGIC or header.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotMismatch(f"formato {header.get('format')} não suportado")
+
+    current = library_versions()
+    changed = {name: f"{version} != {current.get(name)}"
+               for name, version in header.get("libraries", {}).items() if current.get(name) != version}
+    if changed:
+        raise SnapshotMismatch(f"versões de bibliotecas diferentes: {changed}")
+
+    if current_source is not None:
+        recorded = header.get("source")
+        if not recorded:
+            raise SnapshotMismatch("snapshot sem fonte do modelo registrada")
+        actual = current_source(recorded)
+        if actual != recorded:
+            raise SnapshotMismatch(f"fonte do modelo mudou: {recorded} != {actual}")
+
+    payload = memoryview(data)[newline + 1:]
+    if len(payload) != header.get("payload_bytes") or hashlib.sha256(payload).hexdigest() != header.get("sha256"):
+        raise SnapshotMismatch("checksum não confere")
+
+    state = pickle.loads(payload)
+    state["header"] = header
+    return state
+
+
+def try_restore(path: Optional[str], current_source: Optional[SourceCheck] = None) -> tuple:
+    """
+    Tenta restaurar o snapshot (ver `read_snapshot`); nunca levanta exceção.
+
+    Returns:
+        tuple: (estado ou None, motivo quando não restaurou).
+    """
+    if not path:
+        return None, "desligado"
+    if not os.path.exists(path):
+        return None, "arquivo inexistente"
+    try:
+        return read_snapshot(path, current_source), None
+    except SnapshotMismatch as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
@@ -0,0 +1,295 @@
+"""
+Spool local em disco para a telemetria (S3 de data drift e métricas do CloudWatch).
+O caminho da requisição apenas acrescenta o registro em um segmento local; uma
+thread em segundo plano envia os segmentos fechados aos destinos configurados,
+com novas tentativas e backoff exponencial. O espaço em disco é limitado e, ao
+excedê-lo, os segmentos mais antigos são descartados primeiro.
+
+Um segmento pode ter registros de vários tipos; os tipos já enviados ficam em um
+arquivo ao lado do segmento (`<segmento>.shipped`) para que uma reinicialização
+não os reenvie. A entrega é "ao menos uma vez": uma queda entre o envio e a
+gravação desse arquivo reenvia aquele tipo.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seg"
+SHIPPED_SUFFIX = ".shipped"
+
+
+class TelemetrySpool:
+    """
+    Write-ahead log local em segmentos append-only (um JSON por linha).
+
+    Args:
+        directory (str): diretório dos segmentos (um processo por diretório).
+        shippers (dict): tipo de registro -> função que envia uma lista de registros;
+            deve levantar exceção em caso de falha para o segmento ser retentado.
+        max_bytes (int): espaço máximo ocupado pelos segmentos.
+        segment_bytes (int): tamanho a partir do qual o segmento ativo é fechado.
+        flush_interval (float): idade máxima do segmento ativo antes de ser fechado
+            e enviado, mesmo que pequeno.
+        backoff_base / backoff_max (float): backoff exponencial entre tentativas.
+    """
+
+    def __init__(self, directory: str, shippers: Dict[str, Callable[[List[Dict[str, Any]]], None]],
+                 max_bytes: int = 256 * 1024 * 1024, segment_bytes: int = 1024 * 1024,
+                 flush_interval: float = 2.0, backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.directory = directory
+        self.shippers = shippers
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._active = None
+        self._active_path: Optional[str] = None
+        self._active_opened = 0.0
+        self._sizes: Dict[str, int] = {}
+        self._records: Dict[str, int] = {}
+        self._shipped_kinds: Dict[str, set] = {}
+        self._failures = 0
+        self._next_attempt = 0.0
+
+        self.appended = 0
+        self.shipped = 0
+        self.dropped = 0
+        self.ship_errors = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _recover(self) -> None:
+        """Retoma segmentos deixados por uma execução anterior (e os tipos já enviados de cada um)"""
+        for path in self._segments():
+            try:
+                self._sizes[path] = os.path.getsize(path)
+                with open(path, "rb") as f:
+                    self._records[path] = sum(1 for _ in f)
+            except OSError:
+                continue
+            try:
+                with open(path + SHIPPED_SUFFIX, "r", encoding="utf-8") as f:
+                    self._shipped_kinds[path] = {line.strip() for line in f if line.strip()}
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Spool: progresso de {os.path.basename(path)} ilegível, reenviando: {e}")
+        # Progresso de segmentos que já não existem (queda entre as duas remoções)
+        for name in os.listdir(self.directory):
+            if name.endswith(SHIPPED_SUFFIX) and os.path.join(self.directory, name[:-len(SHIPPED_SUFFIX)]) \
+                    not in self._sizes:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        if self._sizes:
+            logger.info(f"Spool: {len(self._sizes)} segmento(s) pendente(s) recuperado(s)")
+
+    def _segments(self) -> List[str]:
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _new_segment_path(self) -> str:
+        existing = self._segments()
+        last = int(os.path.basename(existing[-1])[:-len(SEGMENT_SUFFIX)]) if existing else 0
+        return os.path.join(self.directory, f"{last + 1:012d}{SEGMENT_SUFFIX}")
+
+    def append(self, kind: str, record: Dict[str, Any]) -> bool:
+        """
+        Acrescenta um registro ao spool. Operação local e rápida: não faz I/O de rede.
+
+        Args:
+            kind (str): tipo do registro (chave em `shippers`).
+            record (dict): conteúdo serializável em JSON.
+
+        Returns:
+            bool: True se o registro foi gravado.
+        """
+        line = (json.dumps({"kind": kind, "record": record}, default=str) + "\n").encode("utf-8")
+        try:
+            with self._lock:
+                if self._active is None:
+                    self._active_path = self._new_segment_path()
+                    self._active = open(self._active_path, "ab")
+                    self._active_opened = time.monotonic()
+                    self._sizes[self._active_path] = 0
+                    self._records[self._active_path] = 0
+
+                self._active.write(line)
+                self._active.flush()
+                self._sizes[self._active_path] += len(line)
+                self._records[self._active_path] += 1
+                self.appended += 1
+
+                if self._sizes[self._active_path] >= self.segment_bytes:
+                    self._seal_locked()
+                self._enforce_limit_locked()
+        except OSError as e:
+            logger.error(f"Spool: falha ao gravar registro: {e}")
+            return False
+
+        return True
+
+    def _seal_locked(self) -> None:
+        """Fecha o segmento ativo, tornando-o elegível para envio"""
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+            self._active_path = None
+            self._wakeup.set()
+
+    def _enforce_limit_locked(self) -> None:
+        """Descarta os segmentos fechados mais antigos até respeitar o limite de disco"""
+        while sum(self._sizes.values()) > self.max_bytes:
+            sealed = [p for p in sorted(self._sizes) if p != self._active_path]
+            if not sealed:
+                break
+            oldest = sealed[0]
+            self.dropped += self._records.get(oldest, 0)
+            logger.warning(f"Spool cheio: descartando segmento {os.path.basename(oldest)} "
+                           f"({self._records.get(oldest, 0)} registros)")
+            self._remove_locked(oldest)
+
+    def _remove_locked(self, path: str) -> None:
+        for name in (path, path + SHIPPED_SUFFIX):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+        self._sizes.pop(path, None)
+        self._records.pop(path, None)
+        self._shipped_kinds.pop(path, None)
+
+    def drain_once(self) -> int:
+        """
+        Envia os segmentos fechados, do mais antigo ao mais novo.
+
+        Returns:
+            int: número de registros enviados nesta passada.
+        """
+        with self._lock:
+            if (self._active is not None and self._sizes.get(self._active_path)
+                    and time.monotonic() - self._active_opened >= self.flush_interval):
+                self._seal_locked()
+            sealed = [p for p in sorted(self._sizes) if p != self._active_path]
+
+        shipped = 0
+        for path in sealed:
+            try:
+                with open(path, "rb") as f:
+                    entries = [json.loads(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                continue  # descartado pelo limite de disco enquanto isso
+            except (OSError, ValueError) as e:
+                logger.error(f"Spool: segmento ilegível {os.path.basename(path)} descartado: {e}")
+                with self._lock:
+                    self.dropped += self._records.get(path, 0)
+                    self._remove_locked(path)
+                continue
+
+            by_kind: Dict[str, List[Dict[str, Any]]] = {}
+            for entry in entries:
+                by_kind.setdefault(entry.get("kind"), []).append(entry.get("record"))
+
+            done = self._shipped_kinds.setdefault(path, set())
+            for kind, records in by_kind.items():
+                if kind in done:
+                    continue
+                shipper = self.shippers.get(kind)
+                if shipper is None:
+                    logger.warning(f"Spool: sem destino para registros '{kind}', descartando")
+                    done.add(kind)
+                    continue
+                shipper(records)  # exceções interrompem a passada e o segmento é retentado
+                done.add(kind)
+                self._mark_shipped(path, kind)
+                shipped += len(records)
+                with self._lock:
+                    self.shipped += len(records)
+
+            with self._lock:
+                self._remove_locked(path)
+
+        return shipped
+
+    def _mark_shipped(self, path: str, kind: str) -> None:
+        """Registra em disco que `kind` já foi enviado (sobrevive a reinicializações)"""
+        try:
+            with open(path + SHIPPED_SUFFIX, "a", encoding="utf-8") as f:
+                f.write(f"{kind}\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logger.warning(f"Spool: não foi possível registrar o envio de '{kind}': {e}")
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            if time.monotonic() < self._next_attempt:
+                continue
+            try:
+                self.drain_once()
+                self._failures = 0
+            except Exception as e:
+                self.ship_errors += 1
+                self._failures += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (self._failures - 1)))
+                delay *= random.uniform(0.5, 1.0)
+                self._next_attempt = time.monotonic() + delay
+                logger.warning(f"Spool: falha no envio (tentativa {self._failures}), "
+                               f"nova tentativa em {delay:.1f}s: {e}")
+
+    def start(self) -> None:
+        """Inicia a thread de envio em segundo plano"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-spool", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True, timeout: float = 5.0) -> None:
+        """
+        Para a thread de envio; com `flush`, tenta enviar o que estiver pendente.
+        Registros não enviados permanecem em disco para a próxima execução.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        with self._lock:
+            self._seal_locked()
+        if flush:
+            try:
+                self.drain_once()
+            except Exception as e:
+                logger.warning(f"Spool: registros pendentes mantidos em disco: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitoramento"""
+        with self._lock:
+            return {
+                "appended": self.appended,
+                "shipped": self.shipped,
+                "dropped": self.dropped,
+                "ship_errors": self.ship_errors,
+                "pending_segments": len(self._sizes),
+                "pending_records": sum(self._records.values()),
+                "pending_bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes
+            }
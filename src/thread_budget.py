@@ -0,0 +1,162 @@
+"""
+Orçamento de threads da inferência: evita que o `n_jobs` do modelo, o BLAS do
+NumPy e o OpenMP (xgboost, lightgbm, catboost) somem mais threads do que os
+núcleos reservados a cada processo que executa o modelo.
+
+- BLAS/OpenMP: limitados ao orçamento no processo (threadpoolctl) e, pelas
+  variáveis de ambiente, nos processos trabalhadores iniciados depois.
+- Estimadores do scikit-learn (paralelismo via joblib): `n_jobs` passa a None e
+  cada lote decide, em um contexto local à thread, 1 thread (lotes pequenos) ou
+  o orçamento inteiro (lotes a partir de `parallel_min_rows` linhas).
+- xgboost, lightgbm e catboost: o número de threads é fixado no orçamento (o
+  parâmetro é lido na predição e não pode variar por lote sem corrida).
+"""
+
+from contextlib import contextmanager, nullcontext
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Tuple
+
+from explanations import unwrap_model
+
+logger = logging.getLogger(__name__)
+
+# Lidas pelas bibliotecas ao serem importadas (valem para processos filhos)
+LIMIT_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                  "BLIS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+THREAD_PARAMS = ("n_jobs", "thread_count", "nthread", "num_threads")
+NATIVE_FLAVORS = ("xgboost", "lightgbm", "catboost")
+
+try:
+    from joblib import parallel_config
+except ImportError:  # joblib < 1.3
+    parallel_config = None
+
+
+def per_worker_budget(configured: int, processes: int, cpus: int) -> int:
+    """Threads por processo: o valor configurado ou os núcleos divididos entre os processos"""
+    if configured > 0:
+        return configured
+    return max(1, cpus // max(1, processes))
+
+
+def _flavor_of(obj: Any) -> str:
+    root = type(obj).__module__.split(".")[0]
+    if type(obj).__name__ == "RuleCreditScoreModel":
+        return "rules"
+    if type(obj).__name__ == "CompactTreeEnsemble":
+        return "compact"
+    return root
+
+
+def model_flavor(model: Any) -> str:
+    """Biblioteca do estimador final (sklearn, xgboost, lightgbm, catboost, rules...)"""
+    estimator = unwrap_model(model)
+    steps = getattr(estimator, "steps", None)
+    if steps:
+        estimator = steps[-1][1]
+    return _flavor_of(estimator)
+
+
+def thread_params(model: Any) -> List[Tuple[str, Any, Any]]:
+    """Parâmetros de threads do modelo: (chave em set_params, dono, valor atual)"""
+    estimator = unwrap_model(model)
+    if not hasattr(estimator, "get_params"):
+        return []
+    try:
+        params = estimator.get_params(deep=True)
+    except Exception:
+        return []
+    found = []
+    for key, value in params.items():
+        owner_key, _, name = key.rpartition("__")
+        if name in THREAD_PARAMS:
+            found.append((key, params[owner_key] if owner_key else estimator, value))
+    return found
+
+
+class ThreadBudget:
+    """
+    Aplica o orçamento de threads aos modelos carregados e a cada lote.
+
+    Args:
+        threads (int): threads por processo que executa o modelo.
+        parallel_min_rows (int): lotes a partir deste tamanho usam todas as threads.
+    """
+
+    def __init__(self, threads: int, parallel_min_rows: int = 1000):
+        self.threads = max(1, threads)
+        self.parallel_min_rows = parallel_min_rows
+        self._lock = threading.Lock()
+        self.small_batches = 0
+        self.large_batches = 0
+
+    def limit_libraries(self) -> List[Dict[str, Any]]:
+        """Limita BLAS/OpenMP no processo e exporta os limites para os processos filhos"""
+        for name in LIMIT_ENV_VARS:
+            os.environ.setdefault(name, str(self.threads))
+        try:
+            from threadpoolctl import threadpool_info, threadpool_limits
+        except ImportError:
+            return []
+        threadpool_limits(limits=self.threads)
+        return [{"user_api": info["user_api"], "internal_api": info["internal_api"],
+                 "num_threads": info["num_threads"]} for info in threadpool_info()]
+
+    def configure(self, model: Any) -> Dict[str, Any]:
+        """
+        Ajusta os parâmetros de threads do modelo ao orçamento (uma vez, no carregamento).
+
+        Returns:
+            dict: configuração efetiva (exposta em /model-info).
+        """
+        estimator = unwrap_model(model)
+        estimators = {}
+        updates = {}
+        for key, owner, value in thread_params(model):
+            if _flavor_of(owner) in NATIVE_FLAVORS:
+                effective: Any = self.threads
+            else:
+                effective = None
+            updates[key] = effective
+            estimators[key] = {"original": value, "effective": effective if effective is not None else "por lote"}
+        if updates:
+            try:
+                estimator.set_params(**updates)
+            except Exception as e:
+                logger.warning(f"Não foi possível ajustar as threads do modelo: {e}")
+                estimators = {key: dict(entry, effective=entry["original"]) for key, entry in estimators.items()}
+
+        return {
+            "flavor": model_flavor(model),
+            "threads_per_worker": self.threads,
+            "parallel_min_rows": self.parallel_min_rows,
+            "estimators": estimators,
+            "libraries": self.limit_libraries()
+        }
+
+    def n_jobs_for(self, rows: int) -> int:
+        return self.threads if rows >= self.parallel_min_rows else 1
+
+    @contextmanager
+    def batch(self, rows: int) -> Iterator[None]:
+        """Contexto (local à thread) com o `n_jobs` do joblib para um lote de `rows` linhas"""
+        n_jobs = self.n_jobs_for(rows)
+        with self._lock:
+            if n_jobs > 1:
+                self.large_batches += 1
+            else:
+                self.small_batches += 1
+        with parallel_config(n_jobs=n_jobs) if parallel_config is not None else nullcontext():
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threads_per_worker": self.threads,
+                "parallel_min_rows": self.parallel_min_rows,
+                "small_batches": self.small_batches,
+                "large_batches": self.large_batches
+            }
+
@@ -0,0 +1,72 @@
+"""
+Codec binário (msgpack) para o corpo das predições entre serviços.
+O corpo decodificado é o mesmo dicionário do JSON (`data`, `records`, `explain`),
+então os dois formatos seguem pelo mesmo caminho da API; só a codificação muda.
+O msgpack é opcional: sem ele, apenas o JSON é aceito.
+"""
+
+import logging
+from typing import Any, Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MSGPACK = "application/msgpack"
+
+# Nomes alternativos usados por clientes comuns
+_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+
+class CodecUnavailable(Exception):
+    """O msgpack não está instalado"""
+
+
+def media_type(header: Optional[str]) -> Optional[str]:
+    """
+    Retorna o codec binário indicado por um header Content-Type/Accept, ou None.
+
+    Args:
+        header (str): valor do header (pode ter parâmetros ou vários tipos no Accept).
+    """
+    if not header:
+        return None
+    for part in header.split(","):
+        value = part.split(";", 1)[0].strip().lower()
+        if _ALIASES.get(value, value) == MSGPACK:
+            return MSGPACK
+    return None
+
+
+def available() -> bool:
+    """Indica se o msgpack está disponível"""
+    return msgpack is not None
+
+
+def decode(body: bytes) -> Any:
+    """
+    Decodifica um corpo msgpack (mapas com chaves texto, como no JSON).
+
+    Raises:
+        CodecUnavailable: sem o pacote msgpack.
+        ValueError: corpo inválido.
+    """
+    if msgpack is None:
+        raise CodecUnavailable("msgpack não instalado")
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise ValueError(f"Corpo msgpack inválido: {e}") from e
+
+
+def encode(value: Any) -> bytes:
+    """Codifica a resposta (tipos nativos, como os entregues ao json.dumps)"""
+    if msgpack is None:
+        raise CodecUnavailable("msgpack não instalado")
+    return msgpack.packb(value, use_bin_type=True)
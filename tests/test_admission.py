@@ -0,0 +1,138 @@
+"""
+Testes para o controle de admissão (token bucket por cliente e limite global).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import server
+from admission import AdmissionController
+
+PAYLOAD = {"data": {"Age": 35, "Annual_Income": 65000}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAdmissionController:
+    """Testes das decisões de admissão"""
+
+    def test_bucket_refills_over_time(self):
+        clock = FakeClock()
+        controller = AdmissionController(rate=2, burst=2, max_in_flight=0, clock=clock)
+        for _ in range(2):
+            controller.admit("a").release()
+
+        decision = controller.admit("a")
+        assert (decision.admitted, decision.status, decision.retry_after) == (False, 429, 1)
+        assert controller.admit("b").admitted
+
+        clock.now = 0.5
+        assert controller.admit("a").admitted
+
+    def test_batch_cost_is_capped_at_burst(self):
+        clock = FakeClock()
+        controller = AdmissionController(rate=1, burst=5, max_in_flight=0, clock=clock)
+        assert controller.admit("a", cost=50).admitted
+        decision = controller.admit("a", cost=50)
+        assert not decision.admitted
+        assert decision.retry_after == 5
+
+    def test_in_flight_limit_refunds_tokens(self):
+        clock = FakeClock()
+        controller = AdmissionController(rate=1, burst=2, max_in_flight=1, clock=clock)
+        first = controller.admit("a")
+        decision = controller.admit("b")
+        assert (decision.admitted, decision.status) == (False, 503)
+
+        first.release()
+        first.release()
+        assert controller.in_flight == 0
+        for _ in range(2):
+            decision = controller.admit("b")
+            assert decision.admitted
+            decision.release()
+
+    def test_stats_and_client_eviction(self):
+        clock = FakeClock()
+        controller = AdmissionController(rate=1, burst=1, max_in_flight=0, max_clients=2, clock=clock)
+        for client in ("a", "a", "b", "c"):
+            controller.admit(client)
+
+        stats = controller.stats()
+        assert stats["admitted"] == 3
+        assert stats["rate_limited"] == 1
+        assert stats["tracked_clients"] == 2
+        assert stats["top_rate_limited_clients"] == []
+
+    def test_api_key_is_hashed(self):
+        key = AdmissionController.client_key("segredo", "10.0.0.1")
+        assert key.startswith("key:") and "segredo" not in key
+        assert AdmissionController.client_key(None, "10.0.0.1") == "ip:10.0.0.1"
+
+
+class TestAdmissionDefaults:
+    """Sem configuração explícita, a admissão não limita (o IP de origem pode ser o proxy)"""
+
+    def test_disabled_by_default(self, monkeypatch):
+        if os.getenv('ADMISSION_ENABLED') is not None:
+            pytest.skip("ADMISSION_ENABLED definido no ambiente")
+        monkeypatch.setattr(server, "admission", AdmissionController(rate=0.01, burst=1, max_in_flight=0))
+        client = server.app.test_client()
+        assert server.ADMISSION_ENABLED is False
+        assert [client.post('/predict', json=PAYLOAD).status_code for _ in range(3)] == [200] * 3
+
+
+class TestServerAdmission:
+    """Testes da admissão nos endpoints de predição"""
+
+    @pytest.fixture(autouse=True)
+    def enabled(self, monkeypatch):
+        monkeypatch.setattr(server, "ADMISSION_ENABLED", True)
+        self.client = server.app.test_client()
+
+    def test_rate_limited_client_gets_retry_after(self, monkeypatch):
+        monkeypatch.setattr(server, "admission", AdmissionController(rate=0.5, burst=1, max_in_flight=0))
+        assert self.client.post('/predict', json=PAYLOAD, headers={"X-API-Key": "k1"}).status_code == 200
+
+        response = self.client.post('/predict', json=PAYLOAD, headers={"X-API-Key": "k1"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "2"
+        assert self.client.post('/predict', json=PAYLOAD, headers={"X-API-Key": "k2"}).status_code == 200
+
+    def test_overload_returns_503(self, monkeypatch):
+        controller = AdmissionController(rate=0, burst=1, max_in_flight=1)
+        monkeypatch.setattr(server, "admission", controller)
+        held = controller.admit("outro")
+
+        response = self.client.post('/predict', json=PAYLOAD)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        held.release()
+        assert self.client.post('/predict', json=PAYLOAD).status_code == 200
+
+    def test_batch_costs_by_records(self, monkeypatch):
+        monkeypatch.setattr(server, "admission", AdmissionController(rate=0.01, burst=4, max_in_flight=0))
+        monkeypatch.setattr(server, "ADMISSION_RECORDS_PER_TOKEN", 10)
+        batch = {"records": [PAYLOAD["data"]] * 30}
+        assert self.client.post('/predict/batch', json=batch).status_code == 200
+        assert self.client.post('/predict', json=PAYLOAD).status_code == 200
+        assert self.client.post('/predict', json=PAYLOAD).status_code == 429
+
+    def test_metrics_and_disabled(self, monkeypatch):
+        monkeypatch.setattr(server, "admission", AdmissionController(rate=0.01, burst=1, max_in_flight=0))
+        self.client.post('/predict', json=PAYLOAD)
+        self.client.post('/predict', json=PAYLOAD)
+        assert self.client.get('/metrics').get_json()["admission"]["rate_limited"] == 1
+
+        monkeypatch.setattr(server, "ADMISSION_ENABLED", False)
+        assert self.client.post('/predict', json=PAYLOAD).status_code == 200
+        assert self.client.get('/metrics').get_json()["admission"] is None
@@ -0,0 +1,229 @@
+"""
+Testes do download de artefatos (paralelo, retomável e verificado) e do
+model_downloader contra um diretório local no papel do store.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import pytest
+from flask import Flask, jsonify, request, send_file
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import model_downloader
+from artifact_download import (
+    CHECKSUMS_FILE, MANIFEST_FILE, ArtifactDownloadError, HttpArtifactStore, LocalArtifactStore,
+    _part_path, download_artifacts
+)
+
+
+def make_store(root, with_checksums=True):
+    """Artefatos no formato do MLflow, com um arquivo grande o bastante para vários blocos"""
+    files = {
+        "model.pkl": os.urandom(300 * 1024),
+        "MLmodel": b"flavors:\n  sklearn: {}\n",
+        "metadata/requirements.txt": b"scikit-learn\n"
+    }
+    for path, content in files.items():
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb") as f:
+            f.write(content)
+    if with_checksums:
+        with open(os.path.join(root, CHECKSUMS_FILE), "w") as f:
+            json.dump({path: hashlib.sha256(content).hexdigest() for path, content in files.items()}, f)
+    return files
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class FlakyStore(LocalArtifactStore):
+    """Interrompe a primeira leitura de model.pkl no meio do arquivo"""
+
+    def __init__(self, root, fail_after):
+        super().__init__(root)
+        self.fail_after = fail_after
+        self.starts = []
+
+    def read(self, path, start=0, chunk_size=1024):
+        actual, chunks = super().read(path, start, chunk_size)
+        if path != "model.pkl":
+            return actual, chunks
+        self.starts.append(start)
+
+        def flaky():
+            sent = 0
+            for chunk in chunks:
+                if len(self.starts) == 1 and sent >= self.fail_after:
+                    raise ConnectionResetError("conexão interrompida")
+                sent += len(chunk)
+                yield chunk
+        return actual, flaky()
+
+
+class TestDownloadArtifacts:
+    """Paralelismo, verificação, retomada e reaproveitamento"""
+
+    def test_downloads_and_skips_unchanged(self, tmp_path):
+        files = make_store(tmp_path / "store")
+        dest = tmp_path / "model"
+        report = download_artifacts(LocalArtifactStore(str(tmp_path / "store")), str(dest), workers=3)
+
+        assert {r["status"] for r in report["files"]} == {"downloaded"}
+        for path, content in files.items():
+            assert read(dest / path) == content
+        assert report["transferred_bytes"] == report["total_bytes"] == sum(map(len, files.values()))
+        assert not list(dest.rglob("*.part"))
+
+        report = download_artifacts(LocalArtifactStore(str(tmp_path / "store")), str(dest))
+        assert {r["status"] for r in report["files"]} == {"skipped"}
+        assert report["transferred_bytes"] == 0
+
+    def test_changed_local_file_is_replaced(self, tmp_path):
+        files = make_store(tmp_path / "store", with_checksums=False)
+        dest = tmp_path / "model"
+        download_artifacts(LocalArtifactStore(str(tmp_path / "store"), revision="run1"), str(dest))
+        with open(dest / "MLmodel", "wb") as f:
+            f.write(b"x" * len(files["MLmodel"]))
+
+        report = download_artifacts(LocalArtifactStore(str(tmp_path / "store"), revision="run1"), str(dest))
+        statuses = {r["path"]: r["status"] for r in report["files"]}
+        assert statuses["MLmodel"] == "downloaded" and statuses["model.pkl"] == "skipped"
+        assert read(dest / "MLmodel") == files["MLmodel"]
+        assert MANIFEST_FILE in os.listdir(dest)
+
+    def test_new_version_with_same_size_is_downloaded(self, tmp_path):
+        """Sem checksums.json, só a mesma revisão permite pular ou retomar"""
+        for version, content in (("v1", b"modelo versao1"), ("v2", b"modelo versao2")):
+            (tmp_path / version).mkdir()
+            (tmp_path / version / "model.pkl").write_bytes(content)
+        dest = tmp_path / "model"
+
+        download_artifacts(LocalArtifactStore(str(tmp_path / "v1"), revision="run-v1"), str(dest))
+        report = download_artifacts(LocalArtifactStore(str(tmp_path / "v2"), revision="run-v2"), str(dest))
+        assert report["files"][0]["status"] == "downloaded"
+        assert read(dest / "model.pkl") == b"modelo versao2"
+
+        # Parcial deixado por outra versão não é retomado
+        (dest / "model.pkl.part").write_bytes(b"modelo ver")
+        report = download_artifacts(LocalArtifactStore(str(tmp_path / "v1")), str(dest))
+        assert report["files"][0]["status"] == "downloaded"
+        assert read(dest / "model.pkl") == b"modelo versao1"
+        assert not list(dest.glob("*.part"))
+
+    def test_checksum_mismatch(self, tmp_path):
+        make_store(tmp_path / "store")
+        with open(tmp_path / "store" / "model.pkl", "ab") as f:
+            f.write(b"!")
+        checksums = json.loads(read(tmp_path / "store" / CHECKSUMS_FILE))
+        checksums["model.pkl"] = "0" * 64
+        with open(tmp_path / "store" / CHECKSUMS_FILE, "w") as f:
+            json.dump(checksums, f)
+        dest = tmp_path / "model"
+
+        with pytest.raises(ArtifactDownloadError, match="sha256"):
+            download_artifacts(LocalArtifactStore(str(tmp_path / "store")), str(dest), retries=2, backoff=0)
+        assert not (dest / "model.pkl").exists() and not (dest / "model.pkl.part").exists()
+        assert (dest / "MLmodel").exists()
+
+    def test_resumes_interrupted_file(self, tmp_path):
+        files = make_store(tmp_path / "store")
+        store = FlakyStore(str(tmp_path / "store"), fail_after=100 * 1024)
+        dest = tmp_path / "model"
+
+        report = download_artifacts(store, str(dest), chunk_size=16 * 1024, backoff=0)
+
+        statuses = {r["path"]: r for r in report["files"]}
+        assert statuses["model.pkl"]["status"] == "resumed"
+        assert store.starts[0] == 0 and store.starts[1] >= 100 * 1024
+        assert statuses["model.pkl"]["bytes"] == len(files["model.pkl"])
+        assert read(dest / "model.pkl") == files["model.pkl"]
+
+    def test_rejects_paths_outside_destination(self, tmp_path):
+        class EvilStore(LocalArtifactStore):
+            def list_files(self):
+                return [{"path": "../fora.txt", "size": 1, "sha256": None}]
+
+        with pytest.raises(ArtifactDownloadError, match="fora do destino"):
+            download_artifacts(EvilStore(str(tmp_path)), str(tmp_path / "model"), retries=1)
+        assert not (tmp_path / "fora.txt").exists()
+
+
+class TestHttpArtifactStore:
+    """Store pela API REST do MLflow, com Range"""
+
+    @pytest.fixture
+    def tracking_server(self, tmp_path):
+        root = tmp_path / "artifacts"
+        make_store(root / "model")
+        ranges = []
+        flask_app = Flask(__name__)
+
+        @flask_app.route("/api/2.0/mlflow/artifacts/list")
+        def list_artifacts():
+            base = root / request.args["path"]
+            return jsonify({"files": [
+                {"path": f"{request.args['path']}/{p.name}", "is_dir": p.is_dir(),
+                 "file_size": None if p.is_dir() else p.stat().st_size}
+                for p in sorted(base.iterdir())
+            ]})
+
+        @flask_app.route("/get-artifact")
+        def get_artifact():
+            ranges.append(request.headers.get("Range"))
+            return send_file(str(root / request.args["path"]), conditional=True)
+
+        http = make_server("127.0.0.1", 0, flask_app, threaded=True)
+        threading.Thread(target=http.serve_forever, daemon=True).start()
+        yield f"http://127.0.0.1:{http.server_port}", root, ranges
+        http.shutdown()
+
+    def test_lists_and_resumes_with_range(self, tracking_server, tmp_path):
+        url, root, ranges = tracking_server
+        store = HttpArtifactStore(url, "run123", "model")
+        files = {f["path"]: f for f in store.list_files()}
+        assert set(files) == {"model.pkl", "MLmodel", "metadata/requirements.txt"}
+        assert all(f["sha256"] for f in files.values())
+
+        dest = tmp_path / "model"
+        dest.mkdir()
+        content = read(root / "model" / "model.pkl")
+        with open(_part_path(str(dest / "model.pkl"), "run123"), "wb") as f:
+            f.write(content[:1000])
+
+        report = download_artifacts(store, str(dest), workers=2)
+        statuses = {r["path"]: r for r in report["files"]}
+        assert statuses["model.pkl"]["status"] == "resumed"
+        assert statuses["model.pkl"]["bytes"] == len(content) - 1000
+        assert "bytes=1000-" in ranges
+        assert read(dest / "model.pkl") == content
+
+
+class TestModelDownloader:
+    """Testes do script com --source"""
+
+    def test_local_source(self, tmp_path):
+        files = make_store(tmp_path / "store")
+        output = tmp_path / "report.json"
+        argv = ["--source", str(tmp_path / "store"), "--dest", str(tmp_path / "model"),
+                "--output", str(output)]
+        assert model_downloader.main(argv) == 0
+        assert read(tmp_path / "model" / "model.pkl") == files["model.pkl"]
+        with open(output) as f:
+            assert len(json.load(f)["files"]) == 3
+
+        assert model_downloader.main(argv) == 0
+        with open(output) as f:
+            assert {r["status"] for r in json.load(f)["files"]} == {"skipped"}
+
+    def test_artifact_path(self):
+        assert model_downloader.artifact_path("mlflow-artifacts:/1/abc/artifacts/model") == "model"
+        assert model_downloader.artifact_path("runs:/abc/credit_model") == "credit_model"
+        assert model_downloader.artifact_path("") == "model"
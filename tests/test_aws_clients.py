@@ -0,0 +1,89 @@
+"""
+Testes para os clientes AWS compartilhados, contra um stand-in HTTP local.
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import aws_clients
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Responde 200 a qualquer PUT, mantendo a conexão aberta (keep-alive)"""
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    requests = []
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        type(self).requests.append(self.path)
+        self.send_response(200)
+        self.send_header('ETag', '"abc"')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    StandInHandler.connections = 0
+    StandInHandler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'teste')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'teste')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ENDPOINT_URL_S3', f"http://127.0.0.1:{server.server_address[1]}")
+    aws_clients.reset()
+    yield server
+    aws_clients.reset()
+    server.shutdown()
+    server.server_close()
+
+
+class TestAwsClients:
+    """Testes do compartilhamento e da configuração dos clientes"""
+
+    def test_one_client_per_service_across_threads(self, stand_in):
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(aws_clients.get_client('s3'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({id(client) for client in seen}) == 1
+        assert list(aws_clients.stats()["clients"]) == ['s3']
+
+    def test_connections_are_reused(self, stand_in):
+        s3 = aws_clients.get_client('s3')
+        for i in range(5):
+            s3.put_object(Bucket='fiap-ds-mlops', Key=f'teste/{i}.csv', Body='a,b\n1,2')
+        assert len(StandInHandler.requests) == 5
+        assert StandInHandler.connections == 1
+
+    def test_configuration(self, stand_in, monkeypatch):
+        monkeypatch.setattr(aws_clients, 'AWS_MAX_POOL_CONNECTIONS', 4)
+        monkeypatch.setattr(aws_clients, 'AWS_MAX_ATTEMPTS', 5)
+        config = aws_clients.get_client('s3').meta.config
+        assert config.max_pool_connections == 4
+        assert config.retries == {"total_max_attempts": 5, "mode": "standard"}
+        assert config.tcp_keepalive is True
+
+    def test_endpoint_override_precedence(self, monkeypatch):
+        monkeypatch.setenv('AWS_ENDPOINT_URL', 'http://localhost:4566')
+        monkeypatch.delenv('AWS_ENDPOINT_URL_CLOUDWATCH', raising=False)
+        assert aws_clients.endpoint_url('cloudwatch') == 'http://localhost:4566'
+        monkeypatch.setenv('AWS_ENDPOINT_URL_CLOUDWATCH', 'http://localhost:9999')
+        assert aws_clients.endpoint_url('cloudwatch') == 'http://localhost:9999'
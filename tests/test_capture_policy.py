@@ -0,0 +1,165 @@
+"""
+Testes da política de amostragem da captura de data drift.
+"""
+
+import csv
+import io
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import drift_analysis
+from capture_policy import CapturePolicy, parse_class_rates
+from schema import DRIFT_METADATA_COLUMNS, read_drift_records, synthetic_record
+
+
+def decisions(policy, ids, prediction="Good"):
+    return {i: policy.decide({}, prediction, applicant_key=f"CUS_{i}") for i in ids}
+
+
+class FakeS3:
+    """Cliente S3 em memória com a interface usada por `_ship_real_data`"""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey()
+        return {'Body': io.BytesIO(self.objects[Key].encode('utf-8'))}
+
+    def put_object(self, Body, Bucket, Key):
+        self.objects[Key] = Body
+
+
+class TestCapturePolicy:
+    """Taxas, piso por classe, baixa confiança e sorteio determinístico"""
+
+    def test_rate_is_deterministic_and_nested(self):
+        ids = range(10000)
+        low = decisions(CapturePolicy(rate=0.1), ids)
+        again = decisions(CapturePolicy(rate=0.1), ids)
+        high = decisions(CapturePolicy(rate=0.3), ids)
+
+        captured = {i for i, w in low.items() if w is not None}
+        assert low == again
+        assert 850 <= len(captured) <= 1150
+        assert set(low.values()) == {None, 10.0}
+        assert captured <= {i for i, w in high.items() if w is not None}
+
+    def test_salt_changes_the_sample(self):
+        ids = range(2000)
+        plain = decisions(CapturePolicy(rate=0.2), ids)
+        salted = decisions(CapturePolicy(rate=0.2, salt="2026-10"), ids)
+        assert plain != salted
+
+    def test_class_minimum_rates(self):
+        policy = CapturePolicy(rate=0.1, class_min_rates={"Poor": 1.0, "Standard": 0.5})
+        poor = decisions(policy, range(500), "Poor")
+        standard = decisions(policy, range(500), "Standard")
+
+        assert set(poor.values()) == {1.0}
+        assert set(standard.values()) == {None, 2.0}
+        stats = policy.stats()
+        assert stats["by_class"]["Poor"] == {"seen": 500, "captured": 500}
+        assert stats["seen"] == 1000
+
+    def test_low_confidence_is_always_captured(self):
+        policy = CapturePolicy(rate=0.0, low_confidence=0.6)
+        assert policy.decide({}, "Good", 0.55, "CUS_1") == 1.0
+        assert policy.decide({}, "Good", 0.9, "CUS_1") is None
+        assert policy.decide({}, "Good", None, "CUS_1") is None
+        assert policy.stats()["reasons"] == {"baixa_confianca": 1, "descartada": 2}
+
+    def test_key_falls_back_to_record(self):
+        policy = CapturePolicy(rate=0.5)
+        records = [synthetic_record(random.Random(i)) for i in range(200)]
+        first = [policy.decide(record, "Good") for record in records]
+        assert first == [policy.decide(dict(record), "Good") for record in records]
+        assert policy.decide({"Customer_ID": "CUS_7", "Age": 30}, "Good") == \
+            policy.decide({"Customer_ID": "CUS_7", "Age": 55}, "Good")
+
+    def test_parse_class_rates(self):
+        assert parse_class_rates("Poor=1.0, Standard=0.25") == {"Poor": 1.0, "Standard": 0.25}
+        assert parse_class_rates("") == {}
+        with pytest.raises(ValueError):
+            parse_class_rates("Poor")
+
+
+class TestAppIntegration:
+    """Captura no handler e coluna nova nos arquivos diários"""
+
+    def test_handler_records_weight_or_skips(self, monkeypatch):
+        emitted = []
+        monkeypatch.setenv("AWS_REGION", "us-east-1")
+        monkeypatch.setattr(app, "_emit_telemetry", lambda kind, record, shipper: emitted.append((kind, record)))
+        monkeypatch.setattr(app, "capture_policy", CapturePolicy(rate=0.0, class_min_rates={"Poor": 0.5}))
+
+        records = [dict(synthetic_record(random.Random(i)), Customer_ID=f"CUS_{i}") for i in range(40)]
+        response = app.handler({"records": records})
+        assert response["statusCode"] == 200
+        predictions = [r["prediction"] for r in json.loads(response["body"])["predictions"]]
+
+        rows = [record["row"] for kind, record in emitted if kind == "real_data"]
+        stats = app.runtime_stats()["drift_capture"]
+        assert stats["seen"] == 40
+        assert 0 < len(rows) == stats["captured"] < 40
+        assert {row["credit_score_prediction"] for row in rows} <= {"Poor"}
+        assert all(row["sample_weight"] == 2.0 for row in rows)
+        assert stats["by_class"].get("Poor", {}).get("seen", 0) == predictions.count("Poor")
+
+    def test_new_column_extends_existing_file(self, monkeypatch, tmp_path):
+        s3 = FakeS3()
+        monkeypatch.setattr(app.aws_clients, 'get_client', lambda service: s3)
+        file_name = "2026-10-01_credit_score_prediction_data.csv"
+
+        app._ship_real_data([{"file_name": file_name, "row": {"Age": 30, "credit_score_prediction": "Good"}}])
+        app._ship_real_data([{"file_name": file_name,
+                              "row": {"Age": 41, "credit_score_prediction": "Poor", "sample_weight": 4.0}}])
+
+        local = tmp_path / file_name
+        local.write_text(s3.objects[f"{app.DRIFT_PREFIX}/{file_name}"], encoding='utf-8')
+        skipped = [0]
+        parsed = list(read_drift_records(str(local), skipped))
+        assert skipped[0] == 0
+        assert [(r["Age"], r["sample_weight"]) for r in parsed] == [("30", ""), ("41", "4.0")]
+
+
+class TestWeightedDriftAnalysis:
+    """Contagens da análise de drift re-ponderadas pelo peso amostral"""
+
+    def test_class_mix_is_reweighted(self, tmp_path):
+        header = list(synthetic_record(random.Random(0))) + DRIFT_METADATA_COLUMNS
+        path = tmp_path / "2026-10-01_credit_score_prediction_data.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(header)
+            rng = random.Random(1)
+            for i in range(300):
+                prediction = ("Good", "Standard", "Poor")[i % 3]
+                record = dict(synthetic_record(rng), credit_score_prediction=prediction,
+                              timestamp="01-10-2026 10:00", model_version="1",
+                              sample_weight=1.0 if prediction == "Poor" else 4.0)
+                writer.writerow([record[column] for column in header])
+
+        output = tmp_path / "report.json"
+        assert drift_analysis.main([str(tmp_path), "--workers", "1", "--output", str(output)]) == 0
+        weighted = json.loads(output.read_text())
+        assert drift_analysis.main([str(tmp_path), "--workers", "1", "--unweighted",
+                                    "--output", str(output)]) == 0
+        unweighted = json.loads(output.read_text())
+
+        assert weighted["rows"] == unweighted["rows"] == 300
+        assert weighted["estimated_rows"] == 900.0 and unweighted["estimated_rows"] == 300.0
+        assert weighted["class_mix"]["2026-10-01"]["shares"]["Poor"] == pytest.approx(1 / 9, abs=1e-6)
+        assert unweighted["class_mix"]["2026-10-01"]["shares"]["Poor"] == pytest.approx(1 / 3, abs=1e-6)
+        assert weighted["model_versions"]["1"]["estimated_rows"] == 900.0
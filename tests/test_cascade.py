@@ -0,0 +1,230 @@
+"""
+Testes da cascata de modelos por confiança e do cascade_report.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import app
+import cascade_report
+from cascade import CascadeScorer, aligned_proba, threshold_sweep
+from rule_model import RuleCreditScoreModel
+
+
+def make_data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "Annual_Income": rng.uniform(8000, 200000, n).round(2),
+        "Credit_Utilization_Ratio": rng.uniform(0, 100, n).round(2),
+        "Outstanding_Debt": rng.uniform(0, 50000, n).round(2),
+    })
+    y = RuleCreditScoreModel().predict(X)
+    flip = rng.random(n) < 0.2
+    y[flip] = rng.choice(["Good", "Standard", "Poor"], int(flip.sum()))
+    return X, y
+
+
+def make_forest(X, y):
+    return RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+
+
+def run_full(model, X):
+    return model.predict(X), model.predict_proba(X), list(model.classes_)
+
+
+class TestCascadeScorer:
+    """Roteamento entre o primeiro estágio e o modelo completo"""
+
+    def test_escalated_rows_get_full_model_answer(self):
+        X, y = make_data()
+        forest = make_forest(X, y)
+        scorer = CascadeScorer(RuleCreditScoreModel(), 0.7, {"model_name": "rule_model"})
+        calls = []
+
+        def run(model, sub):
+            calls.append(len(sub))
+            return run_full(model, sub)
+
+        predictions, proba, classes = scorer.predict_arrays(forest, X, run)
+
+        assert classes == list(forest.classes_)
+        first = aligned_proba(RuleCreditScoreModel(), X, classes)
+        escalate = first.max(axis=1) < 0.7
+        assert calls == [int(escalate.sum())]
+        assert (predictions[escalate] == forest.predict(X[escalate])).all()
+        assert (predictions[~escalate] == RuleCreditScoreModel().predict(X[~escalate])).all()
+        np.testing.assert_allclose(proba[escalate], forest.predict_proba(X[escalate]))
+
+        stats = scorer.stats()
+        assert stats["rows"] == len(X) and stats["escalated_rows"] == int(escalate.sum())
+        assert stats["first_stage"] == "rule_model"
+
+    def test_threshold_extremes(self):
+        X, y = make_data()
+        forest = make_forest(X, y)
+        calls = []
+
+        def run(model, sub):
+            calls.append(len(sub))
+            return run_full(model, sub)
+
+        CascadeScorer(RuleCreditScoreModel(), 0.0).predict_arrays(forest, X, run)
+        assert calls == []
+        predictions, _, _ = CascadeScorer(RuleCreditScoreModel(), 1.01).predict_arrays(forest, X, run)
+        assert calls == [len(X)]
+        assert (predictions == forest.predict(X)).all()
+
+    def test_not_applied_to_rule_model(self):
+        scorer = CascadeScorer(RuleCreditScoreModel(), 0.7)
+        assert not scorer.applies(RuleCreditScoreModel())
+        assert not scorer.applies(scorer.first_stage)
+
+    def test_unknown_classes_bypass(self):
+        X, _ = make_data(50)
+        labels = np.where(X["Annual_Income"] > 1e5, "A", "B")
+        forest = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, labels)
+        scorer = CascadeScorer(RuleCreditScoreModel(), 0.7)
+        predictions, _, _ = scorer.predict_arrays(forest, X, run_full)
+        assert (predictions == forest.predict(X)).all()
+        assert scorer.stats()["bypassed_calls"] == 1
+
+
+class TestAppIntegration:
+    """Cascata no caminho de inferência da API"""
+
+    def test_predict_arrays_uses_cascade(self, monkeypatch):
+        X, y = make_data()
+        forest = make_forest(X, y)
+        scorer = CascadeScorer(RuleCreditScoreModel(), 0.7, {"model_name": "rule_model"})
+        monkeypatch.setattr(app, "cascade", scorer)
+
+        predictions, _, _ = app.predict_arrays(forest, X)
+        assert scorer.stats()["calls"] == 1
+        assert 0 < scorer.stats()["escalated_rows"] < len(X)
+        assert app.runtime_stats()["cascade"]["rows"] == len(X)
+
+        app.predict_arrays(forest, X, use_cascade=False)
+        app.predict_arrays(app.fallback_model, X)
+        assert scorer.stats()["calls"] == 1
+
+    def test_cascaded_latency_has_its_own_key(self, monkeypatch):
+        class FullModel:
+            """Modelo completo de teste (o de regras não passa pela cascata)"""
+            classes_ = RuleCreditScoreModel.classes_
+
+            def predict(self, X):
+                return RuleCreditScoreModel().predict(X)
+
+            def predict_proba(self, X):
+                return RuleCreditScoreModel().predict_proba(X)
+
+        info = {"model_name": "fiap-mlops-score-model", "version": "5"}
+        entry = {"model": FullModel(), "info": info, "prepared": None}
+        keys = []
+        monkeypatch.setattr(app.model_pool, "get_entry", lambda version=None, name=None: entry)
+        monkeypatch.setattr(app.deadline_policy, "observe",
+                            lambda key, rows, elapsed_ms, now=None: keys.append(key))
+        monkeypatch.setattr(app, "COALESCING_ENABLED", False)
+        records = [{"Annual_Income": 20000.0 * (i + 1), "Credit_Utilization_Ratio": 25.0,
+                    "Outstanding_Debt": 1000.0} for i in range(5)]
+
+        monkeypatch.setattr(app, "cascade", CascadeScorer(RuleCreditScoreModel(), 0.7))
+        assert app.handler({"records": records})["statusCode"] == 200
+        monkeypatch.setattr(app, "cascade", None)
+        assert app.handler({"records": records})["statusCode"] == 200
+
+        assert keys == ["fiap-mlops-score-model:5:cascade", "fiap-mlops-score-model:5"]
+
+    def test_threshold_is_required(self):
+        env = dict(os.environ, CASCADE_ENABLED="true", MODEL_OFFLINE="true", STARTUP_SNAPSHOT_PATH="")
+        env.pop("CASCADE_THRESHOLD", None)
+        src = os.path.join(os.path.dirname(__file__), '..', 'src')
+        check = "import app; print(app.cascade is None)"
+        result = subprocess.run([sys.executable, "-c", check], cwd=src, env=env,
+                                capture_output=True, text=True, timeout=120)
+        assert result.stdout.strip().splitlines()[-1] == "True"
+        assert "requer CASCADE_THRESHOLD" in result.stderr
+
+    def test_explanations_skip_cascade(self, monkeypatch):
+        X, y = make_data(50)
+        forest = make_forest(X, y)
+        scorer = CascadeScorer(RuleCreditScoreModel(), 0.7)
+        monkeypatch.setattr(app, "cascade", scorer)
+
+        class Explainer:
+            def explain(self, model_input, predictions, top_k):
+                return [[] for _ in predictions]
+
+        results, _ = app.score_records(forest, X, Explainer())
+        assert [r["prediction"] for r in results] == list(forest.predict(X))
+        assert scorer.stats()["calls"] == 0
+        app.score_records(forest, X)
+        assert scorer.stats()["calls"] == 1
+
+
+class TestThresholdSweep:
+    """Varredura de limiares"""
+
+    def test_sweep(self):
+        confidence = np.array([0.9, 0.6, 0.8, 0.5])
+        first = np.array(["Good", "Poor", "Good", "Poor"], dtype=object)
+        full = np.array(["Good", "Standard", "Poor", "Poor"], dtype=object)
+        labels = np.array(["Good", "Standard", "Poor", "Good"], dtype=object)
+        rows = threshold_sweep(confidence, first, full, [0.0, 0.7, 0.85, 1.0], labels, 0.1, 1.0)
+
+        assert [r["escalation_rate"] for r in rows] == [0.0, 0.5, 0.75, 1.0]
+        assert [r["agreement"] for r in rows] == [0.5, 0.75, 1.0, 1.0]
+        assert rows[-1]["accuracy"] == rows[-1]["full_model_accuracy"] == 0.75
+        assert rows[1]["ms_per_row"] == pytest.approx(0.6)
+        assert rows[1]["compute_saving"] == pytest.approx(0.4)
+        assert rows[-1]["first_stage_agreement_kept"] is None
+
+
+class TestCascadeReport:
+    """Testes do script de escolha do limiar"""
+
+    def setup_data(self, tmp_path):
+        X, y = make_data(600)
+        model_path = tmp_path / "model.pkl"
+        joblib.dump(make_forest(X, y), model_path)
+        validation_path = tmp_path / "validation.csv"
+        X.assign(Credit_Score=y).to_csv(validation_path, index=False)
+        return model_path, validation_path
+
+    def test_rules_first_stage(self, tmp_path):
+        model_path, validation_path = self.setup_data(tmp_path)
+        output = tmp_path / "report.json"
+        assert cascade_report.main(["--validation", str(validation_path), "--model", str(model_path),
+                                    "--min-agreement", "0.9", "--output", str(output)]) == 0
+
+        with open(output) as f:
+            report = json.load(f)
+        assert report["first_stage"] == "rule_model"
+        assert report["thresholds"][-1]["agreement"] == 1.0
+        assert report["recommended"]["agreement"] >= 0.9
+        assert "accuracy" in report["thresholds"][0]
+
+    def test_distilled_first_stage(self, tmp_path):
+        model_path, validation_path = self.setup_data(tmp_path)
+        tree_path = tmp_path / "tree.pkl"
+        output = tmp_path / "report.json"
+        assert cascade_report.main(["--validation", str(validation_path), "--model", str(model_path),
+                                    "--distill", str(tree_path), "--thresholds", "0.5,1.01",
+                                    "--output", str(output)]) == 0
+
+        with open(output) as f:
+            report = json.load(f)
+        assert report["validation_rows"] == 300
+        assert [r["threshold"] for r in report["thresholds"]] == [0.5, 1.01]
+        tree = joblib.load(tree_path)
+        assert set(tree.classes_) <= {"Good", "Standard", "Poor"}
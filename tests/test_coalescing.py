@@ -0,0 +1,116 @@
+"""
+Testes para a coalescência de requisições idênticas.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+from coalescing import SingleFlight, request_key
+
+
+class SlowModel:
+    """Modelo lento que conta quantas vezes foi executado"""
+
+    classes_ = ["Good", "Standard", "Poor"]
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        time.sleep(0.2)
+        return np.array(["Good"] * len(X))
+
+
+def run_concurrently(func, count):
+    results = [None] * count
+
+    def target(i):
+        results[i] = func()
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight:
+    """Testes do singleflight"""
+
+    def test_identical_calls_execute_once(self):
+        """Chamadas simultâneas com a mesma chave executam a função uma vez"""
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return "ok"
+
+        results = run_concurrently(lambda: flight.do("k", slow), 5)
+        assert len(calls) == 1
+        assert [r[0] for r in results] == ["ok"] * 5
+        assert sum(1 for r in results if r[1]) == 4
+        assert flight.stats()["coalesced"] == 4
+
+    def test_error_is_shared(self):
+        """Exceção do líder é repassada às requisições que aguardavam"""
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.1)
+            raise RuntimeError("falhou")
+
+        def call():
+            try:
+                flight.do("k", failing)
+            except RuntimeError as e:
+                return str(e)
+
+        assert run_concurrently(call, 3) == ["falhou"] * 3
+
+    def test_not_a_cache(self):
+        """Após terminar, a mesma chave executa de novo"""
+        flight = SingleFlight()
+        flight.do("k", lambda: 1)
+        assert flight.do("k", lambda: 2) == (2, False)
+
+    def test_request_key_is_order_independent(self):
+        assert request_key({"a": 1, "b": 2}, "v1") == request_key({"b": 2, "a": 1}, "v1")
+        assert request_key({"a": 1}, "v1") != request_key({"a": 1}, "v2")
+
+
+class TestHandlerCoalescing:
+    """Testes da coalescência no handler"""
+
+    def setup_method(self):
+        self.model = SlowModel()
+        self.registry_name = app.MODEL_NAME
+        app.model_pool.register(self.registry_name, "slow", self.model,
+                                {"model_name": self.registry_name, "version": "slow"})
+
+    def teardown_method(self):
+        app.model_pool._entries.pop((self.registry_name, "slow"), None)
+
+    @pytest.mark.skipif(not app.COALESCING_ENABLED, reason="coalescência desabilitada")
+    def test_identical_requests_share_inference(self):
+        """Requisições idênticas simultâneas executam o modelo uma única vez"""
+        event = {"data": {"Age": 41, "Annual_Income": 72000}, "model_version": "slow"}
+        before = app.singleflight.stats()["coalesced"]
+
+        responses = run_concurrently(lambda: app.handler(dict(event)), 4)
+
+        assert self.model.calls == 1
+        assert all(r["statusCode"] == 200 for r in responses)
+        assert {json.loads(r["body"])["prediction"] for r in responses} == {"Good"}
+        assert app.singleflight.stats()["coalesced"] - before == 3
@@ -0,0 +1,135 @@
+"""
+Testes para a entrada e saída colunar (Arrow IPC / Parquet) da predição em lote.
+"""
+
+import base64
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import columnar
+import server
+
+RECORDS = [
+    {"Age": 35, "Annual_Income": 65000, "Monthly_Inhand_Salary": 5200, "Num_Bank_Accounts": 2,
+     "Num_Credit_Card": 2, "Interest_Rate": 11.5, "Num_of_Loan": 1, "Outstanding_Debt": 8000,
+     "Credit_Utilization_Ratio": 28.5, "Total_EMI_per_month": 950, "Amount_invested_monthly": 800,
+     "Monthly_Balance": 3200, "Credit_Mix": "Good"},
+    {"Age": 15, "Annual_Income": -20000, "Monthly_Inhand_Salary": 1500, "Num_Bank_Accounts": 7,
+     "Num_Credit_Card": 6, "Interest_Rate": 28, "Num_of_Loan": 5, "Outstanding_Debt": 25000,
+     "Credit_Utilization_Ratio": 140, "Total_EMI_per_month": 1200, "Amount_invested_monthly": 50,
+     "Monthly_Balance": 200, "Credit_Mix": "Bad"},
+]
+
+
+def columnar_event(frame, fmt, accept=None):
+    headers = {"Content-Type": fmt}
+    if accept:
+        headers["Accept"] = accept
+    return {
+        "body": base64.b64encode(columnar.write_frame(frame, fmt)).decode("ascii"),
+        "isBase64Encoded": True,
+        "headers": headers
+    }
+
+
+class TestMediaType:
+    """Testes da negociação de formato"""
+
+    def test_recognizes_columnar_types(self):
+        assert columnar.media_type("application/vnd.apache.arrow.stream") == columnar.ARROW_STREAM
+        assert columnar.media_type("application/x-parquet; charset=binary") == columnar.PARQUET
+        assert columnar.media_type("application/json, application/vnd.apache.arrow.file") == columnar.ARROW_FILE
+        assert columnar.media_type("application/json") is None
+        assert columnar.media_type(None) is None
+
+
+class TestValidateAndCleanFrame:
+    """A versão colunar aplica as mesmas regras de `validate_and_clean_data`"""
+
+    def test_matches_row_by_row_validation(self):
+        frame = pd.DataFrame(RECORDS)
+        frame.loc[0, "Credit_Mix"] = None
+        cleaned = app.validate_and_clean_frame(frame)
+
+        for i, record in enumerate(RECORDS):
+            record = dict(record)
+            if i == 0:
+                record.pop("Credit_Mix")
+            expected = app.validate_and_clean_data(record)
+            for field, value in expected.items():
+                if isinstance(value, str):
+                    assert cleaned.loc[i, field] == value
+                else:
+                    assert cleaned.loc[i, field] == pytest.approx(value)
+
+    def test_invalid_core_value_names_field(self):
+        frame = pd.DataFrame({"Age": ["35", "abc"]})
+        with pytest.raises(ValueError, match="Age"):
+            app.validate_and_clean_frame(frame)
+
+
+class TestColumnarHandler:
+    """Testes do caminho colunar do handler"""
+
+    def test_arrow_input_matches_json_batch(self):
+        """Entrada Arrow com resposta JSON produz as mesmas predições do lote JSON"""
+        frame = pd.DataFrame(RECORDS)
+        response = app.handler(columnar_event(frame, columnar.ARROW_STREAM))
+        assert response["statusCode"] == 200
+        body = json.loads(response["body"])
+
+        expected = json.loads(app.handler({"records": RECORDS})["body"])
+        assert body["count"] == 2
+        assert [p["prediction"] for p in body["predictions"]] == \
+            [p["prediction"] for p in expected["predictions"]]
+
+    @pytest.mark.parametrize("fmt", [columnar.ARROW_STREAM, columnar.ARROW_FILE, columnar.PARQUET])
+    def test_columnar_output(self, fmt):
+        """Com Accept colunar, os resultados voltam em colunas no mesmo formato"""
+        frame = pd.DataFrame(RECORDS * 50)
+        response = app.handler(columnar_event(frame, fmt, accept=fmt))
+        assert response["statusCode"] == 200
+        assert response["isBase64Encoded"] is True
+        assert response["headers"]["Content-Type"] == fmt
+
+        result = columnar.read_frame(base64.b64decode(response["body"]), fmt)
+        assert len(result) == 100
+        assert "prediction" in result.columns
+        if "confidence" in result.columns:
+            probabilities = result[[c for c in result.columns if c.startswith("probability_")]]
+            assert np.allclose(probabilities.max(axis=1), result["confidence"])
+
+    def test_invalid_body_is_400(self):
+        event = {"body": base64.b64encode(b"nao e arrow").decode(), "isBase64Encoded": True,
+                 "headers": {"Content-Type": columnar.PARQUET}}
+        assert app.handler(event)["statusCode"] == 400
+
+    def test_invalid_value_is_400(self):
+        frame = pd.DataFrame({"Age": ["abc"]})
+        response = app.handler(columnar_event(frame, columnar.ARROW_STREAM))
+        assert response["statusCode"] == 400
+        assert "Age" in json.loads(response["body"])["message"]
+
+
+class TestColumnarServer:
+    """Testes do endpoint /predict/batch com corpo binário"""
+
+    def test_parquet_roundtrip(self):
+        client = server.app.test_client()
+        body = columnar.write_frame(pd.DataFrame(RECORDS), columnar.PARQUET)
+        response = client.post("/predict/batch", data=body, content_type=columnar.PARQUET,
+                               headers={"Accept": columnar.PARQUET})
+        assert response.status_code == 200
+        assert response.mimetype == columnar.PARQUET
+        assert "X-Model-Version" in response.headers
+        result = columnar.read_frame(response.data, columnar.PARQUET)
+        assert len(result) == 2
@@ -0,0 +1,192 @@
+"""
+Testes para a variante compacta dos modelos de árvore e para o model_compactor.
+"""
+
+import json
+import os
+import pickle
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import model_compactor
+from compact_model import CompactTreeEnsemble, compact_estimator, compact_model
+
+CLASSES = np.array(["Good", "Standard", "Poor"])
+
+
+def make_data(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Annual_Income": rng.uniform(8000, 200000, n).round(2),
+        "Outstanding_Debt": rng.uniform(0, 50000, n).round(2),
+        "Credit_Utilization_Ratio": rng.uniform(0, 100, n).round(2),
+        "Credit_Mix": rng.choice(["Good", "Standard", "Bad"], n),
+    })
+    score = df["Annual_Income"] / 200000 - df["Outstanding_Debt"] / 50000 + rng.normal(0, 0.2, n)
+    y = np.where(score > 0.2, "Good", np.where(score > -0.3, "Standard", "Poor"))
+    return df, y
+
+
+def make_pipeline(df, y, n_estimators=30):
+    pre = ColumnTransformer([("cat", OneHotEncoder(handle_unknown="ignore"), ["Credit_Mix"])],
+                            remainder="passthrough")
+    return Pipeline([("pre", pre), ("clf", RandomForestClassifier(n_estimators, random_state=0))]).fit(df, y)
+
+
+class TestCompactTreeEnsemble:
+    """Equivalência e redução do modelo compacto"""
+
+    @pytest.mark.parametrize("estimator_class", [RandomForestClassifier, ExtraTreesClassifier])
+    def test_full_compaction_matches_original(self, estimator_class):
+        df, y = make_data()
+        X = df.drop(columns="Credit_Mix")
+        original = estimator_class(n_estimators=25, random_state=0).fit(X, y)
+        compact = CompactTreeEnsemble.from_estimator(original)
+
+        np.testing.assert_allclose(compact.predict_proba(X), original.predict_proba(X), atol=1e-6)
+        assert (compact.predict(X) == original.predict(X)).all()
+        assert compact.threshold.dtype == np.float32 and compact.value.dtype == np.float32
+
+    def test_pipeline_keeps_preprocessing(self):
+        df, y = make_data()
+        original = make_pipeline(df, y)
+        compact = compact_model(original)
+
+        assert isinstance(compact, Pipeline)
+        np.testing.assert_allclose(compact.predict_proba(df), original.predict_proba(df), atol=1e-6)
+        restored = pickle.loads(pickle.dumps(compact))
+        assert (restored.predict(df.iloc[:5]) == original.predict(df.iloc[:5])).all()
+
+    def test_estimator_pruning_uses_first_trees(self):
+        df, y = make_data()
+        X = df.drop(columns="Credit_Mix")
+        original = RandomForestClassifier(20, random_state=0).fit(X, y)
+        compact = CompactTreeEnsemble.from_estimator(original, n_estimators=5)
+
+        expected = np.mean([tree.predict_proba(X.to_numpy()) for tree in original.estimators_[:5]], axis=0)
+        np.testing.assert_allclose(compact.predict_proba(X), expected, atol=1e-6)
+        assert compact.n_estimators == 5
+
+    def test_depth_truncation(self):
+        df, y = make_data()
+        X = df.drop(columns="Credit_Mix")
+        original = RandomForestClassifier(10, random_state=0).fit(X, y)
+        full = CompactTreeEnsemble.from_estimator(original)
+        shallow = CompactTreeEnsemble.from_estimator(original, max_depth=3)
+
+        assert shallow.depth == 3
+        assert shallow.node_count < full.node_count
+        np.testing.assert_allclose(shallow.predict_proba(X).sum(axis=1), 1.0, atol=1e-5)
+
+    def test_unsupported_model(self):
+        df, y = make_data()
+        X = df.drop(columns="Credit_Mix")
+        with pytest.raises(TypeError):
+            CompactTreeEnsemble.from_estimator(object())
+        with pytest.raises(TypeError, match="GradientBoostingClassifier"):
+            CompactTreeEnsemble.from_estimator(GradientBoostingClassifier(n_estimators=5).fit(X, y))
+        with pytest.raises(TypeError, match="não treinado"):
+            CompactTreeEnsemble.from_estimator(RandomForestClassifier())
+
+    def test_clone_keeps_params(self):
+        df, y = make_data()
+        X = df.drop(columns="Credit_Mix")
+        compact = CompactTreeEnsemble.from_estimator(RandomForestClassifier(10, random_state=0).fit(X, y),
+                                                     max_depth=4)
+        cloned = clone(compact)
+        assert cloned.get_params() == compact.get_params() == {"n_estimators": 10, "max_depth": 4}
+        assert not hasattr(cloned, "roots")
+        pipeline = compact_model(make_pipeline(df, y, n_estimators=5))
+        assert clone(pipeline).steps[-1][1].get_params()["n_estimators"] == 5
+
+
+class TestModelCompactor:
+    """Testes do script de compactação"""
+
+    def setup_data(self, tmp_path):
+        df, y = make_data(800)
+        model_path = tmp_path / "model.pkl"
+        joblib.dump(make_pipeline(df.iloc[:600], y[:600], n_estimators=40), model_path)
+        holdout = df.iloc[600:].assign(Credit_Score=y[600:])
+        holdout_path = tmp_path / "holdout.csv"
+        holdout.to_csv(holdout_path, index=False)
+        with open(tmp_path / "model_metadata.json", "w") as f:
+            json.dump({"model_name": "fiap-mlops-score-model", "version": "7"}, f)
+        return model_path, holdout_path
+
+    def test_lossless_report(self, tmp_path):
+        model_path, holdout_path = self.setup_data(tmp_path)
+        output = tmp_path / "model_compact.pkl"
+        assert model_compactor.main(["--model", str(model_path), "--holdout", str(holdout_path),
+                                     "--output", str(output)]) == 0
+
+        with open(tmp_path / "model_compact_report.json") as f:
+            report = json.load(f)
+        assert report["agreement"] == 1.0
+        assert report["accuracy"]["delta"] == 0.0
+        assert report["probability_delta"]["max_abs"] < 1e-5
+        assert report["model_info"] == {"model_name": "fiap-mlops-score-model", "version": "7",
+                                        "variant": "compact"}
+        assert "single_row_p50_ms" in report["latency"]["compact"]
+
+    def test_size_budget_prunes_estimators(self, tmp_path):
+        model_path, holdout_path = self.setup_data(tmp_path)
+        output = tmp_path / "model_compact.pkl"
+        assert model_compactor.main(["--model", str(model_path), "--holdout", str(holdout_path),
+                                     "--output", str(output), "--max-size-mb", "0.05",
+                                     "--min-estimators", "5"]) == 0
+
+        with open(tmp_path / "model_compact_report.json") as f:
+            report = json.load(f)
+        assert report["compact"]["n_estimators"] < 40
+        assert report["budget"]["met"] is (report["size_mb"]["compact"] <= 0.05)
+        assert "compact" in report["accuracy"]
+
+    def test_latency_budget_requires_holdout(self, tmp_path):
+        model_path, _ = self.setup_data(tmp_path)
+        assert model_compactor.main(["--model", str(model_path), "--target-latency-ms", "1"]) == 1
+
+    def test_unsupported_ensemble_is_rejected(self, tmp_path):
+        df, y = make_data()
+        model_path = tmp_path / "model.pkl"
+        joblib.dump(GradientBoostingClassifier(n_estimators=5).fit(df.drop(columns="Credit_Mix"), y), model_path)
+        assert model_compactor.main(["--model", str(model_path), "--output", str(tmp_path / "c.pkl")]) == 1
+        assert not (tmp_path / "c.pkl").exists()
+
+
+class TestCompactPreference:
+    """A API pode preferir o artefato compacto"""
+
+    def test_compact_source_has_top_priority(self, tmp_path, monkeypatch):
+        df, y = make_data()
+        compact = compact_model(make_pipeline(df, y, n_estimators=5))
+        path = tmp_path / "model_compact.pkl"
+        joblib.dump(compact, path)
+        with open(tmp_path / "model_compact_report.json", "w") as f:
+            json.dump({"model_info": {"model_name": "fiap-mlops-score-model", "version": "7",
+                                      "variant": "compact"}}, f)
+
+        monkeypatch.setattr(app, "MODEL_PREFER_COMPACT", True)
+        monkeypatch.setattr(app, "MODEL_COMPACT_PATH", str(path))
+        sources = {source.name: source.priority for source in app.get_model_sources()}
+        assert sources["local_compact"] < sources["mlflow_registry"]
+
+        loaded, info = app._local_compact_probe()()
+        assert info["source"] == "local_compact"
+        assert info["variant"] == "compact"
+        assert compact_estimator(loaded) is not None
+
+    def test_not_listed_by_default(self, monkeypatch):
+        monkeypatch.setattr(app, "MODEL_PREFER_COMPACT", False)
+        assert "local_compact" not in {source.name for source in app.get_model_sources()}
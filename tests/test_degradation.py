@@ -0,0 +1,193 @@
+"""
+Testes para a degradação por prazo e o modelo de regras vetorizado.
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import server
+from degradation import DeadlinePolicy, LatencyEstimator
+from rule_model import RuleCreditScoreModel
+
+RECORD = {"Age": 35, "Annual_Income": 65000, "Outstanding_Debt": 8000, "Credit_Utilization_Ratio": 28.5}
+
+
+def legacy_rule(income, credit_util, outstanding_debt):
+    """Regras do antigo modelo mock (linha a linha)"""
+    score = 2 if income > 60000 else 1 if income > 35000 else 0
+    score += 2 if credit_util < 30 else 1 if credit_util < 60 else 0
+    score += 1 if outstanding_debt < 5000 else 0
+    return "Good" if score >= 4 else "Standard" if score >= 2 else "Poor"
+
+
+class SlowModel:
+    """Modelo principal lento, para exercitar o prazo"""
+    classes_ = RuleCreditScoreModel.classes_
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.rules = RuleCreditScoreModel()
+
+    def predict(self, X):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.rules.predict(X)
+
+    def predict_proba(self, X):
+        return self.rules.predict_proba(X)
+
+
+class TestRuleModel:
+    """O modelo de regras vetorizado reproduz as regras originais"""
+
+    def test_matches_legacy_rules(self):
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame({
+            "Annual_Income": rng.choice([0, 35000, 35001, 60000, 60001, 120000], 500),
+            "Credit_Utilization_Ratio": rng.choice([10, 29.9, 30, 59.9, 60, 95], 500),
+            "Outstanding_Debt": rng.choice([0, 4999, 5000, 20000], 500),
+        })
+        expected = [legacy_rule(*row) for row in X.itertuples(index=False)]
+        assert RuleCreditScoreModel().predict(X).tolist() == expected
+
+    def test_probabilities_follow_classes_order(self):
+        model = RuleCreditScoreModel()
+        X = pd.DataFrame({"Annual_Income": [100000, 0], "Credit_Utilization_Ratio": [10, 90],
+                          "Outstanding_Debt": [0, 40000]})
+        proba = model.predict_proba(X)
+        assert model.predict(X).tolist() == ["Good", "Poor"]
+        assert model.classes_[np.argmax(proba, axis=1)].tolist() == ["Good", "Poor"]
+        np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+
+class TestDeadlinePolicy:
+    """Decisões da política de prazo"""
+
+    def test_estimator(self):
+        estimator = LatencyEstimator(alpha=1.0)
+        assert estimator.estimate(10) is None
+        estimator.observe(1, 2.0)
+        estimator.observe(101, 102.0)
+        assert estimator.estimate(1) == 2.0
+        assert estimator.estimate(51) == pytest.approx(52.0)
+
+    def test_decisions(self):
+        policy = DeadlinePolicy(safety_factor=1.0, margin_ms=0)
+        assert policy.decide("m", 1, None, now=0) is None
+        assert policy.decide("m", 1, deadline=0.1, now=0) is None
+        assert policy.decide("m", 1, deadline=0.1, now=0.2)["reason"] == "deadline_exceeded"
+
+        policy.observe("m", 1, 50.0)
+        assert policy.decide("m", 1, deadline=0.1, now=0) is None
+        degraded = policy.decide("m", 1, deadline=0.04, now=0)
+        assert degraded == {"reason": "insufficient_budget", "budget_ms": 40.0, "estimated_ms": 50.0}
+
+        stats = policy.stats()
+        assert stats["decisions"] == 4
+        assert stats["degraded"] == 2
+        assert stats["reasons"] == {"deadline_exceeded": 1, "insufficient_budget": 1}
+
+    def test_recovers_after_slow_first_sample(self):
+        """Estimativa antiga libera uma sonda por intervalo e é substituída por ela"""
+        policy = DeadlinePolicy(safety_factor=1.0, margin_ms=0, max_age_seconds=30)
+        policy.observe("m", 1, 200.0, now=0)
+
+        assert policy.decide("m", 1, deadline=10.1, now=10)["reason"] == "insufficient_budget"
+        assert policy.decide("m", 1, deadline=31.1, now=31) is None
+        # Só uma sonda por intervalo enquanto a sonda não termina
+        assert policy.decide("m", 1, deadline=32.1, now=32)["reason"] == "insufficient_budget"
+
+        policy.observe("m", 1, 5.0, now=31.05)
+        assert policy.decide("m", 1, deadline=33.1, now=33) is None
+        stats = policy.stats()
+        assert stats["probes"] == 1
+        assert stats["estimates"]["m"] == {"base_ms": 5.0, "per_row_ms": 0.0, "observations": 2}
+
+    def test_deadline_uses_smallest_budget_minus_queue_wait(self):
+        assert DeadlinePolicy.deadline(10.0, [None]) is None
+        assert DeadlinePolicy.deadline(10.0, [500, 200, None], queue_wait_ms=50) == pytest.approx(10.15)
+
+
+class TestHandlerDegradation:
+    """O handler troca para o modelo de reserva quando o principal não cabe no prazo"""
+
+    @pytest.fixture
+    def slow_primary(self, monkeypatch):
+        primary = SlowModel(delay=0.03)
+        entry = {"model": primary, "info": {"model_name": "fiap-mlops-score-model", "version": "9"}}
+        monkeypatch.setattr(app.model_pool, "get_entry", lambda version=None: entry)
+        monkeypatch.setattr(app, "deadline_policy", DeadlinePolicy(safety_factor=1.0, margin_ms=0))
+        monkeypatch.setattr(app, "COALESCING_ENABLED", False)
+        return primary
+
+    def call(self, headers=None, context=None, data=RECORD):
+        event = {"body": json.dumps({"data": data}), "headers": headers or {}}
+        return json.loads(app.handler(event, context)["body"])
+
+    def test_degrades_when_estimate_exceeds_budget(self, slow_primary):
+        first = self.call({"X-Deadline-Ms": "1000"})
+        assert "degraded" not in first
+        assert first["model_version"] == "9"
+
+        second = self.call({"X-Deadline-Ms": "20"})
+        assert second["degraded"] is True
+        assert second["degradation"]["reason"] == "insufficient_budget"
+        assert second["degradation"]["primary_model_version"] == "9"
+        assert second["model_name"] == "rule_model"
+        assert second["prediction"] == first["prediction"]
+        assert slow_primary.calls == 1
+        assert app.runtime_stats()["degradation"]["degraded"] == 1
+
+    def test_expired_deadline_and_queue_wait(self, slow_primary):
+        assert self.call({"X-Deadline-Ms": "0"})["degradation"]["reason"] == "deadline_exceeded"
+
+        queued_since = f"t={time.time() - 2:.3f}"
+        body = self.call({"X-Deadline-Ms": "1000", "X-Request-Start": queued_since})
+        assert body["degradation"]["reason"] == "deadline_exceeded"
+        assert slow_primary.calls == 0
+
+    def test_slo_and_lambda_context(self, slow_primary, monkeypatch):
+        class LambdaContext:
+            def get_remaining_time_in_millis(self):
+                return 0
+
+        assert self.call(context=LambdaContext())["degraded"] is True
+
+        monkeypatch.setattr(app, "REQUEST_SLO_MS", 0.001)
+        assert self.call()["degraded"] is True
+        monkeypatch.setattr(app, "DEGRADATION_ENABLED", False)
+        assert "degraded" not in self.call()
+
+    def test_no_deadline_uses_primary(self, slow_primary):
+        assert "degraded" not in self.call()
+        assert slow_primary.calls == 1
+
+    def test_server_forwards_deadline(self, slow_primary):
+        response = server.app.test_client().post('/predict', json={"data": RECORD},
+                                                 headers={"X-Deadline-Ms": "0"})
+        assert response.get_json()["degraded"] is True
+
+    def test_columnar_flags_degraded_header(self, slow_primary):
+        pytest.importorskip("pyarrow")
+        import base64
+        import columnar
+
+        fmt = columnar.ARROW_STREAM
+        event = {
+            "body": base64.b64encode(columnar.write_frame(pd.DataFrame([RECORD] * 3), fmt)).decode("ascii"),
+            "isBase64Encoded": True,
+            "headers": {"Content-Type": fmt, "Accept": fmt, "X-Deadline-Ms": "0"}
+        }
+        response = app.handler(event)
+        assert response["statusCode"] == 200
+        assert response["headers"]["X-Degraded"] == "deadline_exceeded"
+        assert response["headers"]["X-Model-Name"] == "rule_model"
@@ -0,0 +1,144 @@
+"""
+Testes para a análise offline de data drift (drift_analysis.py).
+"""
+
+import csv
+import io
+import json
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import drift_analysis
+from schema import DRIFT_METADATA_COLUMNS, synthetic_record
+
+HEADER = list(synthetic_record(random.Random(0))) + DRIFT_METADATA_COLUMNS
+
+
+def write_day(directory, date, rows, income_shift=0.0, version="1", classes=("Good", "Standard", "Poor"),
+              weights=None):
+    rng = random.Random(date)
+    path = directory / f"{date}_credit_score_prediction_data.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(HEADER)
+        for i in range(rows):
+            record = synthetic_record(rng)
+            record["Annual_Income"] = round(record["Annual_Income"] + income_shift, 2)
+            record.update({"credit_score_prediction": classes[i % len(classes)],
+                           "timestamp": f"{date} 10:00",
+                           "model_version": version if i % 4 else "2",
+                           "sample_weight": weights(record, i) if weights else ""})
+            writer.writerow([record[column] for column in HEADER])
+    return path
+
+
+@pytest.fixture
+def drift_dir(tmp_path):
+    write_day(tmp_path, "2026-03-01", 400)
+    write_day(tmp_path, "2026-03-02", 400)
+    path = write_day(tmp_path, "2026-03-03", 400, income_shift=150000, classes=("Poor",))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("linha,quebrada\n")
+    return tmp_path
+
+
+def run(args, tmp_path):
+    output = tmp_path / "report.json"
+    assert drift_analysis.main(args + ["--output", str(output)]) == 0
+    with open(output) as f:
+        return json.load(f)
+
+
+class TestChunking:
+    """Leitura de arquivos em trechos"""
+
+    def test_chunks_cover_every_line_once(self, drift_dir):
+        path = str(drift_dir / "2026-03-01_credit_score_prediction_data.csv")
+        whole, _ = drift_analysis.read_block((path, 0, None))
+        tasks = drift_analysis.plan_tasks([path], 4096)
+        parts = [drift_analysis.read_block(task)[0] for task in tasks]
+
+        assert len(tasks) > 5
+        assert sum(len(part) for part in parts) == len(whole) == 400
+        assert parts[0].columns.tolist() == HEADER
+
+    def test_boundaries_on_line_starts(self, tmp_path):
+        """Trechos que terminam exatamente no início de uma linha não a repetem"""
+        path = tmp_path / "2026-03-01_credit_score_prediction_data.csv"
+        path.write_bytes(b"a,b\n" + b"".join(f"{i},{i}\n".encode() for i in range(10)))
+        for chunk_bytes in (4, 5, 8, 12):
+            tasks = drift_analysis.plan_tasks([str(path)], chunk_bytes)
+            rows = [row for task in tasks for row in drift_analysis.read_block(task)[0]["a"]]
+            assert rows == [str(i) for i in range(10)], chunk_bytes
+
+    def test_psi(self):
+        counts = np.array([10.0, 20.0, 30.0])
+        assert drift_analysis.psi(counts, counts * 3) == pytest.approx(0.0)
+        assert drift_analysis.psi(counts, np.array([30.0, 20.0, 10.0])) > 0.2
+
+
+class TestDriftAnalysis:
+    """Relatório completo sobre um diretório local"""
+
+    def test_report(self, drift_dir, tmp_path):
+        report = run([str(drift_dir), "--workers", "2", "--chunk-mb", "0.01"], tmp_path)
+
+        assert report["files"] == 3
+        assert report["tasks"] > 3
+        assert report["rows"] == 1200
+        assert report["skipped_lines"] == 1
+        assert report["reference"].endswith("2026-03-01_credit_score_prediction_data.csv")
+
+        income = report["feature_drift"]["Annual_Income"]
+        assert income["psi_by_date"]["2026-03-01"] == 0.0
+        assert income["psi_by_date"]["2026-03-03"] >= 0.2
+        assert "Annual_Income" in report["alerts"]
+        assert report["feature_drift"]["Age"]["status"] != "significant"
+
+        assert report["class_mix"]["2026-03-03"]["shares"] == {"Poor": 1.0}
+        assert report["model_versions"]["2"]["rows"] == 300
+        assert report["model_versions"]["1"]["rows"] == 900
+        assert "Annual_Income" in report["model_versions"]["1"]["feature_means"]
+
+    def test_parallel_matches_sequential(self, drift_dir, tmp_path):
+        parallel = run([str(drift_dir), "--workers", "3", "--chunk-mb", "0.02"], tmp_path)
+        sequential = run([str(drift_dir), "--workers", "1"], tmp_path)
+        for key in ("rows", "feature_drift", "class_mix", "model_versions"):
+            assert parallel[key] == sequential[key]
+
+    def test_empty_directory(self, tmp_path):
+        assert drift_analysis.main([str(tmp_path)]) == 1
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + 2]
+        return {"Contents": [{"Key": k} for k in page], "IsTruncated": start + 2 < len(keys),
+                "NextContinuationToken": str(start + 2)}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+class TestS3Prefix:
+    """Leitura de um prefixo do S3 (um objeto por tarefa)"""
+
+    def test_reads_prefix(self, drift_dir, tmp_path, monkeypatch):
+        import aws_clients
+        objects = {f"credit-score-real-data/{p.name}": p.read_bytes() for p in drift_dir.glob("*.csv")}
+        monkeypatch.setattr(aws_clients, "get_client", lambda service: FakeS3(objects))
+
+        report = run(["s3://fiap-ds-mlops/credit-score-real-data/", "--workers", "1"], tmp_path)
+        assert report["files"] == 3
+        assert report["rows"] == 1200
+        assert "Annual_Income" in report["alerts"]
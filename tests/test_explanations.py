@@ -0,0 +1,126 @@
+"""
+Testes para o lote de predições e as contribuições por feature.
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+from explanations import TreeContributionExplainer, build_explainer
+
+
+def make_training_frame(n=300, seed=0):
+    """Gera registros no formato de entrada do modelo"""
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(n):
+        records.append(app.validate_and_clean_data({
+            "Age": int(rng.integers(18, 70)),
+            "Annual_Income": float(rng.uniform(10000, 150000)),
+            "Credit_Utilization_Ratio": float(rng.uniform(0, 100)),
+            "Outstanding_Debt": float(rng.uniform(0, 30000)),
+            "Credit_Mix": str(rng.choice(["Good", "Standard", "Poor"]))
+        }))
+    frame = app.prepare_model_input(records)
+    labels = np.where(frame["Annual_Income"] > 80000, "Good",
+                      np.where(frame["Credit_Utilization_Ratio"] > 60, "Poor", "Standard"))
+    return frame, labels
+
+
+def make_pipeline(frame, labels):
+    categorical = ["Month", "Occupation", "Type_of_Loan", "Credit_Mix", "Credit_History_Age",
+                   "Payment_of_Min_Amount", "Payment_Behaviour"]
+    preprocess = ColumnTransformer([
+        ("cat", OneHotEncoder(handle_unknown="ignore"), categorical)
+    ], remainder="passthrough")
+    pipeline = Pipeline([
+        ("preprocess", preprocess),
+        ("model", RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0))
+    ])
+    return pipeline.fit(frame, labels)
+
+
+class TestTreeContributionExplainer:
+    """Testes do explicador de árvores"""
+
+    def setup_method(self):
+        self.frame, self.labels = make_training_frame()
+        self.pipeline = make_pipeline(self.frame, self.labels)
+        self.explainer = TreeContributionExplainer(self.pipeline)
+
+    def test_contributions_reconstruct_probabilities(self):
+        """Valor base + contribuições reproduz o predict_proba do ensemble"""
+        contrib = self.explainer.contributions(self.frame.head(50))
+        reconstructed = self.explainer.base_value + contrib.sum(axis=1)
+        np.testing.assert_allclose(reconstructed, self.pipeline.predict_proba(self.frame.head(50)), atol=1e-9)
+
+    def test_one_hot_columns_grouped_back(self):
+        """Colunas one-hot são agregadas de volta na coluna original"""
+        predictions = self.pipeline.predict(self.frame.head(5))
+        explanations = self.explainer.explain(self.frame.head(5), list(predictions), top_k=3)
+        assert len(explanations) == 5
+        for explanation, predicted in zip(explanations, predictions):
+            assert explanation["class"] == predicted
+            assert len(explanation["top_features"]) == 3
+            for item in explanation["top_features"]:
+                assert item["feature"] in self.frame.columns
+
+    def test_unsupported_model(self):
+        """Modelos sem árvores não têm explicador"""
+        assert build_explainer(object()) is None
+
+
+class TestBatchAndExplainHandler:
+    """Testes do lote e do modo de explicações no handler"""
+
+    def setup_method(self):
+        frame, labels = make_training_frame()
+        self.registry_name = app.MODEL_NAME
+        app.model_pool.register(self.registry_name, "rf-test", make_pipeline(frame, labels),
+                                {"model_name": self.registry_name, "version": "rf-test"})
+
+    def teardown_method(self):
+        app.model_pool._entries.pop((self.registry_name, "rf-test"), None)
+
+    def test_batch_prediction(self):
+        """Lote em `records` retorna uma predição por registro"""
+        event = {"records": [{"Age": 30}, {"Age": 50, "Annual_Income": 120000}]}
+        response = app.handler(event)
+        assert response["statusCode"] == 200
+
+        body = json.loads(response["body"])
+        assert body["count"] == 2
+        assert all(p["prediction"] in ["Good", "Standard", "Poor"] for p in body["predictions"])
+
+    def test_batch_invalid_record(self):
+        """Registro inválido no lote retorna 400 indicando o índice"""
+        response = app.handler({"records": [{"Age": 30}, {"Age": "abc"}]})
+        assert response["statusCode"] == 400
+        assert "Registro 1" in json.loads(response["body"])["message"]
+
+    def test_explain_flag(self):
+        """Com explain=true, cada predição traz as features mais relevantes"""
+        event = {
+            "records": [{"Age": 30}, {"Annual_Income": 120000}],
+            "explain": True,
+            "model_version": "rf-test"
+        }
+        body = json.loads(app.handler(event)["body"])
+        assert body["explanations_available"] is True
+        assert body["explanation_ms"] >= 0
+        for prediction in body["predictions"]:
+            assert prediction["explanation"]["class"] == prediction["prediction"]
+            assert len(prediction["explanation"]["top_features"]) == app.EXPLANATION_TOP_K
+
+    def test_explain_not_requested(self):
+        """Sem a flag, a resposta não carrega explicações"""
+        body = json.loads(app.handler({"data": {"Age": 30}, "model_version": "rf-test"})["body"])
+        assert "explanation" not in body
@@ -0,0 +1,142 @@
+"""
+Testes para o feature store embarcado (perfis por Customer_ID).
+"""
+
+import json
+import os
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import feature_store_builder
+from feature_store import FeatureStore, build_snapshot, enrich_frame, enrich_records
+
+PROFILES = [
+    {"Customer_ID": "CUS_0001", "Age": "52", "Annual_Income": "120000.5", "Credit_Mix": "Good",
+     "Outstanding_Debt": "809.98_", "Monthly_Inhand_Salary": ""},
+    {"Customer_ID": "CUS_0002", "Age": "23", "Annual_Income": "19114.12", "Credit_Mix": "Bad"},
+    {"Customer_ID": "CUS_0001", "Age": "53", "Occupation": "Doctor"},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "feature_store.db")
+    build_snapshot(PROFILES, path, source="teste")
+    return FeatureStore(path)
+
+
+class TestFeatureStore:
+    """Testes da construção e leitura do snapshot"""
+
+    def test_last_row_wins_and_values_are_parsed(self, store):
+        profile = store.get("CUS_0001")
+        assert profile["Age"] == 53.0
+        assert profile["Annual_Income"] == 120000.5
+        assert profile["Outstanding_Debt"] == 809.98
+        assert profile["Occupation"] == "Doctor"
+        assert "Monthly_Inhand_Salary" not in profile
+        assert store.get("CUS_9999") is None
+
+    def test_stats_and_metadata(self, store):
+        store.get_many(["CUS_0001", "CUS_0002", "CUS_0003"])
+        stats = store.stats()
+        assert stats["profiles"] == 2
+        assert stats["lookups"] == 3
+        assert stats["hits"] == 2
+
+    def test_reload_reads_new_snapshot(self, store):
+        build_snapshot([{"Customer_ID": "CUS_0003", "Age": "40"}], store.path)
+        store.reload()
+        assert store.get("CUS_0003")["Age"] == 40.0
+        assert store.get("CUS_0001") is None
+
+    def test_concurrent_lookups(self, store):
+        errors = []
+
+        def lookup():
+            try:
+                for _ in range(50):
+                    assert store.get("CUS_0002")["Credit_Mix"] == "Bad"
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+
+class TestEnrichment:
+    """Testes do preenchimento dos registros a partir do perfil"""
+
+    def test_request_fields_override_profile(self, store):
+        records, found = enrich_records(store, [
+            {"Customer_ID": "CUS_0001", "Annual_Income": 130000},
+            {"Customer_ID": "CUS_9999", "Age": 30},
+        ])
+        assert found == 1
+        assert records[0]["Annual_Income"] == 130000
+        assert records[0]["Age"] == 53.0
+        assert records[1] == {"Customer_ID": "CUS_9999", "Age": 30}
+
+    def test_without_customer_id_is_untouched(self, store):
+        records = [{"Age": 30}]
+        assert enrich_records(store, records) == (records, None)
+        assert enrich_records(None, [{"Customer_ID": "CUS_0001"}])[1] is None
+
+    def test_frame_fills_missing_columns_and_nulls(self, store):
+        frame = pd.DataFrame({"Customer_ID": ["CUS_0002", "CUS_0001", "CUS_9999"],
+                              "Age": [None, 60.0, 35.0]})
+        enriched, found = enrich_frame(store, frame)
+        assert found == 2
+        assert enriched["Age"].tolist() == [23.0, 60.0, 35.0]
+        assert enriched.loc[0, "Credit_Mix"] == "Bad"
+        assert pd.isna(enriched.loc[2, "Credit_Mix"])
+
+
+class TestHandlerWithFeatureStore:
+    """Testes do handler com o feature store configurado"""
+
+    def test_profile_replaces_population_defaults(self, store, monkeypatch):
+        monkeypatch.setattr(app, "feature_store", store)
+        captured = []
+        original = app.validate_and_clean_data
+        monkeypatch.setattr(app, "validate_and_clean_data",
+                            lambda data: captured.append(original(data)) or captured[-1])
+
+        response = app.handler({"data": {"Customer_ID": "CUS_0002", "Monthly_Balance": 150}})
+        body = json.loads(response["body"])
+        assert response["statusCode"] == 200
+        assert body["profiles_found"] == 1
+        assert captured[0]["Annual_Income"] == 19114.12
+        assert captured[0]["Age"] == 23.0
+        assert captured[0]["Monthly_Balance"] == 150.0
+        assert captured[0]["Credit_Mix"] == "Bad"
+
+    def test_no_profiles_key_without_customer_id(self, store, monkeypatch):
+        monkeypatch.setattr(app, "feature_store", store)
+        body = json.loads(app.handler({"data": {"Age": 40}})["body"])
+        assert "profiles_found" not in body
+
+
+class TestBuilder:
+    """Testes do script de geração do snapshot"""
+
+    def test_builds_from_csv(self, tmp_path):
+        csv_path = tmp_path / "train.csv"
+        pd.DataFrame(PROFILES).to_csv(csv_path, index=False)
+        output = tmp_path / "out" / "fs.db"
+        assert feature_store_builder.main(["--csv", str(csv_path), "--output", str(output)]) == 0
+        assert FeatureStore(str(output)).stats()["profiles"] == 2
+
+    def test_missing_customer_id_fails(self, tmp_path):
+        csv_path = tmp_path / "sem_id.csv"
+        pd.DataFrame([{"Age": 30}]).to_csv(csv_path, index=False)
+        assert feature_store_builder.main(["--csv", str(csv_path), "--output", str(tmp_path / "fs.db")]) == 1
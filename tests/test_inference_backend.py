@@ -0,0 +1,190 @@
+"""
+Testes para o backend de inferência em processos (memória compartilhada).
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import inference_backend
+from inference_backend import (
+    InferenceBackendError, ProcessInferenceBackend, decode_frame, encode_frame
+)
+from rule_model import RuleCreditScoreModel
+
+RECORD = {"Age": 35, "Annual_Income": 65000, "Outstanding_Debt": 8000, "Credit_Utilization_Ratio": 28.5}
+
+
+class SlowModel(RuleCreditScoreModel):
+    """Modelo que demora mais que o prazo do backend"""
+
+    def predict(self, X):
+        time.sleep(30)
+        return super().predict(X)
+
+
+class BrokenModel(RuleCreditScoreModel):
+    """Modelo que falha na inferência"""
+
+    def predict(self, X):
+        raise ValueError("entrada inválida")
+
+
+@pytest.fixture(scope="module")
+def backend(tmp_path_factory):
+    # Os trabalhadores precisam importar as classes de teste (e o app) ao carregar o
+    # snapshot; o prazo cobre essa importação em máquinas carregadas
+    previous = os.environ.get("PYTHONPATH")
+    os.environ["PYTHONPATH"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    pool = ProcessInferenceBackend(workers=2, snapshot_dir=str(tmp_path_factory.mktemp("snapshots")),
+                                   timeout=8.0, health_interval=0)
+    pool.start()
+    yield pool
+    pool.stop()
+    if previous is None:
+        os.environ.pop("PYTHONPATH", None)
+    else:
+        os.environ["PYTHONPATH"] = previous
+
+
+def model_input(rows=50):
+    rng = np.random.default_rng(rows)
+    records = [dict(RECORD, Annual_Income=float(income), Occupation=str(occupation))
+               for income, occupation in zip(rng.integers(10000, 120000, rows),
+                                             rng.choice(["Engineer", "Doctor", "Lawyer"], rows))]
+    return app.prepare_model_input(records)
+
+
+class TestEncoding:
+    """Codificação do lote para a memória compartilhada"""
+
+    def test_roundtrip(self):
+        frame = pd.DataFrame({
+            "Age": np.array([30, 41, 52], dtype=np.int64),
+            "Income": [1.5, np.nan, 3.0],
+            "Occupation": ["Engineer", None, "Engineer"],
+            "Flag": [True, False, True]
+        })
+        layout, values, codes = encode_frame(frame)
+        assert [c for c, _ in layout["numeric"]] == ["Age", "Income"]
+        assert layout["categorical"][0] == ("Occupation", ["Engineer"])
+        assert codes.dtype == np.int32
+
+        decoded = decode_frame(layout, values, codes)
+        assert decoded.columns.tolist() == frame.columns.tolist()
+        assert decoded["Age"].dtype == np.int64
+        pd.testing.assert_series_equal(decoded["Income"], frame["Income"])
+        assert decoded["Occupation"].tolist() == ["Engineer", None, "Engineer"]
+        assert decoded["Flag"].tolist() == [True, False, True]
+
+
+class TestProcessBackend:
+    """Inferência nos processos trabalhadores"""
+
+    def test_matches_local_inference(self, backend):
+        X = model_input(400)
+        y = RuleCreditScoreModel().predict(X)
+        forest = RandomForestClassifier(n_estimators=20, random_state=0).fit(X[app.MODEL_NUMERIC_FEATURES], y)
+
+        cases = [(RuleCreditScoreModel(), X), (forest, X[app.MODEL_NUMERIC_FEATURES])]
+        for model, frame in cases:
+            predictions, proba, classes = backend.predict_arrays(model, frame)
+            assert predictions.tolist() == model.predict(frame).tolist()
+            np.testing.assert_allclose(proba, model.predict_proba(frame))
+            assert classes == list(model.classes_)
+
+        assert backend.stats()["models"] == 2
+        assert backend.stats()["shared_memory_bytes"] > 0
+
+        # O snapshot acompanha a vida do modelo
+        path = backend._snapshots[forest][1]
+        del cases, forest, model
+        assert not os.path.exists(path)
+
+    def test_unpicklable_model_stays_local(self, backend):
+        model = RuleCreditScoreModel()
+        model.hook = lambda X: X
+        assert backend.predict_arrays(model, model_input(3)) is None
+
+    def test_model_error_is_reported(self, backend):
+        with pytest.raises(InferenceBackendError, match="entrada inválida"):
+            backend.predict_arrays(BrokenModel(), model_input(3))
+        assert backend.stats()["alive"] == 2
+
+    def test_timeout_restarts_worker(self, backend):
+        restarts = backend.stats()["restarts"]
+        with pytest.raises(InferenceBackendError, match="Prazo"):
+            backend.predict_arrays(SlowModel(), model_input(3))
+        assert backend.stats()["restarts"] == restarts + 1
+        assert backend.predict_arrays(RuleCreditScoreModel(), model_input(3)) is not None
+
+    def test_health_check_restarts_dead_worker(self, backend):
+        restarts = backend.stats()["restarts"]
+        backend._slots[0].process.kill()
+        backend._slots[0].process.wait()
+
+        assert backend.check_health() == 1
+        assert backend.stats()["restarts"] == restarts + 1
+        assert backend.stats()["alive"] == 2
+        for _ in range(4):
+            assert backend.predict_arrays(RuleCreditScoreModel(), model_input(3)) is not None
+
+
+class TestAppIntegration:
+    """A API usa o backend configurado e cai para a inferência local em falhas"""
+
+    def test_handler_uses_backend(self, backend, monkeypatch):
+        monkeypatch.setattr(app, "inference_backend", backend)
+        calls = backend.stats()["calls"]
+        response = app.handler({"body": json.dumps({"data": RECORD})})
+
+        assert response["statusCode"] == 200
+        assert json.loads(response["body"])["prediction"] in ("Good", "Standard", "Poor")
+        assert backend.stats()["calls"] == calls + 1
+        assert app.runtime_stats()["inference_backend"]["backend"] == "process"
+
+    def test_fallback_model_stays_local(self, backend, monkeypatch):
+        monkeypatch.setattr(app, "inference_backend", backend)
+        calls = backend.stats()["calls"]
+        app.predict_arrays(app.fallback_model, model_input(3))
+        assert backend.stats()["calls"] == calls
+
+    def test_shared_memory_failure_runs_locally(self, backend, monkeypatch):
+        def full_shm(*args, **kwargs):
+            raise OSError(28, "No space left on device")
+
+        for worker in backend._slots:
+            worker.release_segment()
+        monkeypatch.setattr(inference_backend.shared_memory, "SharedMemory", full_shm)
+        monkeypatch.setattr(app, "inference_backend", backend)
+        monkeypatch.setattr(app, "inference_fallbacks", 0)
+        failures = backend.stats()["failures"]
+
+        with pytest.raises(InferenceBackendError, match="Memória compartilhada"):
+            backend.predict_arrays(RuleCreditScoreModel(), model_input(3))
+        predictions, _, _ = app.predict_arrays(RuleCreditScoreModel(), model_input(3))
+        assert len(predictions) == 3
+        assert app.inference_fallbacks == 1
+        assert backend.stats()["failures"] == failures + 2
+
+        monkeypatch.undo()
+        assert backend.predict_arrays(RuleCreditScoreModel(), model_input(3)) is not None
+
+    def test_backend_failure_runs_locally(self, monkeypatch):
+        class FailingBackend:
+            def predict_arrays(self, model, frame):
+                raise InferenceBackendError("trabalhador encerrado")
+
+        monkeypatch.setattr(app, "inference_backend", FailingBackend())
+        monkeypatch.setattr(app, "inference_fallbacks", 0)
+        predictions, _, _ = app.predict_arrays(RuleCreditScoreModel(), model_input(3))
+        assert len(predictions) == 3
+        assert app.inference_fallbacks == 1
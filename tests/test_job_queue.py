@@ -0,0 +1,208 @@
+"""
+Testes para a fila de jobs assíncronos e o trabalhador (queue_worker.py).
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import queue_worker
+import server
+from job_queue import JsonlResultSink, SqliteJobQueue, SqliteResultSink, open_sink
+
+RECORD = {"Age": 35, "Annual_Income": 65000, "Outstanding_Debt": 8000, "Credit_Utilization_Ratio": 28.5}
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return SqliteJobQueue(str(tmp_path / "jobs.db"), visibility_timeout=30, max_attempts=2)
+
+
+def drain(job_queue, handler=app.handler, **kwargs):
+    worker = queue_worker.JobWorker(job_queue, open_sink("", job_queue), handler,
+                                    retry_delay=0, idle_sleep=0.01, **kwargs)
+    return worker.run(drain=True, idle_exit=0.2)
+
+
+class TestSqliteJobQueue:
+    """Entrega com prazo de visibilidade, confirmação e reentrega"""
+
+    def test_receive_ack_and_idempotent_enqueue(self, job_queue):
+        ids = job_queue.enqueue([{"data": RECORD}] * 3)
+        assert job_queue.enqueue([{"data": RECORD}], job_ids=[ids[0]]) == [ids[0]]
+
+        jobs = job_queue.receive(2)
+        assert [job["id"] for job in jobs] == ids[:2]
+        assert jobs[0]["payload"] == {"data": RECORD} and jobs[0]["attempts"] == 1
+        assert job_queue.stats()["queued"] == 1 and job_queue.stats()["in_flight"] == 2
+        assert job_queue.status(ids[0])["status"] == "in_flight"
+
+        assert job_queue.ack(jobs) == 2
+        assert job_queue.status(ids[0]) is None
+        assert [job["id"] for job in job_queue.receive(10)] == [ids[2]]
+
+    def test_expired_visibility_redelivers_and_dead_letters(self, job_queue):
+        [job_id] = job_queue.enqueue([{"data": RECORD}])
+        first = job_queue.receive(1, visibility_timeout=0.05)
+        assert job_queue.receive(1) == []
+        time.sleep(0.1)
+
+        second = job_queue.receive(1, visibility_timeout=0.05)
+        assert second[0]["attempts"] == 2
+        # A entrega antiga não confirma o job reentregue
+        assert job_queue.ack(first) == 0
+        time.sleep(0.1)
+
+        assert job_queue.receive(1) == []
+        assert job_queue.status(job_id)["status"] == "dead"
+        assert job_queue.stats()["dead"] == 1
+
+    def test_release_with_delay(self, job_queue):
+        job_queue.enqueue([{"data": RECORD}])
+        jobs = job_queue.receive(1)
+        assert job_queue.release(jobs, delay=0.1, error="HTTP 500") == 1
+        assert job_queue.receive(1) == []
+        time.sleep(0.15)
+        assert job_queue.receive(1)[0]["attempts"] == 2
+
+    def test_concurrent_consumers_do_not_share_jobs(self, job_queue):
+        job_queue.enqueue([{"data": RECORD}] * 200)
+        consumers = [SqliteJobQueue(job_queue.path) for _ in range(4)]
+        received = []
+
+        def consume(consumer):
+            while True:
+                jobs = consumer.receive(7)
+                if not jobs:
+                    return
+                received.extend(job["id"] for job in jobs)
+
+        threads = [threading.Thread(target=consume, args=(c,)) for c in consumers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(received) == len(set(received)) == 200
+
+
+class TestJobWorker:
+    """Pontuação pelo handler, isolamento de registros inválidos e reentrega"""
+
+    def test_scores_and_isolates_invalid_records(self, job_queue):
+        ids = job_queue.enqueue([{"data": RECORD}, {"data": dict(RECORD, Age="trinta")}, RECORD, "texto"])
+        report = drain(job_queue, batch_size=10, threads=2)
+
+        assert report["succeeded"] == 2 and report["failed"] == 2
+        sink = SqliteResultSink(job_queue.path)
+        ok = sink.get(ids[0])
+        assert ok["status"] == "succeeded"
+        assert ok["result"]["prediction"] in ("Good", "Standard", "Poor")
+        assert ok["result"]["model_version"] == str(app.model_info.get("version"))
+        assert sink.get(ids[2])["status"] == "succeeded"
+        assert "Age" in sink.get(ids[1])["error"]
+        assert sink.get(ids[3])["status"] == "failed"
+        assert job_queue.stats()["queued"] == job_queue.stats()["in_flight"] == 0
+
+    def test_transient_failures_are_redelivered(self, job_queue):
+        [job_id] = job_queue.enqueue([{"data": RECORD}])
+        calls = []
+
+        def flaky(event):
+            calls.append(event)
+            if len(calls) == 1:
+                return {"statusCode": 500, "body": json.dumps({"error": "Erro na predição"})}
+            return app.handler(event)
+
+        report = drain(job_queue, handler=flaky)
+        assert report["retried"] == 1 and report["succeeded"] == 1
+        assert calls[0]["headers"]["X-Request-ID"].startswith("jobs-")
+        assert SqliteResultSink(job_queue.path).get(job_id)["status"] == "succeeded"
+
+    def test_sink_failure_does_not_stop_the_worker(self, job_queue):
+        [job_id] = job_queue.enqueue([{"data": RECORD}])
+        sink = SqliteResultSink(job_queue.path)
+        write = sink.write
+        calls = []
+
+        def flaky_write(results):
+            calls.append(results)
+            if len(calls) == 1:
+                raise OSError("disco cheio")
+            return write(results)
+
+        sink.write = flaky_write
+        worker = queue_worker.JobWorker(job_queue, sink, app.handler, retry_delay=0, idle_sleep=0.01)
+        report = worker.run(drain=True, idle_exit=0.2)
+
+        assert report["errors"] == 1 and report["succeeded"] == 1
+        assert len(calls) == 2
+        assert sink.get(job_id)["status"] == "succeeded"
+        assert job_queue.stats()["queued"] == job_queue.stats()["in_flight"] == 0
+
+    def test_jsonl_sink(self, job_queue, tmp_path):
+        job_queue.enqueue([{"data": RECORD}] * 3)
+        worker = queue_worker.JobWorker(job_queue, JsonlResultSink(str(tmp_path / "resultados")),
+                                        app.handler, idle_sleep=0.01)
+        worker.run(drain=True, idle_exit=0.2)
+        [name] = os.listdir(tmp_path / "resultados")
+        lines = (tmp_path / "resultados" / name).read_text().splitlines()
+        assert [json.loads(line)["status"] for line in lines] == ["succeeded"] * 3
+
+    def test_each_process_gets_its_own_spool(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("TELEMETRY_SPOOL_DIR", str(tmp_path / "spool"))
+        first = queue_worker.isolate_telemetry_spool(0)
+        monkeypatch.setenv("TELEMETRY_SPOOL_DIR", str(tmp_path / "spool"))
+        second = queue_worker.isolate_telemetry_spool(1)
+
+        assert first == str(tmp_path / "spool" / "worker-0")
+        assert second == str(tmp_path / "spool" / "worker-1")
+        assert os.environ["TELEMETRY_SPOOL_DIR"] == second
+
+    def test_worker_processes(self, tmp_path):
+        path = str(tmp_path / "jobs.db")
+        jobs_file = tmp_path / "jobs.jsonl"
+        jobs_file.write_text("\n".join(json.dumps({"data": dict(RECORD, Age=20 + i)}) for i in range(60)))
+        assert queue_worker.main(["--queue", path, "--enqueue", str(jobs_file)]) == 0
+
+        output = tmp_path / "worker.json"
+        assert queue_worker.main(["--queue", path, "--processes", "2", "--batch-size", "10",
+                                  "--drain", "--idle-exit", "0.5", "--output", str(output)]) == 0
+        report = json.loads(output.read_text())
+        assert report["processes"] == 2
+        assert report["succeeded"] == 60
+
+
+class TestServerEndpoints:
+    """Envio e consulta de jobs pelo servidor HTTP"""
+
+    def test_submit_and_poll(self, job_queue, monkeypatch):
+        monkeypatch.setattr(server, "job_queue", job_queue)
+        monkeypatch.setattr(server, "job_results", open_sink("", job_queue))
+        client = server.app.test_client()
+
+        response = client.post('/jobs', json={"records": [RECORD, RECORD]}, headers={"X-Model-Version": "latest"})
+        assert response.status_code == 202
+        ids = response.get_json()["job_ids"]
+        assert client.get(f'/jobs/{ids[0]}').get_json()["status"] == "queued"
+        assert client.get('/metrics').get_json()["jobs"]["queued"] == 2
+
+        drain(job_queue)
+        result = client.get(f'/jobs/{ids[1]}').get_json()
+        assert result["status"] == "succeeded"
+        assert "prediction" in result["result"]
+
+        assert client.get('/jobs/desconhecido').status_code == 404
+        assert client.post('/jobs', json={"records": []}).status_code == 400
+        assert client.post('/jobs', json={"data": RECORD, "job_ids": ["a", "b"]}).status_code == 400
+
+    def test_disabled_without_queue(self, monkeypatch):
+        monkeypatch.setattr(server, "job_queue", None)
+        client = server.app.test_client()
+        assert client.post('/jobs', json={"data": RECORD}).status_code == 404
+        assert client.get('/jobs/x').status_code == 404
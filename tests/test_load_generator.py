@@ -0,0 +1,90 @@
+"""
+Testes para o gerador de carga e o esquema de entrada.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import load_generator
+from schema import payload_from_drift_row, read_drift_records, synthetic_record
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Servidor local mínimo que responde 200 a qualquer POST"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSchema:
+    """Testes dos utilitários de esquema"""
+
+    def test_synthetic_record_is_valid(self):
+        """Registros sintéticos passam pela validação da API"""
+        rng = random.Random(0)
+        for _ in range(20):
+            cleaned = app.validate_and_clean_data(synthetic_record(rng, missing_rate=0.3))
+            assert 18 <= cleaned['Age'] <= 100
+
+    def test_replay_skips_malformed_rows(self, tmp_path):
+        """Linhas com colunas a mais são ignoradas e contadas"""
+        csv_file = tmp_path / "2025-01-01_credit_score_prediction_data.csv"
+        csv_file.write_text(
+            "Age,Annual_Income,Occupation,credit_score_prediction,timestamp,model_version\n"
+            "30.0,50000.0,Engineer,Good,01-01-2025 10:00,1\n"
+            "40.0,60000.0,Personal Loan, Auto Loan,Good,01-01-2025 10:00,1\n"
+        )
+        skipped = [0]
+        rows = list(read_drift_records(str(tmp_path), skipped))
+        assert skipped == [1]
+        assert payload_from_drift_row(rows[0]) == {
+            "Age": "30.0", "Annual_Income": "50000.0", "Occupation": "Engineer"
+        }
+
+
+class TestLoadGenerator:
+    """Testes do gerador de carga"""
+
+    def test_percentile(self):
+        values = sorted(float(i) for i in range(1, 101))
+        assert load_generator.percentile(values, 50) == 50.0
+        assert load_generator.percentile(values, 99) == 99.0
+        assert load_generator.percentile(values, 100) == 100.0
+
+    def test_closed_loop_correction(self):
+        """Resposta lenta gera as amostras que teriam sido observadas"""
+        samples = load_generator.expected_interval_corrections(0.5, 0.1)
+        assert [round(s, 3) for s in samples] == [0.5, 0.4, 0.3, 0.2, 0.1]
+        assert load_generator.expected_interval_corrections(0.5, None) == [0.5]
+
+    def test_open_loop_against_local_server(self, tmp_path):
+        """Malha aberta atinge a taxa alvo contra um servidor local"""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            output = tmp_path / "report.json"
+            exit_code = load_generator.main([
+                "--url", f"http://127.0.0.1:{server.server_address[1]}",
+                "--rate", "50", "--duration", "1", "--output", str(output)
+            ])
+        finally:
+            server.shutdown()
+
+        report = json.loads(output.read_text())
+        assert exit_code == 0
+        assert report["mode"] == "open"
+        assert report["ok"] == report["completed"] == report["sent"] == 50
+        assert report["latency_corrected"]["p50_ms"] >= 0
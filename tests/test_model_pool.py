@@ -0,0 +1,128 @@
+"""
+Testes para o pool de versões do modelo.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+from model_pool import ModelPool, ModelVersionUnavailable
+
+
+class FakeModel:
+    """Modelo mínimo com tamanho controlado"""
+
+    def __init__(self, label, payload_size=0):
+        self.label = label
+        self.payload = b"x" * payload_size
+        self.classes_ = ["Good", "Standard", "Poor"]
+
+    def predict(self, X):
+        return [self.label] * len(X)
+
+
+class TestModelPool:
+    """Testes do pool LRU de modelos"""
+
+    def setup_method(self):
+        self.loaded = []
+
+        def loader(name, version):
+            self.loaded.append(version)
+            if version == "missing":
+                raise FileNotFoundError(version)
+            return FakeModel(version), {"model_name": name, "version": version, "source": "test"}
+
+        self.pool = ModelPool(loader=loader, max_bytes=10 * 1024 * 1024, max_models=3)
+        self.pool.register("credit", "1", FakeModel("1"), {"version": "1"}, default=True)
+
+    def test_default_version(self):
+        """Sem versão pedida, retorna o modelo padrão"""
+        model, info = self.pool.get()
+        assert model.label == "1"
+        assert self.pool.get("latest")[1]["version"] == "1"
+
+    def test_loads_on_demand_once(self):
+        """Versões ausentes são carregadas uma única vez e reaproveitadas"""
+        self.pool.get("2")
+        self.pool.get("2")
+        assert self.loaded == ["2"]
+        assert self.pool.stats()["hits"] == 1
+
+    def test_lru_eviction_keeps_default(self):
+        """Excedendo o limite, remove a versão menos usada, nunca a padrão"""
+        self.pool.get("2")
+        self.pool.get("3")
+        self.pool.get("2")
+        self.pool.get("4")
+
+        resident = {entry["version"] for entry in self.pool.stats()["resident"]}
+        assert resident == {"1", "2", "4"}
+        assert self.pool.evictions == 1
+
+    def test_memory_budget(self):
+        """Modelos grandes são removidos para respeitar o orçamento de memória"""
+        pool = ModelPool(loader=lambda n, v: (FakeModel(v, 600_000), {"version": v}),
+                         max_bytes=1_000_000, max_models=10)
+        pool.register("credit", "1", FakeModel("1"), {"version": "1"}, default=True)
+        pool.get("2")
+        pool.get("3")
+
+        resident = {entry["version"] for entry in pool.stats()["resident"]}
+        assert resident == {"1", "3"}
+
+    def test_unavailable_version(self):
+        """Falha no carregamento vira ModelVersionUnavailable e não deixa lock pendente"""
+        with pytest.raises(ModelVersionUnavailable):
+            self.pool.get("missing")
+        assert self.pool._loading == {}
+
+    def test_versions_resolve_against_registry_name(self):
+        """Versão sob demanda usa o nome do Registry, não o do modelo padrão local"""
+        requested = []
+        pool = ModelPool(loader=lambda n, v: requested.append((n, v)) or (FakeModel(v), {"version": v}),
+                         max_bytes=10 * 1024 * 1024, max_models=3, registry_name="fiap-mlops-score-model")
+        pool.register("local_model", "1.0", FakeModel("1.0"), {"version": "1.0"}, default=True)
+
+        pool.get("4")
+        assert requested == [("fiap-mlops-score-model", "4")]
+        assert pool.get()[1]["version"] == "1.0"
+
+
+class TestVersionRouting:
+    """Testes de roteamento de versão no handler"""
+
+    def setup_method(self):
+        self.registry_name = app.MODEL_NAME
+        app.model_pool.register(self.registry_name, "canary", app.model,
+                                {"model_name": self.registry_name, "version": "canary"})
+
+    def teardown_method(self):
+        app.model_pool._entries.pop((self.registry_name, "canary"), None)
+
+    def test_header_selects_version(self):
+        """Header X-Model-Version escolhe a versão usada na predição"""
+        event = {
+            "body": json.dumps({"data": {"Age": 30}}),
+            "headers": {"x-model-version": "canary"}
+        }
+        body = json.loads(app.handler(event)["body"])
+        assert body["model_version"] == "canary"
+
+    def test_body_field_selects_version(self):
+        """Campo model_version do corpo também escolhe a versão"""
+        body = json.loads(app.handler({"data": {"Age": 30}, "model_version": "canary"})["body"])
+        assert body["model_version"] == "canary"
+
+    def test_unknown_version_returns_404(self, monkeypatch):
+        """Versão inexistente retorna 404"""
+        def failing_loader(name, version):
+            raise FileNotFoundError(version)
+
+        monkeypatch.setattr(app.model_pool, "loader", failing_loader)
+        response = app.handler({"data": {"Age": 30}, "model_version": "does-not-exist"})
+        assert response["statusCode"] == 404
@@ -0,0 +1,77 @@
+"""
+Testes para a resolução paralela das fontes do modelo.
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from model_resolver import CircuitBreaker, ModelSource, ModelSourceResolver
+
+
+def source(name, priority, delay=0.0, available=True, fail=False, load_delay=0.0, local=False):
+    """Cria uma fonte fake com atraso de sondagem (e de carregamento) configurável"""
+    def load():
+        time.sleep(load_delay)
+        return name, {"source": name}
+
+    def probe():
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"{name} indisponível")
+        if not available:
+            return None
+        return load
+    return ModelSource(name, priority, probe, local=local)
+
+
+class TestModelSourceResolver:
+    """Testes do resolvedor de fontes"""
+
+    def setup_method(self):
+        self.breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+        self.resolver = ModelSourceResolver(self.breaker, deadline=2.0, probe_timeout=0.3)
+
+    def test_prefers_highest_priority(self):
+        """Com várias fontes disponíveis, escolhe a de maior prioridade"""
+        loaded, info = self.resolver.resolve([source("local", 10), source("registry", 0, delay=0.05)])
+        assert info["source"] == "registry"
+
+    def test_slow_source_is_bounded(self):
+        """Fonte lenta estoura o timeout de sondagem e a próxima é usada"""
+        started = time.monotonic()
+        loaded, info = self.resolver.resolve([source("registry", 0, delay=5), source("local", 10)])
+        assert info["source"] == "local"
+        assert time.monotonic() - started < 1.0
+
+    def test_probes_run_in_parallel(self):
+        """Sondas lentas não se somam: o tempo total é o da mais lenta"""
+        started = time.monotonic()
+        self.resolver.resolve([source(f"run{i}", i, delay=0.2, available=False) for i in range(5)]
+                              + [source("local", 10)])
+        assert time.monotonic() - started < 0.6
+
+    def test_circuit_breaker_skips_dead_source(self):
+        """Falha recente abre o breaker e a fonte é pulada no recarregamento"""
+        self.resolver.resolve([source("registry", 0, fail=True), source("local", 10)])
+        assert not self.breaker.allow("registry")
+
+        self.resolver.resolve([source("registry", 0), source("local", 10)])
+        statuses = {r["source"]: r.get("status") for r in self.resolver.last_report}
+        assert statuses["registry"] == "skipped_circuit_open"
+
+    def test_returns_none_when_nothing_loads(self):
+        """Sem fontes disponíveis, retorna None para o chamador usar o fallback"""
+        assert self.resolver.resolve([source("registry", 0, available=False)]) is None
+
+    def test_load_timeout_falls_through_to_local(self):
+        """Download remoto lento não impede o arquivo local (reserva do prazo)"""
+        resolver = ModelSourceResolver(self.breaker, deadline=1.0, probe_timeout=0.3, local_reserve=0.4)
+        started = time.monotonic()
+        loaded, info = resolver.resolve([source("registry", 0, load_delay=5),
+                                         source("local", 100, load_delay=0.2, local=True)])
+        assert info["source"] == "local"
+        assert time.monotonic() - started < 1.5
+        statuses = {r["source"]: r.get("status") for r in resolver.last_report}
+        assert statuses == {"registry": "load_timeout", "local": "loaded"}
@@ -0,0 +1,164 @@
+"""
+Testes para o registro local de auditoria das predições.
+"""
+
+import base64
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import server
+from prediction_store import PredictionStore, parse_time
+
+RECORD = {"Age": 35, "Annual_Income": 65000, "Outstanding_Debt": 8000, "Credit_Utilization_Ratio": 28.5}
+CLASSES = ["Good", "Standard", "Poor"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    prediction_store = PredictionStore(str(tmp_path / "predictions.db"), retention_days=7,
+                                       batch_size=100, flush_interval=0.05)
+    yield prediction_store
+    prediction_store.stop()
+
+
+class TestPredictionStore:
+    """Gravação em lotes, consultas indexadas e retenção"""
+
+    def test_record_and_query(self, store):
+        store.start()
+        proba = np.array([[0.7, 0.2, 0.1], [0.1, 0.3, 0.6]])
+        assert store.record("req-1", "modelo", "3", np.array(["Good", "Poor"]), proba, CLASSES,
+                            features=pd.DataFrame([RECORD, RECORD]), applicant_keys=["C1", None],
+                            ts=parse_time("2026-03-10T09:00:00"))
+        store.record("req-2", "modelo", "3", [{"prediction": "Standard", "confidence": 0.5,
+                                               "probabilities": {"Standard": 0.5, "Good": 0.3, "Poor": 0.2}}],
+                     features=[RECORD], applicant_keys=["C1"], degraded=True,
+                     ts=parse_time("2026-03-11T09:00:00"))
+        assert store.wait_idle()
+
+        by_request = store.query(request_id="req-1")
+        assert [r["prediction"] for r in by_request] == ["Good", "Poor"]
+        assert by_request[0]["probabilities"] == {"Good": 0.7, "Standard": 0.2, "Poor": 0.1}
+        assert by_request[0]["confidence"] == 0.7
+        assert by_request[0]["features"]["Annual_Income"] == 65000
+        assert by_request[1]["applicant_key"] is None
+
+        history = store.query(applicant_key="C1")
+        assert [r["request_id"] for r in history] == ["req-2", "req-1"]
+        assert history[0]["degraded"] is True
+        assert history[0]["timestamp"] == "2026-03-11T09:00:00"
+
+        window = store.query(applicant_key="C1", since="2026-03-10T00:00:00", until="2026-03-11T00:00:00")
+        assert [r["request_id"] for r in window] == ["req-1"]
+        assert store.stats()["written"] == 3
+
+    def test_lookup_uses_indexes(self, store):
+        plans = {
+            "request_id": "SELECT * FROM predictions WHERE request_id = 'x'",
+            "applicant": "SELECT * FROM predictions WHERE applicant_key = 'x' AND ts >= 0 ORDER BY ts DESC",
+            "time": "SELECT * FROM predictions WHERE ts >= 0 AND ts < 1"
+        }
+        for query in plans.values():
+            plan = " ".join(row[-1] for row in store._writer.execute(f"EXPLAIN QUERY PLAN {query}"))
+            assert "USING INDEX" in plan, plan
+
+    def test_lookup_is_fast_on_large_store(self, store):
+        predictions = np.array(["Good"] * 1000)
+        for i in range(50):
+            store.record(f"req-{i}", "modelo", "1", predictions,
+                         applicant_keys=[f"C{i}-{j}" for j in range(1000)], ts=1_000_000 + i)
+        store.flush()
+
+        started = time.perf_counter()
+        rows = store.query(applicant_key="C42-7")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        assert [r["request_id"] for r in rows] == ["req-42"]
+        assert elapsed_ms < 50
+
+    def test_full_queue_drops_batches(self, tmp_path):
+        small = PredictionStore(str(tmp_path / "small.db"), max_pending=3)
+        assert small.record("a", "m", "1", ["Good", "Good"])
+        assert not small.record("b", "m", "1", ["Good", "Good"])
+        assert small.stats()["dropped"] == 2
+        small.flush()
+        assert small.stats()["pending"] == 0
+
+    def test_compaction_respects_retention(self, store):
+        now = time.time()
+        store.record("old", "m", "1", ["Poor"] * 3, ts=now - 10 * 86400)
+        store.record("new", "m", "1", ["Good"], ts=now - 86400)
+        store.flush()
+
+        assert store.compact(now=now) == 3
+        assert store.query(request_id="old") == []
+        assert len(store.query(request_id="new")) == 1
+        assert store.stats()["compacted"] == 3
+
+
+class TestApiIntegration:
+    """A API registra cada predição e o servidor expõe a consulta administrativa"""
+
+    @pytest.fixture
+    def api_store(self, store, monkeypatch):
+        monkeypatch.setattr(app, "prediction_store", store)
+        monkeypatch.setattr(server, "ADMIN_TOKEN", "segredo")
+        return store
+
+    def test_json_batch_is_recorded(self, api_store):
+        client = server.app.test_client()
+        response = client.post('/predict/batch', json={"records": [dict(RECORD, Customer_ID="CUS_1"), RECORD]},
+                               headers={"X-Request-ID": "pedido-123"})
+        body = response.get_json()
+        assert body["request_id"] == "pedido-123"
+        api_store.flush()
+
+        rows = client.get('/admin/predictions?applicant=CUS_1', headers={"X-Admin-Token": "segredo"}).get_json()
+        assert rows["count"] == 1
+        assert rows["predictions"][0]["request_id"] == "pedido-123"
+        assert rows["predictions"][0]["prediction"] == body["predictions"][0]["prediction"]
+        assert rows["predictions"][0]["probabilities"] == body["predictions"][0]["probabilities"]
+
+        assert client.get('/admin/predictions', headers={"X-Admin-Token": "segredo"}).status_code == 400
+        assert client.get('/admin/predictions?since=ontem', headers={"X-Admin-Token": "segredo"}).status_code == 400
+        assert client.get('/admin/predictions?request_id=x').status_code == 403
+        assert app.runtime_stats()["prediction_store"]["written"] == 2
+
+    def test_generated_request_id(self, api_store):
+        body = json.loads(app.handler({"body": json.dumps({"data": RECORD})})["body"])
+        api_store.flush()
+        assert len(body["request_id"]) == 32
+        assert api_store.query(request_id=body["request_id"])[0]["features"]["Age"] == 35
+
+    def test_columnar_batch_is_recorded(self, api_store):
+        pytest.importorskip("pyarrow")
+        import columnar
+
+        fmt = columnar.ARROW_STREAM
+        frame = pd.DataFrame([dict(RECORD, Customer_ID=f"CUS_{i}") for i in range(3)])
+        response = app.handler({
+            "body": base64.b64encode(columnar.write_frame(frame, fmt)).decode("ascii"),
+            "isBase64Encoded": True,
+            "headers": {"Content-Type": fmt, "Accept": fmt, "X-Request-ID": "colunar-1"}
+        })
+        assert response["headers"]["X-Request-ID"] == "colunar-1"
+        api_store.flush()
+        rows = api_store.query(request_id="colunar-1")
+        assert [r["applicant_key"] for r in rows] == ["CUS_0", "CUS_1", "CUS_2"]
+        assert set(rows[0]["probabilities"]) == set(CLASSES)
+
+    def test_disabled_store(self, monkeypatch):
+        monkeypatch.setattr(app, "prediction_store", None)
+        monkeypatch.setattr(server, "ADMIN_TOKEN", "segredo")
+        body = json.loads(app.handler({"body": json.dumps({"data": RECORD})})["body"])
+        assert "request_id" not in body
+        response = server.app.test_client().get('/admin/predictions?request_id=x',
+                                                headers={"X-Admin-Token": "segredo"})
+        assert response.status_code == 404
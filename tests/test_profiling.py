@@ -0,0 +1,232 @@
+"""
+Testes para o profiling de memória e CPU do pipeline.
+"""
+
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import server
+from profiling import AllocationProfiler, CpuSampler, StageTimer
+
+PAYLOAD = {
+    "data": {
+        "Age": 35, "Annual_Income": 65000, "Monthly_Inhand_Salary": 5200,
+        "Num_Bank_Accounts": 2, "Num_Credit_Card": 2, "Interest_Rate": 11.5,
+        "Num_of_Loan": 1, "Outstanding_Debt": 8000, "Credit_Utilization_Ratio": 28.5,
+        "Total_EMI_per_month": 950, "Amount_invested_monthly": 800, "Monthly_Balance": 3200
+    }
+}
+
+STAGES = {"validate_and_clean_data", "prepare_model_input", "inference", "telemetry"}
+
+
+def leaky_allocation(store):
+    store.append(bytearray(256 * 1024))
+
+
+class TestAllocationProfiler:
+    """Testes da atribuição de alocações por etapa"""
+
+    def teardown_method(self):
+        if app.profiler.active:
+            app.profiler.stop()
+
+    def test_inactive_profiler_is_noop(self):
+        """Desligado, o profiler não liga o tracemalloc nem guarda contadores"""
+        profiler = AllocationProfiler()
+        with profiler.request():
+            with profiler.stage("x"):
+                pass
+        assert profiler.report() == {"active": False}
+
+    def test_handler_stages_are_reported(self):
+        """Com o profiling ligado, cada etapa do handler aparece no relatório"""
+        app.profiler.start()
+        for _ in range(3):
+            assert app.handler(dict(PAYLOAD))["statusCode"] == 200
+
+        report = app.profiler.report()
+        assert report["requests"]["count"] == 3
+        assert STAGES <= set(report["stages"])
+        assert all(report["stages"][name]["calls"] == 3 for name in STAGES)
+        assert report["requests"]["max_peak_bytes"] > 0
+
+        final = app.profiler.stop()
+        assert final["active"] is True
+        assert not tracemalloc.is_tracing()
+
+    def test_detail_mode_and_growth_find_allocation_site(self):
+        """Snapshots por etapa e crescimento desde o início apontam a linha que retém memória"""
+        profiler = AllocationProfiler()
+        profiler.start(detail_requests=1)
+        store = []
+        try:
+            with profiler.request():
+                with profiler.stage("leaky"):
+                    leaky_allocation(store)
+            report = profiler.report()
+        finally:
+            profiler.stop()
+
+        stage = report["stages"]["leaky"]
+        assert stage["net_bytes"] >= 256 * 1024
+        assert any("test_profiling.py" in site["site"] for site in stage["top_sites"])
+        assert report["top_growth_since_start"][0]["size_diff"] >= 256 * 1024
+        assert report["detail_requests_remaining"] == 0
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+class TestStageTimer:
+    """Testes do cronômetro por etapa"""
+
+    def test_handler_stages_are_timed(self, monkeypatch):
+        """Cada etapa do handler tem seu tempo, e a requisição inteira fica em total"""
+        timer = StageTimer()
+        monkeypatch.setattr(app, "profiler", timer)
+        assert app.handler(dict(PAYLOAD))["statusCode"] == 200
+
+        stages = timer.last()
+        assert STAGES | {"total"} <= set(stages)
+        assert stages["total"] >= sum(stages[name] for name in STAGES)
+
+
+class TestCpuSampler:
+    """Testes do profile de CPU por amostragem"""
+
+    def test_capture_finds_busy_function(self):
+        """A função que consome CPU aparece entre as mais amostradas"""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,))
+        worker.start()
+        try:
+            result = CpuSampler().capture(0.3, interval=0.005)
+        finally:
+            stop.set()
+            worker.join()
+
+        assert result["samples"] > 0
+        assert any(item["function"].startswith("busy_loop") for item in result["top_inclusive"])
+
+
+class TestAdminEndpoints:
+    """Testes dos endpoints administrativos do servidor"""
+
+    def setup_method(self):
+        self.client = server.app.test_client()
+
+    def teardown_method(self):
+        if app.profiler.active:
+            app.profiler.stop()
+
+    def test_disabled_without_token(self, monkeypatch):
+        """Sem ADMIN_TOKEN configurado os endpoints não existem"""
+        monkeypatch.setattr(server, "ADMIN_TOKEN", None)
+        assert self.client.get("/admin/profile/memory").status_code == 404
+
+    def test_requires_valid_token(self, monkeypatch):
+        """Token errado é recusado; token certo liga e desliga o profiling"""
+        monkeypatch.setattr(server, "ADMIN_TOKEN", "segredo")
+        assert self.client.post("/admin/profile/memory/start",
+                                headers={"X-Admin-Token": "errado"}).status_code == 403
+
+        headers = {"X-Admin-Token": "segredo"}
+        assert self.client.post("/admin/profile/memory/start", json={"frames": 5},
+                                headers=headers).get_json()["active"] is True
+        self.client.post("/predict", json=PAYLOAD)
+        report = self.client.get("/admin/profile/memory", headers=headers).get_json()
+        assert report["requests"]["count"] == 1
+        assert self.client.post("/admin/profile/memory/stop", headers=headers).status_code == 200
+        assert app.profiler.active is False
+
+    def test_cpu_window_is_bounded(self, monkeypatch):
+        """A janela de captura de CPU é limitada"""
+        monkeypatch.setattr(server, "ADMIN_TOKEN", "segredo")
+        headers = {"X-Admin-Token": "segredo"}
+        response = self.client.post("/admin/profile/cpu", json={"seconds": 3600}, headers=headers)
+        assert response.status_code == 400
+        response = self.client.post("/admin/profile/cpu", json={"seconds": 0.05}, headers=headers)
+        assert response.status_code == 200
+        assert "top_self" in response.get_json()
+
+    def test_cpu_capture_formats(self, monkeypatch):
+        """O profile de CPU sai em pilhas agregadas (flame graph) ou no formato do pstats"""
+        monkeypatch.setattr(server, "ADMIN_TOKEN", "segredo")
+        headers = {"X-Admin-Token": "segredo"}
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,))
+        worker.start()
+        try:
+            collapsed = self.client.post("/admin/profile/cpu", headers=headers,
+                                         json={"seconds": 0.3, "interval_ms": 5, "format": "collapsed"})
+            profile = self.client.post("/admin/profile/cpu?format=pstats", headers=headers,
+                                       json={"seconds": 0.3, "interval_ms": 5, "mode": "wall"})
+        finally:
+            stop.set()
+            worker.join()
+
+        assert collapsed.mimetype == "text/plain"
+        lines = collapsed.get_data(as_text=True).splitlines()
+        assert any("busy_loop (test_profiling.py:" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+        path = os.path.join(tempfile.mkdtemp(), "cpu.pstats")
+        with open(path, "wb") as f:
+            f.write(profile.get_data())
+        stats = pstats.Stats(path)
+        assert any(name == "busy_loop" for _, _, name in stats.stats)
+
+    def test_cpu_capture_limits(self, monkeypatch):
+        """Intervalo mínimo, modo válido e uma captura por vez"""
+        monkeypatch.setattr(server, "ADMIN_TOKEN", "segredo")
+        headers = {"X-Admin-Token": "segredo"}
+        assert self.client.post("/admin/profile/cpu", headers=headers,
+                                json={"seconds": 0.1, "interval_ms": 1}).status_code == 400
+        assert self.client.post("/admin/profile/cpu", headers=headers,
+                                json={"seconds": 0.1, "mode": "gpu"}).status_code == 400
+
+        running = threading.Thread(target=app.cpu_sampler.capture, args=(0.5,))
+        running.start()
+        try:
+            time.sleep(0.05)
+            assert app.cpu_sampler.busy
+            response = self.client.post("/admin/profile/cpu", headers=headers, json={"seconds": 0.1})
+            assert response.status_code == 409
+        finally:
+            running.join()
+        assert self.client.post("/admin/profile/cpu", headers=headers,
+                                json={"seconds": 0.05}).get_json()["mode"] == "cpu"
+
+
+class TestCpuSamplerModes:
+    """Modo de relógio e limite de frequência da amostragem"""
+
+    def test_wall_mode_includes_idle_threads(self):
+        stop = threading.Event()
+        waiting = threading.Thread(target=stop.wait)
+        waiting.start()
+        try:
+            sampler = CpuSampler(min_interval=0.02)
+            wall = sampler.capture(0.2, interval=0.001, mode="wall")
+            cpu = sampler.capture(0.2, interval=0.001, mode="cpu")
+        finally:
+            stop.set()
+            waiting.join()
+
+        assert wall["interval_ms"] == 20
+        assert wall["ticks"] <= 11
+        assert wall["samples"] > cpu["samples"]
+        with pytest.raises(ValueError):
+            sampler.capture(0.1, mode="gpu")
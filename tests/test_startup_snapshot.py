@@ -0,0 +1,225 @@
+"""
+Testes do snapshot de inicialização e do snapshot_builder.
+"""
+
+from collections import OrderedDict
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import snapshot_builder
+import startup_snapshot
+from explanations import build_explainer
+from startup_snapshot import (
+    SnapshotMismatch, file_source, mlflow_source, read_header, read_snapshot, try_restore, write_snapshot
+)
+
+INFO = {"model_name": "fiap-mlops-score-model", "version": "9", "source": "local_file"}
+
+
+def make_model(n=200, seed=0):
+    """Pipeline de árvores treinado sobre a entrada do modelo da API"""
+    rng = np.random.default_rng(seed)
+    frame = app.prepare_model_input([app.validate_and_clean_data({
+        "Annual_Income": float(rng.uniform(10000, 150000)),
+        "Credit_Utilization_Ratio": float(rng.uniform(0, 100)),
+        "Outstanding_Debt": float(rng.uniform(0, 30000))
+    }) for _ in range(n)])
+    labels = np.where(frame["Annual_Income"] > 80000, "Good",
+                      np.where(frame["Credit_Utilization_Ratio"] > 60, "Poor", "Standard"))
+    categorical = ["Month", "Occupation", "Type_of_Loan", "Credit_Mix", "Credit_History_Age",
+                   "Payment_of_Min_Amount", "Payment_Behaviour"]
+    pipeline = Pipeline([
+        ("preprocess", ColumnTransformer([("cat", OneHotEncoder(handle_unknown="ignore"), categorical)],
+                                         remainder="passthrough")),
+        ("model", RandomForestClassifier(n_estimators=10, max_depth=5, random_state=0))
+    ])
+    return pipeline.fit(frame, labels), frame
+
+
+@pytest.fixture
+def isolated_pool(monkeypatch):
+    """Restaura o modelo padrão e o pool da API após o teste"""
+    monkeypatch.setattr(app, "model", app.model)
+    monkeypatch.setattr(app, "model_info", app.model_info)
+    monkeypatch.setattr(app, "startup_report", app.startup_report)
+    monkeypatch.setattr(app.model_pool, "_entries", OrderedDict(app.model_pool._entries))
+    monkeypatch.setattr(app.model_pool, "_default_key", app.model_pool._default_key)
+
+
+class TestStartupSnapshot:
+    """Gravação e restauração do snapshot"""
+
+    def test_round_trip(self, tmp_path):
+        model, frame = make_model()
+        path = str(tmp_path / "snapshot.pkl")
+        header = write_snapshot(path, model, INFO, build_explainer(model))
+
+        state = read_snapshot(path)
+        assert state["info"] == INFO
+        assert (state["model"].predict(frame) == model.predict(frame)).all()
+        assert state["prepared"] is not None
+        assert state["header"]["sha256"] == header["sha256"] == read_header(path)["sha256"]
+        assert read_header(path)["libraries"] == startup_snapshot.library_versions()
+
+    def test_corrupted_payload(self, tmp_path):
+        path = str(tmp_path / "snapshot.pkl")
+        write_snapshot(path, {"a": 1}, INFO)
+        with open(path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        with pytest.raises(SnapshotMismatch, match="checksum"):
+            read_snapshot(path)
+
+    def test_library_mismatch(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "snapshot.pkl")
+        write_snapshot(path, {"a": 1}, INFO)
+        versions = dict(startup_snapshot.library_versions(), **{"scikit-learn": "0.0.1"})
+        monkeypatch.setattr(startup_snapshot, "library_versions", lambda: versions)
+        state, reason = try_restore(path)
+        assert state is None and "scikit-learn" in reason
+
+    def test_source_must_match(self, tmp_path):
+        path = str(tmp_path / "snapshot.pkl")
+        source = mlflow_source({"model_name": "fiap-mlops-score-model", "version": 9, "run_id": "abc"})
+        write_snapshot(path, {"a": 1}, INFO, source=source)
+
+        assert read_snapshot(path, lambda recorded: dict(recorded))["model"] == {"a": 1}
+        newer = dict(source, version="10")
+        with pytest.raises(SnapshotMismatch, match="fonte do modelo mudou"):
+            read_snapshot(path, lambda recorded: newer)
+        state, reason = try_restore(path, lambda recorded: None)
+        assert state is None and "fonte" in reason
+
+        write_snapshot(path, {"a": 1}, INFO)
+        with pytest.raises(SnapshotMismatch, match="sem fonte"):
+            read_snapshot(path, lambda recorded: recorded)
+
+    def test_missing_or_disabled(self, tmp_path):
+        assert try_restore(str(tmp_path / "nada.pkl")) == (None, "arquivo inexistente")
+        assert try_restore("") == (None, "desligado")
+
+
+@pytest.fixture
+def local_model(tmp_path, monkeypatch):
+    """Modelo salvo como o arquivo local da API"""
+    model, frame = make_model()
+    model_path = str(tmp_path / "model.pkl")
+    joblib.dump(model, model_path)
+    monkeypatch.setattr(app, "LOCAL_MODEL_PATH", model_path)
+    monkeypatch.setattr(app, "MODEL_PREFER_COMPACT", False)
+    return model, frame, model_path
+
+
+class TestLoadModel:
+    """Integração com `app.load_model`"""
+
+    def test_restores_snapshot(self, tmp_path, monkeypatch, isolated_pool, local_model):
+        model, frame, model_path = local_model
+        explainer = build_explainer(model)
+        path = str(tmp_path / "snapshot.pkl")
+        write_snapshot(path, model, INFO, explainer, file_source(model_path))
+        monkeypatch.setattr(app, "STARTUP_SNAPSHOT_PATH", path)
+        monkeypatch.setattr(app.model_pool, "prepare", lambda m: pytest.fail("explicador recalculado"))
+
+        app.load_model()
+
+        assert app.startup_report["mode"] == "snapshot"
+        assert app.model_info["startup"] == "snapshot" and app.model_info["version"] == "9"
+        entry = app.model_pool.get_entry()
+        assert entry["prepared"] is not None
+        assert (entry["model"].predict(frame) == model.predict(frame)).all()
+        assert app.runtime_stats()["startup"]["mode"] == "snapshot"
+
+    def test_falls_back_on_mismatch(self, tmp_path, monkeypatch, isolated_pool, local_model):
+        path = str(tmp_path / "snapshot.pkl")
+        write_snapshot(path, {"a": 1}, INFO, source=file_source(local_model[2]))
+        with open(path, "ab") as f:
+            f.write(b"x")
+        monkeypatch.setattr(app, "STARTUP_SNAPSHOT_PATH", path)
+
+        app.load_model()
+
+        assert app.startup_report["mode"] == "resolve"
+        assert "checksum" in app.startup_report["snapshot_skipped"]
+        assert "startup" not in app.model_info
+
+    def test_rejects_snapshot_of_replaced_model(self, tmp_path, monkeypatch, isolated_pool, local_model):
+        model, frame, model_path = local_model
+        path = str(tmp_path / "snapshot.pkl")
+        write_snapshot(path, model, INFO, source=file_source(model_path))
+        joblib.dump(make_model(seed=1)[0], model_path)
+        monkeypatch.setattr(app, "STARTUP_SNAPSHOT_PATH", path)
+
+        app.load_model()
+
+        assert app.startup_report["mode"] == "resolve"
+        assert "fonte do modelo mudou" in app.startup_report["snapshot_skipped"]
+
+    def test_prefer_compact_rejects_full_model_snapshot(self, tmp_path, monkeypatch, isolated_pool, local_model):
+        model, frame, model_path = local_model
+        path = str(tmp_path / "snapshot.pkl")
+        write_snapshot(path, model, INFO, source=file_source(model_path))
+        compact_path = str(tmp_path / "model_compact.pkl")
+        joblib.dump(make_model(n=50)[0], compact_path)
+        monkeypatch.setattr(app, "STARTUP_SNAPSHOT_PATH", path)
+        monkeypatch.setattr(app, "MODEL_COMPACT_PATH", compact_path)
+        monkeypatch.setattr(app, "MODEL_PREFER_COMPACT", True)
+
+        app.load_model()
+
+        assert app.startup_report["mode"] == "resolve"
+        assert "fonte do modelo mudou" in app.startup_report["snapshot_skipped"]
+        assert app.model_info["source"] == "local_compact"
+
+    def test_offline_uses_only_local_sources(self, monkeypatch):
+        monkeypatch.setattr(app, "MODEL_OFFLINE", True)
+        assert [s.name for s in app.get_model_sources()] == ["local_file"]
+        assert [s.name for s in app.get_model_sources(force_mlflow=True)][0] == "mlflow_registry"
+
+
+class TestSnapshotBuilder:
+    """Testes do script de geração"""
+
+    def test_build_and_verify(self, tmp_path, monkeypatch):
+        model, frame = make_model()
+        model_path = tmp_path / "model.pkl"
+        joblib.dump(model, model_path)
+        metadata_path = tmp_path / "model_metadata.json"
+        with open(metadata_path, "w") as f:
+            json.dump({"model_name": "fiap-mlops-score-model", "version": "9"}, f)
+        monkeypatch.setenv("STARTUP_SNAPSHOT_PATH", app.STARTUP_SNAPSHOT_PATH)
+        monkeypatch.setenv("MODEL_OFFLINE", "false")
+        output = tmp_path / "startup_snapshot.pkl"
+
+        assert snapshot_builder.main(["--model", str(model_path), "--metadata", str(metadata_path),
+                                      "--output", str(output), "--verify"]) == 0
+
+        with open(tmp_path / "startup_snapshot_report.json") as f:
+            report = json.load(f)
+        assert report["predictions_match"] is True
+        assert report["explainer"] is True
+        assert report["model_info"]["source"] == "local_file"
+        assert report["source"] == file_source(str(model_path))
+        assert read_snapshot(str(output))["info"]["version"] == "9"
+        # O arquivo explícito não passa pelas fontes do MLflow
+        assert os.environ["MODEL_OFFLINE"] == "true"
+
+    def test_refuses_mock_model(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("STARTUP_SNAPSHOT_PATH", app.STARTUP_SNAPSHOT_PATH)
+        if app.model_info.get("type") != "mock":
+            pytest.skip("modelo real disponível")
+        assert snapshot_builder.main(["--output", str(tmp_path / "s.pkl")]) == 1
+        assert not (tmp_path / "s.pkl").exists()
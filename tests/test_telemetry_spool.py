@@ -0,0 +1,200 @@
+"""
+Testes para o spool local de telemetria.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+from schema import read_drift_records
+from telemetry_spool import TelemetrySpool
+
+
+class Recorder:
+    """Destino que guarda os lotes recebidos e pode falhar sob demanda"""
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+
+    def __call__(self, records):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("AWS indisponível")
+        self.batches.append(list(records))
+
+    @property
+    def records(self):
+        return [r for batch in self.batches for r in batch]
+
+
+class TestTelemetrySpool:
+    """Testes do spool em disco"""
+
+    def test_append_is_local_and_drain_ships_in_order(self, tmp_path):
+        """Registros gravados são enviados em lote, na ordem de chegada"""
+        sink = Recorder()
+        spool = TelemetrySpool(str(tmp_path), {"metrics": sink}, flush_interval=0)
+        for i in range(5):
+            assert spool.append("metrics", {"i": i})
+
+        assert sink.records == []
+        assert spool.drain_once() == 5
+        assert [r["i"] for r in sink.records] == list(range(5))
+        assert len(sink.batches) == 1
+        assert spool.stats()["pending_records"] == 0
+        assert os.listdir(tmp_path) == []
+
+    def test_failed_ship_keeps_segment_for_retry(self, tmp_path):
+        """Falha no envio mantém o segmento; o tipo já enviado não é repetido"""
+        metrics = Recorder()
+        real_data = Recorder(failures=1)
+        spool = TelemetrySpool(str(tmp_path), {"metrics": metrics, "real_data": real_data},
+                               flush_interval=0)
+        spool.append("metrics", {"m": 1})
+        spool.append("real_data", {"r": 1})
+
+        with pytest.raises(ConnectionError):
+            spool.drain_once()
+        assert spool.stats()["pending_records"] == 2
+
+        spool.drain_once()
+        assert metrics.records == [{"m": 1}]
+        assert real_data.records == [{"r": 1}]
+        assert spool.stats()["shipped"] == 2
+
+    def test_size_cap_evicts_oldest_segments(self, tmp_path):
+        """Ao exceder o limite, os segmentos mais antigos são descartados"""
+        sink = Recorder()
+        spool = TelemetrySpool(str(tmp_path), {"metrics": sink},
+                               max_bytes=2000, segment_bytes=400, flush_interval=0)
+        for i in range(100):
+            spool.append("metrics", {"i": i, "padding": "x" * 20})
+
+        stats = spool.stats()
+        assert stats["pending_bytes"] <= 2000
+        assert stats["dropped"] > 0
+        assert stats["dropped"] + stats["pending_records"] == 100
+
+        spool.drain_once()
+        shipped = [r["i"] for r in sink.records]
+        assert shipped == sorted(shipped)
+        assert shipped[-1] == 99
+
+    def test_recovers_segments_from_previous_run(self, tmp_path):
+        """Segmentos deixados por outro processo são enviados na próxima execução"""
+        first = TelemetrySpool(str(tmp_path), {}, flush_interval=60)
+        first.append("metrics", {"i": 1})
+        first.stop(flush=False)
+
+        sink = Recorder()
+        second = TelemetrySpool(str(tmp_path), {"metrics": sink}, flush_interval=60)
+        assert second.stats()["pending_records"] == 1
+        second.append("metrics", {"i": 2})
+        second.stop()
+        assert [r["i"] for r in sink.records] == [1, 2]
+
+    def test_restart_does_not_resend_shipped_kinds(self, tmp_path):
+        """O progresso por tipo do segmento sobrevive à reinicialização"""
+        first = TelemetrySpool(str(tmp_path), {"metrics": Recorder(), "real_data": Recorder(failures=1)},
+                               flush_interval=0)
+        first.append("metrics", {"m": 1})
+        first.append("real_data", {"r": 1})
+        with pytest.raises(ConnectionError):
+            first.drain_once()
+        first.stop(flush=False)
+
+        metrics, real_data = Recorder(), Recorder()
+        second = TelemetrySpool(str(tmp_path), {"metrics": metrics, "real_data": real_data},
+                                flush_interval=0)
+        assert second.drain_once() == 1
+        assert metrics.records == []
+        assert real_data.records == [{"r": 1}]
+        assert os.listdir(tmp_path) == []
+
+    def test_orphan_progress_is_removed_on_recovery(self, tmp_path):
+        """Progresso de um segmento já removido não vale para um segmento novo"""
+        (tmp_path / "000000000001.seg.shipped").write_text("metrics\n")
+        sink = Recorder()
+        spool = TelemetrySpool(str(tmp_path), {"metrics": sink}, flush_interval=0)
+        spool.append("metrics", {"i": 1})
+        spool.drain_once()
+        assert sink.records == [{"i": 1}]
+        assert os.listdir(tmp_path) == []
+
+    def test_background_drainer_retries_with_backoff(self, tmp_path):
+        """A thread de envio retenta após falha até entregar"""
+        sink = Recorder(failures=2)
+        spool = TelemetrySpool(str(tmp_path), {"metrics": sink}, flush_interval=0.05,
+                               backoff_base=0.05, backoff_max=0.1)
+        spool.start()
+        spool.append("metrics", {"i": 1})
+
+        deadline = time.time() + 5
+        while not sink.records and time.time() < deadline:
+            time.sleep(0.02)
+        spool.stop()
+
+        assert sink.records == [{"i": 1}]
+        assert spool.stats()["ship_errors"] == 2
+
+
+class FakeBody:
+    def __init__(self, content):
+        self.content = content
+
+    def read(self):
+        return self.content.encode('utf-8')
+
+
+class FakeS3:
+    """Cliente S3 em memória com a interface usada por `_ship_real_data`"""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = 0
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey()
+        return {'Body': FakeBody(self.objects[Key])}
+
+    def put_object(self, Body, Bucket, Key):
+        self.puts += 1
+        self.objects[Key] = Body
+
+
+class TestShipRealData:
+    """Testes do envio em lote dos dados de data drift"""
+
+    def test_batch_is_one_put_per_file_and_csv_quoted(self, monkeypatch, tmp_path):
+        """Um put por arquivo diário; valores com vírgula continuam legíveis"""
+        s3 = FakeS3()
+        monkeypatch.setattr(app.aws_clients, 'get_client', lambda service: s3)
+
+        rows = [
+            {"Age": 30, "Type_of_Loan": "Auto Loan, Personal Loan", "credit_score_prediction": "Good"},
+            {"Age": 41, "Type_of_Loan": "Home Equity Loan", "credit_score_prediction": "Poor"},
+        ]
+        file_name = "2026-01-01_credit_score_prediction_data.csv"
+        app._ship_real_data([{"file_name": file_name, "row": rows[0]}])
+        app._ship_real_data([{"file_name": file_name, "row": rows[1]},
+                             {"file_name": file_name, "row": rows[0]}])
+
+        assert s3.puts == 2
+        local = tmp_path / file_name
+        local.write_text(s3.objects[f"{app.DRIFT_PREFIX}/{file_name}"], encoding='utf-8')
+        skipped = [0]
+        parsed = list(read_drift_records(str(local), skipped))
+        assert skipped[0] == 0
+        assert [r["Type_of_Loan"] for r in parsed] == [
+            "Auto Loan, Personal Loan", "Home Equity Loan", "Auto Loan, Personal Loan"
+        ]
@@ -0,0 +1,116 @@
+"""
+Testes do orçamento de threads da inferência.
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+from joblib import effective_n_jobs
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import server
+from rule_model import RuleCreditScoreModel
+from thread_budget import ThreadBudget, model_flavor, per_worker_budget
+
+
+class NativeBoosting(BaseEstimator, ClassifierMixin):
+    """Estimador no formato do wrapper scikit-learn do xgboost"""
+
+    def __init__(self, n_jobs=-1):
+        self.n_jobs = n_jobs
+
+
+NativeBoosting.__module__ = "xgboost.sklearn"
+
+
+def make_forest(n_jobs=-1):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"Annual_Income": rng.uniform(8000, 200000, 200),
+                      "Outstanding_Debt": rng.uniform(0, 50000, 200)})
+    y = np.where(X["Annual_Income"] > 80000, "Good", "Poor")
+    pipeline = Pipeline([("scale", StandardScaler()),
+                         ("model", RandomForestClassifier(n_estimators=10, n_jobs=n_jobs, random_state=0))])
+    return pipeline.fit(X, y), X
+
+
+class TestThreadBudget:
+    """Configuração do modelo e contexto por lote"""
+
+    def test_per_worker_budget(self):
+        assert per_worker_budget(3, 4, 16) == 3
+        assert per_worker_budget(0, 4, 16) == 4
+        assert per_worker_budget(0, 1, 8) == 8
+        assert per_worker_budget(0, 8, 4) == 1
+
+    def test_sklearn_estimators_run_per_batch(self):
+        pipeline, _ = make_forest(n_jobs=-1)
+        report = ThreadBudget(4, 100).configure(pipeline)
+
+        assert pipeline.named_steps["model"].n_jobs is None
+        assert report["flavor"] == "sklearn"
+        assert report["estimators"] == {"model__n_jobs": {"original": -1, "effective": "por lote"}}
+        assert report["threads_per_worker"] == 4
+        assert isinstance(report["libraries"], list)
+
+    def test_native_libraries_get_fixed_threads(self):
+        pipeline = Pipeline([("scale", StandardScaler()), ("model", NativeBoosting(n_jobs=-1))])
+        report = ThreadBudget(3).configure(pipeline)
+
+        assert model_flavor(pipeline) == "xgboost"
+        assert pipeline.named_steps["model"].n_jobs == 3
+        assert report["estimators"]["model__n_jobs"]["effective"] == 3
+
+    def test_model_without_params(self):
+        report = ThreadBudget(2).configure(RuleCreditScoreModel())
+        assert report["flavor"] == "rules" and report["estimators"] == {}
+
+    def test_batch_context_is_thread_local(self):
+        budget = ThreadBudget(4, parallel_min_rows=100)
+        seen = {}
+
+        def other_thread():
+            seen["other"] = effective_n_jobs(None)
+
+        with budget.batch(10):
+            seen["small"] = effective_n_jobs(None)
+        with budget.batch(500):
+            seen["large"] = effective_n_jobs(None)
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+
+        assert seen == {"small": 1, "large": 4, "other": 1}
+        assert budget.stats()["small_batches"] == 1 and budget.stats()["large_batches"] == 1
+
+
+class TestAppIntegration:
+    """Orçamento no carregamento, na inferência e em /model-info"""
+
+    def test_inline_inference_uses_budget(self, monkeypatch):
+        pipeline, X = make_forest()
+        budget = ThreadBudget(2, parallel_min_rows=50)
+        monkeypatch.setattr(app, "thread_budget", budget)
+
+        model, info = app._apply_thread_budget(pipeline, {"model_name": "m", "version": "1"})
+        assert info["thread_budget"]["estimators"]["model__n_jobs"]["effective"] == "por lote"
+
+        app._model_arrays(model, X.iloc[:10])
+        predictions, _, _ = app._model_arrays(model, X)
+        assert list(predictions) == list(pipeline.predict(X))
+        stats = app.runtime_stats()["thread_budget"]
+        assert stats["small_batches"] == 1 and stats["large_batches"] == 1
+
+    def test_model_info_reports_configuration(self):
+        response = server.app.test_client().get('/model-info')
+        assert response.status_code == 200
+        config = response.get_json()["thread_budget"]
+        assert config["threads_per_worker"] == app.thread_budget.threads
+        assert config["parallel_min_rows"] == app.INFERENCE_PARALLEL_MIN_ROWS
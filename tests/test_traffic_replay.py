@@ -0,0 +1,125 @@
+"""
+Testes para o replay do tráfego capturado (traffic_replay.py).
+"""
+
+import csv
+import json
+import os
+import random
+import sys
+import threading
+
+import joblib
+import pytest
+from sklearn.dummy import DummyClassifier
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import server
+import traffic_replay
+from profiling import AllocationProfiler
+from schema import DRIFT_METADATA_COLUMNS, synthetic_record
+
+HEADER = list(synthetic_record(random.Random(0))) + DRIFT_METADATA_COLUMNS
+
+
+@pytest.fixture
+def capture(tmp_path):
+    rng = random.Random(7)
+    path = tmp_path / "2026-03-01_credit_score_prediction_data.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(HEADER)
+        for i in range(40):
+            record = synthetic_record(rng, missing_rate=0.2)
+            record.update({"credit_score_prediction": "Good",
+                           "timestamp": f"01-03-2026 10:{i // 10:02d}", "model_version": "1"})
+            writer.writerow([record.get(column, "") for column in HEADER])
+        f.write("linha,quebrada\n")
+    return path
+
+
+def run(args, tmp_path):
+    output = tmp_path / "replay.json"
+    assert traffic_replay.main(args + ["--output", str(output)]) == 0
+    with open(output) as f:
+        return json.load(f)
+
+
+class TestLoading:
+    """Reconstrução dos payloads e do ritmo original"""
+
+    def test_drift_csv(self, capture):
+        records, skipped = traffic_replay.load_replay(str(capture))
+        assert skipped == 1
+        assert len(records) == 40
+        # Dez registros por minuto, espalhados a cada 6 segundos
+        assert [r["offset"] for r in records[:3]] == [0.0, 6.0, 12.0]
+        assert records[10]["offset"] == 60.0
+        assert isinstance(records[0]["payload"]["Annual_Income"], float)
+        assert records[0]["recorded"] == "Good"
+        assert "timestamp" not in records[0]["payload"]
+
+    def test_jsonl_export(self, tmp_path):
+        path = tmp_path / "export.jsonl"
+        path.write_text("\n".join([
+            json.dumps({"timestamp": "2026-03-11T09:00:05", "prediction": "Poor",
+                        "features": {"Age": 30, "Occupation": "Engineer"}}),
+            json.dumps({"timestamp": "2026-03-11T09:00:00", "Age": 41}),
+            "{quebrado"
+        ]))
+        records, skipped = traffic_replay.load_replay(str(path))
+        assert skipped == 1
+        assert [r["payload"] for r in records] == [{"Age": 41}, {"Age": 30, "Occupation": "Engineer"}]
+        assert records[1]["offset"] == 5.0
+        assert records[1]["recorded"] == "Poor"
+
+    def test_scaled_schedule(self, capture):
+        records, _ = traffic_replay.load_replay(str(capture))
+        assert [r["at"] for r in traffic_replay.build_requests(records[:3], speed=2.0)] == [0.0, 3.0, 6.0]
+        batched = traffic_replay.build_requests(records, batch_size=10, speed=60.0, max_gap=0.5)
+        assert [r["at"] for r in batched] == [0.0, 0.5, 1.0, 1.5]
+        assert all(r["at"] is None for r in traffic_replay.build_requests(records, speed=0))
+
+
+class TestReplay:
+    """Replay no próprio processo e contra o servidor HTTP"""
+
+    def test_in_process_stages_and_model_comparison(self, capture, tmp_path):
+        X = app.prepare_model_input([synthetic_record(random.Random(1)) for _ in range(10)])
+        poor = DummyClassifier(strategy="constant", constant="Poor").fit(X, ["Poor"] * 9 + ["Good"])
+        model_path = tmp_path / "poor.pkl"
+        joblib.dump(poor, model_path)
+
+        report = run([str(capture), "--batch-size", "5", "--model-file", f"poor={model_path}",
+                      "--compare", "latest", "poor"], tmp_path)
+
+        latest = report["versions"]["latest"]
+        assert report["requests"] == 8
+        assert latest["ok"] == 8
+        assert {"validate_and_clean_data", "prepare_model_input", "inference", "total"} <= set(latest["stages"])
+        assert latest["recorded_agreement"]["compared"] == 40
+
+        comparison = report["comparison"]
+        assert comparison["compared"] == 40
+        assert comparison["changed"] == sum(comparison["transitions"].values()) > 0
+        assert all(key.endswith("->Poor") for key in comparison["transitions"])
+        assert comparison["examples"][0]["candidate"]["prediction"] == "Poor"
+        # O profiler de alocações volta ao lugar ao final do replay
+        assert isinstance(app.profiler, AllocationProfiler)
+
+    def test_http_target(self, capture, tmp_path):
+        http = make_server("127.0.0.1", 0, server.app, threaded=True)
+        threading.Thread(target=http.serve_forever, daemon=True).start()
+        try:
+            report = run([str(capture), "--url", f"http://127.0.0.1:{http.server_port}",
+                          "--limit", "12", "--speed", "60", "--concurrency", "2"], tmp_path)
+        finally:
+            http.shutdown()
+
+        default = report["versions"]["default"]
+        assert default["ok"] == 12
+        assert default["stages"] == {}
+        assert default["latency_scheduled"]["count"] == 12
+        assert 1.0 <= report["elapsed_seconds"] < 5
@@ -0,0 +1,111 @@
+"""
+Testes para o codec binário (msgpack) das predições.
+"""
+
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import app
+import server
+import wire_codec
+
+msgpack = pytest.importorskip("msgpack")
+
+RECORD = {"Age": 35, "Annual_Income": 65000, "Outstanding_Debt": 8000, "Credit_Utilization_Ratio": 28.5}
+MSGPACK_HEADERS = {"Content-Type": wire_codec.MSGPACK, "Accept": wire_codec.MSGPACK}
+
+
+def without_timestamp(body):
+    return {k: v for k, v in body.items() if k != "timestamp"}
+
+
+class TestNegotiation:
+    """Escolha do codec pelos headers"""
+
+    def test_media_type(self):
+        assert wire_codec.media_type("application/x-msgpack") == wire_codec.MSGPACK
+        assert wire_codec.media_type("application/json, application/vnd.msgpack;q=0.9") == wire_codec.MSGPACK
+        assert wire_codec.media_type("application/json") is None
+        assert wire_codec.media_type(None) is None
+
+    def test_invalid_body(self):
+        with pytest.raises(ValueError):
+            wire_codec.decode(b"\xc1")
+
+
+class TestServer:
+    """Mesmo modelo de requisição e resposta em JSON e msgpack"""
+
+    def setup_method(self):
+        self.client = server.app.test_client()
+
+    def test_single_prediction_matches_json(self):
+        as_json = self.client.post('/predict', json={"data": RECORD}).get_json()
+        response = self.client.post('/predict', data=msgpack.packb({"data": RECORD}), headers=MSGPACK_HEADERS)
+
+        assert response.status_code == 200
+        assert response.mimetype == wire_codec.MSGPACK
+        assert without_timestamp(msgpack.unpackb(response.get_data())) == without_timestamp(as_json)
+
+    def test_batch_and_mixed_codecs(self):
+        body = {"records": [RECORD, dict(RECORD, Annual_Income=12000)]}
+        binary = self.client.post('/predict/batch', data=msgpack.packb(body),
+                                  headers={"Content-Type": "application/x-msgpack"})
+        assert binary.mimetype == "application/json"
+        assert binary.get_json()["count"] == 2
+
+        packed = self.client.post('/predict/batch', json=body, headers={"Accept": wire_codec.MSGPACK})
+        result = msgpack.unpackb(packed.get_data())
+        assert [p["prediction"] for p in result["predictions"]] == \
+            [p["prediction"] for p in binary.get_json()["predictions"]]
+
+    def test_errors_follow_accept(self):
+        response = self.client.post('/predict/batch', data=msgpack.packb({"records": []}),
+                                    headers=MSGPACK_HEADERS)
+        assert response.status_code == 400
+        assert msgpack.unpackb(response.get_data())["error"] == "Dados não fornecidos"
+
+        invalid = self.client.post('/predict', data=b"\xc1", headers=MSGPACK_HEADERS)
+        assert invalid.status_code == 400
+        missing = self.client.post('/predict', data=msgpack.packb({"x": 1}), headers=MSGPACK_HEADERS)
+        assert missing.status_code == 400
+
+    def test_without_msgpack_package(self, monkeypatch):
+        monkeypatch.setattr(wire_codec, "msgpack", None)
+        response = self.client.post('/predict', data=b"\x80", headers=MSGPACK_HEADERS)
+        assert response.status_code == 415
+        assert self.client.post('/predict', json={"data": RECORD},
+                                headers={"Accept": wire_codec.MSGPACK}).get_json()["prediction"]
+
+    def test_batch_cost_uses_decoded_records(self, monkeypatch):
+        monkeypatch.setattr(server, "ADMISSION_ENABLED", True)
+        monkeypatch.setattr(server, "ADMISSION_RECORDS_PER_TOKEN", 1)
+        costs = []
+        original = server.admission.admit
+        monkeypatch.setattr(server.admission, "admit",
+                            lambda client, cost=1: costs.append(cost) or original(client, cost))
+        self.client.post('/predict/batch', data=msgpack.packb({"records": [RECORD] * 3}),
+                         headers=MSGPACK_HEADERS)
+        assert costs == [3]
+
+
+class TestLambdaHandler:
+    """O handler aceita msgpack em base64, como o API Gateway entrega corpos binários"""
+
+    def test_base64_body(self):
+        event = {
+            "body": base64.b64encode(msgpack.packb({"data": RECORD})).decode("ascii"),
+            "isBase64Encoded": True,
+            "headers": MSGPACK_HEADERS
+        }
+        response = app.handler(event)
+        assert response["isBase64Encoded"] is True
+        assert response["headers"]["Content-Type"] == wire_codec.MSGPACK
+        body = msgpack.unpackb(base64.b64decode(response["body"]))
+        expected = json.loads(app.handler({"body": json.dumps({"data": RECORD})})["body"])
+        assert without_timestamp(body) == without_timestamp(expected)
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Replay do tráfego capturado contra a API de Credit Score.
+
+Reconstrói os corpos das requisições a partir dos CSVs diários gravados por
+`write_real_data` (ou de um export JSON Lines, ex.: `/admin/predictions`) e os
+reenvia, na ordem e no ritmo originais (opcionalmente acelerados), para o
+`handler` no próprio processo ou para um server.py em execução. Ao contrário
+dos payloads sintéticos, o replay reproduz a mistura real de campos ausentes,
+categorias inesperadas e valores extremos que passam por `validate_and_clean_data`.
+
+O relatório traz:
+- latência por requisição (serviço e a partir do instante agendado) e, no
+  modo local, o tempo de cada etapa do pipeline (validação, preparação,
+  inferência, telemetria);
+- com `--compare A B`, cada requisição é enviada às duas versões do modelo e as
+  predições são comparadas (concordância, transições de classe e diferença de
+  confiança). Versões locais podem ser registradas com `--model-file ROTULO=arquivo`.
+
+Os CSVs de drift têm resolução de minuto: os registros de um mesmo minuto são
+distribuídos uniformemente dentro dele.
+
+Exemplos:
+    python traffic_replay.py drift_data/
+    python traffic_replay.py drift_data/ --speed 10 --max-gap-seconds 5
+    python traffic_replay.py drift_data/ --model-file novo=model/candidate.pkl --compare latest novo
+    python traffic_replay.py drift_data/2026-03-10_credit_score_prediction_data.csv \\
+        --url http://localhost:5000 --batch-size 50 --compare 3 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Adicionar pasta src ao path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from load_generator import HttpTarget, summarize
+from schema import DRIFT_METADATA_COLUMNS, NUMERIC_FIELDS, payload_from_drift_row, read_drift_records
+
+PREDICTION_COLUMN = 'credit_score_prediction'
+VERSION_COLUMN = 'model_version'
+# Formatos de `timestamp` gravados por write_real_data e pelo registro de predições
+TIMESTAMP_FORMATS = ("%d-%m-%Y %H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S")
+MINUTE_RESOLUTION = 60.0
+MAX_EXAMPLES = 20
+
+
+def parse_timestamp(value: Any) -> Tuple[Optional[float], float]:
+    """
+    Converte o timestamp gravado em (epoch, resolução em segundos).
+
+    Returns:
+        tuple: (None, 0) quando o valor não é reconhecido.
+    """
+    if not value:
+        return None, 0.0
+    text = str(value).strip()
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return parsed.timestamp(), (MINUTE_RESOLUTION if "%S" not in fmt else 1.0)
+    try:
+        return datetime.fromisoformat(text).timestamp(), 0.0
+    except ValueError:
+        return None, 0.0
+
+
+def _typed(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos numéricos voltam a ser números, como o cliente os enviou; o resto fica como gravado"""
+    typed = {}
+    for field, value in payload.items():
+        if field in NUMERIC_FIELDS and isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        typed[field] = value
+    return typed
+
+
+def _read_jsonl(path: str, skipped: List[int]) -> List[Dict[str, Any]]:
+    """Export JSON Lines: linhas do registro de predições (com `features`) ou registros puros"""
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                skipped[0] += 1
+                continue
+            if not isinstance(item, dict):
+                skipped[0] += 1
+                continue
+            if isinstance(item.get("features"), dict):
+                rows.append({"payload": item["features"], "timestamp": item.get("timestamp"),
+                             "recorded": item.get("prediction"), "version": item.get("model_version")})
+            else:
+                payload = {k: v for k, v in item.items() if k not in DRIFT_METADATA_COLUMNS}
+                rows.append({"payload": payload, "timestamp": item.get("timestamp"),
+                             "recorded": item.get(PREDICTION_COLUMN), "version": item.get(VERSION_COLUMN)})
+    return rows
+
+
+def load_replay(path: str, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Lê os registros capturados e calcula o instante relativo de cada um.
+
+    Args:
+        path (str): CSV de drift, diretório com os arquivos diários ou arquivo .jsonl.
+        limit (int): máximo de registros (os primeiros, na ordem dos arquivos).
+
+    Returns:
+        tuple: (registros com payload, offset em segundos, predição e versão
+        gravadas; linhas ignoradas).
+    """
+    skipped = [0]
+    if path.endswith('.jsonl'):
+        rows = _read_jsonl(path, skipped)
+    else:
+        rows = [{"payload": payload_from_drift_row(row), "timestamp": row.get("timestamp"),
+                 "recorded": row.get(PREDICTION_COLUMN), "version": row.get(VERSION_COLUMN)}
+                for row in read_drift_records(path, skipped)]
+    if limit:
+        rows = rows[:limit]
+
+    # Registros com o mesmo timestamp são espalhados dentro da resolução gravada
+    parsed = [parse_timestamp(row["timestamp"]) for row in rows]
+    groups: Dict[float, List[int]] = {}
+    last = None
+    for index, (epoch, _) in enumerate(parsed):
+        last = epoch if epoch is not None else last
+        groups.setdefault(last if last is not None else 0.0, []).append(index)
+
+    epochs = [0.0] * len(rows)
+    for epoch, indexes in groups.items():
+        resolution = max(parsed[i][1] for i in indexes)
+        for position, index in enumerate(indexes):
+            epochs[index] = epoch + resolution * position / len(indexes)
+
+    origin = min(epochs) if epochs else 0.0
+    records = []
+    for index, row in enumerate(rows):
+        records.append({
+            "index": index,
+            "offset": epochs[index] - origin,
+            "payload": _typed(row["payload"]),
+            "recorded": row["recorded"] or None,
+            "version": row["version"] or None
+        })
+    records.sort(key=lambda record: (record["offset"], record["index"]))
+    return records, skipped[0]
+
+
+def build_requests(records: List[Dict[str, Any]], batch_size: int = 1, speed: float = 1.0,
+                   max_gap: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Agrupa os registros em requisições e calcula o instante de envio de cada uma.
+
+    Args:
+        records (list): saída de `load_replay`.
+        batch_size (int): registros por requisição (>1 usa /predict/batch).
+        speed (float): fator de aceleração do ritmo original; 0 envia o mais rápido possível.
+        max_gap (float): maior intervalo (já acelerado) entre requisições consecutivas.
+    """
+    requests = []
+    clock, previous = 0.0, None
+    for start in range(0, len(records), max(1, batch_size)):
+        chunk = records[start:start + max(1, batch_size)]
+        at = None
+        if speed > 0:
+            offset = chunk[0]["offset"]
+            gap = 0.0 if previous is None else (offset - previous) / speed
+            if max_gap is not None:
+                gap = min(gap, max_gap)
+            clock += gap
+            previous = offset
+            at = clock
+        requests.append({"at": at, "records": chunk})
+    return requests
+
+
+def request_body(request: Dict[str, Any], batch: bool) -> Dict[str, Any]:
+    payloads = [record["payload"] for record in request["records"]]
+    return {"records": payloads} if batch else {"data": payloads[0]}
+
+
+class InProcessTarget:
+    """Chama o `handler` no próprio processo, medindo o tempo de cada etapa"""
+
+    def __init__(self, model_files: Optional[Dict[str, str]] = None):
+        import app
+        from profiling import StageTimer
+
+        self.app = app
+        self.timer = StageTimer()
+        for label, path in (model_files or {}).items():
+            import joblib
+            name = app.MODEL_NAME
+            app.model_pool.register(name, label, joblib.load(path),
+                                    {"model_name": name, "version": label, "source": "local_file"})
+
+        # O profiler de alocações dá lugar ao cronômetro por etapa até `close`
+        self._previous_profiler = app.profiler
+        app.profiler = self.timer
+
+    def send(self, path: str, body: Dict[str, Any], headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, float]]:
+        response = self.app.handler({"body": json.dumps(body), "headers": headers})
+        return response["statusCode"], json.loads(response["body"]), self.timer.last()
+
+    def close(self) -> None:
+        self.app.profiler = self._previous_profiler
+
+
+class HttpReplayTarget:
+    """Envia as requisições a um server.py em execução (sem tempo por etapa)"""
+
+    def __init__(self, url: str, timeout: float):
+        self.http = HttpTarget(url, timeout)
+
+    def close(self) -> None:
+        pass
+
+    def send(self, path: str, body: Dict[str, Any], headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, float]]:
+        status, content = self.http.request(path, json.dumps(body).encode('utf-8'), headers)
+        try:
+            return status, json.loads(content), {}
+        except ValueError:
+            return status, None, {}
+
+
+def response_predictions(status: int, body: Any, count: int) -> List[Optional[Dict[str, Any]]]:
+    """Predições de uma resposta, uma por registro (None quando a requisição falhou)"""
+    if status != 200 or not isinstance(body, dict):
+        return [None] * count
+    items = body.get("predictions") if "predictions" in body else [body]
+    if not isinstance(items, list) or len(items) != count:
+        return [None] * count
+    return [{"prediction": item.get("prediction"), "confidence": item.get("confidence")}
+            for item in items]
+
+
+class ReplayRecorder:
+    """Latências, etapas, status e predições por versão, de forma thread-safe"""
+
+    def __init__(self, labels: List[str], total_records: int):
+        self.labels = labels
+        self.service = {label: [] for label in labels}
+        self.scheduled = {label: [] for label in labels}
+        self.stages = {label: {} for label in labels}
+        self.statuses = {label: {} for label in labels}
+        self.predictions = {label: [None] * total_records for label in labels}
+        self.lag: List[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, label: str, request: Dict[str, Any], service: float, scheduled: Optional[float],
+               status: Optional[int], error: Optional[str], stages: Dict[str, float],
+               predictions: List[Optional[Dict[str, Any]]]):
+        key = error or f"HTTP {status}"
+        with self._lock:
+            self.service[label].append(service)
+            if scheduled is not None:
+                self.scheduled[label].append(scheduled)
+            self.statuses[label][key] = self.statuses[label].get(key, 0) + 1
+            for name, ms in stages.items():
+                self.stages[label].setdefault(name, []).append(ms / 1000)
+            for record, prediction in zip(request["records"], predictions):
+                self.predictions[label][record["position"]] = prediction
+
+
+def replay(target: Any, requests: List[Dict[str, Any]], labels: List[Optional[str]],
+           concurrency: int = 8) -> Tuple[ReplayRecorder, float]:
+    """
+    Reenvia as requisições no instante agendado (`at`), com até `concurrency`
+    em voo; cada requisição vai a todas as versões em `labels`, em sequência.
+    """
+    batch = any(len(request["records"]) > 1 for request in requests)
+    path = "/predict/batch" if batch else "/predict"
+    position = 0
+    for request in requests:
+        for record in request["records"]:
+            record["position"] = position
+            position += 1
+
+    names = [label or "default" for label in labels]
+    recorder = ReplayRecorder(names, position)
+    schedule: "queue.Queue[Optional[Tuple[Dict[str, Any], Optional[float]]]]" = queue.Queue()
+
+    def worker():
+        while True:
+            item = schedule.get()
+            if item is None:
+                return
+            request, intended = item
+            body = request_body(request, batch)
+            lag = time.perf_counter() - intended if intended is not None else None
+            if lag is not None:
+                with recorder._lock:
+                    recorder.lag.append(lag)
+            for label, name in zip(labels, names):
+                headers = {"X-Model-Version": label} if label else {}
+                started = time.perf_counter()
+                try:
+                    status, response, stages = target.send(path, body, headers)
+                    error = None
+                except Exception as e:
+                    status, response, stages, error = None, None, {}, type(e).__name__
+                finished = time.perf_counter()
+                recorder.record(name, request, finished - started,
+                                finished - intended if intended is not None else None,
+                                status, error, stages,
+                                response_predictions(status, response, len(request["records"])))
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+    for thread in workers:
+        thread.start()
+
+    started = time.perf_counter()
+    for request in requests:
+        intended = None
+        if request["at"] is not None:
+            intended = started + request["at"]
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        schedule.put((request, intended))
+    for _ in workers:
+        schedule.put(None)
+    for thread in workers:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+
+def compare_predictions(baseline: List[Optional[Dict[str, Any]]], candidate: List[Optional[Dict[str, Any]]],
+                        records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Concordância entre duas listas de predições alinhadas por registro"""
+    compared = agree = 0
+    transitions: Dict[str, int] = {}
+    confidence_diffs: List[float] = []
+    examples = []
+    for record, a, b in zip(records, baseline, candidate):
+        if a is None or b is None:
+            continue
+        compared += 1
+        if a["confidence"] is not None and b["confidence"] is not None:
+            confidence_diffs.append(abs(a["confidence"] - b["confidence"]))
+        if a["prediction"] == b["prediction"]:
+            agree += 1
+            continue
+        key = f"{a['prediction']}->{b['prediction']}"
+        transitions[key] = transitions.get(key, 0) + 1
+        if len(examples) < MAX_EXAMPLES:
+            examples.append({"index": record["index"], "baseline": a, "candidate": b,
+                             "payload": record["payload"]})
+    return {
+        "compared": compared,
+        "agreement": round(agree / compared, 6) if compared else None,
+        "changed": compared - agree,
+        "transitions": dict(sorted(transitions.items(), key=lambda kv: -kv[1])),
+        "mean_abs_confidence_diff": round(sum(confidence_diffs) / len(confidence_diffs), 6)
+        if confidence_diffs else None,
+        "max_abs_confidence_diff": round(max(confidence_diffs), 6) if confidence_diffs else None,
+        "examples": examples
+    }
+
+
+def recorded_agreement(predictions: List[Optional[Dict[str, Any]]],
+                       records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Quanto o replay concorda com as predições gravadas na captura"""
+    pairs = [(p["prediction"], r["recorded"]) for p, r in zip(predictions, records)
+             if p is not None and r["recorded"]]
+    same = sum(1 for predicted, recorded in pairs if predicted == recorded)
+    return {"compared": len(pairs), "agreement": round(same / len(pairs), 6) if pairs else None}
+
+
+def build_report(recorder: ReplayRecorder, records: List[Dict[str, Any]], requests: List[Dict[str, Any]],
+                 elapsed: float, speed: float, skipped: int) -> Dict[str, Any]:
+    ordered = sorted(records, key=lambda record: record["position"])
+    versions = {}
+    for label in recorder.labels:
+        ok = recorder.statuses[label].get("HTTP 200", 0)
+        versions[label] = {
+            "statuses": recorder.statuses[label],
+            "ok": ok,
+            "error_rate": round(1 - ok / len(recorder.service[label]), 6) if recorder.service[label] else 0.0,
+            "latency_service": summarize(recorder.service[label]),
+            "latency_scheduled": summarize(recorder.scheduled[label]),
+            "stages": {name: summarize(values) for name, values in recorder.stages[label].items()},
+            "recorded_agreement": recorded_agreement(recorder.predictions[label], ordered)
+        }
+
+    report = {
+        "records": len(records),
+        "skipped_rows": skipped,
+        "requests": len(requests),
+        "batch_size": max(len(request["records"]) for request in requests) if requests else 0,
+        "speed": speed,
+        "elapsed_seconds": round(elapsed, 3),
+        "original_span_seconds": round(max((r["offset"] for r in records), default=0.0), 3),
+        "schedule_lag": summarize(recorder.lag),
+        "versions": versions
+    }
+    if len(recorder.labels) == 2:
+        baseline, candidate = recorder.labels
+        report["comparison"] = dict(
+            compare_predictions(recorder.predictions[baseline], recorder.predictions[candidate], ordered),
+            baseline=baseline, candidate=candidate)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("=" * 60)
+    print(f"Registros: {report['records']} ({report['skipped_rows']} linhas ignoradas)  "
+          f"Requisições: {report['requests']}  Lote: {report['batch_size']}")
+    print(f"Velocidade: {report['speed'] or 'máxima'}  |  Duração: {report['elapsed_seconds']}s "
+          f"(original: {report['original_span_seconds']}s)")
+    for label, version in report["versions"].items():
+        lat = version["latency_service"]
+        print(f"[{label}] OK: {version['ok']}  erros: {version['error_rate']:.4%}  "
+              f"p50={lat['p50_ms']}ms p99={lat['p99_ms']}ms max={lat['max_ms']}ms")
+        for name, stage in version["stages"].items():
+            print(f"    {name:>24}: p50={stage['p50_ms']}ms p99={stage['p99_ms']}ms")
+        agreement = version["recorded_agreement"]
+        if agreement["compared"]:
+            print(f"    concordância com a captura: {agreement['agreement']:.4%} ({agreement['compared']})")
+    comparison = report.get("comparison")
+    if comparison:
+        print(f"{comparison['baseline']} x {comparison['candidate']}: "
+              f"{comparison['changed']} de {comparison['compared']} predições mudaram "
+              f"(concordância {comparison['agreement']})")
+        for transition, count in comparison["transitions"].items():
+            print(f"    {transition}: {count}")
+    print("=" * 60)
+
+
+def _model_files(values: List[str]) -> Dict[str, str]:
+    files = {}
+    for value in values:
+        label, sep, path = value.partition('=')
+        if not sep or not label or not path:
+            raise ValueError(f"--model-file espera ROTULO=arquivo, recebido {value!r}")
+        files[label] = path
+    return files
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay do tráfego capturado contra a API")
+    parser.add_argument("path", help="CSV de drift, diretório com os arquivos diários ou export .jsonl")
+    parser.add_argument("--url", help="URL do server.py; sem ela, o handler roda no próprio processo")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Fator sobre o ritmo original (1 = original, 10 = 10x mais rápido, 0 = máximo)")
+    parser.add_argument("--max-gap-seconds", type=float, help="Maior pausa entre requisições (após a aceleração)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Registros por requisição (>1 usa /predict/batch)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requisições simultâneas")
+    parser.add_argument("--limit", type=int, help="Máximo de registros reproduzidos")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "CANDIDATA"),
+                        help="Versões do modelo comparadas (header X-Model-Version; 'latest' = padrão)")
+    parser.add_argument("--model-file", action="append", default=[], metavar="ROTULO=ARQUIVO",
+                        help="Registra um modelo local (joblib) como versão ROTULO (apenas no modo local)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição HTTP (s)")
+    parser.add_argument("--verbose", action="store_true", help="Mantém os logs INFO da API no modo local")
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args(argv)
+
+    records, skipped = load_replay(args.path, args.limit)
+    if not records:
+        print(f"Nenhum registro encontrado em {args.path}")
+        return 1
+    print(f"Replay: {len(records)} registros ({skipped} linhas ignoradas)")
+
+    if args.url:
+        if args.model_file:
+            parser.error("--model-file só vale no modo local (sem --url)")
+        target = HttpReplayTarget(args.url, args.timeout)
+    else:
+        if not args.verbose:
+            logging.getLogger('app').setLevel(logging.WARNING)
+        target = InProcessTarget(_model_files(args.model_file))
+
+    labels = list(args.compare) if args.compare else [None]
+    requests = build_requests(records, args.batch_size, args.speed, args.max_gap_seconds)
+    try:
+        recorder, elapsed = replay(target, requests, labels, args.concurrency)
+    finally:
+        target.close()
+    report = build_report(recorder, records, requests, elapsed, args.speed, skipped)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Relatório salvo em {args.output}")
+
+    return 0 if any(version["ok"] for version in report["versions"].values()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())